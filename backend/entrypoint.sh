@@ -51,6 +51,30 @@ echo "Collecting static files..."
 python manage.py collectstatic --noinput || true
 
 # DaphneでASGIサーバーを起動（WebSocket対応）
-echo "Starting Daphne ASGI server..."
-exec daphne -b 0.0.0.0 -p ${PORT:-8000} salesmind.asgi:application
+# ASGI_WORKERS個のプロセスをASGI_BASE_PORT（省略時はPORT）から連番のポートで起動し、nginxのupstreamで振り分ける
+# （nginxのupstreamは同じASGI_WORKERSからnginx-upstream.shで生成する。プロセス間のメッセージはRedisチャンネルレイヤー経由）
+ASGI_WORKERS=${ASGI_WORKERS:-1}
+BASE_PORT=${ASGI_BASE_PORT:-${PORT:-8000}}
+
+if [ "$ASGI_WORKERS" -le 1 ]; then
+    echo "Starting Daphne ASGI server..."
+    exec daphne -b 0.0.0.0 -p "$BASE_PORT" salesmind.asgi:application
+fi
+
+echo "Starting ${ASGI_WORKERS} Daphne ASGI workers (ports ${BASE_PORT}-$((BASE_PORT + ASGI_WORKERS - 1)))..."
+pids=()
+for i in $(seq 0 $((ASGI_WORKERS - 1))); do
+    daphne -b 0.0.0.0 -p $((BASE_PORT + i)) salesmind.asgi:application &
+    pids+=($!)
+done
+
+trap 'kill -TERM "${pids[@]}" 2>/dev/null' TERM INT
+
+# いずれかのワーカーが終了したら残りも停止し、コンテナの再起動に任せる
+set +e
+wait -n
+status=$?
+kill -TERM "${pids[@]}" 2>/dev/null
+wait
+exit $status
 
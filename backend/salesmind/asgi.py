@@ -18,6 +18,12 @@ os.environ.setdefault("DJANGO_SETTINGS_MODULE", "salesmind.settings")
 # Django ASGIアプリケーションを初期化（HTTP用）
 django_asgi_app = get_asgi_application()
 
+# 最初の音声認識リクエストでgRPCチャネルの接続を待たないよう、Speech-to-Textクライアントを準備
+from django.conf import settings
+if settings.SPEECH_CLIENT_WARMUP:
+    from spin.services.speech_to_text import warm_up_speech_client
+    warm_up_speech_client()
+
 # WebSocketルーティングをインポート
 from spin.routing import websocket_urlpatterns
 
@@ -88,6 +88,8 @@ MIDDLEWARE = [
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    # @conditional_etag を付けたビューのETag / 304 応答
+    "spin.middleware.ConditionalGetMiddleware",
 ]
 
 ROOT_URLCONF = "salesmind.urls"
@@ -112,12 +114,56 @@ WSGI_APPLICATION = "salesmind.wsgi.application"
 # ASGI Application (for WebSocket support via Django Channels)
 ASGI_APPLICATION = "salesmind.asgi.application"
 
-# Channel Layers configuration for Django Channels
-CHANNEL_LAYERS = {
-    "default": {
-        "BACKEND": "channels.layers.InMemoryChannelLayer"
-    }
-}
+# OpenAI Realtime APIの接続先（ベンチマークではローカルの疑似サーバーに向ける）
+OPENAI_REALTIME_URL = os.getenv("OPENAI_REALTIME_URL", "wss://api.openai.com/v1/realtime?model=gpt-realtime")
+
+# リアルタイムモードの音声フレーム結合（クライアントからの小さなPCM16フレームをまとめて上流に送る）
+# REALTIME_AUDIO_BATCH_MS分またはREALTIME_AUDIO_BATCH_MAX_BYTESたまったら送信。0で結合しない
+REALTIME_AUDIO_SAMPLE_RATE = int(os.getenv("REALTIME_AUDIO_SAMPLE_RATE", "24000"))
+REALTIME_AUDIO_BATCH_MS = int(os.getenv("REALTIME_AUDIO_BATCH_MS", "100"))
+REALTIME_AUDIO_BATCH_MAX_BYTES = int(os.getenv("REALTIME_AUDIO_BATCH_MAX_BYTES", "32768"))
+
+# リアルタイムモード切断時に、キューに残った発言の保存・分析を待つ最大秒数
+REALTIME_PERSISTENCE_DRAIN_TIMEOUT = int(os.getenv("REALTIME_PERSISTENCE_DRAIN_TIMEOUT", "60"))
+
+# リアルタイムモードのクライアント送信キュー
+# 未送信のキューの上限（バイト）、受信確認のない送信量の上限（バイト）、上限超過が何秒続いたら切断するか
+REALTIME_SEND_QUEUE_MAX_BYTES = int(os.getenv("REALTIME_SEND_QUEUE_MAX_BYTES", str(1024 * 1024)))
+REALTIME_SEND_WINDOW_BYTES = int(os.getenv("REALTIME_SEND_WINDOW_BYTES", str(512 * 1024)))
+REALTIME_SEND_OVERFLOW_SECONDS = float(os.getenv("REALTIME_SEND_OVERFLOW_SECONDS", "5"))
+
+# 音声認識（/api/speech/transcribe/）
+# WEBM（Opus）の録音をGCP Speech-to-Textにそのまま送るか（Falseの場合はffmpegでWAVに変換してから送る）
+SPEECH_WEBM_OPUS_DIRECT = os.getenv("SPEECH_WEBM_OPUS_DIRECT", "True") == "True"
+# Speech-to-Text APIのgRPCチャネルのkeepalive間隔（秒）と、ワーカー起動時に接続しておくか
+SPEECH_GRPC_KEEPALIVE_SECONDS = int(os.getenv("SPEECH_GRPC_KEEPALIVE_SECONDS", "60"))
+SPEECH_CLIENT_WARMUP = os.getenv("SPEECH_CLIENT_WARMUP", "True") == "True"
+# プッシュトゥトークのストリーミング音声認識（/ws/speech/）
+# バックエンド（google: GCP Speech-to-Text、fake: ローカル開発用）、1回の最大録音秒数（GCPのストリームは約5分まで）、
+# 1回の最大音声データ量（バイト）、ワーカーあたりの同時ストリーム数
+SPEECH_STREAMING_BACKEND = os.getenv("SPEECH_STREAMING_BACKEND", "google")
+SPEECH_STREAMING_MAX_SECONDS = int(os.getenv("SPEECH_STREAMING_MAX_SECONDS", "280"))
+SPEECH_STREAMING_MAX_BYTES = int(os.getenv("SPEECH_STREAMING_MAX_BYTES", str(10 * 1024 * 1024)))
+SPEECH_STREAMING_MAX_STREAMS = int(os.getenv("SPEECH_STREAMING_MAX_STREAMS", "32"))
+# 長時間音声の文字起こし（/api/speech/transcribe/long/）
+# 無音の位置で分割して並列に認識する。アップロードの上限（バイト）・録音の上限（秒）、
+# 1区間の最大・最小秒数（同期認識は60秒まで）、プロセスあたりの並列数、1区間の認識・全体の変換のタイムアウト（秒）
+SPEECH_LONG_AUDIO_MAX_BYTES = int(os.getenv("SPEECH_LONG_AUDIO_MAX_BYTES", str(100 * 1024 * 1024)))
+SPEECH_LONG_AUDIO_MAX_SECONDS = int(os.getenv("SPEECH_LONG_AUDIO_MAX_SECONDS", "1800"))
+SPEECH_LONG_AUDIO_MAX_CHUNK_SECONDS = float(os.getenv("SPEECH_LONG_AUDIO_MAX_CHUNK_SECONDS", "50"))
+SPEECH_LONG_AUDIO_MIN_CHUNK_SECONDS = float(os.getenv("SPEECH_LONG_AUDIO_MIN_CHUNK_SECONDS", "15"))
+SPEECH_LONG_AUDIO_PARALLELISM = int(os.getenv("SPEECH_LONG_AUDIO_PARALLELISM", "4"))
+SPEECH_LONG_AUDIO_CHUNK_TIMEOUT = int(os.getenv("SPEECH_LONG_AUDIO_CHUNK_TIMEOUT", "120"))
+SPEECH_LONG_AUDIO_TRANSCODE_TIMEOUT = int(os.getenv("SPEECH_LONG_AUDIO_TRANSCODE_TIMEOUT", "120"))
+# 音声変換（ffmpeg）の同時実行数、1回の変換のタイムアウト（秒）、空きを待つ最大秒数
+FFMPEG_BINARY = os.getenv("FFMPEG_BINARY", "ffmpeg")
+AUDIO_TRANSCODE_MAX_PROCESSES = int(os.getenv("AUDIO_TRANSCODE_MAX_PROCESSES", str(os.cpu_count() or 2)))
+AUDIO_TRANSCODE_TIMEOUT = int(os.getenv("AUDIO_TRANSCODE_TIMEOUT", "30"))
+AUDIO_TRANSCODE_QUEUE_TIMEOUT = int(os.getenv("AUDIO_TRANSCODE_QUEUE_TIMEOUT", "10"))
+
+# スコアリングジョブ（セッション終了時のバックグラウンドスコアリング）
+SCORING_JOB_MAX_WORKERS = int(os.getenv("SCORING_JOB_MAX_WORKERS", "4"))
+SCORING_JOB_STALE_SECONDS = int(os.getenv("SCORING_JOB_STALE_SECONDS", "300"))
 
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
@@ -145,6 +191,54 @@ else:
         }
     }
 
+# キャッシュ
+# 複数ワーカー間で共有するためREDIS_URLが設定されている場合はRedisを使用（未設定時はプロセス内メモリ）
+REDIS_URL = os.getenv("REDIS_URL")
+
+if REDIS_URL:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        }
+    }
+
+# Channel Layers configuration for Django Channels
+# 複数のASGIワーカープロセス間でメッセージをやり取りするため、REDIS_URL（またはCHANNEL_REDIS_URL）が
+# 設定されている場合はRedisを使用（未設定時のローカル開発・テストではプロセス内メモリ）
+CHANNEL_REDIS_URL = os.getenv("CHANNEL_REDIS_URL", REDIS_URL)
+
+if CHANNEL_REDIS_URL:
+    CHANNEL_LAYERS = {
+        "default": {
+            "BACKEND": "channels_redis.core.RedisChannelLayer",
+            "CONFIG": {
+                "hosts": [CHANNEL_REDIS_URL],
+                "prefix": "salesmind",
+                # チャンネルごとの未処理メッセージ上限と、メッセージ・グループの有効期限（秒）
+                "capacity": int(os.getenv("CHANNEL_LAYER_CAPACITY", "1000")),
+                "expiry": int(os.getenv("CHANNEL_LAYER_EXPIRY", "60")),
+                "group_expiry": 86400,
+            },
+        }
+    }
+else:
+    CHANNEL_LAYERS = {
+        "default": {
+            "BACKEND": "channels.layers.InMemoryChannelLayer"
+        }
+    }
+
+# ランキングAPIのキャッシュ（ブラウザ・nginxのキャッシュ有効期間と、サーバー側キャッシュの有効期間）
+RANKING_CACHE_MAX_AGE = int(os.getenv("RANKING_CACHE_MAX_AGE", "30"))
+RANKING_CACHE_TTL = int(os.getenv("RANKING_CACHE_TTL", "600"))
+
 CORS_ALLOW_ALL_ORIGINS = True
 
 # CSRF設定（nginx経由のアクセスを許可）
@@ -14,3 +14,9 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "salesmind.settings")
 
 application = get_wsgi_application()
+
+# 最初の音声認識リクエストでgRPCチャネルの接続を待たないよう、Speech-to-Textクライアントを準備
+from django.conf import settings
+if settings.SPEECH_CLIENT_WARMUP:
+    from spin.services.speech_to_text import warm_up_speech_client
+    warm_up_speech_client()
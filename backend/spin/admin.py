@@ -6,10 +6,13 @@ from django.urls import path, reverse
 from django.shortcuts import render, redirect
 from django.contrib import messages
 from django.http import JsonResponse
+from django.db.models import Count, Max
+from django.db.models.functions import Coalesce
 from django.template.response import TemplateResponse
 from .models import Session, ChatMessage, Report, OpenAIAPIKey, ModelConfiguration, AIProviderKey, AIModel, UserProfile, EmailVerificationToken, UserEmail, PendingUserRegistration
 import openai
 import logging
+from .services.message_archive import get_message_counts
 
 logger = logging.getLogger(__name__)
 
@@ -214,11 +217,16 @@ class CustomUserAdmin(BaseUserAdmin):
     
     readonly_fields = ['last_login', 'date_joined', 'session_count_display', 'report_count_display']
     
+    def get_queryset(self, request):
+        """一覧表示で行ごとにクエリが発生しないよう、プロファイルとセッション数をまとめて取得"""
+        return super().get_queryset(request).select_related('profile').annotate(session_total=Count('sessions'))
+    
     def session_count(self, obj):
         """セッション数を表示"""
-        count = obj.sessions.count()
+        count = obj.session_total
         return count
     session_count.short_description = 'セッション数'
+    session_count.admin_order_field = 'session_total'
     
     def session_count_display(self, obj):
         """詳細ページでセッション数を表示（リンク付き）"""
@@ -263,6 +271,7 @@ class SessionAdmin(admin.ModelAdmin):
     list_filter = ['status', 'created_at', 'industry']
     search_fields = ['industry', 'value_proposition', 'customer_persona', 'user__username']
     readonly_fields = ['id', 'created_at', 'updated_at', 'message_count_display', 'report_link']
+    list_select_related = ['user', 'report']
     inlines = [ChatMessageInline]
     fieldsets = (
         ('基本情報', {
@@ -279,15 +288,22 @@ class SessionAdmin(admin.ModelAdmin):
         }),
     )
     
+    def get_queryset(self, request):
+        """一覧表示で行ごとにクエリが発生しないよう、メッセージ数（アーカイブ済みを含む）をまとめて取得"""
+        return super().get_queryset(request).annotate(
+            message_total=Count('messages') + Coalesce(Max('message_archive__message_count'), 0)
+        )
+    
     def message_count(self, obj):
         """メッセージ数を表示"""
-        count = obj.messages.count()
+        count = obj.message_total
         return count
     message_count.short_description = 'メッセージ数'
+    message_count.admin_order_field = 'message_total'
     
     def message_count_display(self, obj):
         """詳細ページでメッセージ数を表示"""
-        count = obj.messages.count()
+        count = get_message_counts([obj.pk]).get(obj.pk, 0)
         return f"{count}件"
     message_count_display.short_description = 'メッセージ数'
     
@@ -333,6 +349,7 @@ class ReportAdmin(admin.ModelAdmin):
     list_filter = ['created_at']
     readonly_fields = ['id', 'created_at', 'spin_scores_display', 'feedback', 'next_actions', 'scoring_details_display']
     search_fields = ['session__id', 'session__industry', 'session__user__username']
+    list_select_related = ['session']
     fieldsets = (
         ('基本情報', {
             'fields': ('id', 'session', 'created_at')
@@ -353,7 +370,7 @@ class ReportAdmin(admin.ModelAdmin):
         """総合スコアを表示"""
         total = obj.spin_scores.get('total', 0)
         css_class = 'score-high' if total >= 80 else 'score-medium' if total >= 60 else 'score-low'
-        return format_html('<span class="{}">{:.1f}点</span>', css_class, total)
+        return format_html('<span class="{}">{}点</span>', css_class, f'{total:.1f}')
     total_score.short_description = '総合スコア'
     
     def situation_score(self, obj):
@@ -1251,6 +1268,7 @@ class UserEmailAdmin(admin.ModelAdmin):
     list_display = ['user', 'email', 'is_verification_email', 'verified', 'verified_at', 'created_at']
     list_filter = ['is_verification_email', 'verified', 'created_at']
     search_fields = ['user__username', 'email']
+    list_select_related = ['user']
     readonly_fields = ['created_at', 'updated_at']
     ordering = ['user', '-is_verification_email', '-created_at']
     
@@ -1285,6 +1303,7 @@ class UserProfileAdmin(admin.ModelAdmin):
     list_display = ['user', 'email_verified', 'industry', 'sales_experience', 'created_at']
     list_filter = ['email_verified', 'industry', 'sales_experience', 'usage_purpose', 'created_at']
     search_fields = ['user__username', 'user__email']
+    list_select_related = ['user']
     readonly_fields = ['email_verified_at', 'created_at', 'updated_at']
     
     fieldsets = (
@@ -1339,4 +1358,5 @@ class EmailVerificationTokenAdmin(admin.ModelAdmin):
     list_display = ['user', 'token', 'created_at', 'expires_at', 'used', 'used_at']
     list_filter = ['used', 'created_at', 'expires_at']
     search_fields = ['user__username', 'user__email', 'token']
+    list_select_related = ['user']
     readonly_fields = ['token', 'created_at', 'expires_at']
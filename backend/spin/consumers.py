@@ -3,17 +3,34 @@ WebSocket consumers for OpenAI Realtime API proxy
 """
 import json
 import asyncio
+import base64
 import logging
+import time
 from channels.generic.websocket import AsyncWebsocketConsumer
 from channels.db import database_sync_to_async
+from django.conf import settings
 from django.contrib.auth.models import User
 from rest_framework.authtoken.models import Token
 import websockets
 import os
 
+from .services import realtime_metrics
+from .services.realtime_latency import TurnLatencyTracker
+from .services.realtime_send_queue import RealtimeSendQueue
+
 logger = logging.getLogger(__name__)
 
 
+@database_sync_to_async
+def get_user_from_token(token_key):
+    """トークンからユーザーを取得"""
+    try:
+        token = Token.objects.select_related('user').get(key=token_key)
+        return token.user
+    except Token.DoesNotExist:
+        return None
+
+
 class RealtimeConsumer(AsyncWebsocketConsumer):
     """
     OpenAI Realtime API用のWebSocketプロキシ
@@ -29,6 +46,23 @@ class RealtimeConsumer(AsyncWebsocketConsumer):
         # 会話履歴用のバッファ
         self.pending_user_transcript = None  # ユーザーの発言を一時保存
         self.message_sequence = 0  # メッセージの順番を管理
+        # 音声フレームの結合用バッファ（小さなフレームをまとめて1つのinput_audio_buffer.appendで送る）
+        self.audio_batch_bytes = min(
+            settings.REALTIME_AUDIO_SAMPLE_RATE * 2 * settings.REALTIME_AUDIO_BATCH_MS // 1000,
+            settings.REALTIME_AUDIO_BATCH_MAX_BYTES,
+        )
+        self.audio_buffer = bytearray(max(self.audio_batch_bytes, 0))
+        self.audio_buffered = 0
+        self.audio_flush_task = None
+        # 会話履歴の保存・成功率分析のキュー（転送ループを止めないよう、接続ごとのバックグラウンドタスクで処理）
+        self.persistence_queue = None
+        self.persistence_task = None
+        self.client_connected = False
+        # クライアントへの送信キュー（回線の遅いクライアントでバッファが際限なく増えないよう上限を設ける）
+        self.send_queue = None
+        self.sender_task = None
+        # ターンごとの応答遅延（発話終了 → 最初の音声など）
+        self.latency = TurnLatencyTracker()
         
     async def connect(self):
         """WebSocket接続時の処理"""
@@ -51,7 +85,7 @@ class RealtimeConsumer(AsyncWebsocketConsumer):
             logger.info(f"トークン確認: {token_key[:10]}...")
             
             # ユーザー認証
-            self.user = await self.get_user_from_token(token_key)
+            self.user = await get_user_from_token(token_key)
             if not self.user:
                 logger.error(f"❌ 無効なトークン: {token_key[:10]}...")
                 await self.close(code=4001)
@@ -70,6 +104,20 @@ class RealtimeConsumer(AsyncWebsocketConsumer):
             
             # クライアントとの接続を受け入れ
             await self.accept()
+            self.client_connected = True
+            
+            self.send_queue = RealtimeSendQueue(
+                max_bytes=settings.REALTIME_SEND_QUEUE_MAX_BYTES,
+                window_bytes=settings.REALTIME_SEND_WINDOW_BYTES,
+                overflow_seconds=settings.REALTIME_SEND_OVERFLOW_SECONDS,
+            )
+            self.sender_task = asyncio.create_task(self.send_to_client())
+            realtime_metrics.register_connection(str(id(self)), self.send_queue.gauges)
+            realtime_metrics.ensure_publisher()
+            
+            if self.session_id:
+                self.persistence_queue = asyncio.Queue()
+                self.persistence_task = asyncio.create_task(self.persist_messages())
             
             # OpenAI Realtime APIに接続
             await self.connect_to_openai()
@@ -81,6 +129,7 @@ class RealtimeConsumer(AsyncWebsocketConsumer):
     async def disconnect(self, close_code):
         """WebSocket切断時の処理"""
         logger.info(f"WebSocket disconnecting: user={self.user.username if self.user else 'Unknown'}, code={close_code}")
+        self.client_connected = False
         
         # セッションをrealtime_mode=Falseに更新
         if self.session_id:
@@ -93,6 +142,10 @@ class RealtimeConsumer(AsyncWebsocketConsumer):
             except Exception as e:
                 logger.error(f"Error closing OpenAI WebSocket: {e}")
         
+        # 未送信の音声は破棄（上流の接続も閉じるため）
+        self._cancel_audio_flush()
+        self.audio_buffered = 0
+        
         # フォワーディングタスクをキャンセル
         if self.forwarding_task:
             self.forwarding_task.cancel()
@@ -100,18 +153,50 @@ class RealtimeConsumer(AsyncWebsocketConsumer):
                 await self.forwarding_task
             except asyncio.CancelledError:
                 pass
+        
+        # 送信キューを破棄
+        if self.sender_task:
+            self.sender_task.cancel()
+            realtime_metrics.unregister_connection(str(id(self)))
+        
+        # キューに残っている発言の保存・分析を終えてから終了
+        if self.persistence_task:
+            self.persistence_queue.put_nowait(None)
+            try:
+                await asyncio.wait_for(self.persistence_task, timeout=settings.REALTIME_PERSISTENCE_DRAIN_TIMEOUT)
+            except asyncio.TimeoutError:
+                logger.warning(f"⚠️ 会話履歴の保存が終わらないまま終了: Session {self.session_id}")
+            except Exception as e:
+                logger.error(f"Error in persistence task: {e}", exc_info=True)
+        
+        # 応答遅延の統計をセッションに保存
+        if self.session_id and self.latency.turns:
+            await self.save_latency_summary()
     
     async def receive(self, text_data=None, bytes_data=None):
         """クライアントからメッセージを受信"""
         try:
             if text_data:
                 data = json.loads(text_data)
+                
+                # 受信確認（フロー制御用、上流には転送しない）
+                if data.get('type') == 'salesmind.ack':
+                    if self.send_queue is not None:
+                        self.send_queue.ack(data.get('received'))
+                    return
+                
                 logger.info(f"📨 クライアントからテキスト受信: type={data.get('type', 'unknown')}")
                 logger.debug(f"メッセージ内容: {text_data[:200]}...")
                 
                 # OpenAI Realtime APIにメッセージを転送
                 if self.openai_ws:
                     try:
+                        # バッファ中の音声を先に送り、commit等のイベントとの順序を保つ（clearの場合は破棄）
+                        if data.get('type') == 'input_audio_buffer.clear':
+                            self._cancel_audio_flush()
+                            self.audio_buffered = 0
+                        else:
+                            await self.flush_audio()
                         await self.openai_ws.send(text_data)
                         logger.info(f"✅ OpenAIへテキスト転送成功")
                     except Exception as e:
@@ -136,20 +221,10 @@ class RealtimeConsumer(AsyncWebsocketConsumer):
             elif bytes_data:
                 # バイナリデータ（音声）の場合
                 # OpenAI Realtime APIはJSON形式のinput_audio_buffer.appendイベントを期待
-                bytes_len = len(bytes_data)
-                logger.debug(f"🎤 クライアントから音声データ受信: {bytes_len} bytes")
-                
+                # （フレームごとのログは出力しない）
                 if self.openai_ws:
                     try:
-                        # PCM16バイナリをBase64エンコードしてJSON形式で送信
-                        import base64
-                        audio_base64 = base64.b64encode(bytes_data).decode('utf-8')
-                        audio_event = {
-                            "type": "input_audio_buffer.append",
-                            "audio": audio_base64
-                        }
-                        await self.openai_ws.send(json.dumps(audio_event))
-                        logger.debug(f"✅ OpenAIへ音声転送成功: {bytes_len} bytes (Base64)")
+                        await self.append_audio(bytes_data)
                     except Exception as e:
                         logger.error(f"❌ OpenAIへの音声送信失敗: {e}", exc_info=True)
                     
@@ -163,6 +238,65 @@ class RealtimeConsumer(AsyncWebsocketConsumer):
                 }
             }))
     
+    async def append_audio(self, audio: bytes):
+        """
+        クライアントからの音声（PCM16）をバッファに追加し、REALTIME_AUDIO_BATCH_MS分
+        （またはREALTIME_AUDIO_BATCH_MAX_BYTES）たまったら1つのinput_audio_buffer.appendとして送信
+        
+        バッファが埋まらない場合もREALTIME_AUDIO_BATCH_MS後には送信する
+        """
+        capacity = self.audio_batch_bytes
+        if capacity <= 0:
+            await self.send_audio(audio)
+            return
+        
+        if self.audio_buffered + len(audio) > capacity:
+            await self.flush_audio()
+        if len(audio) >= capacity:
+            # バッファより大きいフレームはそのまま送信
+            await self.send_audio(audio)
+            return
+        
+        self.audio_buffer[self.audio_buffered:self.audio_buffered + len(audio)] = audio
+        self.audio_buffered += len(audio)
+        if self.audio_buffered >= capacity:
+            await self.flush_audio()
+        elif self.audio_flush_task is None:
+            self.audio_flush_task = asyncio.create_task(self._flush_audio_later())
+    
+    async def _flush_audio_later(self):
+        await asyncio.sleep(settings.REALTIME_AUDIO_BATCH_MS / 1000)
+        self.audio_flush_task = None
+        try:
+            await self.flush_audio()
+        except Exception as e:
+            logger.error(f"❌ OpenAIへの音声送信失敗: {e}", exc_info=True)
+    
+    def _cancel_audio_flush(self):
+        if self.audio_flush_task and self.audio_flush_task is not asyncio.current_task():
+            self.audio_flush_task.cancel()
+        self.audio_flush_task = None
+    
+    async def flush_audio(self):
+        """バッファ中の音声を送信"""
+        self._cancel_audio_flush()
+        if not self.audio_buffered:
+            return
+        # 送信を待つ間に次のフレームを受け付けられるよう、エンコードしてからバッファを空にする
+        audio_base64 = base64.b64encode(memoryview(self.audio_buffer)[:self.audio_buffered]).decode('ascii')
+        self.audio_buffered = 0
+        await self.openai_ws.send(json.dumps({
+            "type": "input_audio_buffer.append",
+            "audio": audio_base64
+        }))
+    
+    async def send_audio(self, audio: bytes):
+        """音声をBase64エンコードしてそのまま送信"""
+        await self.openai_ws.send(json.dumps({
+            "type": "input_audio_buffer.append",
+            "audio": base64.b64encode(audio).decode('ascii')
+        }))
+    
     async def connect_to_openai(self):
         """OpenAI Realtime APIに接続"""
         try:
@@ -178,7 +312,7 @@ class RealtimeConsumer(AsyncWebsocketConsumer):
             logger.info(f"APIキー取得成功: {api_key[:10]}...{api_key[-4:]}")
             
             # OpenAI Realtime API WebSocketエンドポイント（GA版）
-            openai_url = "wss://api.openai.com/v1/realtime?model=gpt-realtime"
+            openai_url = settings.OPENAI_REALTIME_URL
             
             # websocketsライブラリのバージョンに応じてヘッダーを設定
             headers = [
@@ -236,7 +370,13 @@ class RealtimeConsumer(AsyncWebsocketConsumer):
                     # テキストメッセージ
                     data = json.loads(message)
                     msg_type = data.get('type', 'unknown')
-                    logger.info(f"📩 OpenAIからメッセージ受信: type={msg_type}")
+                    logger.debug(f"📩 OpenAIからメッセージ受信: type={msg_type}")
+                    
+                    turn = self.latency.on_upstream_event(
+                        msg_type, time.monotonic(), getattr(self.openai_ws, 'latency', None)
+                    )
+                    if turn:
+                        logger.info(f"⏱️ 応答遅延: user={self.user.username}, session={self.session_id}, {turn}")
                     
                     # エラーメッセージは詳細ログ
                     if msg_type == 'error':
@@ -244,17 +384,21 @@ class RealtimeConsumer(AsyncWebsocketConsumer):
                     else:
                         logger.debug(f"メッセージ内容: {message[:300]}...")
                     
-                    await self.send(text_data=message)
-                    logger.debug(f"✅ クライアントへ転送完了")
+                    self.send_queue.put(message, data)
+                    if self.send_queue.overflowed:
+                        await self.close_slow_client()
+                        return
                     
-                    # セッション履歴に保存（必要に応じて）
-                    await self.save_message_to_session(data)
+                    # セッション履歴の保存はキューに入れてバックグラウンドで行う
+                    self.enqueue_message(data)
                     
                 elif isinstance(message, bytes):
                     # バイナリメッセージ（音声）
                     logger.debug(f"🔊 OpenAIから音声受信: {len(message)} bytes")
-                    await self.send(bytes_data=message)
-                    logger.debug(f"✅ クライアントへ音声転送完了")
+                    self.send_queue.put(message)
+                    if self.send_queue.overflowed:
+                        await self.close_slow_client()
+                        return
                     
         except websockets.exceptions.ConnectionClosed:
             logger.info("OpenAI WebSocket connection closed")
@@ -270,10 +414,48 @@ class RealtimeConsumer(AsyncWebsocketConsumer):
                 }
             }))
     
-    async def save_message_to_session(self, data):
-        """メッセージをセッション履歴に保存"""
+    async def send(self, text_data=None, bytes_data=None, close=False):
+        """クライアントへの送信（接続後は送信キューを経由させ、送信順とフロー制御を保つ）"""
+        if self.send_queue is None or close:
+            await super().send(text_data=text_data, bytes_data=bytes_data, close=close)
+            return
+        self.send_queue.put(text_data if text_data is not None else bytes_data)
+    
+    async def send_to_client(self):
+        """送信キューのメッセージをクライアントに送信"""
         try:
-            if not self.session_id:
+            while True:
+                message, kind, enqueued_at = await self.send_queue.get()
+                if isinstance(message, bytes):
+                    await super().send(bytes_data=message)
+                else:
+                    await super().send(text_data=message)
+                realtime_metrics.increment('send_messages')
+                
+                if kind == 'audio':
+                    now = time.monotonic()
+                    realtime_metrics.observe('send_queue_wait_ms', round((now - enqueued_at) * 1000, 1))
+                    if self.latency.awaiting_first_audio_send:
+                        self.latency.on_first_audio_sent(enqueued_at, now)
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            logger.error(f"Error in send_to_client: {e}", exc_info=True)
+    
+    async def close_slow_client(self):
+        """送信キューの上限超過が続いたクライアントを切断"""
+        logger.warning(
+            f"⚠️ 送信キューの上限超過のため切断: user={self.user.username}, "
+            f"queue={len(self.send_queue)}件/{self.send_queue.pending_bytes} bytes, "
+            f"in_flight={self.send_queue.in_flight_bytes} bytes, dropped={self.send_queue.dropped}"
+        )
+        realtime_metrics.increment('send_overflow_disconnects')
+        await self.close(code=4008)
+    
+    def enqueue_message(self, data):
+        """保存対象のメッセージ（発言のトランスクリプト）を保存キューに追加"""
+        try:
+            if self.persistence_queue is None:
                 return
             
             message_type = data.get('type')
@@ -285,20 +467,14 @@ class RealtimeConsumer(AsyncWebsocketConsumer):
                 transcript = data.get('transcript', '')
                 if transcript and transcript.strip():
                     logger.info(f"💬 ユーザー発言を保存: {transcript[:50]}...")
-                    await self.save_chat_message_direct(
-                        role='salesperson',
-                        message=transcript.strip()
-                    )
+                    self.persistence_queue.put_nowait(('salesperson', transcript.strip()))
             
             # AIの応答（トランスクリプト完了）
             elif message_type == 'response.audio_transcript.done':
                 transcript = data.get('transcript', '')
                 if transcript and transcript.strip():
                     logger.info(f"🤖 AI応答を保存: {transcript[:50]}...")
-                    await self.save_chat_message_direct(
-                        role='customer',
-                        message=transcript.strip()
-                    )
+                    self.persistence_queue.put_nowait(('customer', transcript.strip()))
             
             # フォールバック: response.output_item.done も処理
             elif message_type == 'response.output_item.done':
@@ -316,6 +492,59 @@ class RealtimeConsumer(AsyncWebsocketConsumer):
         except Exception as e:
             logger.error(f"Error saving message to session: {e}", exc_info=True)
     
+    async def persist_messages(self):
+        """
+        保存キューの発言をまとめて保存し、営業メッセージの分析結果をクライアントに送信
+        
+        分析（LLM呼び出し）中に届いた発言は次の保存でまとめて書き込む。キューにNoneが入ったら終了
+        """
+        while True:
+            batch = [await self.persistence_queue.get()]
+            while not self.persistence_queue.empty():
+                batch.append(self.persistence_queue.get_nowait())
+            finished = None in batch
+            batch = [item for item in batch if item is not None]
+            
+            if batch:
+                try:
+                    session, chat_messages = await self.save_chat_messages(batch)
+                    for chat_msg in chat_messages:
+                        analysis = await self.analyze_and_record_turn(session, chat_msg)
+                        if analysis:
+                            await self.send_analysis(analysis)
+                except Exception as e:
+                    logger.error(f"Error in persist_messages: {e}", exc_info=True)
+            
+            if finished:
+                return
+    
+    async def send_analysis(self, analysis):
+        """営業メッセージの分析結果をクライアントに送信（切断後は送信しない）"""
+        if not self.client_connected:
+            return
+        try:
+            await self.send(text_data=json.dumps({'type': 'salesmind.analysis', **analysis}))
+        except Exception as e:
+            logger.warning(f"分析結果の送信に失敗: {e}")
+    
+    @database_sync_to_async
+    def save_latency_summary(self):
+        """この接続のターンごとの応答遅延をセッションの統計に追加"""
+        try:
+            from django.db import transaction
+            from .models import Session
+            from .services.realtime_latency import merge_session_latency
+            
+            with transaction.atomic():
+                session = Session.objects.select_for_update().only('id', 'realtime_latency').get(id=self.session_id, user=self.user)
+                session.realtime_latency = merge_session_latency(session.realtime_latency, self.latency.turns)
+                session.save(update_fields=['realtime_latency'])
+            logger.info(f"⏱️ 応答遅延の統計を保存: Session {self.session_id}, {session.realtime_latency['summary']}")
+        except Session.DoesNotExist:
+            logger.warning(f"⚠️ Session {self.session_id} not found for user {self.user.username}")
+        except Exception as e:
+            logger.error(f"❌ Failed to save realtime latency: {e}", exc_info=True)
+    
     @database_sync_to_async
     def update_session_realtime_mode(self, is_realtime):
         """セッションのリアルタイムモードを更新"""
@@ -343,15 +572,6 @@ class RealtimeConsumer(AsyncWebsocketConsumer):
             logger.error(f"Error getting message count: {e}")
             return 0
     
-    @database_sync_to_async
-    def get_user_from_token(self, token_key):
-        """トークンからユーザーを取得"""
-        try:
-            token = Token.objects.select_related('user').get(key=token_key)
-            return token.user
-        except Token.DoesNotExist:
-            return None
-    
     @database_sync_to_async
     def get_openai_api_key(self):
         """Django管理画面から登録されたOpenAI APIキーを取得"""
@@ -381,6 +601,7 @@ class RealtimeConsumer(AsyncWebsocketConsumer):
         """チャットメッセージをデータベースに保存（レガシー）"""
         try:
             from .models import Session, ChatMessage
+            from .services.scorecard import record_turn
             
             if not self.session_id:
                 return
@@ -411,12 +632,13 @@ class RealtimeConsumer(AsyncWebsocketConsumer):
                     self.message_sequence += 1
                     
                     # データベースに保存
-                    ChatMessage.objects.create(
+                    chat_msg = ChatMessage.objects.create(
                         session=session,
                         role=db_role,
                         message=message_text,
                         sequence=self.message_sequence
                     )
+                    record_turn(session, chat_msg)
                     
                     logger.info(f"Saved message to session {self.session_id}: {db_role} (seq={self.message_sequence})")
                     
@@ -424,49 +646,55 @@ class RealtimeConsumer(AsyncWebsocketConsumer):
             logger.error(f"Error in save_chat_message: {e}", exc_info=True)
     
     @database_sync_to_async
-    def save_chat_message_direct(self, role: str, message: str):
-        """チャットメッセージを直接データベースに保存"""
-        try:
-            from .models import Session, ChatMessage
-            
-            if not self.session_id:
-                logger.warning("save_chat_message_direct: session_id is None")
-                return
-            
-            session = Session.objects.get(id=self.session_id)
-            
-            # シーケンス番号を取得（既存のメッセージ数+1）
-            existing_count = session.messages.count()
-            sequence = existing_count + 1
-            
-            # データベースに保存
-            chat_msg = ChatMessage.objects.create(
-                session=session,
-                role=role,
-                message=message,
-                sequence=sequence
-            )
-            
-            logger.info(f"✅ Saved {role} message to session {self.session_id} (seq={sequence}): {message[:30]}...")
-            
-            # 詳細診断モードかつ営業メッセージの場合、成功率を分析・更新
-            logger.info(f"🔍 分析条件チェック: role={role}, mode={session.mode}, company={session.company}")
-            if role == 'salesperson' and session.mode == 'detailed' and session.company:
-                logger.info(f"📊 成功率分析を開始: session={self.session_id}")
-                try:
-                    self._analyze_and_update_success_rate(session, message, chat_msg)
-                except Exception as e:
-                    logger.error(f"成功率分析エラー（リアルタイム）: {e}", exc_info=True)
-            else:
-                logger.info(f"⏭️ 分析スキップ: 条件を満たしていません")
-                
-        except Session.DoesNotExist:
-            logger.error(f"Session not found: {self.session_id}")
-        except Exception as e:
-            logger.error(f"Error in save_chat_message_direct: {e}", exc_info=True)
+    def save_chat_messages(self, items):
+        """
+        発言をまとめてデータベースに保存
+        
+        Args:
+            items: (role, message) のリスト（発言順）
+        
+        Returns:
+            (Session, 保存したChatMessageのリスト)
+        """
+        from django.db.models import Max
+        from .models import Session, ChatMessage
+        
+        session = Session.objects.get(id=self.session_id)
+        
+        # シーケンス番号を取得（既存の最大値+1から連番）
+        last_sequence = session.messages.aggregate(last=Max('sequence'))['last'] or 0
+        chat_messages = ChatMessage.objects.bulk_create([
+            ChatMessage(session=session, role=role, message=message, sequence=last_sequence + index)
+            for index, (role, message) in enumerate(items, start=1)
+        ])
+        
+        logger.info(f"✅ Saved {len(chat_messages)} messages to session {self.session_id} (seq={last_sequence + 1}-{last_sequence + len(chat_messages)})")
+        return session, chat_messages
+    
+    @database_sync_to_async
+    def analyze_and_record_turn(self, session, chat_msg):
+        """
+        保存した発言をスコアカードに反映（詳細診断モードの営業メッセージは先に成功率を分析・更新）
+        
+        Returns:
+            分析結果（クライアントに送信する内容）。分析しなかった場合はNone
+        """
+        from .services.scorecard import record_turn
+        
+        analysis = None
+        if chat_msg.role == 'salesperson' and session.mode == 'detailed' and session.company_id:
+            logger.info(f"📊 成功率分析を開始: session={self.session_id}")
+            try:
+                analysis = self._analyze_and_update_success_rate(session, chat_msg.message, chat_msg)
+            except Exception as e:
+                logger.error(f"成功率分析エラー（リアルタイム）: {e}", exc_info=True)
+        
+        # スコアカードに反映（営業メッセージは分析結果の保存後）
+        record_turn(session, chat_msg)
+        return analysis
     
     def _analyze_and_update_success_rate(self, session, message, chat_msg):
-        """営業メッセージを分析して成功率を更新（リアルタイムモード用）"""
+        """営業メッセージを分析して成功率を更新（リアルタイムモード用）。分析結果を返す"""
         try:
             from .services.conversation_analysis import analyze_sales_message
             
@@ -496,6 +724,171 @@ class RealtimeConsumer(AsyncWebsocketConsumer):
             
             logger.info(f"📊 リアルタイム成功率更新: Session {session.id}, Delta={success_delta}, New={session.success_probability}%, Stage={current_spin_stage}")
             
+            return {
+                'sequence': chat_msg.sequence,
+                'success_delta': success_delta,
+                'success_probability': session.success_probability,
+                'current_spin_stage': session.current_spin_stage,
+            }
+            
         except Exception as e:
             logger.error(f"リアルタイム成功率分析エラー: {e}", exc_info=True)
+            return None
 
+
+class SpeechRecognitionConsumer(AsyncWebsocketConsumer):
+    """
+    プッシュトゥトーク用のストリーミング音声認識
+    録音中の音声チャンクを認識バックエンド（streaming_speech）に流し、途中経過と確定結果を返す
+    
+    クライアント → サーバー:
+    - {"type": "start", "language_code": "ja-JP", "encoding": "webm_opus", "sample_rate_hertz": 48000}
+    - 音声チャンク（バイナリ。MediaRecorderのtimesliceごとのデータを順に送る）
+    - {"type": "stop"}（録音終了。残りの結果を返して "done" を送る）
+    サーバー → クライアント:
+    - {"type": "ready"}: 接続完了
+    - {"type": "transcript", "text": ..., "is_final": false/true, "stability": ...}
+      途中経過は次の結果で置き換わる。確定結果（is_final=true）は区間ごとに送る
+    - {"type": "done", "text": 確定結果をつなげた全文, "confidence": ...}
+    - {"type": "error", "error": {"message": ...}}
+    
+    1つの接続で start → stop を繰り返し使える
+    """
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.user = None
+        self.audio_queue = None
+        self.recognition_task = None
+        self.received_bytes = 0
+        self.stopped_at = None  # stopを受信した時刻（録音終了から結果確定までの時間のログ用）
+    
+    async def connect(self):
+        query_string = self.scope.get('query_string', b'').decode()
+        params = dict(param.split('=', 1) for param in query_string.split('&') if '=' in param)
+        token_key = params.get('token')
+        self.user = await get_user_from_token(token_key) if token_key else None
+        if not self.user:
+            logger.error("❌ 音声認識: 認証トークンが無効です")
+            await self.close(code=4001)
+            return
+        
+        await self.accept()
+        await self.send(text_data=json.dumps({'type': 'ready'}))
+    
+    async def disconnect(self, close_code):
+        if self.audio_queue is not None:
+            self.audio_queue.put_nowait(None)
+        if self.recognition_task and not self.recognition_task.done():
+            try:
+                await asyncio.wait_for(self.recognition_task, timeout=5)
+            except Exception:
+                self.recognition_task.cancel()
+    
+    async def receive(self, text_data=None, bytes_data=None):
+        if bytes_data is not None:
+            if self.audio_queue is None:
+                return
+            self.received_bytes += len(bytes_data)
+            if self.received_bytes > settings.SPEECH_STREAMING_MAX_BYTES:
+                # 上限を超えた分は送らず、ここまでの音声で認識を終える
+                logger.warning(f"⚠️ 音声認識: 音声データが上限を超えました: user={self.user.username}")
+                self.audio_queue.put_nowait(None)
+                self.audio_queue = None
+                return
+            self.audio_queue.put_nowait(bytes_data)
+            return
+        
+        try:
+            data = json.loads(text_data)
+        except (TypeError, ValueError):
+            await self.send_error('メッセージの形式が正しくありません')
+            return
+        
+        if data.get('type') == 'start':
+            await self.start_recognition(data)
+        elif data.get('type') == 'stop':
+            if self.audio_queue is not None:
+                self.stopped_at = time.monotonic()
+                self.audio_queue.put_nowait(None)
+                self.audio_queue = None
+    
+    async def start_recognition(self, data):
+        """認識を開始（前回の認識が終わっていない場合はエラー）"""
+        from .services.streaming_speech import ENCODINGS, OPUS_SAMPLE_RATES, get_streaming_backend
+        
+        if self.recognition_task and not self.recognition_task.done():
+            await self.send_error('前回の音声認識が終了していません')
+            return
+        
+        language_code = data.get('language_code') or 'ja-JP'
+        encoding = data.get('encoding') or 'webm_opus'
+        sample_rate_hertz = data.get('sample_rate_hertz') or 48000
+        if encoding not in ENCODINGS or not isinstance(sample_rate_hertz, int) or not isinstance(language_code, str):
+            await self.send_error('音声形式の指定が正しくありません')
+            return
+        if encoding.endswith('_opus') and sample_rate_hertz not in OPUS_SAMPLE_RATES:
+            sample_rate_hertz = 48000
+        
+        try:
+            backend = get_streaming_backend()
+        except ValueError as e:
+            logger.error(f"❌ 音声認識バックエンドの設定エラー: {e}")
+            await self.send_error('音声認識を開始できませんでした')
+            return
+        
+        self.audio_queue = asyncio.Queue()
+        self.received_bytes = 0
+        self.stopped_at = None
+        self.recognition_task = asyncio.create_task(
+            self.run_recognition(backend, self.audio_queue, language_code, encoding, sample_rate_hertz)
+        )
+    
+    async def audio_chunks(self, audio_queue):
+        """stopまで（または最大録音時間まで）の音声チャンク"""
+        deadline = time.monotonic() + settings.SPEECH_STREAMING_MAX_SECONDS
+        while True:
+            try:
+                chunk = await asyncio.wait_for(audio_queue.get(), timeout=max(0, deadline - time.monotonic()))
+            except asyncio.TimeoutError:
+                logger.warning(f"⚠️ 音声認識: 最大録音時間（{settings.SPEECH_STREAMING_MAX_SECONDS}秒）に達しました")
+                return
+            if chunk is None:
+                return
+            yield chunk
+    
+    async def run_recognition(self, backend, audio_queue, language_code, encoding, sample_rate_hertz):
+        """認識バックエンドの結果をクライアントに送信"""
+        finals = []
+        confidences = []
+        separator = '' if language_code.startswith(('ja', 'zh')) else ' '
+        try:
+            results = backend.recognize(self.audio_chunks(audio_queue), language_code, encoding, sample_rate_hertz)
+            async for result in results:
+                if result['is_final']:
+                    finals.append(result['text'].strip())
+                    confidences.append(result.get('confidence') or 0.0)
+                await self.send(text_data=json.dumps({
+                    'type': 'transcript',
+                    'text': result['text'],
+                    'is_final': result['is_final'],
+                    'stability': result.get('stability'),
+                }))
+            
+            text = separator.join(text for text in finals if text)
+            confidence = sum(confidences) / len(confidences) if confidences else 0.0
+            await self.send(text_data=json.dumps({'type': 'done', 'text': text, 'confidence': confidence}))
+            if self.stopped_at is not None:
+                logger.info(
+                    f"🎙️ 音声認識完了: user={self.user.username}, 録音終了から{(time.monotonic() - self.stopped_at) * 1000:.0f}ms, "
+                    f"text_length={len(text)}"
+                )
+        except Exception as e:
+            logger.error(f"❌ 音声認識エラー: {e}", exc_info=True)
+            await self.send_error('音声認識に失敗しました')
+        finally:
+            if self.audio_queue is audio_queue:
+                self.audio_queue = None
+    
+    async def send_error(self, message):
+        await self.send(text_data=json.dumps({'type': 'error', 'error': {'message': message}}))
@@ -0,0 +1,95 @@
+"""
+会話履歴アーカイブコマンド
+終了から一定期間が経過したセッションの会話履歴を ChatMessageArchive に圧縮して移し、
+ChatMessageテーブルから削除する（テーブルとインデックスを直近のセッション分だけに保つ）
+
+使用例:
+    python manage.py archive_chat_messages --days 90 --dry-run
+    python manage.py archive_chat_messages --days 90 --limit 1000 --vacuum
+    python manage.py archive_chat_messages --restore <session_id>
+"""
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+
+from spin.models import ChatMessage, Session
+from spin.services.message_archive import archive_session_messages, restore_session_messages
+
+
+class Command(BaseCommand):
+    help = '終了から一定期間が経過したセッションの会話履歴を圧縮してアーカイブします'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=90, help='終了から何日経過したセッションを対象にするか（デフォルト: 90）')
+        parser.add_argument('--limit', type=int, help='処理するセッション数の上限')
+        parser.add_argument('--dry-run', action='store_true', help='対象件数の表示のみ（アーカイブしない）')
+        parser.add_argument('--vacuum', action='store_true', help='完了後にChatMessageテーブルをVACUUM ANALYZE（PostgreSQLのみ）')
+        parser.add_argument('--restore', nargs='+', metavar='SESSION_ID', help='指定セッションの会話履歴をアーカイブから戻す')
+
+    def handle(self, *args, **options):
+        if options['restore']:
+            self._restore(options['restore'])
+            return
+
+        if options['days'] < 1:
+            raise CommandError('--days は1以上を指定してください')
+
+        cutoff = timezone.now() - timedelta(days=options['days'])
+        # (status, finished_at) のインデックスで対象セッションを絞り込み、
+        # (session, sequence) のインデックスでメッセージが残っているかを確認する
+        sessions = (
+            Session.objects.filter(status='finished', finished_at__lt=cutoff)
+            .filter(Exists(ChatMessage.objects.filter(session=OuterRef('pk'))))
+            .order_by('finished_at')
+            .only('id')
+        )
+        if options['limit']:
+            sessions = sessions[:options['limit']]
+
+        if options['dry_run']:
+            session_ids = list(sessions.values_list('id', flat=True))
+            message_count = ChatMessage.objects.filter(session_id__in=session_ids).count()
+            self.stdout.write(f'対象: セッション {len(session_ids)}件 / メッセージ {message_count}件（{cutoff:%Y-%m-%d}以前に終了）')
+            return
+
+        started = time.monotonic()
+        archived_sessions = 0
+        archived_messages = 0
+        # アーカイブ中にメッセージを削除するため、対象セッションを先に確定させる
+        for session in list(sessions):
+            archived_messages += archive_session_messages(session)
+            archived_sessions += 1
+            if archived_sessions % 100 == 0:
+                self.stdout.write(f'  {archived_sessions}セッション / {archived_messages}メッセージ')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'完了: {archived_sessions}セッションの {archived_messages}メッセージをアーカイブしました'
+            f'（{time.monotonic() - started:.1f}秒）'
+        ))
+
+        if options['vacuum'] and archived_messages:
+            self._vacuum()
+
+    def _restore(self, session_ids):
+        for session_id in session_ids:
+            session = Session.objects.filter(pk=session_id).only('id').first()
+            if session is None:
+                raise CommandError(f'セッションが見つかりません: {session_id}')
+            count = restore_session_messages(session)
+            if count is None:
+                self.stdout.write(self.style.WARNING(f'  {session_id}: アーカイブがありません'))
+            else:
+                self.stdout.write(f'  {session_id}: {count}メッセージを戻しました')
+
+    def _vacuum(self):
+        """削除した行の領域を回収し、統計情報を更新"""
+        if connection.vendor != 'postgresql':
+            self.stdout.write(self.style.WARNING('VACUUMはPostgreSQLでのみ実行します'))
+            return
+        with connection.cursor() as cursor:
+            cursor.execute(f'VACUUM (ANALYZE) {ChatMessage._meta.db_table}')
+        self.stdout.write(f'{ChatMessage._meta.db_table} をVACUUM ANALYZEしました')
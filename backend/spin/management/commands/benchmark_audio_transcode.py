@@ -0,0 +1,140 @@
+"""
+音声認識用の音声変換（WEBM → WAV）のベンチマーク
+1リクエストあたりの変換時間（p50/p95）とCPU時間（このプロセスとffmpegの子プロセスの合計）を、
+同時リクエスト数ごとに計測する
+
+- pipe: audio_transcode.transcode_to_wav（ffmpegの標準入出力、AUDIO_TRANSCODE_MAX_PROCESSESで同時実行数を制限）
+- pydub: 以前の方式（一時ファイルに書き出してpydub経由でffmpegを実行し、WAVの一時ファイルを読み戻す）
+
+--input を省略した場合は、ffmpegで合成したWEBM（Opus）音声を使う
+
+使用例:
+    python manage.py benchmark_audio_transcode
+    python manage.py benchmark_audio_transcode --input sample.webm --requests 50 --concurrency 1 4 8
+"""
+import os
+import resource
+import subprocess
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from spin.services.audio_transcode import transcode_to_wav
+from spin.services.realtime_benchmark import percentile
+
+
+def _convert_with_pydub(audio_data: bytes):
+    """以前の convert_webm_to_wav と同じ処理（比較用）"""
+    from pydub import AudioSegment
+
+    with tempfile.NamedTemporaryFile(suffix='.webm', delete=False) as webm_file:
+        webm_file.write(audio_data)
+        webm_path = webm_file.name
+    wav_path = webm_path.replace('.webm', '.wav')
+    try:
+        audio = AudioSegment.from_file(webm_path, format='webm')
+        audio = audio.set_frame_rate(16000).set_channels(1)
+        if audio.max_dBFS < -20:
+            audio = audio.normalize()
+        audio.export(wav_path, format='wav', parameters=['-acodec', 'pcm_s16le'])
+        with open(wav_path, 'rb') as wav_file:
+            return wav_file.read(), 16000
+    finally:
+        for path in (webm_path, wav_path):
+            if os.path.exists(path):
+                os.unlink(path)
+
+
+METHODS = {
+    'pipe': transcode_to_wav,
+    'pydub': _convert_with_pydub,
+}
+
+
+class Command(BaseCommand):
+    help = '音声認識用の音声変換（WEBM → WAV）の1リクエストあたりの時間とCPU使用量を計測します'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--input', help='変換するWEBM音声ファイル（省略時は合成音声）')
+        parser.add_argument('--seconds', type=float, default=10.0, help='合成音声の長さ（秒、デフォルト: 10）')
+        parser.add_argument('--requests', type=int, default=20, help='計測ごとの変換回数（デフォルト: 20）')
+        parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 4], help='同時リクエスト数（デフォルト: 1 4）')
+        parser.add_argument('--methods', nargs='+', choices=sorted(METHODS), default=['pipe', 'pydub'], help='計測する変換方式')
+
+    def handle(self, *args, **options):
+        if options['requests'] < 1 or min(options['concurrency']) < 1:
+            raise CommandError('--requests と --concurrency は1以上を指定してください')
+
+        audio_data = self._load_audio(options)
+        self.stdout.write(
+            f"入力 {len(audio_data) / 1024:.0f}KB × {options['requests']}回 "
+            f"（AUDIO_TRANSCODE_MAX_PROCESSES={settings.AUDIO_TRANSCODE_MAX_PROCESSES}, CPU {os.cpu_count()}コア）"
+        )
+
+        # 初回のみの読み込み・起動コストを計測に含めない
+        for method in options['methods']:
+            METHODS[method](audio_data)
+
+        rows = []
+        for method in options['methods']:
+            for concurrency in options['concurrency']:
+                rows.append(self._measure(method, audio_data, options['requests'], concurrency))
+        self._print_table(rows)
+
+    def _load_audio(self, options):
+        if options['input']:
+            with open(options['input'], 'rb') as f:
+                return f.read()
+        command = [
+            settings.FFMPEG_BINARY, '-hide_banner', '-loglevel', 'error',
+            '-f', 'lavfi', '-i', f"sine=frequency=220:sample_rate=48000:duration={options['seconds']}",
+            '-af', 'volume=0.05', '-c:a', 'libopus', '-b:a', '32k', '-f', 'webm', 'pipe:1',
+        ]
+        try:
+            return subprocess.run(command, check=True, capture_output=True).stdout
+        except (OSError, subprocess.CalledProcessError) as e:
+            raise CommandError(f'合成音声を作成できませんでした（ffmpegが必要です）: {e}')
+
+    def _measure(self, method, audio_data, requests, concurrency):
+        convert = METHODS[method]
+        latencies = []
+
+        def run_one(_):
+            started = time.perf_counter()
+            convert(audio_data)
+            latencies.append(time.perf_counter() - started)
+
+        before = self._cpu_seconds()
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            list(executor.map(run_one, range(requests)))
+        elapsed = time.perf_counter() - started
+        cpu_seconds = self._cpu_seconds() - before
+
+        return {
+            'method': method,
+            'concurrency': concurrency,
+            'requests_per_sec': requests / elapsed,
+            'latency_p50': percentile(latencies, 0.50),
+            'latency_p95': percentile(latencies, 0.95),
+            'cpu_per_request': cpu_seconds / requests,
+        }
+
+    @staticmethod
+    def _cpu_seconds():
+        """このプロセスと終了した子プロセス（ffmpeg）のCPU時間の合計"""
+        usage = [resource.getrusage(resource.RUSAGE_SELF), resource.getrusage(resource.RUSAGE_CHILDREN)]
+        return sum(u.ru_utime + u.ru_stime for u in usage)
+
+    def _print_table(self, rows):
+        self.stdout.write('')
+        self.stdout.write(f"{'method':>7} {'conc':>5} {'req/s':>7} {'p50':>9} {'p95':>9} {'cpu/req':>9}")
+        for row in rows:
+            self.stdout.write(
+                f"{row['method']:>7} {row['concurrency']:>5} {row['requests_per_sec']:>7.1f} "
+                f"{row['latency_p50'] * 1000:>7.1f}ms {row['latency_p95'] * 1000:>7.1f}ms "
+                f"{row['cpu_per_request'] * 1000:>7.1f}ms"
+            )
@@ -0,0 +1,129 @@
+"""
+長時間音声の文字起こし（long_audio.transcribe_long_audio）のベンチマーク
+同じ録音を並列数ごとに分割・認識し、区間数・区間の長さ・全体の処理時間・並列化による短縮を比較する
+
+- fake: 疑似の認識（区間の長さに比例した時間だけ待つ。GCPの認証情報は不要）
+- google: GCP Speech-to-Text の同期認識（recognize）
+
+--input を省略した場合は、発話（ノイズを含む音の断続）と間（無音）を交互に並べた合成音声を使う
+
+使用例:
+    python manage.py benchmark_long_transcription
+    python manage.py benchmark_long_transcription --minutes 10 --parallelism 1 4 8
+    python manage.py benchmark_long_transcription --input meeting.webm --recognizer google --parallelism 4
+"""
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from spin.services.audio_transcode import TARGET_SAMPLE_RATE, pcm16_to_wav
+from spin.services.long_audio import recognize_chunk, transcribe_long_audio
+
+
+def synthesize_speech_like_audio(minutes: float, sample_rate: int = TARGET_SAMPLE_RATE, seed: int = 0) -> bytes:
+    """発話（0.3〜8秒）と間（0.1〜1.5秒）を交互に並べた合成音声（PCM16）"""
+    rng = np.random.default_rng(seed)
+    total = int(minutes * 60 * sample_rate)
+    parts = []
+    length = 0
+    while length < total:
+        speech = int(rng.uniform(0.3, 8.0) * sample_rate)
+        t = np.arange(speech) / sample_rate
+        # 音節程度の周期で音量を揺らした和音＋ノイズ
+        envelope = 0.5 + 0.5 * np.abs(np.sin(2 * np.pi * rng.uniform(2, 5) * t))
+        tone = sum(np.sin(2 * np.pi * rng.uniform(100, 300) * k * t) / k for k in (1, 2, 3))
+        voiced = (tone * envelope * 0.2 + rng.normal(0, 0.02, speech)) * 32767 * 0.5
+        pause = int(rng.uniform(0.1, 1.5) * sample_rate)
+        parts.extend([voiced, rng.normal(0, 30, pause)])
+        length += speech + pause
+    samples = np.concatenate(parts)[:total]
+    return np.clip(samples, -32768, 32767).astype('<i2').tobytes()
+
+
+class FakeRecognizer:
+    """区間の長さ × rtf + latency 秒だけ待ってから、区間の長さを表す文を返す"""
+
+    def __init__(self, latency: float, rtf: float):
+        self.latency = latency
+        self.rtf = rtf
+
+    def __call__(self, pcm: bytes, sample_rate: int, language_code: str):
+        seconds = len(pcm) / 2 / sample_rate
+        time.sleep(self.latency + seconds * self.rtf)
+        return [{'text': f'（{seconds:.1f}秒の発話）', 'confidence': 0.9, 'end': seconds}]
+
+
+class Command(BaseCommand):
+    help = '長時間音声を無音の位置で分割して並列に認識し、並列数ごとの処理時間を計測します'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--input', help='文字起こしする音声ファイル（ffmpegが読める形式、省略時は合成音声）')
+        parser.add_argument('--minutes', type=float, default=10.0, help='合成音声の長さ（分、デフォルト: 10）')
+        parser.add_argument('--recognizer', choices=['fake', 'google'], default='fake', help='認識方式（デフォルト: fake）')
+        parser.add_argument('--latency', type=float, default=0.3, help='fake: 1区間あたりの固定の待ち時間（秒、デフォルト: 0.3）')
+        parser.add_argument('--rtf', type=float, default=0.15, help='fake: 音声1秒あたりの認識時間（秒、デフォルト: 0.15）')
+        parser.add_argument('--parallelism', type=int, nargs='+', default=[1, 4, 8], help='並列数（デフォルト: 1 4 8）')
+        parser.add_argument('--language', default='ja-JP', help='言語コード（デフォルト: ja-JP）')
+
+    def handle(self, *args, **options):
+        if min(options['parallelism']) < 1:
+            raise CommandError('--parallelism は1以上を指定してください')
+
+        audio = self._load_audio(options)
+        if options['recognizer'] == 'fake':
+            recognize = FakeRecognizer(options['latency'], options['rtf'])
+        else:
+            recognize = recognize_chunk
+        self.stdout.write(
+            f"入力 {len(audio) / 1024 / 1024:.1f}MB, 認識 {options['recognizer']} "
+            f"（区間 {settings.SPEECH_LONG_AUDIO_MIN_CHUNK_SECONDS}〜{settings.SPEECH_LONG_AUDIO_MAX_CHUNK_SECONDS}秒）"
+        )
+
+        rows = []
+        for parallelism in sorted(set(options['parallelism'])):
+            with ThreadPoolExecutor(max_workers=parallelism, thread_name_prefix='benchmark-chunk') as executor:
+                started = time.perf_counter()
+                try:
+                    result = transcribe_long_audio(audio, options['language'], recognize=recognize, executor=executor)
+                except Exception as e:
+                    raise CommandError(f'文字起こしに失敗しました: {e}')
+                elapsed = time.perf_counter() - started
+            rows.append((parallelism, elapsed, result))
+            self.stdout.write(f'  parallelism={parallelism}: {elapsed:.2f}秒')
+
+        self._print_chunks(rows[0][2])
+        self._print_table(rows)
+
+    def _load_audio(self, options):
+        if options['input']:
+            with open(options['input'], 'rb') as f:
+                return f.read()
+        if options['minutes'] <= 0:
+            raise CommandError('--minutes は0より大きい値を指定してください')
+        return pcm16_to_wav(synthesize_speech_like_audio(options['minutes']), TARGET_SAMPLE_RATE)
+
+    def _print_chunks(self, result):
+        lengths = [segment['end'] - segment['start'] for segment in result['segments']]
+        self.stdout.write('')
+        self.stdout.write(
+            f"録音 {result['duration']:.1f}秒 → {result['chunks']}区間, {len(result['segments'])}セグメント "
+            f"（変換 {result['timings']['decode'] * 1000:.0f}ms, 分割 {result['timings']['split'] * 1000:.0f}ms）"
+        )
+        if lengths:
+            self.stdout.write(
+                f"セグメントの長さ: 最小 {min(lengths):.1f}秒, 平均 {sum(lengths) / len(lengths):.1f}秒, "
+                f"最大 {max(lengths):.1f}秒"
+            )
+
+    def _print_table(self, rows):
+        baseline = rows[0][1]
+        self.stdout.write('')
+        self.stdout.write(f"{'parallel':>8} {'wall':>8} {'recognize':>10} {'speedup':>8} {'realtime':>9}")
+        for parallelism, elapsed, result in rows:
+            self.stdout.write(
+                f"{parallelism:>8} {elapsed:>7.2f}s {result['timings']['recognize']:>9.2f}s "
+                f"{baseline / elapsed:>7.2f}x {result['duration'] / elapsed:>8.1f}x"
+            )
@@ -0,0 +1,353 @@
+"""
+クエリ数・実行計画のベンチマークコマンド
+主要エンドポイント（チャット、セッション一覧・詳細、ランキング、管理画面の一覧）について
+実データに近い件数のデータを投入し、エンドポイントごとのクエリ数と処理時間を計測する。
+クエリ数が予算（ENDPOINT_BUDGETS）を超えた場合はエラー終了するため、N+1の混入を検知できる
+
+--explain を指定すると主要クエリの実行計画（PostgreSQLでは EXPLAIN (ANALYZE)）を取得し、
+シーケンシャルスキャンになっているテーブルを表示する。
+PostgreSQLでは件数が少ないとインデックスがあってもシーケンシャルスキャンが選ばれるため、
+enable_seqscan = off で実行し「使えるインデックスがない」クエリだけを検出する
+
+投入したデータはトランザクションをロールバックして削除する（AI応答の生成はダミーに差し替える）
+
+使用例:
+    python manage.py benchmark_queries
+    python manage.py benchmark_queries --users 50 --sessions 20 --messages 40 --iterations 5 --explain
+"""
+import re
+import statistics
+import time
+import uuid
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Q
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from spin.models import ChatMessage, Company, CompanyScrapeArtifact, RankingEntry, Report, Session
+from spin.services.company_artifacts import summarize_scraped_data
+from spin.services.compression import compress_payload
+from spin.services.ranking import RANKING_ORDERING, refresh_ranking_entries
+from spin.services.temperature_score import calculate_temperature_score
+
+# エンドポイントごとのクエリ数の上限
+# （データ件数に比例して増える場合はN+1が混入している）
+ENDPOINT_BUDGETS = {
+    'chat_session': 16,
+    'list_sessions': 6,
+    'get_session': 4,
+    'get_report': 4,
+    'ranking_simple': 4,
+    'ranking_detailed': 4,
+    'ranking_weekly': 5,
+    'ranking_me': 10,
+    'admin_sessions': 15,
+    'admin_reports': 10,
+    'admin_messages': 10,
+    'admin_users': 10,
+}
+
+INDUSTRIES = ['IT・SaaS', '不動産（売買・賃貸）', '製造業', '人材（派遣・紹介）', '金融（銀行・証券）']
+
+
+def find_sequential_scans(plan: str, vendor: str):
+    """実行計画からシーケンシャルスキャンしているテーブル名を抽出"""
+    if vendor == 'postgresql':
+        return sorted(set(re.findall(r'Seq Scan on (\w+)', plan)))
+    if vendor == 'sqlite':
+        # "SCAN table"（インデックスを使わない全件走査）のみ対象とする
+        return sorted({
+            match.group(1)
+            for line in plan.splitlines()
+            for match in [re.search(r'\bSCAN (\w+)', line)]
+            if match and 'USING' not in line
+        })
+    return []
+
+
+class Command(BaseCommand):
+    help = '主要エンドポイントのクエリ数・処理時間と、主要クエリの実行計画を計測します'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=20, help='投入するユーザー数（デフォルト: 20）')
+        parser.add_argument('--sessions', type=int, default=10, help='ユーザーあたりのセッション数（デフォルト: 10）')
+        parser.add_argument('--messages', type=int, default=20, help='セッションあたりのメッセージ数（デフォルト: 20）')
+        parser.add_argument('--iterations', type=int, default=3, help='エンドポイントごとの計測回数（デフォルト: 3）')
+        parser.add_argument('--explain', action='store_true', help='主要クエリの実行計画を取得してシーケンシャルスキャンを検出')
+        parser.add_argument('--show-plans', action='store_true', help='実行計画の全文を表示')
+        parser.add_argument('--fail-on-seq-scan', action='store_true', help='シーケンシャルスキャンを検出した場合もエラー終了')
+
+    def handle(self, *args, **options):
+        benchmark_settings = override_settings(
+            ALLOWED_HOSTS=['testserver'],
+            # ランキングのキャッシュが本番のキャッシュに混ざらないようプロセス内キャッシュを使う
+            CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'benchmark-queries'}},
+        )
+        with benchmark_settings, transaction.atomic():
+            self.stdout.write('ベンチマーク用データを投入中...')
+            started = time.perf_counter()
+            dataset = self._seed(options)
+            self.stdout.write(
+                f"  ユーザー {options['users']}人 / セッション {dataset['session_count']}件 / "
+                f"メッセージ {dataset['message_count']}件（{time.perf_counter() - started:.1f}秒）"
+            )
+
+            results = self._run_endpoints(dataset, options['iterations'])
+            scans = self._explain(dataset, options['show_plans']) if options['explain'] else {}
+
+            # 投入したデータはすべて破棄する
+            transaction.set_rollback(True)
+
+        over_budget = [name for name, result in results.items() if result['queries'] > ENDPOINT_BUDGETS[name]]
+        if over_budget:
+            raise CommandError(f"クエリ数が予算を超えました: {', '.join(over_budget)}")
+        if scans and options['fail_on_seq_scan']:
+            raise CommandError(f"シーケンシャルスキャンを検出しました: {', '.join(scans)}")
+        self.stdout.write(self.style.SUCCESS('完了: すべてのエンドポイントがクエリ数の予算内です'))
+
+    def _seed(self, options):
+        """実データに近い構成のユーザー・企業・セッション・メッセージ・レポートを投入"""
+        now = timezone.now()
+        prefix = f"bench_{uuid.uuid4().hex[:8]}"
+
+        users = User.objects.bulk_create([
+            User(username=f"{prefix}_{i}", email=f"{prefix}_{i}@benchmark.salesmind.local")
+            for i in range(options['users'])
+        ])
+        admin_user = User.objects.create_superuser(f"{prefix}_admin", f"{prefix}_admin@benchmark.salesmind.local", uuid.uuid4().hex)
+
+        # スクレイピング結果を含む企業情報（詳細診断のセッションに紐づける）
+        scraped_data = {
+            'url': 'https://example.com/',
+            'raw_html_list': ['<html><body>' + '会社概要 ' * 1000 + '</body></html>' for _ in range(10)],
+            'page_texts': [{'url': f"https://example.com/{n}", 'text': '会社概要 ' * 500} for n in range(10)],
+        }
+        codec, payload, raw_size = compress_payload(scraped_data)
+        companies = Company.objects.bulk_create([
+            Company(
+                user=user,
+                source_url=f"https://example.com/{user.username}",
+                company_name=f"株式会社ベンチマーク{i}",
+                industry=INDUSTRIES[i % len(INDUSTRIES)],
+                business_description='業務効率化のためのクラウドサービスを提供しています。' * 5,
+                scraped_data=summarize_scraped_data(scraped_data),
+            )
+            for i, user in enumerate(users)
+        ])
+        CompanyScrapeArtifact.objects.bulk_create([
+            CompanyScrapeArtifact(company=company, codec=codec, payload=payload, raw_size=raw_size, compressed_size=len(payload))
+            for company in companies
+        ])
+
+        sessions = []
+        for i, user in enumerate(users):
+            for n in range(options['sessions']):
+                mode = 'detailed' if n % 2 else 'simple'
+                finished = n % 5 != 0
+                sessions.append(Session(
+                    user=user,
+                    mode=mode,
+                    industry=INDUSTRIES[(i + n) % len(INDUSTRIES)],
+                    value_proposition='営業支援ツールで商談準備の時間を半分にします',
+                    customer_persona='中堅企業の営業部長',
+                    company=companies[i] if mode == 'detailed' else None,
+                    success_probability=30 + (i * 7 + n * 11) % 60,
+                    status='finished' if finished else 'active',
+                    finished_at=now - timedelta(days=(i + n) % 30, hours=n) if finished else None,
+                ))
+        Session.objects.bulk_create(sessions)
+
+        messages = [
+            ChatMessage(
+                session=session,
+                role='salesperson' if seq % 2 else 'customer',
+                message=f"メッセージ{seq}: 現在の営業プロセスについて教えてください。" * 3,
+                sequence=seq,
+                temperature_score=50.0 if seq % 2 == 0 else None,
+            )
+            for session in sessions
+            for seq in range(1, options['messages'] + 1)
+        ]
+        ChatMessage.objects.bulk_create(messages, batch_size=1000)
+
+        reports = Report.objects.bulk_create([
+            Report(
+                session=session,
+                spin_scores={
+                    'situation': 10 + n % 15, 'problem': 12 + n % 13, 'implication': 8 + n % 17,
+                    'need': 9 + n % 16, 'total': 40 + n % 55,
+                },
+                feedback='状況確認の質問は十分でした。示唆質問で課題の影響をさらに掘り下げましょう。' * 10,
+                next_actions='次回は決裁プロセスを確認しましょう。',
+                scoring_details={'situation': {'score': 10, 'comments': '良好', 'strengths': [], 'weaknesses': []}},
+            )
+            for n, session in enumerate(sessions)
+            if session.status == 'finished'
+        ])
+        refresh_ranking_entries(reports)
+
+        user = users[0]
+        user_sessions = [session for session in sessions if session.user_id == user.id]
+        return {
+            'user': user,
+            'token': Token.objects.create(user=user),
+            'admin_user': admin_user,
+            'active_session': next(s for s in user_sessions if s.status == 'active'),
+            'finished_session': next(s for s in user_sessions if s.status == 'finished' and s.mode == 'detailed'),
+            'report': next(r for r in reports if r.session.user_id == user.id),
+            'session_count': len(sessions),
+            'message_count': len(messages),
+        }
+
+    def _endpoints(self, dataset):
+        """(名前, クライアント種別, HTTPメソッド, URL, リクエストボディを返す関数)"""
+        active_session = dataset['active_session']
+        counter = iter(range(1, 10000))
+        return [
+            ('chat_session', 'api', 'post', '/api/session/chat/',
+             lambda: {'session_id': str(active_session.id), 'message': f"御社の課題について伺えますか？（{next(counter)}）"}),
+            ('list_sessions', 'api', 'get', '/api/session/list/?limit=20&stats=true', None),
+            ('get_session', 'api', 'get', f"/api/session/{dataset['finished_session'].id}/?expand=company,report,messages", None),
+            ('get_report', 'api', 'get', f"/api/report/{dataset['report'].id}/", None),
+            ('ranking_simple', 'api', 'get', '/api/ranking/simple/', None),
+            ('ranking_detailed', 'api', 'get', '/api/ranking/detailed/', None),
+            ('ranking_weekly', 'api', 'get', '/api/ranking/simple/weekly/', None),
+            ('ranking_me', 'api', 'get', '/api/ranking/me/', None),
+            ('admin_sessions', 'admin', 'get', '/admin/spin/session/', None),
+            ('admin_reports', 'admin', 'get', '/admin/spin/report/', None),
+            ('admin_messages', 'admin', 'get', '/admin/spin/chatmessage/', None),
+            ('admin_users', 'admin', 'get', '/admin/auth/user/', None),
+        ]
+
+    def _run_endpoints(self, dataset, iterations):
+        """各エンドポイントを計測（ランキングのキャッシュは毎回破棄し、DBから生成する場合を計測する）"""
+        api_client = APIClient()
+        api_client.credentials(HTTP_AUTHORIZATION=f"Token {dataset['token'].key}")
+        admin_client = APIClient()
+        admin_client.force_login(dataset['admin_user'])
+        clients = {'api': api_client, 'admin': admin_client}
+
+        self.stdout.write('')
+        self.stdout.write(f"{'エンドポイント':<17}{'クエリ数':>8}{'予算':>6}{'中央値(ms)':>12}{'最大(ms)':>10}")
+
+        results = {}
+        with self._patch_ai_calls():
+            for name, client_type, method, url, build_body in self._endpoints(dataset):
+                query_counts = []
+                timings = []
+                for _ in range(iterations):
+                    cache.clear()
+                    request = getattr(clients[client_type], method)
+                    kwargs = {'data': build_body(), 'format': 'json'} if build_body else {}
+                    with CaptureQueriesContext(connection) as queries:
+                        started = time.perf_counter()
+                        response = request(url, **kwargs)
+                        timings.append((time.perf_counter() - started) * 1000)
+                    if response.status_code != 200:
+                        raise CommandError(f"{name}: ステータス {response.status_code} が返されました（{url}）")
+                    query_counts.append(len(queries))
+
+                result = {
+                    'queries': max(query_counts),
+                    'median_ms': statistics.median(timings),
+                    'max_ms': max(timings),
+                }
+                results[name] = result
+                budget = ENDPOINT_BUDGETS[name]
+                line = f"{name:<24}{result['queries']:>8}{budget:>6}{result['median_ms']:>12.1f}{result['max_ms']:>10.1f}"
+                self.stdout.write(self.style.ERROR(line) if result['queries'] > budget else line)
+        return results
+
+    def _patch_ai_calls(self):
+        """チャットのAI呼び出しを外部APIにアクセスしないダミーに差し替える"""
+        return mock.patch.multiple(
+            'spin.views',
+            generate_customer_response=lambda session, history: '興味があります。詳しく教えてください。',
+            analyze_sales_message=lambda session, history, message: {
+                'success_delta': 2,
+                'reason': '課題を確認する質問です',
+                'current_spin_stage': 'P',
+                'message_spin_type': 'P',
+                'step_appropriateness': 'appropriate',
+            },
+            calculate_temperature_score=lambda message, use_llm=True, **kwargs: calculate_temperature_score(
+                message, use_llm=False, **kwargs
+            ),
+            check_loss_candidate=lambda session, history: None,
+            should_trigger_closing=lambda session, history: False,
+            check_loss_confirmed=lambda session, history, reason: False,
+        )
+
+    def _key_queries(self, dataset):
+        """実行計画を確認する主要クエリ"""
+        user = dataset['user']
+        now = timezone.now()
+        return [
+            ('セッション一覧（ユーザー別・作成日時順）',
+             Session.objects.filter(user=user).order_by('-created_at', '-id')[:20]),
+            ('セッション（モード・状態で絞り込み）',
+             Session.objects.filter(mode='detailed', status='finished').order_by().values('pk')),
+            ('管理画面のセッション一覧（状態で絞り込み）',
+             Session.objects.filter(status='finished').order_by('-created_at')[:100]),
+            ('会話履歴（セッション別・sequence順）',
+             ChatMessage.objects.filter(session=dataset['finished_session'], sequence__gt=0).order_by('sequence')[:100]),
+            ('ランキング（スコア順）',
+             RankingEntry.objects.filter(mode='simple').order_by(*RANKING_ORDERING['simple'])[:50]),
+            ('ランキング（カーソル以降のページ）',
+             RankingEntry.objects.filter(mode='simple').filter(
+                 Q(total_score__lt=60) | Q(total_score=60, session_id__lt=dataset['finished_session'].pk)
+             ).order_by(*RANKING_ORDERING['simple'])[:50]),
+            ('ランキング（業界別）',
+             RankingEntry.objects.filter(mode='detailed', industry=INDUSTRIES[0]).order_by(*RANKING_ORDERING['detailed'])[:50]),
+            ('順位（スコアより上の件数）',
+             RankingEntry.objects.filter(mode='simple', total_score__gt=60).order_by().values('pk')),
+            ('自己ベスト',
+             RankingEntry.objects.filter(user=user, mode='simple').order_by('-total_score')[:1]),
+            ('週間ランキング（期間で絞り込み）',
+             RankingEntry.objects.filter(mode='simple', finished_at__gte=now - timedelta(days=7), finished_at__lt=now)
+             .order_by().values('user_id')),
+            ('管理画面のレポート一覧（作成日時順）',
+             Report.objects.order_by('-created_at')[:100]),
+        ]
+
+    def _explain(self, dataset, show_plans):
+        """
+        主要クエリの実行計画を取得し、シーケンシャルスキャンしているクエリを返す
+
+        Returns:
+            {クエリ名: [テーブル名, ...]}
+        """
+        vendor = connection.vendor
+        options = {}
+        if vendor == 'postgresql':
+            options = {'analyze': True}
+            with connection.cursor() as cursor:
+                # インデックスがあれば必ずインデックスを使わせる（トランザクション内のみ有効）
+                cursor.execute('SET LOCAL enable_seqscan = off')
+
+        self.stdout.write('')
+        self.stdout.write(f"実行計画（{vendor}）:")
+        scans = {}
+        for name, queryset in self._key_queries(dataset):
+            plan = queryset.explain(**options)
+            tables = find_sequential_scans(plan, vendor)
+            if tables:
+                scans[name] = tables
+                self.stdout.write(self.style.WARNING(f"  ✗ {name}: シーケンシャルスキャン {', '.join(tables)}"))
+            else:
+                self.stdout.write(f"  ✓ {name}")
+            if show_plans:
+                self.stdout.write('    ' + plan.replace('\n', '\n    '))
+
+        if vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('SET LOCAL enable_seqscan = on')
+        return scans
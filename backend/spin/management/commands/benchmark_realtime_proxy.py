@@ -0,0 +1,174 @@
+"""
+リアルタイムモードのプロキシ（consumers.RealtimeConsumer）のオーバーヘッド計測
+同じ同時接続数で、ローカルの疑似Realtimeサーバーへ直接接続した場合と、Daphne（/ws/realtime/）を経由した場合を
+続けて計測し、プロキシを通すことで増える遅延・ワーカーのCPU使用率・接続あたりのメモリを比較する
+
+- 音声フレームの折り返し遅延（疑似サーバーは受け取った音声をそのまま返す）
+- 応答開始の遅延（一定間隔で input_audio_buffer.commit を送り、生成された応答の最初の音声deltaまで）
+
+使用例:
+    python manage.py benchmark_realtime_proxy
+    python manage.py benchmark_realtime_proxy --connections 10 50 100 --duration 15 --audio-batch-ms 0
+"""
+import subprocess
+
+from django.core.management.base import CommandError
+
+from spin.management.commands import benchmark_realtime_scaling
+from spin.services.realtime_benchmark import (
+    PeakMemorySampler,
+    frame_size,
+    process_usage,
+    run_realtime_load,
+    start_fake_realtime_servers,
+)
+
+HOST = benchmark_realtime_scaling.HOST
+
+
+class Command(benchmark_realtime_scaling.Command):
+    help = '疑似Realtimeサーバーへの直接接続とDaphne経由を比較し、リアルタイムプロキシのオーバーヘッドを計測します'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--connections', type=int, nargs='+', default=[10, 50, 100], help='同時接続数（デフォルト: 10 50 100）')
+        parser.add_argument('--workers', type=int, default=1, help='Daphneワーカー数（デフォルト: 1）')
+        parser.add_argument('--duration', type=float, default=10.0, help='各計測で音声を送信する秒数（デフォルト: 10）')
+        parser.add_argument('--frame-ms', type=int, default=20, help='音声フレームの長さ（ミリ秒、デフォルト: 20）')
+        parser.add_argument('--sample-rate', type=int, default=24000, help='サンプリングレート（デフォルト: 24000）')
+        parser.add_argument('--turn-seconds', type=float, default=2.0, help='input_audio_buffer.commit を送る間隔（秒、0で送らない）')
+        parser.add_argument('--response-frames', type=int, default=10, help='疑似サーバーが応答ごとに生成する音声delta数（1つ100ms）')
+        parser.add_argument('--client-processes', type=int, default=1, help='疑似クライアントのプロセス数')
+        parser.add_argument('--upstream-processes', type=int, default=1, help='疑似Realtimeサーバーのプロセス数')
+        parser.add_argument('--base-port', type=int, default=18100, help='ワーカーのポート番号（ここから連番）')
+        parser.add_argument('--upstream-port', type=int, default=18090, help='疑似Realtimeサーバーのポート番号')
+        parser.add_argument('--audio-batch-ms', type=int, help='ワーカーの音声フレーム結合時間（REALTIME_AUDIO_BATCH_MS、0で結合しない）')
+        parser.add_argument('--worker-log', help='ワーカーのログの出力先ファイル（省略時は破棄）')
+
+    def handle(self, *args, **options):
+        if min(options['connections']) < 1 or options['workers'] < 1:
+            raise CommandError('--connections と --workers は1以上を指定してください')
+
+        turn_frames = int(options['turn_seconds'] * 1000 / options['frame_ms']) if options['turn_seconds'] > 0 else 0
+        self.stdout.write(
+            f"同時接続数 {options['connections']}（{options['duration']}秒, {options['frame_ms']}msフレーム, "
+            f"ワーカー {options['workers']}, commit間隔 {options['turn_seconds']}秒）"
+        )
+
+        user, token, temporary_key = self._create_benchmark_user()
+        upstream = start_fake_realtime_servers(
+            HOST,
+            options['upstream_port'],
+            options['upstream_processes'],
+            response_frames=options['response_frames'],
+            response_frame_bytes=frame_size(options['sample_rate'], 100),
+        )
+        log_file = open(options['worker_log'], 'ab') if options['worker_log'] else subprocess.DEVNULL
+        ports, workers = self._start_workers(options['workers'], options, log_file)
+        try:
+            rows = []
+            for connection_count in options['connections']:
+                direct = self._load(
+                    [f"ws://{HOST}:{options['upstream_port']}/"] * connection_count, options, turn_frames, 'json',
+                )
+                proxied = self._measure_proxy(connection_count, ports, workers, token.key, options, turn_frames)
+                rows.append((direct, proxied))
+                self.stdout.write(
+                    f"  connections={connection_count}: "
+                    f"{proxied['frames_per_sec']:.0f}/{proxied['expected_frames_per_sec']:.0f} frames/s, "
+                    f"追加遅延 p95 {self._added(direct['latency_p95'], proxied['latency_p95'])}"
+                )
+            self._print_comparison(rows)
+        finally:
+            for worker in workers:
+                worker.terminate()
+            for worker in workers:
+                worker.wait(timeout=10)
+            for process in upstream:
+                process.terminate()
+            if log_file is not subprocess.DEVNULL:
+                log_file.close()
+            user.delete()
+            if temporary_key:
+                temporary_key.delete()
+
+    def _load(self, urls, options, turn_frames, audio_format):
+        return run_realtime_load(
+            urls,
+            options['duration'],
+            sample_rate=options['sample_rate'],
+            frame_ms=options['frame_ms'],
+            client_processes=options['client_processes'],
+            audio_format=audio_format,
+            turn_frames=turn_frames,
+        )
+
+    def _measure_proxy(self, connection_count, ports, workers, token_key, options, turn_frames):
+        urls = [
+            f'ws://{HOST}:{ports[index % len(ports)]}/ws/realtime/?token={token_key}'
+            for index in range(connection_count)
+        ]
+        before = [process_usage(worker.pid) for worker in workers]
+        sampler = PeakMemorySampler([worker.pid for worker in workers])
+        sampler.start()
+        try:
+            result = self._load(urls, options, turn_frames, 'binary')
+        finally:
+            peak_rss = sampler.stop()
+        after = [process_usage(worker.pid) for worker in workers]
+
+        cpu_seconds = [
+            end[0] - start[0] for start, end in zip(before, after)
+            if start[0] is not None and end[0] is not None
+        ]
+        idle_rss = sum(usage[1] for usage in before if usage[1] is not None)
+        result.update({
+            'worker_cpu_percent': sum(cpu_seconds) / result['elapsed'] * 100 if cpu_seconds else None,
+            'worker_rss_mb': peak_rss / 1024 / 1024 if peak_rss else None,
+            # 計測開始前のメモリからの増加分を接続数で割る（同じワーカーで前の計測に使ったメモリは含まれない）
+            'rss_per_connection_kb': max(0, peak_rss - idle_rss) / 1024 / connection_count if peak_rss else None,
+        })
+        return result
+
+    def _print_comparison(self, rows):
+        self.stdout.write('')
+        self.stdout.write('音声の折り返し遅延（direct: 疑似サーバーに直接接続、proxy: Daphne経由、added: 差分）')
+        self.stdout.write(
+            f"{'conns':>6} {'direct f/s':>10} {'proxy f/s':>10} {'target':>7} {'loss':>6} "
+            f"{'direct p50':>10} {'proxy p50':>10} {'added p50':>10} {'added p95':>10} {'added p99':>10}"
+        )
+        for direct, proxied in rows:
+            self.stdout.write(
+                f"{proxied['connections']:>6} {direct['frames_per_sec']:>10.0f} {proxied['frames_per_sec']:>10.0f} "
+                f"{proxied['expected_frames_per_sec']:>7.0f} {proxied['loss_rate']:>6.1%} "
+                f"{self._ms(direct['latency_p50']):>10} {self._ms(proxied['latency_p50']):>10} "
+                f"{self._added(direct['latency_p50'], proxied['latency_p50']):>10} "
+                f"{self._added(direct['latency_p95'], proxied['latency_p95']):>10} "
+                f"{self._added(direct['latency_p99'], proxied['latency_p99']):>10}"
+            )
+
+        self.stdout.write('')
+        self.stdout.write('応答開始の遅延（commit → 最初の音声delta）とワーカーのリソース使用量')
+        self.stdout.write(
+            f"{'conns':>6} {'responses':>9} {'direct p50':>10} {'proxy p50':>10} {'proxy p95':>10} "
+            f"{'cpu%':>6} {'cpu%/conn':>9} {'rss MB':>7} {'KB/conn':>8}"
+        )
+        for direct, proxied in rows:
+            cpu_percent = proxied['worker_cpu_percent']
+            cpu = f"{cpu_percent:.0f}" if cpu_percent is not None else '-'
+            cpu_per_connection = f"{cpu_percent / proxied['connections']:.2f}" if cpu_percent is not None else '-'
+            rss = f"{proxied['worker_rss_mb']:.0f}" if proxied['worker_rss_mb'] is not None else '-'
+            rss_per_connection = (
+                f"{proxied['rss_per_connection_kb']:.0f}" if proxied['rss_per_connection_kb'] is not None else '-'
+            )
+            self.stdout.write(
+                f"{proxied['connections']:>6} {proxied['responses']:>9} "
+                f"{self._ms(direct['response_latency_p50']):>10} {self._ms(proxied['response_latency_p50']):>10} "
+                f"{self._ms(proxied['response_latency_p95']):>10} "
+                f"{cpu:>6} {cpu_per_connection:>9} {rss:>7} {rss_per_connection:>8}"
+            )
+
+    @staticmethod
+    def _added(direct, proxied):
+        if direct is None or proxied is None:
+            return '-'
+        return f'{(proxied - direct) * 1000:+.1f}ms'
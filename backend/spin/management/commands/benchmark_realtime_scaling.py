@@ -0,0 +1,186 @@
+"""
+リアルタイムモードのワーカー数スケーリングベンチマーク
+Daphneワーカーをワーカー数ごとに起動し、同時接続数を変えながら /ws/realtime/ に音声フレームを送信して、
+スループット（折り返されたフレーム数/秒）・往復遅延・ワーカーのCPU使用率を計測する。
+OpenAI Realtime APIの代わりにローカルの疑似サーバー（音声をそのまま折り返す）に接続させる
+
+接続はnginxのleast_connと同様にワーカーへ均等に振り分ける。
+ベンチマーク用のユーザー（と、OpenAIキーが未登録の場合はダミーキー）を作成し、終了時に削除する
+
+使用例:
+    python manage.py benchmark_realtime_scaling
+    python manage.py benchmark_realtime_scaling --workers 1 2 4 --connections 50 100 200 --duration 15
+"""
+import os
+import subprocess
+import sys
+import uuid
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.authtoken.models import Token
+
+from spin.models import AIProviderKey
+from spin.services.realtime_benchmark import (
+    process_usage,
+    run_realtime_load,
+    start_fake_realtime_servers,
+    wait_for_port,
+)
+
+HOST = '127.0.0.1'
+
+
+class Command(BaseCommand):
+    help = 'Daphneワーカー数ごとにリアルタイムモードの同時接続スループットを計測します'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4], help='計測するワーカー数（デフォルト: 1 2 4）')
+        parser.add_argument('--connections', type=int, nargs='+', default=[25, 50, 100], help='同時接続数（デフォルト: 25 50 100）')
+        parser.add_argument('--duration', type=float, default=10.0, help='各計測で音声を送信する秒数（デフォルト: 10）')
+        parser.add_argument('--frame-ms', type=int, default=20, help='音声フレームの長さ（ミリ秒、デフォルト: 20）')
+        parser.add_argument('--sample-rate', type=int, default=24000, help='サンプリングレート（デフォルト: 24000）')
+        parser.add_argument('--client-processes', type=int, default=os.cpu_count() or 1, help='疑似クライアントのプロセス数')
+        parser.add_argument('--upstream-processes', type=int, default=1, help='疑似Realtimeサーバーのプロセス数')
+        parser.add_argument('--base-port', type=int, default=18100, help='ワーカーのポート番号（ここから連番）')
+        parser.add_argument('--upstream-port', type=int, default=18090, help='疑似Realtimeサーバーのポート番号')
+        parser.add_argument('--audio-batch-ms', type=int, help='ワーカーの音声フレーム結合時間（REALTIME_AUDIO_BATCH_MS、0で結合しない）')
+        parser.add_argument('--worker-log', help='ワーカーのログの出力先ファイル（省略時は破棄）')
+
+    def handle(self, *args, **options):
+        if min(options['workers']) < 1 or min(options['connections']) < 1:
+            raise CommandError('--workers と --connections は1以上を指定してください')
+
+        self.stdout.write(
+            f"ワーカー数 {options['workers']} × 同時接続数 {options['connections']} "
+            f"（{options['duration']}秒, {options['frame_ms']}msフレーム, CPU {os.cpu_count()}コア）"
+        )
+
+        user, token, temporary_key = self._create_benchmark_user()
+        upstream = start_fake_realtime_servers(HOST, options['upstream_port'], options['upstream_processes'])
+        log_file = open(options['worker_log'], 'ab') if options['worker_log'] else subprocess.DEVNULL
+        try:
+            rows = []
+            for worker_count in options['workers']:
+                rows.extend(self._run_workers(worker_count, token.key, options, log_file))
+            self._print_table(rows)
+        finally:
+            for process in upstream:
+                process.terminate()
+            if log_file is not subprocess.DEVNULL:
+                log_file.close()
+            user.delete()
+            if temporary_key:
+                temporary_key.delete()
+
+    def _create_benchmark_user(self):
+        user = User.objects.create_user(username=f'realtime-benchmark-{uuid.uuid4().hex[:8]}')
+        token = Token.objects.create(user=user)
+        # 接続先は疑似サーバーのためキーの値は使われないが、未登録だとプロキシが接続を拒否する
+        temporary_key = None
+        if not AIProviderKey.objects.filter(provider='openai', is_active=True).exists():
+            temporary_key = AIProviderKey.objects.create(
+                name='realtime benchmark (temporary)',
+                provider='openai',
+                api_key='sk-benchmark',
+                is_active=True,
+            )
+        return user, token, temporary_key
+
+    def _start_workers(self, worker_count, options, log_file):
+        env = {**os.environ, 'OPENAI_REALTIME_URL': f"ws://{HOST}:{options['upstream_port']}/"}
+        if options['audio_batch_ms'] is not None:
+            env['REALTIME_AUDIO_BATCH_MS'] = str(options['audio_batch_ms'])
+        ports = [options['base_port'] + index for index in range(worker_count)]
+        workers = [
+            subprocess.Popen(
+                [sys.executable, '-m', 'daphne', '-b', HOST, '-p', str(port), 'salesmind.asgi:application'],
+                cwd=settings.BASE_DIR,
+                env=env,
+                stdout=log_file,
+                stderr=log_file,
+            )
+            for port in ports
+        ]
+        for port in ports:
+            wait_for_port(HOST, port)
+        return ports, workers
+
+    def _run_workers(self, worker_count, token_key, options, log_file):
+        ports, workers = self._start_workers(worker_count, options, log_file)
+        rows = []
+        try:
+            for connection_count in options['connections']:
+                urls = [
+                    f'ws://{HOST}:{ports[index % worker_count]}/ws/realtime/?token={token_key}'
+                    for index in range(connection_count)
+                ]
+                before = [process_usage(worker.pid) for worker in workers]
+                result = run_realtime_load(
+                    urls,
+                    options['duration'],
+                    sample_rate=options['sample_rate'],
+                    frame_ms=options['frame_ms'],
+                    client_processes=options['client_processes'],
+                )
+                after = [process_usage(worker.pid) for worker in workers]
+
+                cpu_seconds = [
+                    end[0] - start[0] for start, end in zip(before, after)
+                    if start[0] is not None and end[0] is not None
+                ]
+                rss = [usage[1] for usage in after if usage[1] is not None]
+                result.update({
+                    'workers': worker_count,
+                    # 計測区間全体（接続確立・折り返し待ちを含む）に対するワーカーCPU使用率の合計
+                    'worker_cpu_percent': sum(cpu_seconds) / result['elapsed'] * 100 if cpu_seconds else None,
+                    'worker_rss_mb': sum(rss) / 1024 / 1024 if rss else None,
+                })
+                rows.append(result)
+                self.stdout.write(
+                    f"  workers={worker_count} connections={connection_count}: "
+                    f"{result['frames_per_sec']:.0f}/{result['expected_frames_per_sec']:.0f} frames/s, "
+                    f"p95 {self._ms(result['latency_p95'])}"
+                )
+        finally:
+            for worker in workers:
+                worker.terminate()
+            for worker in workers:
+                worker.wait(timeout=10)
+        return rows
+
+    def _print_table(self, rows):
+        self.stdout.write('')
+        self.stdout.write(
+            f"{'workers':>7} {'conns':>6} {'ok':>5} {'err':>4} {'frames/s':>9} {'target':>7} {'loss':>6} "
+            f"{'p50':>8} {'p95':>8} {'p99':>8} {'cpu%':>6} {'cpu%/conn':>9} {'rss MB':>7}"
+        )
+        for row in rows:
+            cpu = f"{row['worker_cpu_percent']:.0f}" if row['worker_cpu_percent'] is not None else '-'
+            cpu_per_connection = (
+                f"{row['worker_cpu_percent'] / row['connections']:.2f}" if row['worker_cpu_percent'] is not None else '-'
+            )
+            rss = f"{row['worker_rss_mb']:.0f}" if row['worker_rss_mb'] is not None else '-'
+            self.stdout.write(
+                f"{row['workers']:>7} {row['connections']:>6} {row['connected']:>5} {row['errors']:>4} "
+                f"{row['frames_per_sec']:>9.0f} {row['expected_frames_per_sec']:>7.0f} {row['loss_rate']:>6.1%} "
+                f"{self._ms(row['latency_p50']):>8} {self._ms(row['latency_p95']):>8} {self._ms(row['latency_p99']):>8} "
+                f"{cpu:>6} {cpu_per_connection:>9} {rss:>7}"
+            )
+
+        # 同時接続数ごとに、最小のワーカー数の場合と比べたスループットの倍率
+        min_workers = min(row['workers'] for row in rows)
+        baseline = {row['connections']: row['frames_per_sec'] for row in rows if row['workers'] == min_workers}
+        self.stdout.write('')
+        for row in rows:
+            base = baseline.get(row['connections'])
+            if base and row['workers'] != min_workers:
+                self.stdout.write(
+                    f"  connections={row['connections']}: workers={row['workers']} は "
+                    f"workers={min_workers} の{row['frames_per_sec'] / base:.2f}倍のスループット"
+                )
+
+    @staticmethod
+    def _ms(value):
+        return f'{value * 1000:.1f}ms' if value is not None else '-'
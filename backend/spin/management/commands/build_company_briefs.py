@@ -0,0 +1,37 @@
+"""
+企業ブリーフ生成コマンド
+プロンプト用の企業ブリーフ（Company.company_brief）が未生成の企業について、ブリーフとトークン数を生成して保存する
+（プロンプト構築時は未生成でもその場で生成するが、保存はしないため定期実行・デプロイ時に一括生成しておく）
+
+使用例:
+    python manage.py build_company_briefs
+    python manage.py build_company_briefs --all --batch-size 200
+"""
+from django.core.management.base import BaseCommand
+
+from spin.models import Company
+from spin.services.company_brief import generate_company_brief
+
+
+class Command(BaseCommand):
+    help = 'プロンプト用の企業ブリーフを生成します'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help='生成済みの企業も再生成（ブリーフの形式を変更した場合など）')
+        parser.add_argument('--batch-size', type=int, default=100, help='1回に読み込む企業数（デフォルト: 100）')
+
+    def handle(self, *args, **options):
+        companies = Company.objects.order_by('pk')
+        if not options['all']:
+            companies = companies.filter(company_brief__isnull=True)
+
+        built = 0
+        for company in companies.iterator(chunk_size=options['batch_size']):
+            brief, tokens = generate_company_brief(company)
+            # save()を使わずに更新し、updated_at（検索インデックスのキャッシュキー）を変えない
+            Company.objects.filter(pk=company.pk).update(company_brief=brief, company_brief_tokens=tokens)
+            built += 1
+            if options['verbosity'] >= 2:
+                self.stdout.write(f"  {company.company_name}: {tokens}トークン")
+
+        self.stdout.write(self.style.SUCCESS(f'完了: {built}件の企業ブリーフを生成しました'))
@@ -0,0 +1,71 @@
+"""
+期間別ランキング集計コマンド
+終了した日間・週間・月間の期間について、ランキングの集計結果（RankingRollup）を作成する
+（未集計の期間はAPIアクセス時にも集計されるため、定期実行で事前に作成しておく用途）
+
+使用例:
+    python manage.py build_ranking_rollups --days 7
+    python manage.py build_ranking_rollups --period monthly --days 90 --industries --rebuild
+"""
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from spin.models import RankingEntry, RankingRollupWindow
+from spin.services.ranking_windows import PERIODS, build_rollup, get_window, is_window_closed, window_datetimes
+
+
+class Command(BaseCommand):
+    help = '終了した期間の期間別ランキングを集計します'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--mode', choices=['simple', 'detailed'], help='診断モード（省略時は両方）')
+        parser.add_argument('--period', choices=PERIODS, help='期間（省略時はすべて）')
+        parser.add_argument('--days', type=int, default=7, help='何日前までの期間を対象にするか（デフォルト: 7）')
+        parser.add_argument('--industries', action='store_true', help='業界別の集計も作成')
+        parser.add_argument('--rebuild', action='store_true', help='集計済みの期間も再集計')
+
+    def handle(self, *args, **options):
+        modes = [options['mode']] if options['mode'] else ['simple', 'detailed']
+        periods = [options['period']] if options['period'] else list(PERIODS)
+        today = timezone.localdate()
+
+        built = 0
+        for period in periods:
+            # 対象範囲に含まれる期間の開始日を列挙
+            starts = []
+            day = today - timedelta(days=options['days'])
+            while day <= today:
+                start, end = get_window(period, day)
+                if start not in starts and is_window_closed(period, start):
+                    starts.append(start)
+                day = end
+
+            for mode in modes:
+                for start in starts:
+                    industries = ['']
+                    if options['industries']:
+                        industries += self._industries_in_window(mode, period, start)
+                    for industry in industries:
+                        exists = RankingRollupWindow.objects.filter(
+                            mode=mode, period=period, period_start=start, industry=industry
+                        ).exists()
+                        if exists and not options['rebuild']:
+                            continue
+                        count = build_rollup(mode, period, start, industry)
+                        built += 1
+                        if count or options['verbosity'] >= 2:
+                            self.stdout.write(f"  {mode}/{period}/{start} {industry or '全業界'}: {count}件")
+
+        self.stdout.write(self.style.SUCCESS(f'完了: {built}期間を集計しました'))
+
+    def _industries_in_window(self, mode, period, start):
+        """期間内にランキングエントリがある業界を取得"""
+        start_at, end_at = window_datetimes(*get_window(period, start))
+        return list(
+            RankingEntry.objects.filter(mode=mode, finished_at__gte=start_at, finished_at__lt=end_at)
+            .exclude(industry='')
+            .values_list('industry', flat=True)
+            .distinct()
+        )
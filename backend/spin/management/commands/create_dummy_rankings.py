@@ -8,6 +8,7 @@ from django.core.management.base import BaseCommand
 from django.contrib.auth.models import User
 from django.utils import timezone
 from spin.models import Session, Report, ChatMessage
+from spin.services.ranking import update_ranking_entry
 
 
 class Command(BaseCommand):
@@ -190,10 +191,13 @@ class Command(BaseCommand):
             'total': total_score
         }
 
-        Report.objects.create(
+        report = Report.objects.create(
             session=session,
             spin_scores=spin_scores,
             feedback='ダミーデータのフィードバック',
             next_actions='ダミーデータの次のアクション'
         )
 
+        # ランキングエントリを作成
+        update_ranking_entry(session, report)
+
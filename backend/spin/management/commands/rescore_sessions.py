@@ -0,0 +1,254 @@
+"""
+一括再スコアリングコマンド
+スコアリングのプロンプトやモデルを変更した後に、終了済みセッションを並列で再スコアリングする
+
+使用例:
+    python manage.py rescore_sessions --mode detailed --since 2025-01-01 --workers 8
+    python manage.py rescore_sessions --resume  # 中断したところから再開
+"""
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+
+from spin.models import ModelConfiguration, Report, Session
+from spin.services.message_archive import get_session_messages
+from spin.services.ranking import refresh_ranking_entries
+from spin.services.scoring import SCORING_PROMPT_VERSION, compute_transcript_hash, score_conversation
+from spin.services.scoring_jobs import build_spin_scores
+
+REPORT_UPDATE_FIELDS = [
+    'spin_scores', 'feedback', 'next_actions', 'scoring_details',
+    'transcript_hash', 'prompt_version', 'rescored_at',
+]
+
+# レート制限エラーのリトライ設定
+MAX_RETRIES = 3
+RETRY_BACKOFF_SECONDS = 5
+
+
+class RateLimiter:
+    """スレッド間で共有するレート制限（1分あたりのリクエスト数）"""
+
+    def __init__(self, requests_per_minute: int):
+        self.interval = 60.0 / requests_per_minute if requests_per_minute > 0 else 0.0
+        self.next_slot = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """次のリクエスト枠まで待機"""
+        if not self.interval:
+            return
+        with self.lock:
+            now = time.monotonic()
+            wait = self.next_slot - now
+            self.next_slot = max(now, self.next_slot) + self.interval
+        if wait > 0:
+            time.sleep(wait)
+
+
+class Command(BaseCommand):
+    help = '終了済みセッションを並列で再スコアリングします（チェックポイントから再開可能）'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--mode', choices=['simple', 'detailed'], help='診断モードで絞り込み')
+        parser.add_argument('--user', help='ユーザー名で絞り込み')
+        parser.add_argument('--since', help='終了日時の下限（YYYY-MM-DD）')
+        parser.add_argument('--until', help='終了日時の上限（YYYY-MM-DD、この日を含まない）')
+        parser.add_argument('--session-ids', nargs='+', help='対象セッションID')
+        parser.add_argument('--limit', type=int, help='処理する最大セッション数')
+        parser.add_argument('--workers', type=int, default=4, help='並列数（デフォルト: 4）')
+        parser.add_argument(
+            '--rpm',
+            type=int,
+            help='1分あたりの最大リクエスト数（省略時はスコアリング用APIキーのレート制限、未設定なら60）'
+        )
+        parser.add_argument('--batch-size', type=int, default=50, help='Reportを一括更新する件数（デフォルト: 50）')
+        parser.add_argument(
+            '--checkpoint',
+            default='rescore_checkpoint.json',
+            help='チェックポイントファイルのパス（デフォルト: rescore_checkpoint.json）'
+        )
+        parser.add_argument('--resume', action='store_true', help='チェックポイントから再開')
+        parser.add_argument('--force', action='store_true', help='会話履歴とプロンプトバージョンが一致していても再スコアリング')
+        parser.add_argument('--dry-run', action='store_true', help='対象件数のみ表示して終了')
+
+    def handle(self, *args, **options):
+        filters = {
+            key: options[key]
+            for key in ('mode', 'user', 'since', 'until', 'session_ids')
+            if options.get(key)
+        }
+        queryset = self._build_queryset(filters)
+
+        checkpoint_path = Path(options['checkpoint'])
+        checkpoint = self._load_checkpoint(checkpoint_path, filters) if options['resume'] else None
+        if checkpoint is None:
+            checkpoint = {
+                'filters': filters,
+                'prompt_version': SCORING_PROMPT_VERSION,
+                'cursor': None,
+                'processed': 0,
+                'rescored': 0,
+                'skipped': 0,
+                'failed': [],
+            }
+        elif checkpoint['cursor']:
+            queryset = queryset.filter(pk__gt=checkpoint['cursor'])
+            self.stdout.write(f"チェックポイントから再開します: 処理済み {checkpoint['processed']}件")
+
+        total = queryset.count()
+        if options['limit']:
+            total = min(total, options['limit'])
+        self.stdout.write(f'再スコアリング対象: {total}件（プロンプトバージョン: {SCORING_PROMPT_VERSION}）')
+        if options['dry_run'] or not total:
+            return
+
+        rpm = options['rpm'] or self._default_rpm()
+        rate_limiter = RateLimiter(rpm)
+        workers = max(1, options['workers'])
+        batch_size = max(1, options['batch_size'])
+        self.stdout.write(f'並列数: {workers}, レート制限: {rpm} req/min, バッチサイズ: {batch_size}')
+
+        started = time.monotonic()
+        remaining = total
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='rescore') as executor:
+            while remaining > 0:
+                # 主キー順にバッチを取得し、バッチ単位でチェックポイントを進める
+                batch_queryset = queryset.filter(pk__gt=checkpoint['cursor']) if checkpoint['cursor'] else queryset
+                batch = list(batch_queryset[:min(batch_size, remaining)])
+                if not batch:
+                    break
+
+                futures = {
+                    executor.submit(self._rescore_session, session, rate_limiter, options['force']): session
+                    for session in batch
+                }
+                updated_reports = []
+                for future in as_completed(futures):
+                    session = futures[future]
+                    try:
+                        report = future.result()
+                    except Exception as e:
+                        self.stdout.write(self.style.WARNING(f'  失敗: {session.id}: {e}'))
+                        checkpoint['failed'].append(str(session.id))
+                        continue
+                    if report is None:
+                        checkpoint['skipped'] += 1
+                    else:
+                        updated_reports.append(report)
+
+                # Reportをまとめて更新
+                Report.objects.bulk_update(updated_reports, REPORT_UPDATE_FIELDS, batch_size=batch_size)
+                refresh_ranking_entries(updated_reports)
+
+                checkpoint['rescored'] += len(updated_reports)
+                checkpoint['processed'] += len(batch)
+                checkpoint['cursor'] = str(batch[-1].pk)
+                self._save_checkpoint(checkpoint_path, checkpoint)
+                remaining -= len(batch)
+
+                elapsed = time.monotonic() - started
+                self.stdout.write(
+                    f"  処理済み {checkpoint['processed']}件（再スコアリング {checkpoint['rescored']} / "
+                    f"スキップ {checkpoint['skipped']} / 失敗 {len(checkpoint['failed'])}）"
+                    f" 経過 {elapsed:.0f}秒"
+                )
+
+        self.stdout.write(self.style.SUCCESS(
+            f"完了: 再スコアリング {checkpoint['rescored']}件、スキップ {checkpoint['skipped']}件、"
+            f"失敗 {len(checkpoint['failed'])}件"
+        ))
+        if checkpoint['failed']:
+            self.stdout.write(f'失敗したセッションは {checkpoint_path} の failed に記録されています')
+
+    def _build_queryset(self, filters):
+        """再スコアリング対象のセッションを主キー順で取得"""
+        queryset = Session.objects.filter(status='finished', report__isnull=False).select_related('report', 'user')
+        if filters.get('mode'):
+            queryset = queryset.filter(mode=filters['mode'])
+        if filters.get('user'):
+            queryset = queryset.filter(user__username=filters['user'])
+        if filters.get('since'):
+            queryset = queryset.filter(finished_at__gte=self._parse_date(filters['since']))
+        if filters.get('until'):
+            queryset = queryset.filter(finished_at__lt=self._parse_date(filters['until']))
+        if filters.get('session_ids'):
+            queryset = queryset.filter(id__in=filters['session_ids'])
+        return queryset.order_by('pk')
+
+    def _parse_date(self, value):
+        try:
+            return timezone.make_aware(datetime.strptime(value, '%Y-%m-%d'))
+        except ValueError:
+            raise CommandError(f'日付はYYYY-MM-DD形式で指定してください: {value}')
+
+    def _default_rpm(self):
+        """スコアリング用APIキーに設定されたレート制限を取得"""
+        config = ModelConfiguration.objects.filter(purpose='scoring', is_active=True).select_related('primary_provider_key').first()
+        if config and config.primary_provider_key and config.primary_provider_key.rate_limit_rpm:
+            return config.primary_provider_key.rate_limit_rpm
+        return 60
+
+    def _rescore_session(self, session, rate_limiter, force):
+        """
+        1セッションを再スコアリング（ワーカースレッドで実行）
+
+        Returns:
+            更新したReport（保存は呼び出し側で一括実行）。スキップした場合はNone
+        """
+        try:
+            conversation_history = get_session_messages(session)
+            transcript_hash = compute_transcript_hash(conversation_history)
+            report = session.report
+            if not force and report.transcript_hash == transcript_hash and report.prompt_version == SCORING_PROMPT_VERSION:
+                return None
+
+            for attempt in range(MAX_RETRIES + 1):
+                rate_limiter.acquire()
+                try:
+                    scores_data = json.loads(score_conversation(session, conversation_history))
+                    break
+                except Exception as e:
+                    # レート制限エラーのみバックオフしてリトライ
+                    is_rate_limited = '429' in str(e) or 'rate' in str(e).lower()
+                    if not is_rate_limited or attempt == MAX_RETRIES:
+                        raise
+                    time.sleep(RETRY_BACKOFF_SECONDS * (2 ** attempt))
+
+            report.spin_scores = build_spin_scores(scores_data)
+            report.feedback = scores_data.get('feedback', '')
+            report.next_actions = scores_data.get('next_actions', '')
+            report.scoring_details = scores_data.get('scoring_details', {})
+            report.transcript_hash = transcript_hash
+            report.prompt_version = SCORING_PROMPT_VERSION
+            report.rescored_at = timezone.now()
+            return report
+        finally:
+            # ワーカースレッドのDB接続を閉じる
+            connection.close()
+
+    def _load_checkpoint(self, path, filters):
+        """チェックポイントを読み込む（絞り込み条件が異なる場合はエラー）"""
+        if not path.exists():
+            self.stdout.write(self.style.WARNING(f'チェックポイントが見つからないため最初から実行します: {path}'))
+            return None
+        checkpoint = json.loads(path.read_text(encoding='utf-8'))
+        if checkpoint.get('filters') != filters:
+            raise CommandError('チェックポイントの絞り込み条件が今回の指定と異なります。同じ条件で実行するか、--resumeを外してください')
+        if checkpoint.get('prompt_version') != SCORING_PROMPT_VERSION:
+            raise CommandError('チェックポイント作成後にプロンプトバージョンが変更されています。--resumeを外して最初から実行してください')
+        return checkpoint
+
+    def _save_checkpoint(self, path, checkpoint):
+        """チェックポイントを書き込む（一時ファイル経由で置き換え）"""
+        checkpoint['updated_at'] = timezone.now().isoformat()
+        tmp_path = path.with_suffix(path.suffix + '.tmp')
+        tmp_path.write_text(json.dumps(checkpoint, ensure_ascii=False, indent=2), encoding='utf-8')
+        tmp_path.replace(path)
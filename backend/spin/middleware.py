@@ -0,0 +1,68 @@
+"""
+条件付きGET（ETag / 304 Not Modified）ミドルウェア
+
+@conditional_etag を付けたビューのGET/HEADレスポンスにETagを付与し、
+If-None-Matchが一致する場合は本文を返さず304を返す。
+ビューが独自にETagを設定している場合はそれを使い、なければレスポンス本文のハッシュから生成する
+"""
+import hashlib
+
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+
+
+def conditional_etag(view_func):
+    """
+    ビューをConditionalGetMiddlewareの対象にするデコレーター
+
+    @api_view より外側（一番上）に付けること
+    """
+    view_func.conditional_etag = True
+    return view_func
+
+
+def compute_etag(*parts) -> str:
+    """構成要素から強いETagを生成"""
+    raw = ":".join(str(part) for part in parts)
+    return f'"{hashlib.sha1(raw.encode("utf-8")).hexdigest()}"'
+
+
+def set_private_etag(response, etag: str):
+    """
+    ユーザーごとのレスポンスにETagとキャッシュ制御ヘッダーを設定
+
+    ブラウザには保存させるが、毎回If-None-Matchで再検証させる
+    """
+    response['ETag'] = etag
+    if not response.has_header('Cache-Control'):
+        patch_cache_control(response, private=True, no_cache=True)
+    patch_vary_headers(response, ['Authorization'])
+    return response
+
+
+def not_modified_response(request, etag: str):
+    """If-None-Matchが一致する場合は304レスポンスを返す（一致しない場合はNone）"""
+    response = get_conditional_response(request, etag=etag)
+    if response is not None:
+        set_private_etag(response, etag)
+    return response
+
+
+class ConditionalGetMiddleware:
+    """@conditional_etag を付けたビューの条件付きGETを処理するミドルウェア"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if not getattr(request, '_conditional_etag', False):
+            return response
+        if request.method not in ('GET', 'HEAD') or response.status_code != 200 or response.streaming:
+            return response
+
+        etag = response.get('ETag') or f'"{hashlib.sha1(response.content).hexdigest()}"'
+        set_private_etag(response, etag)
+        return get_conditional_response(request, etag=etag, response=response)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request._conditional_etag = getattr(view_func, 'conditional_etag', False)
@@ -0,0 +1,79 @@
+# Generated by Django 5.2.18 on 2026-10-19 02:37
+
+from bs4 import BeautifulSoup
+from django.db import migrations, models
+
+# Webサイト情報としてブリーフに含める最大文字数（この時点のcompany_brief.BRIEF_WEB_TEXT_MAX_CHARS）
+BRIEF_WEB_TEXT_MAX_CHARS = 2000
+
+
+def _web_text(scraped_data):
+    """scraped_dataからWebサイトのテキストを取り出す"""
+    if not scraped_data:
+        return ""
+    if scraped_data.get('text_content'):
+        return scraped_data['text_content'][:BRIEF_WEB_TEXT_MAX_CHARS]
+    if scraped_data.get('page_texts'):
+        return "\n".join(page.get('text') or '' for page in scraped_data['page_texts'])[:BRIEF_WEB_TEXT_MAX_CHARS]
+
+    raw_html_list = scraped_data.get('raw_html_list') or []
+    if not raw_html_list and scraped_data.get('raw_html'):
+        raw_html_list = [scraped_data['raw_html']]
+    texts = []
+    total_chars = 0
+    for raw_html in raw_html_list:
+        text = BeautifulSoup(raw_html, 'html.parser').get_text(separator=' ', strip=True)
+        if text:
+            texts.append(text)
+            total_chars += len(text)
+        if total_chars >= BRIEF_WEB_TEXT_MAX_CHARS:
+            break
+    return "\n".join(texts)[:BRIEF_WEB_TEXT_MAX_CHARS]
+
+
+def backfill_company_brief(apps, schema_editor):
+    """
+    既存企業のプロンプト用ブリーフを生成
+
+    サービスのコードは後の変更で参照するテーブルが増えるため使わず、この時点のCompany.scraped_dataだけから生成する
+    （トークン数は文字数/4の概算。企業情報を保存し直すと正確な値で再生成される）
+    """
+    Company = apps.get_model('spin', 'Company')
+    for company in Company.objects.filter(company_brief__isnull=True).iterator():
+        lines = [f"企業名: {company.company_name}"]
+        for label, value in (
+            ('業界', company.industry),
+            ('事業内容', company.business_description),
+            ('所在地', company.location),
+            ('従業員数', company.employee_count),
+            ('設立年', company.established_year),
+        ):
+            if value:
+                lines.append(f"{label}: {value}")
+        web_text = _web_text(company.scraped_data)
+        if web_text:
+            lines.append("\n--- 企業のWebサイト情報 ---")
+            lines.append(web_text)
+        brief = "\n".join(lines)
+        Company.objects.filter(pk=company.pk).update(company_brief=brief, company_brief_tokens=len(brief) // 4)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('spin', '0023_session_realtime_mode'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='company',
+            name='company_brief',
+            field=models.TextField(blank=True, help_text='プロンプト用の企業情報ブリーフ（保存時に自動生成）', null=True),
+        ),
+        migrations.AddField(
+            model_name='company',
+            name='company_brief_tokens',
+            field=models.PositiveIntegerField(default=0, help_text='企業情報ブリーフのトークン数'),
+        ),
+        migrations.RunPython(backfill_company_brief, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 02:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('spin', '0024_company_brief'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='company',
+            name='retrieval_index',
+            field=models.JSONField(blank=True, help_text='企業ページのBM25検索インデックス（スクレイピング時に構築）', null=True),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-19 02:43
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('spin', '0025_company_retrieval_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ScoringJob',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('status', models.CharField(choices=[('pending', '待機中'), ('running', '実行中'), ('completed', '完了'), ('failed', '失敗')], default='pending', max_length=20)),
+                ('partial_feedback', models.TextField(blank=True, default='', help_text='生成途中のフィードバック文')),
+                ('error', models.TextField(blank=True, help_text='失敗時のエラーメッセージ', null=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('report', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='scoring_job', to='spin.report')),
+                ('session', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='scoring_job', to='spin.session')),
+            ],
+            options={
+                'verbose_name': 'スコアリングジョブ',
+                'verbose_name_plural': 'スコアリングジョブ',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 02:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('spin', '0026_scoring_job'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='session',
+            name='scorecard',
+            field=models.JSONField(blank=True, help_text='ターンごとの分析結果を集計したスコアカード（終了時のスコアリングに使用）', null=True),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-19 02:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('spin', '0027_session_scorecard'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='report',
+            name='prompt_version',
+            field=models.CharField(blank=True, default='', help_text='スコアリング時のプロンプトバージョン', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='report',
+            name='rescored_at',
+            field=models.DateTimeField(blank=True, help_text='再スコアリング日時', null=True),
+        ),
+        migrations.AddField(
+            model_name='report',
+            name='transcript_hash',
+            field=models.CharField(blank=True, default='', help_text='スコアリング時の会話履歴のハッシュ値', max_length=64),
+        ),
+    ]
@@ -0,0 +1,90 @@
+# Generated by Django 5.2.18 on 2026-10-19 02:50
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+
+BACKFILL_BATCH_SIZE = 500
+
+
+def backfill_ranking_entries(apps, schema_editor):
+    """既存の終了済みセッションのランキングエントリを作成"""
+    Session = apps.get_model('spin', 'Session')
+    RankingEntry = apps.get_model('spin', 'RankingEntry')
+    sessions = (
+        Session.objects.filter(status='finished', report__isnull=False)
+        .select_related('user', 'report', 'company')
+        .only(
+            'id', 'mode', 'industry', 'success_probability', 'finished_at', 'company_id',
+            'user__username', 'report__spin_scores', 'company__company_name',
+        )
+        .annotate(message_count=Count('messages'))
+        .order_by('pk')
+    )
+    batch = []
+    for session in sessions.iterator(chunk_size=BACKFILL_BATCH_SIZE):
+        spin_scores = session.report.spin_scores or {}
+        total_score = spin_scores.get('total', 0) or 0
+        success_probability = session.success_probability or 0
+        company_name = session.company.company_name if session.company_id else ''
+        batch.append(RankingEntry(
+            session_id=session.id,
+            user_id=session.user_id,
+            mode=session.mode,
+            username=session.user.username,
+            company_name=company_name or session.industry or '未設定',
+            industry=session.industry or '',
+            total_score=total_score,
+            success_probability=success_probability,
+            composite_score=(total_score * 0.7) + (success_probability * 0.3),
+            situation_score=spin_scores.get('situation', 0) or 0,
+            problem_score=spin_scores.get('problem', 0) or 0,
+            implication_score=spin_scores.get('implication', 0) or 0,
+            need_score=spin_scores.get('need', 0) or 0,
+            message_count=session.message_count,
+            finished_at=session.finished_at,
+        ))
+        if len(batch) >= BACKFILL_BATCH_SIZE:
+            RankingEntry.objects.bulk_create(batch, ignore_conflicts=True)
+            batch = []
+    if batch:
+        RankingEntry.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('spin', '0028_report_rescore_metadata'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RankingEntry',
+            fields=[
+                ('session', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='ranking_entry', serialize=False, to='spin.session')),
+                ('mode', models.CharField(choices=[('simple', '簡易診断'), ('detailed', '詳細診断')], max_length=20)),
+                ('username', models.CharField(max_length=150)),
+                ('company_name', models.CharField(blank=True, default='', max_length=255)),
+                ('industry', models.CharField(blank=True, default='', max_length=100)),
+                ('total_score', models.FloatField(default=0, help_text='総合スコア')),
+                ('success_probability', models.FloatField(default=0, help_text='終了時の商談成功率')),
+                ('composite_score', models.FloatField(default=0, help_text='総合評価スコア（スコア70% + 成功率30%）')),
+                ('situation_score', models.FloatField(default=0)),
+                ('problem_score', models.FloatField(default=0)),
+                ('implication_score', models.FloatField(default=0)),
+                ('need_score', models.FloatField(default=0)),
+                ('message_count', models.PositiveIntegerField(default=0)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ranking_entries', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'ランキングエントリ',
+                'verbose_name_plural': 'ランキングエントリ',
+                'indexes': [models.Index(fields=['mode', '-total_score', '-finished_at', '-session'], name='ranking_mode_total_idx'), models.Index(fields=['mode', '-composite_score', '-finished_at', '-session'], name='ranking_mode_composite_idx')],
+            },
+        ),
+        migrations.RunPython(backfill_ranking_entries, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-19 02:53
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('spin', '0029_ranking_entry'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='rankingentry',
+            index=models.Index(fields=['mode', 'updated_at'], name='ranking_mode_updated_idx'),
+        ),
+    ]
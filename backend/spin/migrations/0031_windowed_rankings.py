@@ -0,0 +1,65 @@
+# Generated by Django 5.2.18 on 2026-10-19 02:55
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('spin', '0030_ranking_entry_updated_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RankingRollup',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('mode', models.CharField(choices=[('simple', '簡易診断'), ('detailed', '詳細診断')], max_length=20)),
+                ('period', models.CharField(choices=[('daily', '日間'), ('weekly', '週間'), ('monthly', '月間')], max_length=20)),
+                ('period_start', models.DateField(help_text='期間の開始日')),
+                ('industry', models.CharField(blank=True, default='', help_text='業界（空文字は全業界）', max_length=100)),
+                ('username', models.CharField(max_length=150)),
+                ('rank', models.PositiveIntegerField()),
+                ('best_score', models.FloatField(help_text='期間内の最高スコア')),
+                ('average_score', models.FloatField(help_text='期間内の平均スコア')),
+                ('session_count', models.PositiveIntegerField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': '期間別ランキング集計',
+                'verbose_name_plural': '期間別ランキング集計',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='rankingentry',
+            index=models.Index(fields=['mode', 'industry', '-total_score', '-finished_at', '-session'], name='ranking_industry_total_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='rankingentry',
+            index=models.Index(fields=['mode', 'industry', '-composite_score', '-finished_at', '-session'], name='ranking_industry_comp_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='rankingentry',
+            index=models.Index(fields=['mode', 'finished_at'], name='ranking_mode_finished_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='rankingentry',
+            index=models.Index(fields=['mode', 'industry', 'finished_at'], name='ranking_industry_finished_idx'),
+        ),
+        migrations.AddField(
+            model_name='rankingrollup',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ranking_rollups', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='rankingrollup',
+            index=models.Index(fields=['mode', 'period', 'period_start', 'industry', 'rank'], name='rollup_window_rank_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='rankingrollup',
+            unique_together={('mode', 'period', 'period_start', 'industry', 'user')},
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-19 02:57
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('spin', '0031_windowed_rankings'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='rankingentry',
+            index=models.Index(fields=['user', 'mode', '-total_score'], name='ranking_user_total_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='rankingentry',
+            index=models.Index(fields=['user', 'mode', '-composite_score'], name='ranking_user_composite_idx'),
+        ),
+    ]
@@ -0,0 +1,105 @@
+# Generated by Django 5.2.18 on 2026-10-19 03:10
+
+import json
+import zlib
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+MOVE_BATCH_SIZE = 100
+
+# この時点のcompany_artifactsの定義（サービスのコードは変更されうるためマイグレーションでは使わない）
+ARTIFACT_KEYS = ('raw_html', 'raw_html_list', 'page_texts', 'text_content')
+SUMMARY_MAX_STRING_CHARS = 500
+
+
+def _summarize(data):
+    """Company.scraped_data に残す概要（生HTML・本文テキストを除き、件数と短いメタデータのみ）"""
+    summary = {}
+    for key, value in data.items():
+        if key in ARTIFACT_KEYS:
+            continue
+        if isinstance(value, str) and len(value) > SUMMARY_MAX_STRING_CHARS:
+            continue
+        if isinstance(value, (list, dict)) and len(json.dumps(value, ensure_ascii=False)) > SUMMARY_MAX_STRING_CHARS:
+            continue
+        summary[key] = value
+
+    page_texts = data.get('page_texts') or []
+    raw_html_list = data.get('raw_html_list') or ([data['raw_html']] if data.get('raw_html') else [])
+    summary['page_count'] = len(page_texts) or len(raw_html_list)
+    summary['text_chars'] = (
+        sum(len(page.get('text') or '') for page in page_texts) or len(data.get('text_content') or '')
+    )
+    summary['has_artifact'] = True
+    return summary
+
+
+def _decompress(codec, payload):
+    payload = bytes(payload)
+    if codec == 'zstd':
+        import zstandard
+        raw = zstandard.ZstdDecompressor().decompress(payload)
+    else:
+        raw = zlib.decompress(payload)
+    return json.loads(raw.decode('utf-8'))
+
+
+def move_scraped_data(apps, schema_editor):
+    """既存のスクレイピング結果を圧縮テーブル（zlib）に移し、Companyには概要のみを残す"""
+    Company = apps.get_model('spin', 'Company')
+    CompanyScrapeArtifact = apps.get_model('spin', 'CompanyScrapeArtifact')
+    companies = Company.objects.exclude(scraped_data__isnull=True).only('id', 'scraped_data').order_by('pk')
+    for company in companies.iterator(chunk_size=MOVE_BATCH_SIZE):
+        data = company.scraped_data
+        if not data or not any(key in data for key in ARTIFACT_KEYS):
+            continue
+        raw = json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        payload = zlib.compress(raw, 6)
+        CompanyScrapeArtifact.objects.update_or_create(
+            company_id=company.pk,
+            defaults={'codec': 'zlib', 'payload': payload, 'raw_size': len(raw), 'compressed_size': len(payload)},
+        )
+        Company.objects.filter(pk=company.pk).update(scraped_data=_summarize(data))
+
+
+def restore_scraped_data(apps, schema_editor):
+    """圧縮テーブルのスクレイピング結果をCompany.scraped_dataに戻す"""
+    Company = apps.get_model('spin', 'Company')
+    CompanyScrapeArtifact = apps.get_model('spin', 'CompanyScrapeArtifact')
+    for artifact in CompanyScrapeArtifact.objects.order_by('pk').iterator(chunk_size=MOVE_BATCH_SIZE):
+        Company.objects.filter(pk=artifact.company_id).update(
+            scraped_data=_decompress(artifact.codec, artifact.payload)
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('spin', '0034_session_report_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CompanyScrapeArtifact',
+            fields=[
+                ('company', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='scrape_artifact', serialize=False, to='spin.company')),
+                ('codec', models.CharField(choices=[('zstd', 'Zstandard'), ('zlib', 'zlib')], help_text='圧縮形式', max_length=10)),
+                ('payload', models.BinaryField(help_text='スクレイピング結果（JSON）を圧縮したデータ')),
+                ('raw_size', models.PositiveIntegerField(default=0, help_text='圧縮前のサイズ（バイト）')),
+                ('compressed_size', models.PositiveIntegerField(default=0, help_text='圧縮後のサイズ（バイト）')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': '企業スクレイピングデータ',
+                'verbose_name_plural': '企業スクレイピングデータ',
+            },
+        ),
+        migrations.AlterField(
+            model_name='company',
+            name='scraped_data',
+            field=models.JSONField(blank=True, help_text='スクレイピング結果の概要（生HTML・本文テキストはCompanyScrapeArtifactに圧縮して保存）', null=True),
+        ),
+        migrations.RunPython(move_scraped_data, restore_scraped_data),
+    ]
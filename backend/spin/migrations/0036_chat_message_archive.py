@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-19 03:11
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('spin', '0035_company_scrape_artifact'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChatMessageArchive',
+            fields=[
+                ('session', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='message_archive', serialize=False, to='spin.session')),
+                ('codec', models.CharField(choices=[('zstd', 'Zstandard'), ('zlib', 'zlib')], help_text='圧縮形式', max_length=10)),
+                ('payload', models.BinaryField(help_text='会話履歴（JSON配列）を圧縮したデータ')),
+                ('message_count', models.PositiveIntegerField(default=0)),
+                ('last_sequence', models.PositiveIntegerField(default=0)),
+                ('raw_size', models.PositiveIntegerField(default=0, help_text='圧縮前のサイズ（バイト）')),
+                ('compressed_size', models.PositiveIntegerField(default=0, help_text='圧縮後のサイズ（バイト）')),
+                ('archived_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'アーカイブ済み会話履歴',
+                'verbose_name_plural': 'アーカイブ済み会話履歴',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='session',
+            index=models.Index(fields=['status', 'finished_at'], name='session_status_finished_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 03:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('spin', '0036_chat_message_archive'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='session',
+            name='realtime_latency',
+            field=models.JSONField(blank=True, help_text='リアルタイムモードのターンごとの応答遅延と統計（発話終了→最初の音声など）', null=True),
+        ),
+    ]
@@ -0,0 +1,64 @@
+# Generated by Django 5.2.18 on 2026-10-19 04:00
+
+import json
+import zlib
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+MOVE_BATCH_SIZE = 100
+
+
+def move_retrieval_index(apps, schema_editor):
+    """Company.retrieval_index の既存インデックスを圧縮テーブルに移す（未移行のものは検索時に再構築される）"""
+    Company = apps.get_model('spin', 'Company')
+    CompanyRetrievalIndex = apps.get_model('spin', 'CompanyRetrievalIndex')
+    companies = Company.objects.exclude(retrieval_index__isnull=True).only('id', 'retrieval_index').order_by('pk')
+    for company in companies.iterator(chunk_size=MOVE_BATCH_SIZE):
+        index = company.retrieval_index
+        if not index or not index.get('chunks') or 'version' not in index:
+            continue
+        raw = json.dumps(index, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        payload = zlib.compress(raw, 6)
+        CompanyRetrievalIndex.objects.update_or_create(
+            company_id=company.pk,
+            defaults={
+                'version': index['version'],
+                'codec': 'zlib',
+                'payload': payload,
+                'chunk_count': len(index['chunks']),
+                'compressed_size': len(payload),
+            },
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('spin', '0037_session_realtime_latency'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CompanyRetrievalIndex',
+            fields=[
+                ('company', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='retrieval_index', serialize=False, to='spin.company')),
+                ('version', models.PositiveSmallIntegerField(help_text='インデックス形式のバージョン')),
+                ('codec', models.CharField(choices=[('zstd', 'Zstandard'), ('zlib', 'zlib')], help_text='圧縮形式', max_length=10)),
+                ('payload', models.BinaryField(help_text='インデックス（JSON）を圧縮したデータ')),
+                ('chunk_count', models.PositiveIntegerField(default=0, help_text='チャンク数')),
+                ('compressed_size', models.PositiveIntegerField(default=0, help_text='圧縮後のサイズ（バイト）')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': '企業ページ検索インデックス',
+                'verbose_name_plural': '企業ページ検索インデックス',
+            },
+        ),
+        migrations.RunPython(move_retrieval_index, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='company',
+            name='retrieval_index',
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.2.18 on 2026-10-19 04:04
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('spin', '0038_company_retrieval_index_table'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='rankingentry',
+            name='ranking_mode_total_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='rankingentry',
+            name='ranking_mode_composite_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='rankingentry',
+            name='ranking_industry_total_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='rankingentry',
+            name='ranking_industry_comp_idx',
+        ),
+        migrations.AddIndex(
+            model_name='rankingentry',
+            index=models.Index(fields=['mode', '-total_score', '-session'], name='ranking_mode_total_key_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='rankingentry',
+            index=models.Index(fields=['mode', '-composite_score', '-session'], name='ranking_mode_comp_key_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='rankingentry',
+            index=models.Index(fields=['mode', 'industry', '-total_score', '-session'], name='ranking_ind_total_key_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='rankingentry',
+            index=models.Index(fields=['mode', 'industry', '-composite_score', '-session'], name='ranking_ind_comp_key_idx'),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-19 04:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('spin', '0039_ranking_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RankingRollupWindow',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('mode', models.CharField(choices=[('simple', '簡易診断'), ('detailed', '詳細診断')], max_length=20)),
+                ('period', models.CharField(choices=[('daily', '日間'), ('weekly', '週間'), ('monthly', '月間')], max_length=20)),
+                ('period_start', models.DateField(help_text='期間の開始日')),
+                ('industry', models.CharField(blank=True, default='', help_text='業界（空文字は全業界）', max_length=100)),
+                ('user_count', models.PositiveIntegerField(default=0, help_text='集計したユーザー数')),
+                ('built_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': '期間別ランキング集計済み期間',
+                'verbose_name_plural': '期間別ランキング集計済み期間',
+                'unique_together': {('mode', 'period', 'period_start', 'industry')},
+            },
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-19 04:07
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('spin', '0040_ranking_rollup_window'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='chatmessage',
+            options={'ordering': ['session', 'sequence'], 'verbose_name': 'チャットメッセージ', 'verbose_name_plural': 'チャットメッセージ'},
+        ),
+        migrations.AlterModelOptions(
+            name='report',
+            options={'ordering': ['-created_at'], 'verbose_name': 'レポート', 'verbose_name_plural': 'レポート'},
+        ),
+        migrations.AlterModelOptions(
+            name='session',
+            options={'ordering': ['-created_at'], 'verbose_name': 'セッション', 'verbose_name_plural': 'セッション'},
+        ),
+    ]
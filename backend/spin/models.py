@@ -365,6 +365,12 @@ class Company(models.Model):
         ('sitemap', 'sitemap.xml'),
     ]
     
+    # プロンプト用ブリーフの生成に使う項目
+    BRIEF_SOURCE_FIELDS = frozenset({
+        'company_name', 'industry', 'business_description', 'location', 'employee_count',
+        'established_year', 'scraped_data',
+    })
+    
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='companies')
     source_url = models.URLField(max_length=500, help_text="スクレイピング元URL（単一URL or sitemap.xml URL）")
@@ -376,7 +382,9 @@ class Company(models.Model):
     employee_count = models.CharField(max_length=100, null=True, blank=True)
     established_year = models.IntegerField(null=True, blank=True)
     scraped_urls = models.JSONField(null=True, blank=True, help_text="スクレイピングしたURL一覧（sitemap.xmlの場合）")
-    scraped_data = models.JSONField(null=True, blank=True, help_text="生データ保存（複数URLのデータを統合）")
+    scraped_data = models.JSONField(null=True, blank=True, help_text="スクレイピング結果の概要（生HTML・本文テキストはCompanyScrapeArtifactに圧縮して保存）")
+    company_brief = models.TextField(null=True, blank=True, help_text="プロンプト用の企業情報ブリーフ（保存時に自動生成）")
+    company_brief_tokens = models.PositiveIntegerField(default=0, help_text="企業情報ブリーフのトークン数")
     scraped_at = models.DateTimeField(auto_now_add=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -388,6 +396,71 @@ class Company(models.Model):
     
     def __str__(self):
         return f"{self.company_name} ({self.industry or '業界未設定'})"
+    
+    def save(self, *args, **kwargs):
+        # ブリーフの元になる項目を保存する場合のみ、プロンプト用ブリーフを再生成
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None:
+            # 遅延読み込みの項目は保存されない（読み込み済みの項目のみ保存される）
+            saved_fields = self.BRIEF_SOURCE_FIELDS - self.get_deferred_fields()
+        else:
+            saved_fields = self.BRIEF_SOURCE_FIELDS.intersection(update_fields)
+        if saved_fields:
+            from .services.company_brief import generate_company_brief
+            self.company_brief, self.company_brief_tokens = generate_company_brief(self)
+            if update_fields is not None:
+                kwargs['update_fields'] = set(update_fields) | {'company_brief', 'company_brief_tokens'}
+        super().save(*args, **kwargs)
+
+
+class CompanyScrapeArtifact(models.Model):
+    """
+    企業スクレイピングの生データ（生HTML・ページ本文）
+
+    Company行を軽く保つため別テーブルに圧縮して保存し、明示的に参照した場合のみ読み込む
+    """
+    CODEC_CHOICES = [
+        ('zstd', 'Zstandard'),
+        ('zlib', 'zlib'),
+    ]
+
+    company = models.OneToOneField(Company, on_delete=models.CASCADE, primary_key=True, related_name='scrape_artifact')
+    codec = models.CharField(max_length=10, choices=CODEC_CHOICES, help_text="圧縮形式")
+    payload = models.BinaryField(help_text="スクレイピング結果（JSON）を圧縮したデータ")
+    raw_size = models.PositiveIntegerField(default=0, help_text="圧縮前のサイズ（バイト）")
+    compressed_size = models.PositiveIntegerField(default=0, help_text="圧縮後のサイズ（バイト）")
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = '企業スクレイピングデータ'
+        verbose_name_plural = '企業スクレイピングデータ'
+
+    def __str__(self):
+        return f"ScrapeArtifact {self.company_id} ({self.codec}: {self.compressed_size}/{self.raw_size} bytes)"
+
+
+class CompanyRetrievalIndex(models.Model):
+    """
+    企業ページのBM25検索インデックス
+
+    チャンク本文と単語頻度を含み大きくなるため、Company行とは別テーブルに圧縮して保存する
+    """
+    company = models.OneToOneField(Company, on_delete=models.CASCADE, primary_key=True, related_name='retrieval_index')
+    version = models.PositiveSmallIntegerField(help_text="インデックス形式のバージョン")
+    codec = models.CharField(max_length=10, choices=CompanyScrapeArtifact.CODEC_CHOICES, help_text="圧縮形式")
+    payload = models.BinaryField(help_text="インデックス（JSON）を圧縮したデータ")
+    chunk_count = models.PositiveIntegerField(default=0, help_text="チャンク数")
+    compressed_size = models.PositiveIntegerField(default=0, help_text="圧縮後のサイズ（バイト）")
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = '企業ページ検索インデックス'
+        verbose_name_plural = '企業ページ検索インデックス'
+
+    def __str__(self):
+        return f"RetrievalIndex {self.company_id} (v{self.version}: {self.chunk_count} chunks, {self.compressed_size} bytes)"
 
 
 class CompanyAnalysis(models.Model):
@@ -453,6 +526,8 @@ class Session(models.Model):
     company_analysis = models.ForeignKey(CompanyAnalysis, on_delete=models.SET_NULL, null=True, blank=True, related_name='sessions', help_text="分析結果との関連付け")
     success_probability = models.IntegerField(default=50, help_text="現在の商談成功率 (0-100%)")
     last_analysis_reason = models.TextField(null=True, blank=True, help_text="直近の成功率変動理由")
+    scorecard = models.JSONField(null=True, blank=True, help_text="ターンごとの分析結果を集計したスコアカード（終了時のスコアリングに使用）")
+    realtime_latency = models.JSONField(null=True, blank=True, help_text="リアルタイムモードのターンごとの応答遅延と統計（発話終了→最初の音声など）")
     current_spin_stage = models.CharField(
         max_length=1,
         choices=SPIN_STAGE_CHOICES,
@@ -479,6 +554,12 @@ class Session(models.Model):
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['user', '-created_at', '-id'], name='session_user_created_idx'),
+            models.Index(fields=['mode', 'status'], name='session_mode_status_idx'),
+            models.Index(fields=['status', '-created_at'], name='session_status_created_idx'),
+            models.Index(fields=['status', 'finished_at'], name='session_status_finished_idx'),
+        ]
         verbose_name = 'セッション'
         verbose_name_plural = 'セッション'
     
@@ -551,6 +632,30 @@ class ChatMessage(models.Model):
         return f"{self.role}: {self.message[:50]}..."
 
 
+class ChatMessageArchive(models.Model):
+    """
+    アーカイブした会話履歴
+
+    終了から一定期間が経過したセッションの会話履歴を圧縮して1行にまとめ、ChatMessageテーブルからは削除する
+    （archive_chat_messagesコマンドで作成。セッション詳細APIではChatMessageと同じ形式で返す）
+    """
+    session = models.OneToOneField(Session, on_delete=models.CASCADE, primary_key=True, related_name='message_archive')
+    codec = models.CharField(max_length=10, choices=CompanyScrapeArtifact.CODEC_CHOICES, help_text="圧縮形式")
+    payload = models.BinaryField(help_text="会話履歴（JSON配列）を圧縮したデータ")
+    message_count = models.PositiveIntegerField(default=0)
+    last_sequence = models.PositiveIntegerField(default=0)
+    raw_size = models.PositiveIntegerField(default=0, help_text="圧縮前のサイズ（バイト）")
+    compressed_size = models.PositiveIntegerField(default=0, help_text="圧縮後のサイズ（バイト）")
+    archived_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'アーカイブ済み会話履歴'
+        verbose_name_plural = 'アーカイブ済み会話履歴'
+
+    def __str__(self):
+        return f"MessageArchive {self.session_id} ({self.message_count}件)"
+
+
 class Report(models.Model):
     """レポート（セッション終了後のスコアリング結果）"""
     id = models.BigAutoField(primary_key=True)
@@ -559,10 +664,16 @@ class Report(models.Model):
     feedback = models.TextField()
     next_actions = models.TextField()
     scoring_details = models.JSONField(null=True, blank=True)
+    transcript_hash = models.CharField(max_length=64, blank=True, default='', help_text="スコアリング時の会話履歴のハッシュ値")
+    prompt_version = models.CharField(max_length=20, blank=True, default='', help_text="スコアリング時のプロンプトバージョン")
+    rescored_at = models.DateTimeField(null=True, blank=True, help_text="再スコアリング日時")
     created_at = models.DateTimeField(auto_now_add=True)
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['-created_at'], name='report_created_idx'),
+        ]
         verbose_name = 'レポート'
         verbose_name_plural = 'レポート'
     
@@ -570,6 +681,124 @@ class Report(models.Model):
         return f"Report for Session {self.session.id}"
 
 
+class ScoringJob(models.Model):
+    """スコアリングジョブ（セッション終了時のバックグラウンドスコアリング）"""
+    STATUS_CHOICES = [
+        ('pending', '待機中'),
+        ('running', '実行中'),
+        ('completed', '完了'),
+        ('failed', '失敗'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    session = models.OneToOneField(Session, on_delete=models.CASCADE, related_name='scoring_job')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    partial_feedback = models.TextField(blank=True, default='', help_text="生成途中のフィードバック文")
+    report = models.OneToOneField(Report, on_delete=models.SET_NULL, null=True, blank=True, related_name='scoring_job')
+    error = models.TextField(blank=True, null=True, help_text="失敗時のエラーメッセージ")
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        verbose_name = 'スコアリングジョブ'
+        verbose_name_plural = 'スコアリングジョブ'
+
+    def __str__(self):
+        return f"ScoringJob {self.id} ({self.status})"
+
+
+class RankingEntry(models.Model):
+    """ランキングエントリ（終了済みセッションのランキング表示用の非正規化データ）"""
+    session = models.OneToOneField(Session, on_delete=models.CASCADE, primary_key=True, related_name='ranking_entry')
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='ranking_entries')
+    mode = models.CharField(max_length=20, choices=Session.MODE_CHOICES)
+    username = models.CharField(max_length=150)
+    company_name = models.CharField(max_length=255, blank=True, default='')
+    industry = models.CharField(max_length=100, blank=True, default='')
+    total_score = models.FloatField(default=0, help_text="総合スコア")
+    success_probability = models.FloatField(default=0, help_text="終了時の商談成功率")
+    composite_score = models.FloatField(default=0, help_text="総合評価スコア（スコア70% + 成功率30%）")
+    situation_score = models.FloatField(default=0)
+    problem_score = models.FloatField(default=0)
+    implication_score = models.FloatField(default=0)
+    need_score = models.FloatField(default=0)
+    message_count = models.PositiveIntegerField(default=0)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['mode', '-total_score', '-session'], name='ranking_mode_total_key_idx'),
+            models.Index(fields=['mode', '-composite_score', '-session'], name='ranking_mode_comp_key_idx'),
+            models.Index(fields=['mode', 'industry', '-total_score', '-session'], name='ranking_ind_total_key_idx'),
+            models.Index(fields=['mode', 'industry', '-composite_score', '-session'], name='ranking_ind_comp_key_idx'),
+            models.Index(fields=['mode', 'finished_at'], name='ranking_mode_finished_idx'),
+            models.Index(fields=['mode', 'industry', 'finished_at'], name='ranking_industry_finished_idx'),
+            models.Index(fields=['mode', 'updated_at'], name='ranking_mode_updated_idx'),
+            models.Index(fields=['user', 'mode', '-total_score'], name='ranking_user_total_idx'),
+            models.Index(fields=['user', 'mode', '-composite_score'], name='ranking_user_composite_idx'),
+        ]
+        verbose_name = 'ランキングエントリ'
+        verbose_name_plural = 'ランキングエントリ'
+
+    def __str__(self):
+        return f"RankingEntry {self.session_id} ({self.mode}: {self.total_score})"
+
+
+class RankingRollup(models.Model):
+    """期間別ランキングの集計結果（終了した期間のみ保存し、進行中の期間は都度集計する）"""
+    PERIOD_CHOICES = [
+        ('daily', '日間'),
+        ('weekly', '週間'),
+        ('monthly', '月間'),
+    ]
+
+    id = models.BigAutoField(primary_key=True)
+    mode = models.CharField(max_length=20, choices=Session.MODE_CHOICES)
+    period = models.CharField(max_length=20, choices=PERIOD_CHOICES)
+    period_start = models.DateField(help_text="期間の開始日")
+    industry = models.CharField(max_length=100, blank=True, default='', help_text="業界（空文字は全業界）")
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='ranking_rollups')
+    username = models.CharField(max_length=150)
+    rank = models.PositiveIntegerField()
+    best_score = models.FloatField(help_text="期間内の最高スコア")
+    average_score = models.FloatField(help_text="期間内の平均スコア")
+    session_count = models.PositiveIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = [['mode', 'period', 'period_start', 'industry', 'user']]
+        indexes = [
+            models.Index(fields=['mode', 'period', 'period_start', 'industry', 'rank'], name='rollup_window_rank_idx'),
+        ]
+        verbose_name = '期間別ランキング集計'
+        verbose_name_plural = '期間別ランキング集計'
+
+    def __str__(self):
+        return f"RankingRollup {self.mode}/{self.period}/{self.period_start} #{self.rank} {self.username}"
+
+
+class RankingRollupWindow(models.Model):
+    """集計済みの期間（参加者がいない期間も記録し、同じ期間を繰り返し集計しないようにする）"""
+    mode = models.CharField(max_length=20, choices=Session.MODE_CHOICES)
+    period = models.CharField(max_length=20, choices=RankingRollup.PERIOD_CHOICES)
+    period_start = models.DateField(help_text="期間の開始日")
+    industry = models.CharField(max_length=100, blank=True, default='', help_text="業界（空文字は全業界）")
+    user_count = models.PositiveIntegerField(default=0, help_text="集計したユーザー数")
+    built_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = [['mode', 'period', 'period_start', 'industry']]
+        verbose_name = '期間別ランキング集計済み期間'
+        verbose_name_plural = '期間別ランキング集計済み期間'
+
+    def __str__(self):
+        return f"RankingRollupWindow {self.mode}/{self.period}/{self.period_start} {self.industry or '全業界'} ({self.user_count})"
+
+
 class UserProfile(models.Model):
     """ユーザープロファイル（メール認証情報など）"""
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='profile')
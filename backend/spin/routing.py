@@ -6,6 +6,7 @@ from . import consumers
 
 websocket_urlpatterns = [
     path('ws/realtime/', consumers.RealtimeConsumer.as_asgi()),
+    path('ws/speech/', consumers.SpeechRecognitionConsumer.as_asgi()),
 ]
 
 
@@ -56,6 +56,16 @@ class CompanySerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'scraped_at', 'created_at', 'updated_at']
 
 
+class CompanySummarySerializer(serializers.ModelSerializer):
+    """企業情報の概要（スクレイピングの生データは含めない）"""
+    class Meta:
+        model = Company
+        fields = ['id', 'source_url', 'scrape_source', 'company_name', 'industry',
+                  'business_description', 'location', 'employee_count', 'established_year',
+                  'scraped_at', 'created_at', 'updated_at']
+        read_only_fields = fields
+
+
 class SessionSerializer(serializers.ModelSerializer):
     company_id = serializers.UUIDField(write_only=True, required=False, allow_null=True, help_text="企業情報のID（詳細診断モード用）")
     company = CompanySerializer(read_only=True)
@@ -144,6 +154,74 @@ class SessionSerializer(serializers.ModelSerializer):
         return super().create(validated_data)
 
 
+class SessionDetailSerializer(serializers.ModelSerializer):
+    """
+    セッション詳細取得用のシリアライザー（読み取り専用）
+
+    企業情報・レポート・会話履歴はビュー側でexpand指定時のみ付与する。
+    fields引数で返す項目を絞り込める
+    """
+    company_name = serializers.SerializerMethodField()
+    report_id = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Session
+        fields = ['id', 'user', 'mode', 'realtime_mode', 'industry', 'value_proposition', 'customer_persona',
+                  'customer_pain', 'status', 'started_at', 'finished_at', 'created_at', 'updated_at',
+                  'company_id', 'company_name', 'company_analysis', 'success_probability', 'last_analysis_reason',
+                  'current_spin_stage', 'conversation_phase', 'report_id']
+        read_only_fields = fields
+
+    def __init__(self, *args, fields=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields:
+            for field_name in set(self.fields) - set(fields):
+                self.fields.pop(field_name)
+
+    def get_company_name(self, obj):
+        return obj.company.company_name if obj.company_id else None
+
+    def get_report_id(self, obj):
+        try:
+            return obj.report.id
+        except Report.DoesNotExist:
+            return None
+
+
+class SessionSummarySerializer(serializers.ModelSerializer):
+    """セッション一覧用の軽量なシリアライザー（企業のスクレイピング結果や会話履歴は含めない）"""
+    company_name = serializers.SerializerMethodField()
+    report = serializers.SerializerMethodField()
+
+    # 一覧で読み込むカラム（Session.objects.only() に渡す）
+    QUERY_FIELDS = [
+        'id', 'mode', 'realtime_mode', 'industry', 'value_proposition', 'status',
+        'started_at', 'finished_at', 'created_at', 'success_probability', 'company_id',
+        'company__company_name', 'report__id', 'report__spin_scores',
+    ]
+
+    class Meta:
+        model = Session
+        fields = ['id', 'mode', 'realtime_mode', 'industry', 'value_proposition', 'status',
+                  'started_at', 'finished_at', 'created_at', 'success_probability',
+                  'company_id', 'company_name', 'report']
+        read_only_fields = fields
+
+    def get_company_name(self, obj):
+        return obj.company.company_name if obj.company_id else None
+
+    def get_report(self, obj):
+        """レポートのIDと総合スコアのみ（未スコアリングの場合はNone）"""
+        try:
+            report = obj.report
+        except Report.DoesNotExist:
+            return None
+        return {
+            'id': report.id,
+            'spin_scores': {'total': (report.spin_scores or {}).get('total', 0)},
+        }
+
+
 class ReportSerializer(serializers.ModelSerializer):
     session_id = serializers.UUIDField(source='session.id', read_only=True)
     
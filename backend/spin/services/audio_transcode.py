@@ -0,0 +1,182 @@
+"""
+音声認識用の音声変換（ffmpeg）
+アップロードされた音声をffmpegの標準入力に流し込み、標準出力から16kHz・モノラル・16bit PCMを受け取る。
+一時ファイルは使わない。同時に起動するffmpegの数は AUDIO_TRANSCODE_MAX_PROCESSES で制限する
+（リクエストが集中した場合は空きを待つ）
+"""
+import io
+import logging
+import subprocess
+import threading
+import wave
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Iterable, Optional, Tuple, Union
+
+import numpy as np
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+TARGET_SAMPLE_RATE = 16000
+# この音量（dBFS）より小さい音声は正規化する
+NORMALIZE_BELOW_DBFS = -20.0
+# 正規化後の最大音量（dBFS）
+NORMALIZE_HEADROOM_DBFS = -0.1
+
+# ffmpegの実行を待つスレッド（1スレッドにつき1プロセス）
+_executor = ThreadPoolExecutor(
+    max_workers=getattr(settings, 'AUDIO_TRANSCODE_MAX_PROCESSES', 2),
+    thread_name_prefix='audio-transcode',
+)
+
+
+def _ffmpeg_command(sample_rate: int, max_seconds: Optional[float] = None):
+    command = [
+        getattr(settings, 'FFMPEG_BINARY', 'ffmpeg'),
+        '-hide_banner', '-loglevel', 'error', '-nostdin',
+        '-i', 'pipe:0',
+        '-vn', '-ac', '1', '-ar', str(sample_rate),
+    ]
+    if max_seconds:
+        # 指定した長さまで出力したらffmpegを終了させる（残りの入力はデコードしない）
+        command += ['-t', str(max_seconds)]
+    return command + ['-f', 's16le', '-acodec', 'pcm_s16le', 'pipe:1']
+
+
+def _run_ffmpeg(chunks: Iterable[bytes], sample_rate: int, timeout: float, max_seconds: Optional[float] = None) -> bytes:
+    """ffmpegに音声を流し込み、PCM16を受け取る（スレッドプール上で実行）"""
+    try:
+        process = subprocess.Popen(
+            _ffmpeg_command(sample_rate, max_seconds),
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+        )
+    except FileNotFoundError:
+        raise Exception('ffmpegが見つかりません。ffmpegをインストールしてください。')
+
+    output = {}
+
+    def read(name, stream):
+        output[name] = stream.read()
+
+    readers = [
+        threading.Thread(target=read, args=('stdout', process.stdout), daemon=True),
+        threading.Thread(target=read, args=('stderr', process.stderr), daemon=True),
+    ]
+    for reader in readers:
+        reader.start()
+    killer = threading.Timer(timeout, process.kill)
+    killer.start()
+    try:
+        try:
+            for chunk in chunks:
+                process.stdin.write(chunk)
+        except BrokenPipeError:
+            # 入力を読み終える前にffmpegが終了した（エラー内容は標準エラー出力で確認）
+            pass
+        finally:
+            try:
+                process.stdin.close()
+            except BrokenPipeError:
+                pass
+        for reader in readers:
+            reader.join()
+        returncode = process.wait()
+    finally:
+        killer.cancel()
+
+    if returncode != 0:
+        if returncode < 0:
+            raise Exception(f'ffmpegが{timeout}秒以内に終了しませんでした')
+        stderr = output.get('stderr', b'').decode('utf-8', errors='replace').strip()
+        raise Exception(f'ffmpegでの変換に失敗しました（終了コード {returncode}）: {stderr[-500:]}')
+    return output.get('stdout', b'')
+
+
+def normalize_pcm16(pcm: bytes) -> bytes:
+    """音量が小さい場合は最大音量が NORMALIZE_HEADROOM_DBFS になるよう増幅"""
+    samples = np.frombuffer(pcm, dtype='<i2')
+    if samples.size == 0:
+        return pcm
+    peak = int(np.abs(samples.astype(np.int32)).max())
+    if peak == 0:
+        logger.warning('音声が無音です。マイクの音量設定を確認してください。')
+        return pcm
+
+    max_dbfs = 20 * np.log10(peak / 32768)
+    logger.info(f'音声の最大音量: {max_dbfs:.1f}dBFS')
+    if max_dbfs < -60:
+        logger.warning(f'音声の音量が非常に小さいです: {max_dbfs:.1f}dBFS。マイクの音量設定を確認してください。')
+    if max_dbfs >= NORMALIZE_BELOW_DBFS:
+        return pcm
+
+    gain = 10 ** ((NORMALIZE_HEADROOM_DBFS - max_dbfs) / 20)
+    normalized = np.clip(samples.astype(np.float32) * gain, -32768, 32767).astype('<i2')
+    logger.info(f'音量が小さいため正規化しました: {max_dbfs:.1f}dBFS -> {NORMALIZE_HEADROOM_DBFS:.1f}dBFS')
+    return normalized.tobytes()
+
+
+def pcm16_to_wav(pcm: bytes, sample_rate: int) -> bytes:
+    buffer = io.BytesIO()
+    with wave.open(buffer, 'wb') as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        wav.writeframes(pcm)
+    return buffer.getvalue()
+
+
+def transcode_to_pcm16(audio: Union[bytes, Iterable[bytes]], sample_rate: int = TARGET_SAMPLE_RATE,
+                       timeout: Optional[float] = None, max_seconds: Optional[float] = None) -> bytes:
+    """
+    音声をモノラル・16bit PCM（ヘッダーなし、リトルエンディアン）に変換
+
+    Args:
+        audio: 変換元の音声（バイト列、またはUploadedFile.chunks()などのバイト列のイテレータ）
+        sample_rate: 変換後のサンプリングレート
+        timeout: 1回の変換のタイムアウト（秒、省略時は AUDIO_TRANSCODE_TIMEOUT）
+        max_seconds: 変換する長さの上限（秒、これより後の音声は変換しない。省略時は全体）
+
+    Raises:
+        Exception: 変換に失敗した場合・タイムアウトした場合
+    """
+    chunks = [audio] if isinstance(audio, (bytes, bytearray, memoryview)) else audio
+    timeout = timeout or getattr(settings, 'AUDIO_TRANSCODE_TIMEOUT', 30)
+
+    # 空きを待つ時間もタイムアウトに含める
+    future = _executor.submit(_run_ffmpeg, chunks, sample_rate, timeout, max_seconds)
+    try:
+        pcm = future.result(timeout=timeout + getattr(settings, 'AUDIO_TRANSCODE_QUEUE_TIMEOUT', 10))
+    except FutureTimeoutError:
+        future.cancel()
+        raise Exception('音声変換の待ち時間が上限を超えました。しばらくしてから再度お試しください。')
+
+    if not pcm:
+        raise Exception('変換後の音声が空です')
+    return pcm
+
+
+def transcode_to_wav(audio: Union[bytes, Iterable[bytes]], sample_rate: int = TARGET_SAMPLE_RATE) -> Tuple[bytes, int]:
+    """
+    音声をWAV形式（モノラル・16bit PCM）に変換（音量が小さい場合は正規化する）
+
+    Args:
+        audio: 変換元の音声（バイト列、またはUploadedFile.chunks()などのバイト列のイテレータ）
+        sample_rate: 変換後のサンプリングレート
+
+    Returns:
+        tuple[bytes, int]: (WAV形式の音声データ, サンプリングレート)
+
+    Raises:
+        Exception: 変換に失敗した場合・タイムアウトした場合
+    """
+    pcm = transcode_to_pcm16(audio, sample_rate)
+
+    duration_sec = len(pcm) / 2 / sample_rate
+    if duration_sec < 0.5:
+        logger.warning(f'音声が短すぎます: {duration_sec:.2f}秒。最低0.5秒以上推奨')
+    elif duration_sec < 1.0:
+        logger.info(f'音声の長さ: {duration_sec:.2f}秒（推奨: 1秒以上）')
+
+    return pcm16_to_wav(normalize_pcm16(pcm), sample_rate), sample_rate
@@ -6,8 +6,9 @@ import logging
 import os
 import json
 from openai import OpenAI
-from typing import Dict, Any, Tuple
+from typing import Dict, Any, Optional, Tuple
 from spin.services.api_key_manager import APIKeyManager
+from spin.services.company_retrieval import build_retrieval_index, search_index
 
 logger = logging.getLogger(__name__)
 
@@ -29,21 +30,23 @@ def get_client_and_model() -> Tuple[OpenAI, str]:
     return client, model_name
 
 
-def analyze_spin_suitability(company_info: Dict[str, Any], value_proposition: str) -> Dict[str, Any]:
+def analyze_spin_suitability(company_info: Dict[str, Any], value_proposition: str,
+                             retrieval_index: Optional[Dict] = None) -> Dict[str, Any]:
     """
     企業情報と価値提案を元に、SPIN法に基づく提案適合性を分析
     
     Args:
         company_info: 企業情報の辞書
         value_proposition: 価値提案
+        retrieval_index: 保存済みの企業ページ検索インデックス（省略時はcompany_infoから構築）
     
     Returns:
         SPIN適合性分析結果の辞書
     """
     logger.info(f"SPIN適合性分析を開始: 企業={company_info.get('company_name', 'Unknown')}")
     
-    # 企業情報をテキストに変換
-    company_text = format_company_info(company_info)
+    # 企業情報をテキストに変換（価値提案に関連する企業ページを優先して含める）
+    company_text = format_company_info(company_info, query=value_proposition, retrieval_index=retrieval_index)
     
     prompt = f"""
 あなたは営業提案の専門家です。以下の企業情報と価値提案を元に、SPIN法に基づく営業提案の適合性を分析してください。
@@ -136,12 +139,15 @@ def analyze_spin_suitability(company_info: Dict[str, Any], value_proposition: st
         raise ValueError(f"SPIN適合性分析に失敗しました: {e}")
 
 
-def format_company_info(company_info: Dict[str, Any]) -> str:
+def format_company_info(company_info: Dict[str, Any], query: str = "",
+                        retrieval_index: Optional[Dict] = None) -> str:
     """
     企業情報をテキスト形式にフォーマット
     
     Args:
         company_info: 企業情報の辞書
+        query: 関連する企業ページを検索するクエリ（省略時は先頭ページの抜粋）
+        retrieval_index: 保存済みの企業ページ検索インデックス（省略時はcompany_infoから構築）
     
     Returns:
         フォーマットされたテキスト
@@ -161,6 +167,16 @@ def format_company_info(company_info: Dict[str, Any]) -> str:
     if company_info.get('established_year'):
         lines.append(f"設立年: {company_info['established_year']}")
     
+    # クエリがある場合、スクレイピングした全ページから関連するチャンクを含める
+    if query:
+        if retrieval_index is None:
+            retrieval_index = build_retrieval_index(company_info)
+        chunks = search_index(retrieval_index, query)
+        if chunks:
+            lines.append(f"\n【スクレイピングしたコンテンツ（関連箇所）】")
+            lines.append("\n...\n".join(chunk['text'] for chunk in chunks))
+            return "\n".join(lines)
+    
     # raw_html_listがある場合、最初のものを含める
     if company_info.get('raw_html_list'):
         lines.append(f"\n【スクレイピングしたコンテンツ（一部）】")
@@ -0,0 +1,140 @@
+"""
+企業スクレイピングデータ保存サービス
+生HTML・ページ本文などの大きなスクレイピング結果はCompanyScrapeArtifactに圧縮して保存し、
+Company.scraped_data には件数などの小さな概要のみを残す
+（Companyを参照するたびに数百KBのJSONを読み込まないようにする）
+"""
+import json
+import logging
+from typing import Dict, Optional
+
+from django.db import transaction
+
+from spin.services.compression import compress_payload, decompress_payload
+
+logger = logging.getLogger(__name__)
+
+# Company.scraped_data に残さず、圧縮テーブルに移すキー
+ARTIFACT_KEYS = ('raw_html', 'raw_html_list', 'page_texts', 'text_content')
+
+# 概要に残す文字列の最大長（これより長い値は圧縮テーブルのみに保存）
+SUMMARY_MAX_STRING_CHARS = 500
+
+
+def summarize_scraped_data(data: Optional[Dict]) -> Optional[Dict]:
+    """
+    Company.scraped_data に保存する概要を作成
+
+    生HTML・本文テキストを除き、件数と短いメタデータ（URL、取得件数など）のみを残す
+    """
+    if not data:
+        return data
+
+    summary = {}
+    for key, value in data.items():
+        if key in ARTIFACT_KEYS:
+            continue
+        if isinstance(value, str) and len(value) > SUMMARY_MAX_STRING_CHARS:
+            continue
+        if isinstance(value, (list, dict)) and len(json.dumps(value, ensure_ascii=False)) > SUMMARY_MAX_STRING_CHARS:
+            continue
+        summary[key] = value
+
+    page_texts = data.get('page_texts') or []
+    raw_html_list = data.get('raw_html_list') or ([data['raw_html']] if data.get('raw_html') else [])
+    summary['page_count'] = len(page_texts) or len(raw_html_list)
+    summary['text_chars'] = (
+        sum(len(page.get('text') or '') for page in page_texts) or len(data.get('text_content') or '')
+    )
+    summary['has_artifact'] = True
+    return summary
+
+
+def _cache(company, data: Optional[Dict]):
+    company._scraped_payload_cache = data
+
+
+def store_scraped_data(company, data: Optional[Dict]):
+    """
+    スクレイピング結果を圧縮テーブルに保存（既存のデータは置き換える）
+
+    Args:
+        company: 保存済みのCompanyインスタンス
+        data: スクレイピング結果の辞書
+    """
+    from spin.models import CompanyScrapeArtifact
+
+    if not data:
+        CompanyScrapeArtifact.objects.filter(company_id=company.pk).delete()
+        _cache(company, data)
+        return
+
+    codec, payload, raw_size = compress_payload(data)
+    CompanyScrapeArtifact.objects.update_or_create(
+        company_id=company.pk,
+        defaults={
+            'codec': codec,
+            'payload': payload,
+            'raw_size': raw_size,
+            'compressed_size': len(payload),
+        },
+    )
+    _cache(company, data)
+    logger.info(f"スクレイピングデータを保存: Company {company.pk}, {raw_size} → {len(payload)} bytes ({codec})")
+
+
+def create_company_from_scrape(**fields):
+    """
+    スクレイピング結果からCompanyを作成
+
+    fields['scraped_data'] にスクレイピング結果全体を渡すと、
+    Companyには概要のみを保存し、全体と企業ページの検索インデックスは圧縮テーブルに保存する
+    """
+    from spin.models import Company
+    from spin.services.company_retrieval import build_retrieval_index, store_retrieval_index
+
+    data = fields.pop('scraped_data', None)
+    company = Company(scraped_data=summarize_scraped_data(data), **fields)
+    # 保存時の企業ブリーフ生成で本文テキストを参照できるようにする
+    _cache(company, data)
+    index = build_retrieval_index(data)
+    with transaction.atomic():
+        company.save()
+        store_scraped_data(company, data)
+        store_retrieval_index(company, index)
+    return company
+
+
+def get_scraped_data(company) -> Optional[Dict]:
+    """
+    企業のスクレイピング結果全体を取得（圧縮テーブルから読み込み、インスタンスにキャッシュする）
+
+    圧縮テーブルに移行していないデータは Company.scraped_data をそのまま返す
+    """
+    if hasattr(company, '_scraped_payload_cache'):
+        return company._scraped_payload_cache
+
+    data = load_scraped_data(company.pk) if company.pk else None
+    if data is None:
+        data = company.scraped_data
+    _cache(company, data)
+    return data
+
+
+def load_scraped_data(company_id) -> Optional[Dict]:
+    """
+    企業IDからスクレイピング結果全体を取得（Company行は読み込まない）
+
+    Returns:
+        スクレイピング結果。圧縮テーブルにない場合はNone
+    """
+    from spin.models import CompanyScrapeArtifact
+
+    row = (
+        CompanyScrapeArtifact.objects.filter(company_id=company_id)
+        .values_list('codec', 'payload')
+        .first()
+    )
+    if row is None:
+        return None
+    return decompress_payload(*row)
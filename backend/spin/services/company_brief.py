@@ -0,0 +1,164 @@
+"""
+企業ブリーフ生成サービス
+プロンプトに埋め込む企業情報ブロックをスクレイピング/分析時に一度だけ生成し、
+Company.company_brief に保存する（毎ターンの再構築とscraped_dataの読み込みを回避）
+"""
+import logging
+from typing import Optional, Tuple
+
+from bs4 import BeautifulSoup
+
+from spin.services.company_artifacts import get_scraped_data
+
+logger = logging.getLogger(__name__)
+
+# Webサイト情報としてブリーフに含める最大文字数
+BRIEF_WEB_TEXT_MAX_CHARS = 2000
+
+# ブリーフ内のWebサイト情報セクションの見出し
+WEB_SECTION_HEADER = "\n--- 企業のWebサイト情報 ---"
+RELEVANT_WEB_SECTION_HEADER = "\n--- 企業のWebサイト情報（発言に関連する箇所） ---"
+
+
+def _extract_web_text(scraped_data) -> str:
+    """scraped_dataからWebサイトのテキストを取り出す"""
+    if not scraped_data:
+        return ""
+
+    text_content = scraped_data.get('text_content')
+    if text_content:
+        return text_content[:BRIEF_WEB_TEXT_MAX_CHARS]
+
+    page_texts = scraped_data.get('page_texts')
+    if page_texts:
+        return "\n".join(page.get('text') or '' for page in page_texts)[:BRIEF_WEB_TEXT_MAX_CHARS]
+
+    # text_contentがない場合はraw_html / raw_html_listからテキストを抽出
+    raw_html_list = scraped_data.get('raw_html_list') or []
+    if not raw_html_list and scraped_data.get('raw_html'):
+        raw_html_list = [scraped_data['raw_html']]
+
+    texts = []
+    total_chars = 0
+    for raw_html in raw_html_list:
+        text = BeautifulSoup(raw_html, 'html.parser').get_text(separator=' ', strip=True)
+        if not text:
+            continue
+        texts.append(text)
+        total_chars += len(text)
+        if total_chars >= BRIEF_WEB_TEXT_MAX_CHARS:
+            break
+
+    return "\n".join(texts)[:BRIEF_WEB_TEXT_MAX_CHARS]
+
+
+def build_company_brief(company) -> str:
+    """
+    企業情報ブロック（プロンプト埋め込み用テキスト）を構築
+
+    Args:
+        company: Companyインスタンス
+
+    Returns:
+        企業ブリーフのテキスト
+    """
+    company_lines = [f"企業名: {company.company_name}"]
+    if company.industry:
+        company_lines.append(f"業界: {company.industry}")
+    if company.business_description:
+        company_lines.append(f"事業内容: {company.business_description}")
+    if company.location:
+        company_lines.append(f"所在地: {company.location}")
+    if company.employee_count:
+        company_lines.append(f"従業員数: {company.employee_count}")
+    if company.established_year:
+        company_lines.append(f"設立年: {company.established_year}")
+
+    web_text = _extract_web_text(get_scraped_data(company))
+    if web_text:
+        company_lines.append(WEB_SECTION_HEADER)
+        company_lines.append(web_text)
+
+    return "\n".join(company_lines)
+
+
+def count_brief_tokens(text: str) -> int:
+    """ブリーフのトークン数をカウント（tiktokenが使えない場合は文字数/4で概算）"""
+    try:
+        from spin.services.langchain_service import get_langchain_service
+        return get_langchain_service().count_tokens(text)
+    except Exception as e:
+        logger.debug(f"トークン数のカウントに失敗したため概算します: {e}")
+        return len(text) // 4
+
+
+def generate_company_brief(company) -> Tuple[str, int]:
+    """企業ブリーフとそのトークン数を生成"""
+    brief = build_company_brief(company)
+    return brief, count_brief_tokens(brief)
+
+
+def get_company_brief(session) -> str:
+    """
+    セッションに紐づく企業ブリーフを取得
+
+    session.company が未ロードの場合は company_brief 列のみを取得し、
+    scraped_data を含むCompany行全体は読み込まない。
+
+    Args:
+        session: Sessionインスタンス
+
+    Returns:
+        企業ブリーフ（企業情報がない場合は空文字）
+    """
+    if not session.company_id:
+        return ""
+
+    from spin.models import Company, Session
+
+    if Session.company.is_cached(session):
+        company = session.company
+        return (company.company_brief or build_company_brief(company)) if company else ""
+
+    cached: Optional[str] = getattr(session, '_company_brief_cache', None)
+    if cached is not None:
+        return cached
+
+    brief = Company.objects.filter(pk=session.company_id).values_list('company_brief', flat=True).first()
+    if brief is None:
+        # ブリーフ未生成のデータはその場で生成する（保存はしない。build_company_briefsコマンドで一括生成する）
+        company = Company.objects.filter(pk=session.company_id).first()
+        if company is None:
+            return ""
+        brief = build_company_brief(company)
+
+    session._company_brief_cache = brief
+    return brief
+
+
+def get_company_context(session, query: str = "") -> str:
+    """
+    プロンプトに埋め込む企業情報を取得
+
+    検索インデックスがあれば、ブリーフ先頭の固定抜粋の代わりに
+    queryに関連する企業ページのチャンクをWebサイト情報として含める。
+
+    Args:
+        session: Sessionインスタンス
+        query: 検索クエリ（最新の営業担当者の発言）
+
+    Returns:
+        企業情報テキスト（企業情報がない場合は空文字）
+    """
+    brief = get_company_brief(session)
+    if not brief or not query:
+        return brief
+
+    from spin.services.company_retrieval import retrieve_company_chunks
+
+    chunks = retrieve_company_chunks(session.company_id, query)
+    if not chunks:
+        return brief
+
+    profile = brief.split(WEB_SECTION_HEADER, 1)[0]
+    return "\n".join([profile, RELEVANT_WEB_SECTION_HEADER, "\n...\n".join(chunks)])
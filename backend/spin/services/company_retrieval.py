@@ -0,0 +1,307 @@
+"""
+企業ページ検索サービス
+スクレイピングした企業ページをチャンクに分割してBM25インデックスを構築し、
+営業担当者の発言に関連するチャンクだけをプロンプトに含める（外部サービス不要）
+インデックスはCompanyRetrievalIndexに圧縮して保存し、検索する場合のみ読み込む
+"""
+import logging
+import math
+import re
+import threading
+from collections import Counter, OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from bs4 import BeautifulSoup
+
+from spin.services.company_artifacts import load_scraped_data
+from spin.services.compression import compress_payload, decompress_payload
+
+logger = logging.getLogger(__name__)
+
+# インデックス形式のバージョン（形式を変更したら上げる）
+INDEX_VERSION = 1
+
+# チャンク分割設定（文字数）
+CHUNK_SIZE = 400
+CHUNK_OVERLAP = 80
+
+# 検索設定
+DEFAULT_TOP_K = 3
+DEFAULT_MAX_CHARS = 1500
+
+# BM25パラメータ
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+# プロセス内にキャッシュするインデックス数
+INDEX_CACHE_SIZE = 64
+
+_WORD_PATTERN = re.compile(r'[a-z0-9]+|[぀-ヿ㐀-鿿豈-﫿]+')
+_CJK_PATTERN = re.compile(r'[぀-ヿ㐀-鿿豈-﫿]')
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    BM25用のトークン化
+
+    英数字は単語単位、日本語（かな・漢字）は文字bigramに分割する
+    （形態素解析器なしで日本語を検索できるようにするため）
+    """
+    tokens = []
+    for word in _WORD_PATTERN.findall(text.lower()):
+        if not _CJK_PATTERN.match(word):
+            tokens.append(word)
+        elif len(word) == 1:
+            tokens.append(word)
+        else:
+            tokens.extend(word[i:i + 2] for i in range(len(word) - 1))
+    return tokens
+
+
+def chunk_text(text: str, size: int = CHUNK_SIZE, overlap: int = CHUNK_OVERLAP) -> List[str]:
+    """テキストを重なりのある固定長チャンクに分割"""
+    text = re.sub(r'\s+', ' ', text).strip()
+    if not text:
+        return []
+
+    step = max(size - overlap, 1)
+    chunks = []
+    for start in range(0, len(text), step):
+        chunk = text[start:start + size]
+        if chunk:
+            chunks.append(chunk)
+        if start + size >= len(text):
+            break
+    return chunks
+
+
+def _iter_pages(scraped_data) -> List[Tuple[Optional[str], str]]:
+    """scraped_dataから (URL, 本文テキスト) の一覧を取り出す"""
+    if not scraped_data:
+        return []
+
+    if scraped_data.get('page_texts'):
+        return [(page.get('url'), page.get('text') or '') for page in scraped_data['page_texts']]
+
+    if scraped_data.get('text_content'):
+        return [(scraped_data.get('url'), scraped_data['text_content'])]
+
+    # 旧形式のデータはraw_htmlからテキストを抽出
+    raw_html_list = scraped_data.get('raw_html_list') or []
+    if not raw_html_list and scraped_data.get('raw_html'):
+        raw_html_list = [scraped_data['raw_html']]
+    return [
+        (None, BeautifulSoup(raw_html, 'html.parser').get_text(separator=' ', strip=True))
+        for raw_html in raw_html_list
+    ]
+
+
+def build_retrieval_index(scraped_data) -> Optional[Dict]:
+    """
+    スクレイピングデータからBM25インデックスを構築
+
+    Args:
+        scraped_data: スクレイピング結果の辞書（page_texts / text_content / raw_html_list）
+
+    Returns:
+        JSONで保存可能なインデックス（チャンクがない場合はNone）
+    """
+    chunks = []
+    seen = set()
+    for url, text in _iter_pages(scraped_data):
+        for chunk in chunk_text(text):
+            # ヘッダー・フッターなどページ間で重複するチャンクは1つにまとめる
+            if chunk in seen:
+                continue
+            seen.add(chunk)
+            chunks.append({
+                'url': url,
+                'text': chunk,
+                'tf': dict(Counter(tokenize(chunk))),
+            })
+
+    if not chunks:
+        return None
+
+    df = Counter()
+    total_length = 0
+    for chunk in chunks:
+        df.update(chunk['tf'].keys())
+        chunk['length'] = sum(chunk['tf'].values())
+        total_length += chunk['length']
+
+    logger.info(f"企業ページの検索インデックスを構築しました: {len(chunks)} チャンク")
+    return {
+        'version': INDEX_VERSION,
+        'chunks': chunks,
+        'df': dict(df),
+        'avgdl': total_length / len(chunks),
+    }
+
+
+def search_index(index: Dict, query: str, top_k: int = DEFAULT_TOP_K) -> List[Dict]:
+    """
+    BM25でクエリに関連するチャンクを検索
+
+    Args:
+        index: build_retrieval_indexで構築したインデックス
+        query: 検索クエリ（営業担当者の発言など）
+        top_k: 返すチャンク数
+
+    Returns:
+        スコアの高い順のチャンク（url, text, score）
+    """
+    if not index or not index.get('chunks'):
+        return []
+
+    query_terms = set(tokenize(query))
+    if not query_terms:
+        return []
+
+    chunks = index['chunks']
+    df = index['df']
+    avgdl = index.get('avgdl') or 1.0
+    n = len(chunks)
+
+    idf = {}
+    for term in query_terms:
+        term_df = df.get(term)
+        if term_df:
+            idf[term] = math.log(1 + (n - term_df + 0.5) / (term_df + 0.5))
+    if not idf:
+        return []
+
+    scored = []
+    for chunk in chunks:
+        tf = chunk['tf']
+        norm = BM25_K1 * (1 - BM25_B + BM25_B * chunk['length'] / avgdl)
+        score = 0.0
+        for term, term_idf in idf.items():
+            freq = tf.get(term)
+            if freq:
+                score += term_idf * freq * (BM25_K1 + 1) / (freq + norm)
+        if score > 0:
+            scored.append((score, chunk))
+
+    scored.sort(key=lambda item: item[0], reverse=True)
+    return [
+        {'url': chunk['url'], 'text': chunk['text'], 'score': score}
+        for score, chunk in scored[:top_k]
+    ]
+
+
+# プロセス内インデックスキャッシュ: company_id -> (updated_at, index)
+_index_cache: "OrderedDict[str, Tuple[object, Optional[Dict]]]" = OrderedDict()
+_index_cache_lock = threading.Lock()
+
+
+def _cache_index(company_id, updated_at, index: Optional[Dict]):
+    key = str(company_id)
+    with _index_cache_lock:
+        _index_cache[key] = (updated_at, index)
+        _index_cache.move_to_end(key)
+        while len(_index_cache) > INDEX_CACHE_SIZE:
+            _index_cache.popitem(last=False)
+
+
+def _save_index(company_id, updated_at, index: Optional[Dict]):
+    from spin.models import CompanyRetrievalIndex
+
+    if index is None:
+        CompanyRetrievalIndex.objects.filter(company_id=company_id).delete()
+    else:
+        codec, payload, raw_size = compress_payload(index)
+        CompanyRetrievalIndex.objects.update_or_create(
+            company_id=company_id,
+            defaults={
+                'version': index['version'],
+                'codec': codec,
+                'payload': payload,
+                'chunk_count': len(index['chunks']),
+                'compressed_size': len(payload),
+            },
+        )
+        logger.info(f"検索インデックスを保存: Company {company_id}, {raw_size} → {len(payload)} bytes ({codec})")
+    _cache_index(company_id, updated_at, index)
+
+
+def store_retrieval_index(company, index: Optional[Dict]):
+    """
+    検索インデックスを圧縮テーブルに保存（既存のインデックスは置き換える）
+
+    Args:
+        company: 保存済みのCompanyインスタンス
+        index: build_retrieval_indexで構築したインデックス（Noneの場合は削除）
+    """
+    _save_index(company.pk, company.updated_at, index)
+
+
+def get_retrieval_index(company_id) -> Optional[Dict]:
+    """
+    企業の検索インデックスを取得（更新がなければプロセス内キャッシュを使用）
+
+    インデックス未構築・旧形式の既存データは、スクレイピング結果からその場で構築して保存する
+    """
+    from spin.models import Company, CompanyRetrievalIndex
+
+    key = str(company_id)
+    updated_at = Company.objects.filter(pk=company_id).values_list('updated_at', flat=True).first()
+    if updated_at is None:
+        return None
+
+    with _index_cache_lock:
+        cached = _index_cache.get(key)
+        if cached and cached[0] == updated_at:
+            _index_cache.move_to_end(key)
+            return cached[1]
+
+    row = (
+        CompanyRetrievalIndex.objects.filter(company_id=company_id, version=INDEX_VERSION)
+        .values_list('codec', 'payload')
+        .first()
+    )
+    if row is not None:
+        index = decompress_payload(*row)
+        _cache_index(company_id, updated_at, index)
+        return index
+
+    scraped_data = load_scraped_data(company_id)
+    if scraped_data is None:
+        scraped_data = Company.objects.filter(pk=company_id).values_list('scraped_data', flat=True).first()
+    index = build_retrieval_index(scraped_data)
+    _save_index(company_id, updated_at, index)
+    return index
+
+
+def retrieve_company_chunks(company_id, query: str, top_k: int = DEFAULT_TOP_K,
+                            max_chars: int = DEFAULT_MAX_CHARS) -> List[str]:
+    """
+    企業ページからクエリに関連するチャンクを取得
+
+    Args:
+        company_id: 企業ID
+        query: 検索クエリ
+        top_k: 最大チャンク数
+        max_chars: 返すチャンクの合計最大文字数
+
+    Returns:
+        チャンクテキストのリスト
+    """
+    if not company_id or not query:
+        return []
+
+    try:
+        index = get_retrieval_index(company_id)
+        results = search_index(index, query, top_k=top_k)
+    except Exception as e:
+        logger.warning(f"企業ページの検索に失敗しました: company_id={company_id}, error={e}")
+        return []
+
+    texts = []
+    total_chars = 0
+    for result in results:
+        if total_chars + len(result['text']) > max_chars:
+            break
+        texts.append(result['text'])
+        total_chars += len(result['text'])
+    return texts
@@ -0,0 +1,48 @@
+"""
+圧縮ユーティリティ
+スクレイピング結果やアーカイブした会話履歴など、参照頻度の低い大きなJSONを
+圧縮してBinaryFieldに保存するために使う（zstandardがない環境ではzlibを使う）
+"""
+import json
+import zlib
+from typing import Any, Tuple
+
+try:
+    import zstandard
+except ImportError:  # zstandard未インストールの環境ではzlibで圧縮する
+    zstandard = None
+
+ZSTD_LEVEL = 10
+ZLIB_LEVEL = 6
+
+
+def compress_payload(data: Any) -> Tuple[str, bytes, int]:
+    """
+    データをJSONにして圧縮
+
+    Returns:
+        (圧縮形式, 圧縮したデータ, 圧縮前のサイズ)
+    """
+    raw = json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    if zstandard is not None:
+        return 'zstd', zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(raw), len(raw)
+    return 'zlib', zlib.compress(raw, ZLIB_LEVEL), len(raw)
+
+
+def decompress_payload(codec: str, payload) -> Any:
+    """
+    圧縮したデータを復元
+
+    Raises:
+        ValueError: 未対応の圧縮形式の場合
+    """
+    payload = bytes(payload)
+    if codec == 'zstd':
+        if zstandard is None:
+            raise ValueError("zstd形式のデータを復元するにはzstandardが必要です")
+        raw = zstandard.ZstdDecompressor().decompress(payload)
+    elif codec == 'zlib':
+        raw = zlib.decompress(payload)
+    else:
+        raise ValueError(f"未対応の圧縮形式です: {codec}")
+    return json.loads(raw.decode('utf-8'))
@@ -5,6 +5,7 @@ from typing import Dict, List
 
 from openai import OpenAI
 from spin.services.api_key_manager import APIKeyManager
+from spin.services.company_brief import get_company_context
 
 
 logger = logging.getLogger(__name__)
@@ -56,32 +57,8 @@ def analyze_sales_message(session, conversation_history, latest_message: str) ->
         [{"role": msg.role, "message": msg.message} for msg in conversation_history]
     )
 
-    # 企業情報を詳細に取得
-    company_info_text = ""
-    if session.company:
-        company = session.company
-        company_lines = []
-        company_lines.append(f"企業名: {company.company_name}")
-        if company.industry:
-            company_lines.append(f"業界: {company.industry}")
-        if company.business_description:
-            company_lines.append(f"事業内容: {company.business_description}")
-        if company.location:
-            company_lines.append(f"所在地: {company.location}")
-        if company.employee_count:
-            company_lines.append(f"従業員数: {company.employee_count}")
-        if company.established_year:
-            company_lines.append(f"設立年: {company.established_year}")
-        
-        # スクレイピングデータからテキストコンテンツを取得
-        if company.scraped_data and company.scraped_data.get('text_content'):
-            text_content = company.scraped_data.get('text_content', '')[:2000]
-            company_lines.append(f"\n--- Webサイト情報（抜粋） ---")
-            company_lines.append(text_content)
-        
-        company_info_text = "\n".join(company_lines)
-    else:
-        company_info_text = "（企業情報なし）"
+    # 企業情報（事前生成済みのブリーフ＋発言に関連する企業ページ）を取得
+    company_info_text = get_company_context(session, latest_message) or "（企業情報なし）"
 
     prompt = f"""【役割定義】
 あなたは「会話分析AI」です。
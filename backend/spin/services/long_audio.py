@@ -0,0 +1,259 @@
+"""
+長時間音声の文字起こし
+GCP Speech-to-Text の同期認識（recognize）は1回60秒までのため、長い録音は無音の位置で分割し、
+区間ごとに並列で認識してから、時刻つきでつなぎ合わせる
+
+1. ffmpegで16kHz・モノラル・16bit PCMに変換（audio_transcode）
+2. フレームごとの音量から発話・無音を判定（NumPy）し、無音の中央で区切る
+   （SPEECH_LONG_AUDIO_MAX_CHUNK_SECONDS以内に無音がない場合は、その範囲で最も音量の小さい位置で区切る）
+3. 発話を含む区間を SPEECH_LONG_AUDIO_PARALLELISM 並列で認識
+4. 認識結果ごとの終了時刻（result_end_time）から、録音全体での開始・終了時刻を求める
+"""
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+from django.conf import settings
+from google.cloud import speech
+
+from spin.services.audio_transcode import TARGET_SAMPLE_RATE, normalize_pcm16, transcode_to_pcm16
+from spin.services.speech_to_text import build_recognition_config, get_speech_client
+
+logger = logging.getLogger(__name__)
+
+# 発話判定のフレーム長（ミリ秒）
+VAD_FRAME_MS = 30
+# 無音の判定: 音量がノイズフロア（下位10%の音量）+ VAD_MARGIN_DB 以下、かつ VAD_MIN_THRESHOLD_DBFS 以下ではない
+VAD_MARGIN_DB = 12.0
+VAD_MIN_THRESHOLD_DBFS = -55.0
+# 区切りに使う無音の最小の長さ（ミリ秒）
+MIN_SILENCE_MS = 300
+
+
+class AudioTooLongError(Exception):
+    """録音が SPEECH_LONG_AUDIO_MAX_SECONDS を超えている"""
+
+
+# 認識区間の並列数（プロセス内の全リクエストで共有）
+_executor = ThreadPoolExecutor(
+    max_workers=getattr(settings, 'SPEECH_LONG_AUDIO_PARALLELISM', 4),
+    thread_name_prefix='speech-chunk',
+)
+
+
+def frame_energy_dbfs(samples: np.ndarray, frame_length: int) -> np.ndarray:
+    """フレームごとのRMS音量（dBFS）"""
+    count = len(samples) // frame_length
+    if count == 0:
+        return np.zeros(0, dtype=np.float32)
+    frames = samples[:count * frame_length].astype(np.float32).reshape(count, frame_length)
+    rms = np.sqrt(np.mean(frames * frames, axis=1)) / 32768
+    return 20 * np.log10(np.maximum(rms, 1e-10))
+
+
+def detect_speech(energy: np.ndarray) -> np.ndarray:
+    """フレームごとの発話判定（Trueが発話）"""
+    if energy.size == 0:
+        return np.zeros(0, dtype=bool)
+    threshold = max(float(np.percentile(energy, 10)) + VAD_MARGIN_DB, VAD_MIN_THRESHOLD_DBFS)
+    return energy > threshold
+
+
+def _silence_midpoints(speech_frames: np.ndarray, min_frames: int) -> np.ndarray:
+    """min_frames以上続く無音の中央のフレーム位置"""
+    silent = np.concatenate(([0], (~speech_frames).astype(np.int8), [0]))
+    edges = np.diff(silent)
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1)
+    long_runs = ends - starts >= min_frames
+    return (starts[long_runs] + ends[long_runs]) // 2
+
+
+def split_on_silence(pcm: bytes, sample_rate: int = TARGET_SAMPLE_RATE,
+                     max_chunk_seconds: Optional[float] = None,
+                     min_chunk_seconds: Optional[float] = None) -> List[Dict]:
+    """
+    PCM16を無音の位置で区間に分割
+
+    Returns:
+        [{'start': 開始サンプル, 'end': 終了サンプル, 'has_speech': 発話を含むか}, ...]
+    """
+    max_chunk_seconds = max_chunk_seconds or settings.SPEECH_LONG_AUDIO_MAX_CHUNK_SECONDS
+    min_chunk_seconds = min_chunk_seconds or settings.SPEECH_LONG_AUDIO_MIN_CHUNK_SECONDS
+    samples = np.frombuffer(pcm, dtype='<i2')
+    frame_length = sample_rate * VAD_FRAME_MS // 1000
+    energy = frame_energy_dbfs(samples, frame_length)
+    speech_frames = detect_speech(energy)
+    if energy.size == 0:
+        return [{'start': 0, 'end': len(samples), 'has_speech': len(samples) > 0}]
+
+    max_frames = int(max_chunk_seconds * 1000 // VAD_FRAME_MS)
+    min_frames = min(int(min_chunk_seconds * 1000 // VAD_FRAME_MS), max_frames - 1)
+    candidates = _silence_midpoints(speech_frames, MIN_SILENCE_MS // VAD_FRAME_MS)
+
+    boundaries = [0]
+    start = 0
+    total = len(energy)
+    while total - start > max_frames:
+        window = candidates[(candidates > start + min_frames) & (candidates <= start + max_frames)]
+        if window.size:
+            # 上限に収まる中で最も後ろの無音で区切る（区間数を少なくする）
+            cut = int(window[-1])
+        else:
+            # 無音がない場合は、音量が最も小さいフレームで区切る
+            cut = start + min_frames + int(np.argmin(energy[start + min_frames:start + max_frames]))
+        boundaries.append(cut)
+        start = cut
+    boundaries.append(total)
+
+    chunks = []
+    for index, (begin, end) in enumerate(zip(boundaries, boundaries[1:])):
+        chunks.append({
+            'start': begin * frame_length,
+            # 最後の区間は端数のサンプルも含める
+            'end': len(samples) if index == len(boundaries) - 2 else end * frame_length,
+            'has_speech': bool(speech_frames[begin:end].any()),
+        })
+    return chunks
+
+
+def recognize_chunk(pcm: bytes, sample_rate: int, language_code: str) -> List[Dict]:
+    """
+    1区間（60秒以内）を同期認識
+
+    Returns:
+        [{'text': str, 'confidence': float, 'end': 区間の先頭からの終了時刻（秒）}, ...]
+    """
+    client = get_speech_client()
+    if not client:
+        raise Exception('GCP Speech-to-Text APIクライアントが初期化できませんでした')
+    config = build_recognition_config(language_code, sample_rate, speech.RecognitionConfig.AudioEncoding.LINEAR16)
+    response = client.recognize(
+        config=config,
+        audio=speech.RecognitionAudio(content=pcm),
+        timeout=settings.SPEECH_LONG_AUDIO_CHUNK_TIMEOUT,
+    )
+    results = []
+    for result in response.results:
+        if not result.alternatives:
+            continue
+        alternative = result.alternatives[0]
+        results.append({
+            'text': alternative.transcript,
+            'confidence': alternative.confidence,
+            'end': result.result_end_time.total_seconds() if result.result_end_time else None,
+        })
+    return results
+
+
+def _recognize_with_retry(recognize: Callable, pcm: bytes, sample_rate: int, language_code: str) -> List[Dict]:
+    try:
+        return recognize(pcm, sample_rate, language_code)
+    except Exception as e:
+        logger.warning(f'区間の音声認識に失敗したため再試行します: {e}')
+        return recognize(pcm, sample_rate, language_code)
+
+
+def stitch_segments(chunks: List[Dict], chunk_results: List[List[Dict]], sample_rate: int,
+                    language_code: str) -> Tuple[str, float, List[Dict]]:
+    """区間ごとの認識結果を、録音全体での時刻つきの文字起こしにまとめる"""
+    segments = []
+    for chunk, results in zip(chunks, chunk_results):
+        chunk_start = chunk['start'] / sample_rate
+        chunk_end = chunk['end'] / sample_rate
+        segment_start = chunk_start
+        for result in results:
+            text = result['text'].strip()
+            end = chunk_start + result['end'] if result.get('end') else chunk_end
+            end = min(max(end, segment_start), chunk_end)
+            if text:
+                segments.append({
+                    'start': round(segment_start, 2),
+                    'end': round(end, 2),
+                    'text': text,
+                    'confidence': result.get('confidence') or 0.0,
+                })
+            segment_start = end
+
+    separator = '' if language_code.startswith(('ja', 'zh')) else ' '
+    text = separator.join(segment['text'] for segment in segments)
+    # 区間の長さで重みづけした平均
+    weights = [max(segment['end'] - segment['start'], 0.01) for segment in segments]
+    confidence = (
+        sum(segment['confidence'] * weight for segment, weight in zip(segments, weights)) / sum(weights)
+        if segments else 0.0
+    )
+    return text, confidence, segments
+
+
+def transcribe_long_audio(audio, language_code: str = 'ja-JP', recognize: Callable = recognize_chunk,
+                          executor: Optional[ThreadPoolExecutor] = None) -> Dict:
+    """
+    長時間の音声を分割・並列認識してテキストに変換
+
+    Args:
+        audio: 音声（バイト列、またはUploadedFile.chunks()などのバイト列のイテレータ。ffmpegが読める形式）
+        language_code: 言語コード
+        recognize: 1区間の認識関数（recognize_chunkと同じ引数・戻り値。ベンチマークでは疑似の認識に置き換える）
+        executor: 区間の認識に使うスレッドプール（省略時はプロセス共通のプール）
+
+    Returns:
+        {
+            'text': str,  # 全体の文字起こし
+            'confidence': float,
+            'duration': float,  # 録音の長さ（秒）
+            'segments': [{'start': 秒, 'end': 秒, 'text': str, 'confidence': float}, ...],
+            'chunks': int,  # 認識した区間数
+            'timings': {'decode': 秒, 'split': 秒, 'recognize': 秒},
+        }
+
+    Raises:
+        AudioTooLongError: 録音が長すぎる場合
+        Exception: 変換・認識に失敗した場合
+    """
+    sample_rate = TARGET_SAMPLE_RATE
+    started = time.perf_counter()
+    max_seconds = settings.SPEECH_LONG_AUDIO_MAX_SECONDS
+    # 上限を1秒超えた時点で変換を打ち切る（長い録音を最後までデコードしない）
+    pcm = transcode_to_pcm16(
+        audio, sample_rate, timeout=settings.SPEECH_LONG_AUDIO_TRANSCODE_TIMEOUT, max_seconds=max_seconds + 1,
+    )
+    duration = len(pcm) / 2 / sample_rate
+    if duration > max_seconds:
+        raise AudioTooLongError(f'録音が長すぎます。{max_seconds // 60}分以内にしてください')
+    pcm = normalize_pcm16(pcm)
+    decoded = time.perf_counter()
+
+    chunks = [chunk for chunk in split_on_silence(pcm, sample_rate) if chunk['has_speech']]
+    split = time.perf_counter()
+
+    executor = executor or _executor
+    futures = [
+        executor.submit(
+            _recognize_with_retry, recognize, pcm[chunk['start'] * 2:chunk['end'] * 2], sample_rate, language_code,
+        )
+        for chunk in chunks
+    ]
+    chunk_results = [future.result() for future in futures]
+    recognized = time.perf_counter()
+
+    text, confidence, segments = stitch_segments(chunks, chunk_results, sample_rate, language_code)
+    timings = {
+        'decode': round(decoded - started, 3),
+        'split': round(split - decoded, 3),
+        'recognize': round(recognized - split, 3),
+    }
+    logger.info(
+        f'長時間音声の文字起こし完了: {duration:.1f}秒, {len(chunks)}区間, {len(segments)}セグメント, '
+        f'text_length={len(text)}, timings={timings}'
+    )
+    return {
+        'text': text,
+        'confidence': confidence,
+        'duration': round(duration, 2),
+        'segments': segments,
+        'chunks': len(chunks),
+        'timings': timings,
+    }
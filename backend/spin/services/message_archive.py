@@ -0,0 +1,147 @@
+"""
+会話履歴アーカイブサービス
+終了から一定期間が経過したセッションの会話履歴を ChatMessageArchive に圧縮して移し、
+ChatMessageテーブル（と、そのインデックス）を直近のセッション分だけに保つ。
+アーカイブした会話履歴は保存前と同じChatMessageインスタンス（未保存）として読み出せる
+"""
+import logging
+from typing import Dict, Iterable, List, Optional
+
+from django.db import transaction
+from django.db.models import Count
+from django.utils.dateparse import parse_datetime
+
+from spin.models import ChatMessage, ChatMessageArchive
+from spin.services.compression import compress_payload, decompress_payload
+
+logger = logging.getLogger(__name__)
+
+# アーカイブに保存するChatMessageの項目
+ARCHIVE_FIELDS = (
+    'id', 'role', 'message', 'sequence', 'success_delta', 'analysis_summary', 'spin_stage',
+    'stage_evaluation', 'system_notes', 'closing_action', 'temperature_score', 'temperature_details',
+)
+
+
+def _serialize_message(message: ChatMessage) -> Dict:
+    row = {field: getattr(message, field) for field in ARCHIVE_FIELDS}
+    row['created_at'] = message.created_at.isoformat() if message.created_at else None
+    return row
+
+
+def _deserialize_message(session_id, row: Dict) -> ChatMessage:
+    message = ChatMessage(session_id=session_id, **{field: row.get(field) for field in ARCHIVE_FIELDS})
+    message.created_at = parse_datetime(row['created_at']) if row.get('created_at') else None
+    return message
+
+
+def load_archived_messages(session_id) -> List[ChatMessage]:
+    """アーカイブ済みの会話履歴を取得（アーカイブがない場合は空リスト）"""
+    row = (
+        ChatMessageArchive.objects.filter(session_id=session_id)
+        .values_list('codec', 'payload')
+        .first()
+    )
+    if row is None:
+        return []
+    return [_deserialize_message(session_id, message) for message in decompress_payload(*row)]
+
+
+def get_messages_after(session, after_sequence: int, limit: int, include_archive: bool) -> List[ChatMessage]:
+    """
+    指定したsequenceより後の会話履歴を、アーカイブ済みかどうかに関係なくsequence順で取得
+
+    Args:
+        session: Sessionインスタンス
+        after_sequence: このsequenceより後のメッセージを返す
+        limit: 取得件数
+        include_archive: アーカイブも参照するか（アーカイブがないことが分かっている場合はFalse）
+    """
+    messages = list(
+        ChatMessage.objects.filter(session=session, sequence__gt=after_sequence)
+        .order_by('sequence')[:limit]
+    )
+    if include_archive:
+        archived = [message for message in load_archived_messages(session.pk) if message.sequence > after_sequence]
+        messages = sorted(archived + messages, key=lambda message: message.sequence)[:limit]
+    return messages
+
+
+def get_session_messages(session) -> List[ChatMessage]:
+    """セッションの全会話履歴をsequence順で取得（アーカイブ済みのメッセージを含む）"""
+    messages = list(ChatMessage.objects.filter(session=session).order_by('sequence'))
+    archived = load_archived_messages(session.pk)
+    if not archived:
+        return messages
+    return sorted(archived + messages, key=lambda message: message.sequence)
+
+
+def get_message_counts(session_ids: Iterable) -> Dict:
+    """セッションごとのメッセージ数を取得（アーカイブ済みのメッセージを含む）"""
+    session_ids = list(session_ids)
+    counts = dict(
+        ChatMessage.objects.filter(session_id__in=session_ids)
+        .values('session_id')
+        .annotate(count=Count('id'))
+        .values_list('session_id', 'count')
+    )
+    archived = ChatMessageArchive.objects.filter(session_id__in=session_ids).values_list('session_id', 'message_count')
+    for session_id, count in archived:
+        counts[session_id] = counts.get(session_id, 0) + count
+    return counts
+
+
+def archive_session_messages(session) -> int:
+    """
+    セッションの会話履歴をアーカイブに移す（既存のアーカイブがある場合はまとめて保存し直す）
+
+    Returns:
+        アーカイブに移したメッセージ数
+    """
+    with transaction.atomic():
+        messages = list(ChatMessage.objects.select_for_update().filter(session=session).order_by('sequence'))
+        if not messages:
+            return 0
+
+        archived = load_archived_messages(session.pk)
+        rows = [_serialize_message(message) for message in sorted(archived + messages, key=lambda m: m.sequence)]
+        codec, payload, raw_size = compress_payload(rows)
+        ChatMessageArchive.objects.update_or_create(
+            session=session,
+            defaults={
+                'codec': codec,
+                'payload': payload,
+                'message_count': len(rows),
+                'last_sequence': rows[-1]['sequence'],
+                'raw_size': raw_size,
+                'compressed_size': len(payload),
+            },
+        )
+        ChatMessage.objects.filter(pk__in=[message.pk for message in messages]).delete()
+
+    logger.info(f"会話履歴をアーカイブ: Session {session.pk}, {len(messages)}件, {raw_size} → {len(payload)} bytes ({codec})")
+    return len(messages)
+
+
+def restore_session_messages(session) -> Optional[int]:
+    """
+    アーカイブした会話履歴をChatMessageテーブルに戻す
+
+    Returns:
+        戻したメッセージ数（アーカイブがない場合はNone）
+    """
+    with transaction.atomic():
+        archive = ChatMessageArchive.objects.select_for_update().filter(session=session).first()
+        if archive is None:
+            return None
+        messages = [
+            _deserialize_message(session.pk, row)
+            for row in decompress_payload(archive.codec, archive.payload)
+        ]
+        created_at = {message.pk: message.created_at for message in messages}
+        ChatMessage.objects.bulk_create(messages, ignore_conflicts=True)
+        # created_atはauto_now_addで上書きされるため、アーカイブ前の日時に戻す
+        for pk, value in created_at.items():
+            ChatMessage.objects.filter(pk=pk).update(created_at=value)
+        archive.delete()
+    return len(messages)
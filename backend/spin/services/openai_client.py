@@ -18,6 +18,7 @@ from spin.services.memory_manager import (
 # 既存のインポート（フォールバック用）
 from spin.services.ai_service import AIService
 from spin.services.ai_provider_factory import AIProviderFactory
+from spin.services.company_brief import get_company_context
 
 logger = logging.getLogger(__name__)
 
@@ -25,6 +26,14 @@ logger = logging.getLogger(__name__)
 USE_LANGCHAIN = True  # Falseにすると既存の実装にフォールバック
 
 
+def _latest_salesperson_message(conversation_history) -> str:
+    """会話履歴から最新の営業担当者の発言を取得（企業ページ検索のクエリに使用）"""
+    for msg in reversed(conversation_history):
+        if msg.role == 'salesperson':
+            return msg.message
+    return ""
+
+
 def generate_customer_response(session, conversation_history):
     """顧客ロールプレイ用の応答を生成（LangChain版）"""
     logger.info(f"AI顧客応答生成を開始: Session {session.id}, mode={session.mode}, use_langchain={USE_LANGCHAIN}")
@@ -123,30 +132,8 @@ def _generate_customer_response_legacy(session, conversation_history):
     
     # 企業情報を取得（詳細診断モードの場合）
     company_info_text = ""
-    if session.mode == 'detailed' and session.company:
-        company = session.company
-        company_lines = []
-        company_lines.append(f"企業名: {company.company_name}")
-        if company.industry:
-            company_lines.append(f"業界: {company.industry}")
-        if company.business_description:
-            company_lines.append(f"事業内容: {company.business_description}")
-        if company.location:
-            company_lines.append(f"所在地: {company.location}")
-        if company.employee_count:
-            company_lines.append(f"従業員数: {company.employee_count}")
-        if company.established_year:
-            company_lines.append(f"設立年: {company.established_year}")
-        
-        # スクレイピングデータからテキストコンテンツを取得
-        if company.scraped_data:
-            if company.scraped_data.get('text_content'):
-                # テキストコンテンツの最初の2000文字を取得（長すぎるとエラーになるため）
-                text_content = company.scraped_data.get('text_content', '')[:2000]
-                company_lines.append(f"\n--- 企業のWebサイト情報 ---")
-                company_lines.append(text_content)
-        
-        company_info_text = "\n".join(company_lines)
+    if session.mode == 'detailed' and session.company_id:
+        company_info_text = get_company_context(session, _latest_salesperson_message(conversation_history))
     
     # セッション情報から顧客人格を設定
     # 企業情報のヘッダー部分を準備（f-stringの制限を回避するため）
@@ -606,28 +593,8 @@ def generate_customer_response_stream(session, conversation_history):
     # 既存のgenerate_customer_responseと同じロジックでsystem_promptとmessagesを構築
     # 企業情報を取得（詳細診断モードの場合）
     company_info_text = ""
-    if session.mode == 'detailed' and session.company:
-        company = session.company
-        company_lines = []
-        company_lines.append(f"企業名: {company.company_name}")
-        if company.industry:
-            company_lines.append(f"業界: {company.industry}")
-        if company.business_description:
-            company_lines.append(f"事業内容: {company.business_description}")
-        if company.location:
-            company_lines.append(f"所在地: {company.location}")
-        if company.employee_count:
-            company_lines.append(f"従業員数: {company.employee_count}")
-        if company.established_year:
-            company_lines.append(f"設立年: {company.established_year}")
-        
-        if company.scraped_data:
-            if company.scraped_data.get('text_content'):
-                text_content = company.scraped_data.get('text_content', '')[:2000]
-                company_lines.append(f"\n--- 企業のWebサイト情報 ---")
-                company_lines.append(text_content)
-        
-        company_info_text = "\n".join(company_lines)
+    if session.mode == 'detailed' and session.company_id:
+        company_info_text = get_company_context(session, _latest_salesperson_message(conversation_history))
     
     company_info_section = ""
     if company_info_text:
@@ -834,28 +801,8 @@ def _build_system_prompt(session, conversation_history) -> str:
     """システムプロンプトを構築（共通ロジック）"""
     # 企業情報を取得（詳細診断モードの場合）
     company_info_text = ""
-    if session.mode == 'detailed' and hasattr(session, 'company') and session.company:
-        company = session.company
-        company_lines = []
-        company_lines.append(f"企業名: {company.company_name}")
-        if company.industry:
-            company_lines.append(f"業界: {company.industry}")
-        if company.business_description:
-            company_lines.append(f"事業内容: {company.business_description}")
-        if company.location:
-            company_lines.append(f"所在地: {company.location}")
-        if company.employee_count:
-            company_lines.append(f"従業員数: {company.employee_count}")
-        if company.established_year:
-            company_lines.append(f"設立年: {company.established_year}")
-        
-        if company.scraped_data:
-            if company.scraped_data.get('text_content'):
-                text_content = company.scraped_data.get('text_content', '')[:2000]
-                company_lines.append(f"\n--- 企業のWebサイト情報 ---")
-                company_lines.append(text_content)
-        
-        company_info_text = "\n".join(company_lines)
+    if session.mode == 'detailed' and session.company_id:
+        company_info_text = get_company_context(session, _latest_salesperson_message(conversation_history))
     
     company_info_section = ""
     if company_info_text:
@@ -0,0 +1,81 @@
+"""
+カーソル（キーセット）ページネーション
+OFFSETやcount()を使わず、直前のページ末尾の並び順キーを基準に次のページを取得する
+"""
+import base64
+import json
+import uuid
+from typing import List, Tuple
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+# 1ページあたりの件数
+DEFAULT_PAGE_LIMIT = 20
+MAX_PAGE_LIMIT = 100
+
+
+def parse_limit(query_params, default: int = DEFAULT_PAGE_LIMIT, maximum: int = MAX_PAGE_LIMIT) -> int:
+    """
+    クエリパラメータから件数を取得（limit、後方互換のためpage_sizeも受け付ける）
+
+    Raises:
+        ValueError: 数値でない場合
+    """
+    value = query_params.get('limit') or query_params.get('page_size') or default
+    return max(1, min(int(value), maximum))
+
+
+def encode_cursor(created_at, pk) -> str:
+    """(created_at, id) からカーソル文字列を生成"""
+    raw = json.dumps([created_at.isoformat(), str(pk)])
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor: str) -> Tuple:
+    """
+    カーソル文字列を (created_at, id) に変換（idはUUID）
+
+    Raises:
+        ValueError: カーソルが不正な場合
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        created_at_str, pk = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')).decode('utf-8'))
+        # 絞り込みで検証エラー（ValidationError・TypeError）にならないよう、ここで型を確認する
+        if not isinstance(created_at_str, str) or not isinstance(pk, str):
+            raise ValueError("カーソルが不正です")
+        pk = str(uuid.UUID(pk))
+        created_at = parse_datetime(created_at_str)
+    except Exception:
+        raise ValueError("カーソルが不正です")
+    if created_at is None:
+        raise ValueError("カーソルが不正です")
+    return created_at, pk
+
+
+def paginate_by_created_at(queryset, cursor: str, limit: int) -> Tuple[List, str]:
+    """
+    (created_at, id) の降順でキーセットページネーション
+
+    Args:
+        queryset: 絞り込み済みのクエリセット
+        cursor: 前のページのnext_cursor（最初のページはNoneまたは空文字）
+        limit: 取得件数
+
+    Returns:
+        (このページのオブジェクトのリスト, 次ページのカーソル。最終ページの場合はNone)
+
+    Raises:
+        ValueError: カーソルが不正な場合
+    """
+    if cursor:
+        created_at, pk = decode_cursor(cursor)
+        queryset = queryset.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, pk__lt=pk))
+
+    # 次ページの有無を判定するため1件多く取得する
+    items = list(queryset.order_by('-created_at', '-pk')[:limit + 1])
+    if len(items) <= limit:
+        return items, None
+    items = items[:limit]
+    return items, encode_cursor(items[-1].created_at, items[-1].pk)
@@ -0,0 +1,375 @@
+"""
+ランキングサービス
+終了済みセッションのスコアをRankingEntryに非正規化して保存し、
+ランキングAPIはスコアのインデックス順に1ページ分だけを読み出す
+（ページ送りは前ページ末尾の (スコア, session_id) からのキーセット方式で、OFFSETは使わない）
+"""
+import base64
+import json
+import logging
+import uuid
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Q
+
+from spin.models import Company, RankingEntry
+from spin.services.message_archive import get_message_counts
+from spin.services.ranking_cache import build_cache_key, get_or_build, get_ranking_version, invalidate_ranking_version
+from spin.services.ranking_windows import RANKING_SCORE_FIELDS, invalidate_rollups
+
+logger = logging.getLogger(__name__)
+
+# ランキングAPIのページサイズ
+RANKING_DEFAULT_PAGE_SIZE = 50
+RANKING_MAX_PAGE_SIZE = 100
+
+# モードごとの並び順（スコア降順、同点はsession_id順。キーセットページングのキーと一致させる）
+RANKING_ORDERING = {
+    'simple': ('-total_score', '-session_id'),
+    'detailed': ('-composite_score', '-session_id'),
+}
+
+RANKING_UPDATE_FIELDS = [
+    'user', 'mode', 'username', 'company_name', 'industry',
+    'total_score', 'success_probability', 'composite_score',
+    'situation_score', 'problem_score', 'implication_score', 'need_score',
+    'message_count', 'finished_at', 'updated_at',
+]
+
+
+def compute_composite_score(total_score: float, success_probability: float) -> float:
+    """総合評価スコア（スコア70% + 成功率30%）"""
+    return (total_score * 0.7) + (success_probability * 0.3)
+
+
+def build_ranking_entry(session, report, message_count: int, company_name: str = '') -> RankingEntry:
+    """
+    セッションとレポートからRankingEntryを構築（保存はしない）
+
+    Args:
+        session: Sessionインスタンス（userを参照する）
+        report: Reportインスタンス
+        message_count: セッションのメッセージ数
+        company_name: 企業名（企業情報が紐づいていない場合は空文字）
+    """
+    spin_scores = report.spin_scores or {}
+    total_score = spin_scores.get('total', 0) or 0
+    success_probability = session.success_probability or 0
+    return RankingEntry(
+        session_id=session.id,
+        user_id=session.user_id,
+        mode=session.mode,
+        username=session.user.username,
+        company_name=company_name or session.industry or '未設定',
+        industry=session.industry or '',
+        total_score=total_score,
+        success_probability=success_probability,
+        composite_score=compute_composite_score(total_score, success_probability),
+        situation_score=spin_scores.get('situation', 0) or 0,
+        problem_score=spin_scores.get('problem', 0) or 0,
+        implication_score=spin_scores.get('implication', 0) or 0,
+        need_score=spin_scores.get('need', 0) or 0,
+        message_count=message_count,
+        finished_at=session.finished_at,
+    )
+
+
+def update_ranking_entry(session, report) -> RankingEntry:
+    """
+    1セッションのRankingEntryを作成・更新（Report保存時に呼び出す）
+
+    企業情報はスクレイピング結果を読み込まないよう企業名のみを取得する
+    """
+    company_name = ''
+    if session.company_id:
+        company_name = Company.objects.filter(pk=session.company_id).values_list('company_name', flat=True).first() or ''
+    message_count = get_message_counts([session.pk]).get(session.pk, 0)
+    entry = build_ranking_entry(session, report, message_count, company_name)
+    entry.save()
+    invalidate_rollups([entry])
+    _invalidate_on_commit({entry.mode})
+    return entry
+
+
+def refresh_ranking_entries(reports: Iterable) -> int:
+    """
+    複数のReportに対応するRankingEntryをまとめて作成・更新
+
+    Args:
+        reports: session（とsession.user）を参照できるReportのリスト
+
+    Returns:
+        更新した件数
+    """
+    reports = [report for report in reports if report.session.status == 'finished']
+    if not reports:
+        return 0
+
+    message_counts = get_message_counts(report.session_id for report in reports)
+    company_ids = {report.session.company_id for report in reports if report.session.company_id}
+    company_names = dict(
+        Company.objects.filter(pk__in=company_ids).values_list('pk', 'company_name')
+    ) if company_ids else {}
+
+    entries = [
+        build_ranking_entry(
+            report.session,
+            report,
+            message_counts.get(report.session_id, 0),
+            company_names.get(report.session.company_id) or '',
+        )
+        for report in reports
+    ]
+    RankingEntry.objects.bulk_create(
+        entries,
+        update_conflicts=True,
+        unique_fields=['session'],
+        update_fields=RANKING_UPDATE_FIELDS,
+    )
+    invalidate_rollups(entries)
+    _invalidate_on_commit({entry.mode for entry in entries})
+    return len(entries)
+
+
+def _invalidate_on_commit(modes):
+    """コミット後にランキングキャッシュのバージョンを破棄"""
+    def invalidate():
+        for mode in modes:
+            invalidate_ranking_version(mode)
+    transaction.on_commit(invalidate)
+
+
+def parse_page_size(query_params) -> int:
+    """
+    クエリパラメータからページサイズを取得
+
+    Raises:
+        ValueError: 数値でない場合
+    """
+    page_size = int(query_params.get('page_size', RANKING_DEFAULT_PAGE_SIZE))
+    return max(1, min(page_size, RANKING_MAX_PAGE_SIZE))
+
+
+def parse_page_params(query_params) -> Tuple[int, int]:
+    """
+    クエリパラメータからページ番号とページサイズを取得
+
+    Raises:
+        ValueError: 数値でない場合
+    """
+    page = max(1, int(query_params.get('page', 1)))
+    return page, parse_page_size(query_params)
+
+
+def encode_cursor(score: float, session_id, rank: int) -> str:
+    """ページ末尾のエントリから次ページのカーソルを生成"""
+    raw = json.dumps([score, str(session_id), rank], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def parse_cursor(cursor: str) -> Optional[Tuple[float, str, int]]:
+    """
+    カーソルを (スコア, session_id, 前ページ末尾の順位) に変換（空の場合はNone）
+
+    Raises:
+        ValueError: 不正なカーソルの場合
+    """
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        score, session_id, rank = json.loads(raw)
+        return float(score), str(uuid.UUID(session_id)), int(rank)
+    except (TypeError, ValueError) as e:
+        raise ValueError(f"不正なカーソルです: {cursor}") from e
+
+
+def get_ranking_page(mode: str, page_size: int, industry: str = '',
+                     cursor: Optional[Tuple[float, str, int]] = None) -> Tuple[List[RankingEntry], bool]:
+    """
+    ランキングの1ページ分を取得（(スコア, session_id) のインデックスをカーソルの位置から読む）
+
+    Args:
+        industry: 業界で絞り込む場合に指定
+        cursor: parse_cursorで取得した前ページ末尾の位置（先頭ページはNone）
+
+    Returns:
+        (RankingEntryのリスト, 次ページの有無)
+    """
+    score_field = RANKING_SCORE_FIELDS[mode]
+    queryset = RankingEntry.objects.filter(mode=mode)
+    if industry:
+        queryset = queryset.filter(industry=industry)
+    if cursor is not None:
+        score, session_id, _ = cursor
+        queryset = queryset.filter(
+            Q(**{f"{score_field}__lt": score}) | Q(**{score_field: score, 'session_id__lt': session_id})
+        )
+    # 次ページの有無を判定するため1件多く取得する
+    entries = list(queryset.order_by(*RANKING_ORDERING[mode])[:page_size + 1])
+    return entries[:page_size], len(entries) > page_size
+
+
+def serialize_ranking_entry(entry: RankingEntry, rank: int) -> Dict:
+    """RankingEntryをランキングAPIのレスポンス形式に変換"""
+    data = {
+        'rank': rank,
+        'session_id': str(entry.session_id),
+        'username': entry.username,
+        'industry': entry.industry,
+        'total_score': round(entry.total_score, 1),
+        'situation_score': round(entry.situation_score, 1),
+        'problem_score': round(entry.problem_score, 1),
+        'implication_score': round(entry.implication_score, 1),
+        'need_score': round(entry.need_score, 1),
+        'message_count': entry.message_count,
+        'finished_at': entry.finished_at.isoformat() if entry.finished_at else None,
+    }
+    if entry.mode == 'detailed':
+        data.update({
+            'company_name': entry.company_name,
+            'industry': entry.industry or '未設定',
+            'success_probability': round(entry.success_probability, 1),
+            'composite_score': round(entry.composite_score, 1),
+        })
+    return data
+
+
+def get_ranking_payload(mode: str, page_size: int, version: str, industry: str = '', cursor: str = '') -> str:
+    """
+    ランキングAPIのレスポンス（JSON文字列）を取得
+
+    ランキングのバージョンごとにシリアライズ済みのJSONをキャッシュする
+
+    Args:
+        mode: 診断モード
+        page_size: ページサイズ
+        version: get_ranking_versionで取得したバージョン
+        industry: 業界で絞り込む場合に指定
+        cursor: 前ページのレスポンスのnext_cursor（先頭ページは空文字）
+
+    Raises:
+        ValueError: 不正なカーソルの場合
+    """
+    position = parse_cursor(cursor)
+
+    def build():
+        entries, has_next = get_ranking_page(mode, page_size, industry, position)
+        offset = position[2] if position else 0
+        score_field = RANKING_SCORE_FIELDS[mode]
+        last = entries[-1] if entries else None
+        logger.info(f"ランキングを生成: mode={mode}, 順位{offset + 1}〜, {len(entries)}件")
+        return json.dumps({
+            "mode": mode,
+            "industry": industry or None,
+            "ranking": [serialize_ranking_entry(entry, offset + i) for i, entry in enumerate(entries, 1)],
+            "total_sessions": get_ranking_total(mode, industry),
+            "page_size": page_size,
+            "has_next": has_next,
+            "next_cursor": (
+                encode_cursor(getattr(last, score_field), last.session_id, offset + len(entries))
+                if has_next else None
+            ),
+        }, ensure_ascii=False, separators=(',', ':'))
+
+    return get_or_build(build_cache_key('page', mode, version, industry, cursor, page_size), build)
+
+
+def get_ranking_total(mode: str, industry: str = '') -> int:
+    """ランキング対象のセッション数（ランキングのバージョンごとにキャッシュ）"""
+    version, _ = get_ranking_version(mode)
+
+    def count():
+        queryset = RankingEntry.objects.filter(mode=mode)
+        if industry:
+            queryset = queryset.filter(industry=industry)
+        return queryset.count()
+
+    return cache.get_or_set(
+        build_cache_key('total', mode, version, industry),
+        count,
+        getattr(settings, 'RANKING_CACHE_TTL', 600),
+    )
+
+
+def get_score_rank(mode: str, score: float, session_id) -> Dict:
+    """
+    エントリの順位と上位何%かを取得
+
+    順位はランキングページと同じ (スコア, session_id) の降順での位置とし、
+    (スコア, session_id) のインデックスで「このエントリより上位のエントリ数」を数えて求める
+    """
+    score_field = RANKING_SCORE_FIELDS[mode]
+    rank = RankingEntry.objects.filter(mode=mode).filter(
+        Q(**{f"{score_field}__gt": score}) | Q(**{score_field: score, 'session_id__gt': session_id})
+    ).count() + 1
+    total = max(get_ranking_total(mode), rank)
+    return {
+        'score': round(score, 1),
+        'rank': rank,
+        'total_sessions': total,
+        'top_percent': max(0.1, round(rank * 100 / total, 1)),
+        'percentile': round((total - rank) * 100 / total, 1),
+    }
+
+
+def _get_best_entry(user, mode: str) -> Optional[Tuple]:
+    """ユーザーの自己ベストのエントリ（セッションIDとスコア、ランキングで最も上位のもの）を取得"""
+    score_field = RANKING_SCORE_FIELDS[mode]
+    return (
+        RankingEntry.objects.filter(user=user, mode=mode)
+        .order_by(*RANKING_ORDERING[mode])
+        .values_list('session_id', score_field)
+        .first()
+    )
+
+
+def get_user_rank(user, mode: str) -> Optional[Dict]:
+    """
+    ユーザーの自己ベストの順位を取得
+
+    Returns:
+        順位情報（ランキング対象のセッションがない場合はNone）
+    """
+    best = _get_best_entry(user, mode)
+    if best is None:
+        return None
+    session_id, score = best
+    return {
+        'mode': mode,
+        'best_session_id': str(session_id),
+        **get_score_rank(mode, score, session_id),
+    }
+
+
+def get_session_rank(session) -> Optional[Dict]:
+    """
+    セッション終了レスポンス用の順位情報（今回のセッションと自己ベスト）を取得
+
+    Returns:
+        順位情報（ランキングエントリがない場合はNone）
+    """
+    entry = RankingEntry.objects.filter(session_id=session.id).only('mode', 'total_score', 'composite_score').first()
+    if entry is None:
+        return None
+    score = getattr(entry, RANKING_SCORE_FIELDS[entry.mode])
+    session_rank = get_score_rank(entry.mode, score, session.id)
+
+    # 今回が自己ベストの場合は順位の計算を省略する
+    best_session_id, best_score = _get_best_entry(session.user_id, entry.mode)
+    if best_session_id == session.id:
+        personal_best = {'best_session_id': str(session.id), **session_rank}
+    else:
+        personal_best = {
+            'best_session_id': str(best_session_id),
+            **get_score_rank(entry.mode, best_score, best_session_id),
+        }
+
+    return {
+        'mode': entry.mode,
+        'session': session_rank,
+        'personal_best': personal_best,
+    }
@@ -0,0 +1,121 @@
+"""
+ランキングキャッシュサービス
+ランキングAPIのレスポンスをシリアライズ済みの状態でキャッシュする。
+キャッシュキーにはランキングのバージョン（RankingEntryの最終更新日時）を含め、
+Report保存時にバージョンを破棄することで古いランキングを返さないようにする
+"""
+import hashlib
+import logging
+import threading
+import time
+from typing import Callable, Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Max
+
+from spin.models import RankingEntry
+
+logger = logging.getLogger(__name__)
+
+# ランキングのバージョンをキャッシュする秒数
+# （プロセス内キャッシュの場合、他プロセスでの更新はこの秒数以内に反映される）
+RANKING_VERSION_TTL = 10
+# キャッシュ再生成のロックの有効期間（秒）
+RANKING_BUILD_LOCK_TIMEOUT = 30
+# 別プロセスが再生成中の場合に完了を待つ最大秒数
+RANKING_BUILD_WAIT_SECONDS = 5
+RANKING_BUILD_POLL_INTERVAL = 0.05
+
+# 同一プロセス内の再生成を1回にまとめるためのロック（キーのハッシュで振り分け）
+_build_locks = [threading.Lock() for _ in range(16)]
+
+
+def _version_key(mode: str) -> str:
+    return f"ranking:version:{mode}"
+
+
+def get_ranking_version(mode: str) -> Tuple[str, Optional[float]]:
+    """
+    ランキングのバージョンを取得
+
+    Returns:
+        (バージョン文字列, 最終更新日時のUNIXタイムスタンプ。エントリがない場合はNone)
+    """
+    key = _version_key(mode)
+    cached = cache.get(key)
+    if cached is not None:
+        return cached
+
+    latest = RankingEntry.objects.filter(mode=mode).aggregate(latest=Max('updated_at'))['latest']
+    if latest is None:
+        version = ('empty', None)
+    else:
+        timestamp = latest.timestamp()
+        version = (f"{timestamp:.6f}", timestamp)
+    cache.set(key, version, RANKING_VERSION_TTL)
+    return version
+
+
+def invalidate_ranking_version(mode: str):
+    """ランキングのバージョンを破棄（次のリクエストでDBから再取得される）"""
+    cache.delete(_version_key(mode))
+
+
+def _digest(parts) -> str:
+    return hashlib.sha1(":".join(str(part) for part in parts).encode('utf-8')).hexdigest()[:20]
+
+
+def build_etag(*parts) -> str:
+    """キャッシュキーの構成要素からETagを生成"""
+    return f'"{_digest(parts)}"'
+
+
+def build_cache_key(prefix: str, *parts) -> str:
+    """キャッシュキーを生成（業界名などの任意の文字列を含められるようハッシュ化する）"""
+    return f"ranking:{prefix}:{_digest(parts)}"
+
+
+def get_or_build(key: str, builder: Callable[[], str], ttl: Optional[int] = None) -> str:
+    """
+    キャッシュからペイロードを取得し、なければ生成して保存
+
+    キャッシュミスが同時に発生しても再生成は1回だけ行う
+    （同一プロセス内はロック、プロセス間はcache.addによるロックで待ち合わせる）
+
+    Args:
+        key: キャッシュキー
+        builder: ペイロード（シリアライズ済みの文字列）を生成する関数
+        ttl: キャッシュの有効期間（秒）。省略時はRANKING_CACHE_TTL
+    """
+    payload = cache.get(key)
+    if payload is not None:
+        return payload
+
+    if ttl is None:
+        ttl = getattr(settings, 'RANKING_CACHE_TTL', 600)
+    lock_key = f"{key}:lock"
+
+    with _build_locks[hash(key) % len(_build_locks)]:
+        payload = cache.get(key)
+        if payload is not None:
+            return payload
+
+        if cache.add(lock_key, 1, RANKING_BUILD_LOCK_TIMEOUT):
+            try:
+                payload = builder()
+                cache.set(key, payload, ttl)
+                return payload
+            finally:
+                cache.delete(lock_key)
+
+        # 別プロセスが再生成中のため完了を待つ
+        deadline = time.monotonic() + RANKING_BUILD_WAIT_SECONDS
+        while time.monotonic() < deadline:
+            time.sleep(RANKING_BUILD_POLL_INTERVAL)
+            payload = cache.get(key)
+            if payload is not None:
+                return payload
+
+    logger.warning(f"ランキングキャッシュの再生成待ちがタイムアウトしました: {key}")
+    return builder()
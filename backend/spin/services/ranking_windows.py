@@ -0,0 +1,229 @@
+"""
+期間別ランキングサービス
+日間・週間・月間（業界別を含む）のランキングを、ユーザーごとの最高スコアとしてDB側で集計する。
+終了した期間の集計結果はRankingRollupに保存し（集計済みの期間はRankingRollupWindowに記録する）、
+進行中の期間のみ都度集計する
+"""
+import json
+import logging
+from datetime import date, datetime, time, timedelta
+from typing import Dict, Iterable, List, Tuple
+
+from django.db import transaction
+from django.db.models import Avg, Count, Max, Q
+from django.utils import timezone
+
+from spin.models import RankingEntry, RankingRollup, RankingRollupWindow
+from spin.services.ranking_cache import build_cache_key, get_or_build
+
+logger = logging.getLogger(__name__)
+
+PERIODS = ('daily', 'weekly', 'monthly')
+
+# モードごとの順位付けに使うスコア
+RANKING_SCORE_FIELDS = {
+    'simple': 'total_score',
+    'detailed': 'composite_score',
+}
+
+
+def get_window(period: str, day: date) -> Tuple[date, date]:
+    """
+    指定日を含む期間の開始日と終了日（終了日は含まない）を取得
+
+    Raises:
+        ValueError: 未対応の期間が指定された場合
+    """
+    if period == 'daily':
+        return day, day + timedelta(days=1)
+    if period == 'weekly':
+        start = day - timedelta(days=day.weekday())
+        return start, start + timedelta(days=7)
+    if period == 'monthly':
+        start = day.replace(day=1)
+        end = (start.replace(year=start.year + 1, month=1) if start.month == 12
+               else start.replace(month=start.month + 1))
+        return start, end
+    raise ValueError(f"未対応の期間です: {period}")
+
+
+def window_datetimes(start: date, end: date) -> Tuple[datetime, datetime]:
+    """期間の開始日・終了日を現在のタイムゾーンの日時に変換"""
+    return (
+        timezone.make_aware(datetime.combine(start, time.min)),
+        timezone.make_aware(datetime.combine(end, time.min)),
+    )
+
+
+def is_window_closed(period: str, period_start: date) -> bool:
+    """期間が終了しているかどうか"""
+    _, end = get_window(period, period_start)
+    return window_datetimes(period_start, end)[1] <= timezone.now()
+
+
+def clamp_window_day(mode: str, day: date) -> date:
+    """
+    期間を指定する日付を、最初のランキングエントリの日から今日までの範囲に収める
+
+    認証不要のAPIで任意の過去・未来の日付を指定されても、エントリのない期間を集計しないようにする
+    """
+    today = timezone.localdate()
+    if day >= today:
+        return today
+    first = (
+        RankingEntry.objects.filter(mode=mode, finished_at__isnull=False)
+        .order_by('finished_at')
+        .values_list('finished_at', flat=True)
+        .first()
+    )
+    if first is None:
+        return today
+    return max(day, timezone.localtime(first).date())
+
+
+def aggregate_window(mode: str, period_start: date, period_end: date, industry: str = ''):
+    """
+    期間内のランキングエントリをユーザーごとに集計するクエリセット
+
+    (mode, finished_at) / (mode, industry, finished_at) のインデックスで期間内の行だけを読み出し、
+    集計と並べ替えはDB側で行う
+    """
+    score_field = RANKING_SCORE_FIELDS[mode]
+    start_at, end_at = window_datetimes(period_start, period_end)
+    queryset = RankingEntry.objects.filter(mode=mode, finished_at__gte=start_at, finished_at__lt=end_at)
+    if industry:
+        queryset = queryset.filter(industry=industry)
+    return (
+        queryset.values('user_id')
+        .annotate(
+            username=Max('username'),
+            best_score=Max(score_field),
+            average_score=Avg(score_field),
+            session_count=Count('pk'),
+        )
+        .order_by('-best_score', '-session_count', 'user_id')
+    )
+
+
+def build_rollup(mode: str, period: str, period_start: date, industry: str = '') -> int:
+    """
+    終了した期間の集計結果をRankingRollupに保存（既存の集計結果は置き換える）
+
+    Returns:
+        保存したユーザー数
+    """
+    start, end = get_window(period, period_start)
+    rows = list(aggregate_window(mode, start, end, industry))
+    rollups = [
+        RankingRollup(
+            mode=mode,
+            period=period,
+            period_start=start,
+            industry=industry,
+            user_id=row['user_id'],
+            username=row['username'],
+            rank=rank,
+            best_score=row['best_score'],
+            average_score=row['average_score'],
+            session_count=row['session_count'],
+        )
+        for rank, row in enumerate(rows, 1)
+    ]
+    with transaction.atomic():
+        RankingRollup.objects.filter(mode=mode, period=period, period_start=start, industry=industry).delete()
+        RankingRollup.objects.bulk_create(rollups, ignore_conflicts=True)
+        RankingRollupWindow.objects.update_or_create(
+            mode=mode, period=period, period_start=start, industry=industry,
+            defaults={'user_count': len(rollups)},
+        )
+    logger.info(f"期間別ランキングを集計: mode={mode}, period={period}, start={start}, industry={industry or '全業界'}, {len(rollups)}件")
+    return len(rollups)
+
+
+def invalidate_rollups(entries: Iterable[RankingEntry]):
+    """スコアが更新されたエントリを含む、終了済み期間の集計結果を削除"""
+    conditions = Q()
+    for entry in entries:
+        if not entry.finished_at:
+            continue
+        day = timezone.localtime(entry.finished_at).date()
+        for period in PERIODS:
+            start, _ = get_window(period, day)
+            conditions |= Q(mode=entry.mode, period=period, period_start=start, industry__in=['', entry.industry])
+    if conditions:
+        RankingRollupWindow.objects.filter(conditions).delete()
+        RankingRollup.objects.filter(conditions).delete()
+
+
+def _serialize_row(row: Dict, rank: int) -> Dict:
+    return {
+        'rank': rank,
+        'username': row['username'],
+        'best_score': round(row['best_score'], 1),
+        'average_score': round(row['average_score'], 1),
+        'session_count': row['session_count'],
+    }
+
+
+def get_window_page(mode: str, period: str, period_start: date, industry: str, page: int, page_size: int) -> Tuple[List[Dict], int, bool]:
+    """
+    期間別ランキングの1ページ分を取得
+
+    終了した期間は集計結果（未集計の期間のみその場で集計して保存）から、進行中の期間は都度集計して返す
+
+    Returns:
+        (ランキング行のリスト, 総ユーザー数, 次ページの有無)
+    """
+    start, end = get_window(period, period_start)
+    offset = (page - 1) * page_size
+
+    if is_window_closed(period, start):
+        window = {'mode': mode, 'period': period, 'period_start': start, 'industry': industry}
+        total = RankingRollupWindow.objects.filter(**window).values_list('user_count', flat=True).first()
+        if total is None:
+            if industry and not RankingEntry.objects.filter(mode=mode, industry=industry).exists():
+                # 存在しない業界名では集計結果を保存しない
+                return [], 0, False
+            total = build_rollup(mode, period, start, industry)
+        rows = list(
+            RankingRollup.objects.filter(**window).order_by('rank')
+            .values('rank', 'username', 'best_score', 'average_score', 'session_count')[offset:offset + page_size + 1]
+        ) if total else []
+        ranking = [_serialize_row(row, row['rank']) for row in rows]
+    else:
+        queryset = aggregate_window(mode, start, end, industry)
+        rows = list(queryset[offset:offset + page_size + 1])
+        ranking = [_serialize_row(row, offset + i) for i, row in enumerate(rows, 1)]
+        total = queryset.count()
+
+    has_next = len(ranking) > page_size
+    return ranking[:page_size], total, has_next
+
+
+def get_window_payload(mode: str, period: str, day: date, industry: str, page: int, page_size: int, version: str) -> str:
+    """
+    期間別ランキングAPIのレスポンス（JSON文字列）を取得
+
+    Args:
+        day: 期間に含まれる任意の日付
+        version: get_ranking_versionで取得したバージョン
+    """
+    start, end = get_window(period, day)
+
+    def build():
+        ranking, total, has_next = get_window_page(mode, period, start, industry, page, page_size)
+        return json.dumps({
+            "mode": mode,
+            "period": period,
+            "period_start": start.isoformat(),
+            "period_end": end.isoformat(),
+            "is_closed": is_window_closed(period, start),
+            "industry": industry or None,
+            "ranking": ranking,
+            "total_users": total,
+            "page": page,
+            "page_size": page_size,
+            "has_next": has_next,
+        }, ensure_ascii=False, separators=(',', ':'))
+
+    return get_or_build(build_cache_key('window', mode, period, start, industry, page, page_size, version), build)
@@ -0,0 +1,346 @@
+"""
+リアルタイムモード（WebSocketプロキシ）のベンチマーク用部品
+- OpenAI Realtime APIの代わりに応答するローカルの疑似サーバー
+  （音声をそのまま折り返し、input_audio_buffer.commit を受けると音声・文字起こしの応答を生成する）
+- PCM16フレームを一定間隔で送信し、折り返しの遅延と応答開始までの遅延を計測する疑似クライアント
+- プロセスのCPU時間・メモリ使用量の取得（Linuxの /proc を参照）
+
+Djangoに依存しないため、spawnした子プロセスからも読み込める
+"""
+import asyncio
+import base64
+import functools
+import json
+import logging
+import multiprocessing
+import os
+import socket
+import statistics
+import struct
+import threading
+import time
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+
+from websockets.asyncio.client import connect
+from websockets.asyncio.server import serve
+
+# 各フレームの先頭に埋め込むヘッダー（連番, 送信時刻）。疑似サーバーは音声をそのまま折り返すため、
+# 受信したaudio deltaのヘッダーから往復遅延を計算できる
+FRAME_HEADER = struct.Struct('<Id')
+# 折り返した音声deltaの item_id（生成した応答の音声と区別する）
+ECHO_ITEM_ID = 'echo'
+# 疑似サーバーが生成する応答の文字起こし（音声deltaごとに1つ送る）
+FAKE_TRANSCRIPT_DELTA = 'はい、'
+# 疑似クライアントが数える項目
+COUNTERS = ('connected', 'sent', 'received', 'errors', 'commits', 'responses', 'transcript_deltas')
+
+
+def frame_size(sample_rate: int, frame_ms: int) -> int:
+    """PCM16モノラル1フレームのバイト数"""
+    return sample_rate * 2 * frame_ms // 1000
+
+
+def make_frame(sequence: int, size: int) -> bytes:
+    frame = bytearray(size)
+    FRAME_HEADER.pack_into(frame, 0, sequence, time.perf_counter())
+    return bytes(frame)
+
+
+# ---------------------------------------------------------------------------
+# 疑似Realtimeサーバー
+# ---------------------------------------------------------------------------
+
+async def _send_fake_response(websocket, number: int, response_frames: int, response_frame_bytes: int):
+    """commitされた音声に対する応答（音声delta・文字起こしdelta・完了イベント）を生成して送信"""
+    response_id = f'resp_{number}'
+    item_id = f'item_{number}'
+    await websocket.send(json.dumps({'type': 'input_audio_buffer.committed', 'item_id': f'input_{number}'}))
+    await websocket.send(json.dumps({'type': 'response.created', 'response': {'id': response_id}}))
+    audio = base64.b64encode(bytes(response_frame_bytes)).decode('ascii')
+    for _ in range(response_frames):
+        await websocket.send(json.dumps({
+            'type': 'response.audio.delta', 'response_id': response_id, 'item_id': item_id,
+            'content_index': 0, 'delta': audio,
+        }))
+        await websocket.send(json.dumps({
+            'type': 'response.audio_transcript.delta', 'response_id': response_id, 'item_id': item_id,
+            'content_index': 0, 'delta': FAKE_TRANSCRIPT_DELTA,
+        }))
+    await websocket.send(json.dumps({
+        'type': 'response.audio_transcript.done', 'response_id': response_id, 'item_id': item_id,
+        'content_index': 0, 'transcript': FAKE_TRANSCRIPT_DELTA * response_frames,
+    }))
+    await websocket.send(json.dumps({'type': 'response.done', 'response': {'id': response_id, 'status': 'completed'}}))
+
+
+async def _fake_realtime_handler(websocket, response_frames: int, response_frame_bytes: int):
+    await websocket.send(json.dumps({'type': 'session.created', 'session': {'id': 'fake'}}))
+    responses = 0
+    async for message in websocket:
+        if not isinstance(message, str):
+            continue
+        data = json.loads(message)
+        if data.get('type') == 'input_audio_buffer.append':
+            await websocket.send(json.dumps({
+                'type': 'response.audio.delta', 'item_id': ECHO_ITEM_ID, 'content_index': 0,
+                'delta': data.get('audio', ''),
+            }))
+        elif data.get('type') == 'input_audio_buffer.commit':
+            responses += 1
+            await _send_fake_response(websocket, responses, response_frames, response_frame_bytes)
+
+
+async def _serve_fake_realtime(host: str, port: int, response_frames: int, response_frame_bytes: int):
+    handler = functools.partial(
+        _fake_realtime_handler, response_frames=response_frames, response_frame_bytes=response_frame_bytes,
+    )
+    async with serve(handler, host, port, reuse_port=True, max_size=None):
+        await asyncio.Future()
+
+
+def _fake_realtime_process(host: str, port: int, response_frames: int, response_frame_bytes: int):
+    # wait_for_port() の接続確認（WebSocketハンドシェイクなし）をエラーとして出力しない
+    logging.getLogger('websockets.server').setLevel(logging.CRITICAL)
+    asyncio.run(_serve_fake_realtime(host, port, response_frames, response_frame_bytes))
+
+
+def start_fake_realtime_servers(host: str, port: int, processes: int = 1, response_frames: int = 10,
+                                response_frame_bytes: int = 4800) -> List[multiprocessing.Process]:
+    """
+    疑似Realtimeサーバーを起動（SO_REUSEPORTで同じポートを複数プロセスで待ち受ける）
+
+    Args:
+        response_frames: commitごとに生成する応答の音声delta数
+        response_frame_bytes: 生成する音声deltaのPCMバイト数（デフォルトは24kHzで100ms）
+    """
+    context = multiprocessing.get_context('spawn')
+    servers = []
+    for _ in range(processes):
+        process = context.Process(
+            target=_fake_realtime_process,
+            args=(host, port, response_frames, response_frame_bytes),
+            daemon=True,
+        )
+        process.start()
+        servers.append(process)
+    wait_for_port(host, port)
+    return servers
+
+
+def wait_for_port(host: str, port: int, timeout: float = 30.0):
+    """指定ポートが接続を受け付けるまで待機"""
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            with socket.create_connection((host, port), timeout=1):
+                return
+        except OSError:
+            if time.monotonic() > deadline:
+                raise TimeoutError(f'{host}:{port} に接続できません')
+            time.sleep(0.1)
+
+
+# ---------------------------------------------------------------------------
+# 疑似クライアント
+# ---------------------------------------------------------------------------
+
+def _encode_frame(frame: bytes, audio_format: str):
+    """送信形式に変換（binary: プロキシ経由（ブラウザと同じ）、json: Realtime APIに直接送る場合）"""
+    if audio_format == 'json':
+        return json.dumps({'type': 'input_audio_buffer.append', 'audio': base64.b64encode(frame).decode('ascii')})
+    return frame
+
+
+async def _receive(websocket, size: int, commits: deque, stats: Dict):
+    counters = stats['counters']
+    responses = set()
+    async for message in websocket:
+        if not isinstance(message, str):
+            continue
+        received_at = time.perf_counter()
+        data = json.loads(message)
+        event_type = data.get('type')
+        if event_type == 'response.audio_transcript.delta':
+            counters['transcript_deltas'] += 1
+            continue
+        if event_type != 'response.audio.delta':
+            continue
+
+        if data.get('item_id') != ECHO_ITEM_ID:
+            # 生成された応答: commit送信から最初の音声deltaまでの時間
+            if data.get('response_id') not in responses:
+                responses.add(data.get('response_id'))
+                counters['responses'] += 1
+                if commits:
+                    stats['response_latencies'].append(received_at - commits.popleft())
+            continue
+
+        audio = base64.b64decode(data.get('delta', ''))
+        for offset in range(0, len(audio) - size + 1, size):
+            _, sent_at = FRAME_HEADER.unpack_from(audio, offset)
+            stats['latencies'].append(received_at - sent_at)
+            counters['received'] += 1
+
+
+async def _stream_audio(url: str, duration: float, size: int, interval: float, audio_format: str,
+                        turn_frames: int, stats: Dict):
+    counters = stats['counters']
+    async with connect(url, max_size=None, open_timeout=60) as websocket:
+        # プロキシが上流（疑似サーバー）に接続し終えるまで待つ
+        while True:
+            message = await websocket.recv()
+            if isinstance(message, str) and json.loads(message).get('type') == 'session.created':
+                break
+        counters['connected'] += 1
+
+        commits = deque()
+        receiver = asyncio.create_task(_receive(websocket, size, commits, stats))
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        sequence = 0
+        while started + sequence * interval < started + duration:
+            delay = started + sequence * interval - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            await websocket.send(_encode_frame(make_frame(sequence, size), audio_format))
+            sequence += 1
+            if turn_frames and sequence % turn_frames == 0:
+                # 発話の区切り: 疑似サーバーが応答を生成する
+                commits.append(time.perf_counter())
+                await websocket.send(json.dumps({'type': 'input_audio_buffer.commit'}))
+                counters['commits'] += 1
+        counters['sent'] += sequence
+
+        # 送信済みフレームの折り返しを待つ
+        await asyncio.sleep(1.0)
+        receiver.cancel()
+
+
+async def _run_clients(urls: List[str], duration: float, size: int, interval: float, audio_format: str,
+                       turn_frames: int) -> Dict:
+    stats = {
+        'latencies': [],
+        'response_latencies': [],
+        'counters': dict.fromkeys(COUNTERS, 0),
+    }
+
+    async def run_one(index: int, url: str):
+        # 接続要求が一度に集中しないよう少しずつずらす
+        await asyncio.sleep(index * 0.01)
+        try:
+            await _stream_audio(url, duration, size, interval, audio_format, turn_frames, stats)
+        except Exception:
+            stats['counters']['errors'] += 1
+
+    await asyncio.gather(*(run_one(index, url) for index, url in enumerate(urls)))
+    return stats
+
+
+def _client_process(args) -> Dict:
+    return asyncio.run(_run_clients(*args))
+
+
+def percentile(values: List[float], ratio: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * ratio))]
+
+
+def run_realtime_load(urls: List[str], duration: float, sample_rate: int = 24000, frame_ms: int = 20,
+                      client_processes: int = 1, audio_format: str = 'binary', turn_frames: int = 0) -> Dict:
+    """
+    接続先URLの一覧に対して同時に音声を送信し、スループットと往復遅延を計測
+
+    Args:
+        urls: 接続ごとのWebSocket URL（len(urls)が同時接続数）
+        duration: 各接続で音声を送信する秒数
+        client_processes: 疑似クライアントを実行するプロセス数（クライアント側がボトルネックにならないように分散）
+        audio_format: 音声の送信形式（binary: プロキシ経由、json: 疑似サーバーに直接接続する場合）
+        turn_frames: このフレーム数ごとに input_audio_buffer.commit を送り、応答開始までの遅延を計測（0で送らない）
+    """
+    size = frame_size(sample_rate, frame_ms)
+    interval = frame_ms / 1000
+    client_processes = max(1, min(client_processes, len(urls)))
+    chunks = [urls[index::client_processes] for index in range(client_processes)]
+
+    started = time.perf_counter()
+    with multiprocessing.get_context('spawn').Pool(client_processes) as pool:
+        results = pool.map(
+            _client_process,
+            [(chunk, duration, size, interval, audio_format, turn_frames) for chunk in chunks],
+        )
+    elapsed = time.perf_counter() - started
+
+    latencies = [latency for result in results for latency in result['latencies']]
+    response_latencies = [latency for result in results for latency in result['response_latencies']]
+    summary = {key: sum(result['counters'][key] for result in results) for key in COUNTERS}
+    summary.update({
+        'connections': len(urls),
+        'elapsed': elapsed,
+        'expected_frames_per_sec': len(urls) * 1000 / frame_ms,
+        'frames_per_sec': summary['received'] / duration if duration else 0.0,
+        'loss_rate': 1 - summary['received'] / summary['sent'] if summary['sent'] else 0.0,
+        'latency_p50': percentile(latencies, 0.50),
+        'latency_p95': percentile(latencies, 0.95),
+        'latency_p99': percentile(latencies, 0.99),
+        'latency_mean': statistics.fmean(latencies) if latencies else None,
+        'response_latency_p50': percentile(response_latencies, 0.50),
+        'response_latency_p95': percentile(response_latencies, 0.95),
+    })
+    return summary
+
+
+# ---------------------------------------------------------------------------
+# プロセスのリソース使用量
+# ---------------------------------------------------------------------------
+
+_CLOCK_TICKS = os.sysconf('SC_CLK_TCK') if hasattr(os, 'sysconf') else 100
+
+
+def process_usage(pid: int) -> Tuple[Optional[float], Optional[int]]:
+    """
+    プロセスの累計CPU時間（秒）と常駐メモリ（バイト）を取得
+
+    /proc を参照できない環境では (None, None) を返す
+    """
+    try:
+        with open(f'/proc/{pid}/stat') as f:
+            # 2番目の項目（プロセス名）に空白が含まれる場合があるため、閉じ括弧より後ろを分割する
+            fields = f.read().rsplit(')', 1)[1].split()
+        with open(f'/proc/{pid}/status') as f:
+            rss_kb = next(int(line.split()[1]) for line in f if line.startswith('VmRSS:'))
+    except (OSError, StopIteration, IndexError, ValueError):
+        return None, None
+    cpu_seconds = (int(fields[11]) + int(fields[12])) / _CLOCK_TICKS
+    return cpu_seconds, rss_kb * 1024
+
+
+class PeakMemorySampler(threading.Thread):
+    """計測中のプロセスの常駐メモリを定期的に取得し、プロセスごとの最大値を記録する"""
+
+    def __init__(self, pids: List[int], interval: float = 0.5):
+        super().__init__(daemon=True)
+        self.pids = pids
+        self.interval = interval
+        self.peaks: Dict[int, int] = {}
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.is_set():
+            self._sample()
+            self._stop_event.wait(self.interval)
+
+    def _sample(self):
+        for pid in self.pids:
+            _, rss = process_usage(pid)
+            if rss is not None and rss > self.peaks.get(pid, 0):
+                self.peaks[pid] = rss
+
+    def stop(self) -> int:
+        """計測を終了し、各プロセスの最大値の合計（バイト）を返す"""
+        self._stop_event.set()
+        self.join()
+        self._sample()
+        return sum(self.peaks.values())
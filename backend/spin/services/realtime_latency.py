@@ -0,0 +1,126 @@
+"""
+リアルタイムモードの応答遅延計測
+上流（OpenAI Realtime API）のイベント受信時刻から、ターン（発話終了 → 応答完了）ごとの遅延の内訳を求める
+
+ターンごとの項目（ミリ秒）:
+- vad_commit_ms: 発話終了（input_audio_buffer.speech_stopped）→ 音声確定（input_audio_buffer.committed）
+- response_start_ms: 音声確定 → 応答開始（response.created）
+- first_audio_ms: 発話終了（なければ音声確定・応答開始）→ 最初の音声（response.audio.delta）の受信
+- proxy_delay_ms: 最初の音声の受信 → クライアントへの送信（送信キューでの待ち時間）
+- response_ms: 応答開始 → 応答完了（response.done）
+- upstream_rtt_ms: 応答完了時点の上流WebSocketのping往復時間
+"""
+import statistics
+from typing import Dict, List, Optional
+
+from spin.services import realtime_metrics
+from spin.services.realtime_send_queue import AUDIO_DELTA_TYPES
+
+TURN_METRICS = (
+    'vad_commit_ms', 'response_start_ms', 'first_audio_ms', 'proxy_delay_ms', 'response_ms', 'upstream_rtt_ms',
+)
+
+# セッションに保存するターン数の上限（古いものから捨てる）
+MAX_STORED_TURNS = 200
+
+
+def _ms(start: Optional[float], end: Optional[float]) -> Optional[float]:
+    if start is None or end is None:
+        return None
+    return round((end - start) * 1000, 1)
+
+
+def summarize_turns(turns: List[Dict]) -> Dict:
+    """ターンの一覧から項目ごとの統計（件数・平均・p50・p95・最大）を求める"""
+    summary = {'turns': len(turns)}
+    for name in TURN_METRICS:
+        values = sorted(turn[name] for turn in turns if turn.get(name) is not None)
+        if not values:
+            continue
+        summary[name] = {
+            'count': len(values),
+            'mean': round(statistics.fmean(values), 1),
+            'p50': values[len(values) // 2],
+            'p95': values[min(len(values) - 1, int(len(values) * 0.95))],
+            'max': values[-1],
+        }
+    return summary
+
+
+def merge_session_latency(stored: Optional[Dict], turns: List[Dict]) -> Dict:
+    """Session.realtime_latency に今回の接続のターンを追加し、統計を更新"""
+    all_turns = ((stored or {}).get('turns_detail') or []) + turns
+    all_turns = all_turns[-MAX_STORED_TURNS:]
+    return {
+        'summary': summarize_turns(all_turns),
+        'turns_detail': all_turns,
+    }
+
+
+class TurnLatencyTracker:
+    """接続ごとのターン遅延の計測（時刻は time.monotonic() の値を渡す）"""
+
+    def __init__(self):
+        self.turns: List[Dict] = []
+        self._turn: Optional[Dict] = None
+
+    def _start_turn(self) -> Dict:
+        self._turn = {}
+        return self._turn
+
+    def on_upstream_event(self, event_type: str, now: float, upstream_rtt: Optional[float] = None) -> Optional[Dict]:
+        """
+        上流のイベントを記録
+
+        Returns:
+            ターンが完了した場合はその遅延の内訳
+        """
+        turn = self._turn
+        if event_type == 'input_audio_buffer.speech_stopped':
+            self._start_turn()['speech_stopped'] = now
+        elif event_type == 'input_audio_buffer.committed':
+            # 手動でcommitした場合（発話終了の検出なし）はここからターンを始める
+            if turn is None or 'committed' in turn or 'response_created' in turn:
+                turn = self._start_turn()
+            turn['committed'] = now
+        elif event_type == 'response.created':
+            if turn is None or 'response_created' in turn:
+                turn = self._start_turn()
+            turn['response_created'] = now
+        elif event_type in AUDIO_DELTA_TYPES:
+            if turn is not None and 'first_audio' not in turn:
+                turn['first_audio'] = now
+        elif event_type == 'response.done':
+            if turn is not None and 'response_created' in turn:
+                return self._finish_turn(now, upstream_rtt)
+        return None
+
+    @property
+    def awaiting_first_audio_send(self) -> bool:
+        return self._turn is not None and 'first_audio' in self._turn and 'first_audio_sent' not in self._turn
+
+    def on_first_audio_sent(self, enqueued_at: float, now: float):
+        """最初の音声をクライアントに送信した（enqueued_at は送信キューに入れた時刻）"""
+        if self.awaiting_first_audio_send:
+            self._turn['first_audio_sent'] = now
+            self._turn['first_audio_enqueued'] = enqueued_at
+
+    def _finish_turn(self, now: float, upstream_rtt: Optional[float]) -> Dict:
+        turn = self._turn
+        self._turn = None
+        speech_end = next(
+            (turn[key] for key in ('speech_stopped', 'committed', 'response_created') if key in turn), None
+        )
+        result = {
+            'vad_commit_ms': _ms(turn.get('speech_stopped'), turn.get('committed')),
+            'response_start_ms': _ms(turn.get('committed'), turn.get('response_created')),
+            'first_audio_ms': _ms(speech_end, turn.get('first_audio')),
+            'proxy_delay_ms': _ms(turn.get('first_audio_enqueued'), turn.get('first_audio_sent')),
+            'response_ms': _ms(turn.get('response_created'), now),
+            'upstream_rtt_ms': round(upstream_rtt * 1000, 1) if upstream_rtt else None,
+        }
+        self.turns.append(result)
+        for name, value in result.items():
+            if value is not None:
+                realtime_metrics.observe(f'realtime_{name}', value)
+        return result
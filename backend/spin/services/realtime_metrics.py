@@ -0,0 +1,179 @@
+"""
+リアルタイムモードのメトリクス
+ワーカープロセスごとにカウンター・ゲージを集計し、定期的にキャッシュ（複数ワーカーではRedis）へ書き出す。
+/api/metrics/realtime/ では全ワーカーの値を合算して返す
+
+- カウンター: プロセス起動からの累計（increment）
+- ピーク値: プロセス起動からの最大値（record_max）
+- ゲージ: 接続ごとの現在値（register_connection で登録した関数から取得し、合計と最大を集計）
+- 分布: 遅延などの観測値（observe）。直近 HISTOGRAM_SAMPLES 件から平均・パーセンタイルを求める
+"""
+import asyncio
+import logging
+import os
+import socket
+import statistics
+import threading
+import time
+from collections import defaultdict, deque
+from typing import Callable, Dict, List
+
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+WORKERS_KEY = 'realtime_metrics:workers'
+SNAPSHOT_KEY_PREFIX = 'realtime_metrics:worker:'
+# スナップショットの書き出し間隔と有効期限（秒）。有効期限内に更新のないワーカーは集計から除く
+PUBLISH_INTERVAL = 10
+SNAPSHOT_TTL = 60
+# 分布ごとにプロセス内で保持する観測値の数
+HISTOGRAM_SAMPLES = 500
+
+_lock = threading.Lock()
+_counters: Dict[str, float] = defaultdict(float)
+_peaks: Dict[str, float] = {}
+_connections: Dict[str, Callable[[], Dict[str, float]]] = {}
+_histograms: Dict[str, Dict] = {}
+_publisher_task = None
+_worker_id = f'{socket.gethostname()}:{os.getpid()}'
+
+
+def increment(name: str, value: float = 1):
+    with _lock:
+        _counters[name] += value
+
+
+def record_max(name: str, value: float):
+    with _lock:
+        if value > _peaks.get(name, float('-inf')):
+            _peaks[name] = value
+
+
+def observe(name: str, value: float):
+    with _lock:
+        histogram = _histograms.get(name)
+        if histogram is None:
+            histogram = _histograms[name] = {'count': 0, 'samples': deque(maxlen=HISTOGRAM_SAMPLES)}
+        histogram['count'] += 1
+        histogram['samples'].append(value)
+
+
+def summarize_samples(samples: List[float]) -> Dict:
+    """観測値の平均・パーセンタイル"""
+    if not samples:
+        return {}
+    ordered = sorted(samples)
+    return {
+        'mean': round(statistics.fmean(ordered), 1),
+        'p50': ordered[len(ordered) // 2],
+        'p95': ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))],
+        'p99': ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))],
+        'max': ordered[-1],
+    }
+
+
+def register_connection(key: str, gauges: Callable[[], Dict[str, float]]):
+    """接続のゲージ取得関数を登録（切断時に unregister_connection で解除する）"""
+    with _lock:
+        _connections[key] = gauges
+
+
+def unregister_connection(key: str):
+    with _lock:
+        _connections.pop(key, None)
+
+
+def snapshot() -> Dict:
+    """このプロセスのメトリクス"""
+    with _lock:
+        counters = dict(_counters)
+        peaks = dict(_peaks)
+        connections = list(_connections.values())
+        histograms = {
+            name: {'count': histogram['count'], 'samples': list(histogram['samples'])}
+            for name, histogram in _histograms.items()
+        }
+
+    gauges: Dict[str, Dict[str, float]] = {}
+    for get_gauges in connections:
+        for name, value in get_gauges().items():
+            gauge = gauges.setdefault(name, {'sum': 0, 'max': 0})
+            gauge['sum'] += value
+            gauge['max'] = max(gauge['max'], value)
+
+    return {
+        'worker': _worker_id,
+        'updated_at': time.time(),
+        'connections': len(connections),
+        'counters': counters,
+        'peaks': peaks,
+        'gauges': gauges,
+        'histograms': histograms,
+    }
+
+
+def publish():
+    """このプロセスのスナップショットをキャッシュに書き出す"""
+    now = time.time()
+    cache.set(f'{SNAPSHOT_KEY_PREFIX}{_worker_id}', snapshot(), SNAPSHOT_TTL)
+    workers = cache.get(WORKERS_KEY) or {}
+    workers = {worker: seen for worker, seen in workers.items() if now - seen < SNAPSHOT_TTL}
+    workers[_worker_id] = now
+    cache.set(WORKERS_KEY, workers, None)
+
+
+async def _publish_periodically():
+    while True:
+        try:
+            await sync_to_async(publish, thread_sensitive=False)()
+        except Exception as e:
+            logger.warning(f"リアルタイムメトリクスの書き出しに失敗: {e}")
+        await asyncio.sleep(PUBLISH_INTERVAL)
+
+
+def ensure_publisher():
+    """スナップショットを定期的に書き出すタスクを起動（プロセスごとに1つ、イベントループ内から呼ぶ）"""
+    global _publisher_task
+    if _publisher_task is None or _publisher_task.done():
+        _publisher_task = asyncio.get_running_loop().create_task(_publish_periodically())
+
+
+def collect() -> Dict:
+    """全ワーカーのメトリクスを合算"""
+    workers = cache.get(WORKERS_KEY) or {}
+    snapshots = cache.get_many([f'{SNAPSHOT_KEY_PREFIX}{worker}' for worker in workers])
+    # このプロセスの値は最新のものを使う
+    snapshots[f'{SNAPSHOT_KEY_PREFIX}{_worker_id}'] = snapshot()
+
+    total = {'workers': [], 'connections': 0, 'counters': defaultdict(float), 'peaks': {}, 'gauges': {}}
+    histograms: Dict[str, Dict] = {}
+    for data in snapshots.values():
+        total['workers'].append({
+            'worker': data['worker'],
+            'updated_at': data['updated_at'],
+            'connections': data['connections'],
+        })
+        total['connections'] += data['connections']
+        for name, value in data['counters'].items():
+            total['counters'][name] += value
+        for name, value in data['peaks'].items():
+            total['peaks'][name] = max(total['peaks'].get(name, value), value)
+        for name, gauge in data['gauges'].items():
+            merged = total['gauges'].setdefault(name, {'sum': 0, 'max': 0})
+            merged['sum'] += gauge['sum']
+            merged['max'] = max(merged['max'], gauge['max'])
+        for name, histogram in data.get('histograms', {}).items():
+            merged = histograms.setdefault(name, {'count': 0, 'samples': []})
+            merged['count'] += histogram['count']
+            merged['samples'].extend(histogram['samples'])
+
+    total['counters'] = dict(total['counters'])
+    # 分布は各ワーカーの直近の観測値をまとめて集計する
+    total['histograms'] = {
+        name: {'count': histogram['count'], **summarize_samples(histogram['samples'])}
+        for name, histogram in histograms.items()
+    }
+    total['workers'].sort(key=lambda worker: worker['worker'])
+    return total
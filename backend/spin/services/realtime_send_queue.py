@@ -0,0 +1,200 @@
+"""
+リアルタイムモードのクライアント送信キュー（接続ごと）
+
+上流（OpenAI Realtime API）からのイベントをそのままクライアントに送ると、回線の遅いクライアントでは
+Daphneの送信バッファが際限なく増える。送信前にこのキューを通し、次の方針で上限を設ける:
+
+- フロー制御: クライアントが受信済みメッセージ数（salesmind.ack）を返すようになったら、
+  未確認の送信量が window_bytes を超えている間は送信を止めてキューにためる
+- 音声（response.audio.delta）: 送信待ちの直前のdeltaと同じ出力項目なら1つのdeltaに結合
+  （デコードした音声をbytearrayに追記し、Base64への変換は送信時に1回だけ行う）
+- 文字起こしの途中経過（*.delta）: キューが max_bytes の半分を超えたら破棄（完了イベントに全文が含まれる）
+- キューが max_bytes を超えた状態が overflow_seconds 続くか、max_bytes の2倍を超えたら overflowed を返す
+  （呼び出し側で切断する）
+"""
+import asyncio
+import base64
+import json
+import time
+from collections import deque
+from typing import Optional, Tuple, Union
+
+from spin.services import realtime_metrics
+
+AUDIO_DELTA_TYPES = frozenset({'response.audio.delta', 'response.output_audio.delta'})
+TRANSCRIPT_DELTA_TYPES = frozenset({
+    'response.audio_transcript.delta',
+    'response.output_audio_transcript.delta',
+    'response.text.delta',
+    'response.output_text.delta',
+    'conversation.item.input_audio_transcription.delta',
+})
+
+
+class _Item:
+    __slots__ = ('kind', 'message', 'data', 'audio', 'size', 'enqueued_at')
+
+    def __init__(self, kind: str, message, data: Optional[dict], size: int):
+        self.kind = kind
+        self.message = message
+        self.data = data
+        # 結合した音声（デコード済み）。結合していない場合はNone
+        self.audio = None
+        self.size = size
+        self.enqueued_at = time.monotonic()
+
+
+class RealtimeSendQueue:
+    """クライアントへの送信キュー"""
+
+    def __init__(self, max_bytes: int, window_bytes: int, overflow_seconds: float):
+        self.max_bytes = max_bytes
+        self.window_bytes = window_bytes
+        self.overflow_seconds = overflow_seconds
+
+        self._items = deque()
+        self._wakeup = asyncio.Event()
+        self.pending_bytes = 0
+        self.overflow_since = None
+
+        # フロー制御（クライアントが最初のackを送るまでは無効）
+        self.sent_count = 0
+        self.acked_count = None
+        self._in_flight = deque()
+        self.in_flight_bytes = 0
+
+        self.coalesced = 0
+        self.dropped = 0
+
+    def __len__(self):
+        return len(self._items)
+
+    def put(self, message: Union[str, bytes], data: Optional[dict] = None):
+        """
+        送信するメッセージを追加
+
+        Args:
+            message: 送信するテキストまたはバイナリ
+            data: messageをパースしたイベント（音声の結合・途中経過の破棄の判定に使う）
+        """
+        if isinstance(message, bytes):
+            kind = 'bytes'
+        else:
+            event_type = data.get('type') if data else None
+            kind = 'audio' if event_type in AUDIO_DELTA_TYPES else 'transcript' if event_type in TRANSCRIPT_DELTA_TYPES else 'text'
+
+        if kind == 'transcript' and self.pending_bytes > self.max_bytes // 2:
+            self._count_dropped(1)
+            return
+
+        if kind == 'audio' and self._items and self._coalesce(self._items[-1], data):
+            pass
+        else:
+            self._items.append(_Item(kind, message, data if kind == 'audio' else None, len(message)))
+            self.pending_bytes += len(message)
+
+        if self.pending_bytes > self.max_bytes // 2:
+            self._drop_transcript_deltas()
+
+        if self.pending_bytes > self.max_bytes:
+            if self.overflow_since is None:
+                self.overflow_since = time.monotonic()
+        else:
+            self.overflow_since = None
+
+        realtime_metrics.record_max('send_queue_depth_peak', len(self._items))
+        realtime_metrics.record_max('send_queue_bytes_peak', self.pending_bytes)
+        self._wakeup.set()
+
+    def _coalesce(self, last: _Item, data: dict) -> bool:
+        """送信待ちの音声deltaに結合（同じ出力項目の場合のみ）"""
+        if last.kind != 'audio':
+            return False
+        if (last.data.get('item_id'), last.data.get('content_index')) != (data.get('item_id'), data.get('content_index')):
+            return False
+
+        if last.audio is None:
+            last.audio = bytearray(base64.b64decode(last.data.get('delta', '')))
+            last.message = None
+        last.audio += base64.b64decode(data.get('delta', ''))
+        # 結合後のサイズはBase64の長さで見積もる（送信時にBase64・JSONへ変換する）
+        size = (len(last.audio) + 2) // 3 * 4 + 200
+        self.pending_bytes += size - last.size
+        last.size = size
+        self.coalesced += 1
+        realtime_metrics.increment('send_audio_deltas_coalesced')
+        return True
+
+    def _drop_transcript_deltas(self):
+        kept = deque(item for item in self._items if item.kind != 'transcript')
+        dropped = len(self._items) - len(kept)
+        if dropped:
+            self.pending_bytes -= sum(item.size for item in self._items if item.kind == 'transcript')
+            self._items = kept
+            self._count_dropped(dropped)
+
+    def _count_dropped(self, count: int):
+        self.dropped += count
+        realtime_metrics.increment('send_transcript_deltas_dropped', count)
+
+    @property
+    def overflowed(self) -> bool:
+        """上限超過が続いている（または大きく超えた）か"""
+        if self.pending_bytes > self.max_bytes * 2:
+            return True
+        return self.overflow_since is not None and time.monotonic() - self.overflow_since >= self.overflow_seconds
+
+    def _window_full(self) -> bool:
+        return self.acked_count is not None and self.in_flight_bytes >= self.window_bytes
+
+    async def get(self) -> Tuple[Union[str, bytes], str, float]:
+        """
+        次に送信するメッセージを取得（キューが空、またはフロー制御の上限に達している間は待機）
+
+        Returns:
+            (メッセージ, 種類（audio / transcript / text / bytes）, キューに入れた時刻（time.monotonic()）)
+        """
+        while not self._items or self._window_full():
+            self._wakeup.clear()
+            await self._wakeup.wait()
+
+        item = self._items.popleft()
+        self.pending_bytes -= item.size
+        if self.pending_bytes <= self.max_bytes:
+            self.overflow_since = None
+
+        message = item.message
+        if message is None:
+            item.data['delta'] = base64.b64encode(item.audio).decode('ascii')
+            message = json.dumps(item.data)
+        self._mark_sent(len(message))
+        return message, item.kind, item.enqueued_at
+
+    def _mark_sent(self, size: int):
+        self.sent_count += 1
+        if self.acked_count is not None:
+            self._in_flight.append(size)
+            self.in_flight_bytes += size
+
+    def ack(self, received: int):
+        """クライアントが受信済みのメッセージ数（累計）を反映"""
+        if not isinstance(received, int) or received < 0:
+            return
+        if self.acked_count is None:
+            # 最初のackでフロー制御を開始（それまでに送信した未確認分はサイズ不明のため0として扱う）
+            self.acked_count = min(received, self.sent_count)
+            self._in_flight.extend([0] * (self.sent_count - self.acked_count))
+        else:
+            received = min(received, self.sent_count)
+            while self.acked_count < received and self._in_flight:
+                self.in_flight_bytes -= self._in_flight.popleft()
+                self.acked_count += 1
+        self._wakeup.set()
+
+    def gauges(self):
+        """メトリクス用の現在値"""
+        return {
+            'send_queue_depth': len(self._items),
+            'send_queue_bytes': self.pending_bytes,
+            'send_in_flight_bytes': self.in_flight_bytes,
+        }
@@ -0,0 +1,269 @@
+"""
+セッションスコアカードサービス
+会話のターンごとにスコアリング用の特徴量を集計し、Session.scorecardに保存する。
+セッション終了時のスコアリングは会話全文ではなく、このスコアカードと主要な発言の抜粋を使う
+（会話が長くなってもスコアリングのトークン数・待ち時間が増えないようにするため）
+"""
+import logging
+from typing import Dict, List, Optional
+
+from spin.services.message_archive import get_message_counts, get_session_messages
+
+logger = logging.getLogger(__name__)
+
+SCORECARD_VERSION = 1
+
+# 抜粋に含める発言の最大文字数
+EXCERPT_MAX_CHARS = 200
+# 成功率変動の大きい発言を抜粋に残す数
+MAX_HIGHLIGHTS = 4
+# 直近の発言を抜粋に残す数
+MAX_RECENT = 2
+# 営業とは関係ない話題の例を残す数
+MAX_IRRELEVANT_EXAMPLES = 3
+
+# 営業とは関係ない話題のキーワード
+IRRELEVANT_KEYWORDS = [
+    'トイレ', 'お手洗い', '便所', '化粧室',
+    '天気', '雨', '晴れ', '気温',
+    'ランチ', '昼食', '食事', 'ご飯',
+    '趣味', 'スポーツ', '映画', '音楽',
+    'プライベート', '家族', '友人',
+    '今日の', '昨日の', '明日の',
+]
+
+# 顧客の前向きな反応のキーワード
+POSITIVE_KEYWORDS = ['興味', '詳しく', 'デモ', '体験', '導入', '価値', '検討', 'メリット']
+
+# 商談前進（デモ・体験・資料など）のキーワード
+ADVANCEMENT_KEYWORDS = ['デモ', '体験', 'トライアル', '資料', '見積', '導入', '打ち合わせ', '商談']
+
+SPIN_STAGES = ['S', 'P', 'I', 'N']
+
+
+def empty_scorecard() -> Dict:
+    """空のスコアカードを作成"""
+    return {
+        'version': SCORECARD_VERSION,
+        'message_count': 0,
+        'turns': 0,
+        'questions': 0,
+        'analyzed_turns': 0,
+        'success_delta_total': 0,
+        'positive_turns': 0,
+        'negative_turns': 0,
+        'spin_counts': {stage: 0 for stage in SPIN_STAGES},
+        'stage_evaluations': {},
+        'irrelevant_turns': 0,
+        'irrelevant_examples': [],
+        'customer_positive_responses': 0,
+        'advancement_signals': 0,
+        'last_temperature': None,
+        'max_temperature': None,
+        'opening': None,
+        'highlights': [],
+        'recent': [],
+        'pending': None,
+    }
+
+
+def is_irrelevant_message(session, message: str) -> bool:
+    """営業担当者の発言が営業とは関係ない話題かどうか"""
+    message_text = message.lower()
+    for keyword in IRRELEVANT_KEYWORDS:
+        if keyword in message_text:
+            # 業界・価値提案・顧客の課題と関連性があるかチェック
+            if session.industry and session.industry.lower() in message_text:
+                return False
+            if session.value_proposition and session.value_proposition.lower() in message_text:
+                return False
+            if session.customer_pain and session.customer_pain.lower() in message_text:
+                return False
+            return True
+    return False
+
+
+def _commit_excerpt(scorecard: Dict, excerpt: Dict):
+    """完了したターンの抜粋を冒頭・重要・直近の各枠に振り分ける"""
+    if scorecard['opening'] is None:
+        scorecard['opening'] = excerpt
+
+    scorecard['recent'] = (scorecard['recent'] + [excerpt])[-MAX_RECENT:]
+
+    if excerpt.get('delta') is not None:
+        highlights = scorecard['highlights'] + [excerpt]
+        highlights.sort(key=lambda item: abs(item['delta']), reverse=True)
+        scorecard['highlights'] = highlights[:MAX_HIGHLIGHTS]
+
+
+def apply_message(scorecard: Optional[Dict], session, msg) -> Dict:
+    """
+    1件のメッセージをスコアカードに反映
+
+    Args:
+        scorecard: 現在のスコアカード（Noneの場合は新規作成）
+        session: Sessionインスタンス
+        msg: ChatMessageインスタンス（営業メッセージは分析結果の保存後に渡す）
+
+    Returns:
+        更新後のスコアカード
+    """
+    if not scorecard or scorecard.get('version') != SCORECARD_VERSION:
+        scorecard = empty_scorecard()
+
+    scorecard['message_count'] += 1
+    text = msg.message or ''
+
+    if msg.role == 'salesperson':
+        if scorecard['pending']:
+            _commit_excerpt(scorecard, scorecard['pending'])
+
+        scorecard['turns'] += 1
+        if '?' in text or '？' in text:
+            scorecard['questions'] += 1
+
+        # 保存前のインスタンスでは小数のことがあるため、DB保存時と同じく整数に丸める
+        success_delta = int(msg.success_delta) if msg.success_delta is not None else None
+        if success_delta is not None:
+            scorecard['analyzed_turns'] += 1
+            scorecard['success_delta_total'] += success_delta
+            if success_delta > 0:
+                scorecard['positive_turns'] += 1
+            elif success_delta < 0:
+                scorecard['negative_turns'] += 1
+        if msg.spin_stage in SPIN_STAGES:
+            scorecard['spin_counts'][msg.spin_stage] += 1
+        if msg.stage_evaluation:
+            evaluations = scorecard['stage_evaluations']
+            evaluations[msg.stage_evaluation] = evaluations.get(msg.stage_evaluation, 0) + 1
+
+        if is_irrelevant_message(session, text):
+            scorecard['irrelevant_turns'] += 1
+            if len(scorecard['irrelevant_examples']) < MAX_IRRELEVANT_EXAMPLES:
+                scorecard['irrelevant_examples'].append(text[:EXCERPT_MAX_CHARS])
+
+        scorecard['pending'] = {
+            'sequence': msg.sequence,
+            'salesperson': text[:EXCERPT_MAX_CHARS],
+            'customer': None,
+            'delta': success_delta,
+            'stage': msg.spin_stage,
+            'evaluation': msg.stage_evaluation,
+        }
+    else:
+        if any(keyword in text for keyword in POSITIVE_KEYWORDS):
+            scorecard['customer_positive_responses'] += 1
+        if any(keyword in text for keyword in ADVANCEMENT_KEYWORDS):
+            scorecard['advancement_signals'] += 1
+        if msg.temperature_score is not None:
+            scorecard['last_temperature'] = msg.temperature_score
+            if scorecard['max_temperature'] is None or msg.temperature_score > scorecard['max_temperature']:
+                scorecard['max_temperature'] = msg.temperature_score
+        if scorecard['pending'] and scorecard['pending']['customer'] is None:
+            scorecard['pending']['customer'] = text[:EXCERPT_MAX_CHARS]
+
+    return scorecard
+
+
+def record_turn(session, *messages):
+    """
+    ターンのメッセージをセッションのスコアカードに反映して保存
+
+    Args:
+        session: Sessionインスタンス
+        messages: 反映するChatMessage（保存順）
+    """
+    try:
+        scorecard = session.scorecard
+        for msg in messages:
+            if msg is not None:
+                scorecard = apply_message(scorecard, session, msg)
+        session.scorecard = scorecard
+        session.save(update_fields=['scorecard'])
+    except Exception as e:
+        # スコアカードは終了時に再構築できるため、会話は止めない
+        logger.warning(f"スコアカードの更新に失敗しました: Session {session.id}, Error: {e}", exc_info=True)
+
+
+def build_scorecard(session, conversation_history) -> Dict:
+    """保存済みのメッセージからスコアカードを再構築"""
+    scorecard = empty_scorecard()
+    for msg in conversation_history:
+        scorecard = apply_message(scorecard, session, msg)
+    return scorecard
+
+
+def get_scorecard(session, message_count: Optional[int] = None) -> Dict:
+    """
+    スコアリング用のスコアカードを取得
+
+    保存済みのスコアカードが全メッセージを反映していない場合（機能導入前のセッションなど）は、
+    保存済みメッセージの分析結果から再構築して保存する（LLM呼び出しは行わない）。
+
+    Args:
+        session: Sessionインスタンス
+        message_count: セッションのメッセージ数（省略時はアーカイブ済みのメッセージを含めてDBから取得）
+    """
+    if message_count is None:
+        message_count = get_message_counts([session.pk]).get(session.pk, 0)
+
+    scorecard = session.scorecard
+    if scorecard and scorecard.get('version') == SCORECARD_VERSION and scorecard.get('message_count') == message_count:
+        return scorecard
+
+    logger.info(f"スコアカードを再構築します: Session {session.id}, messages={message_count}")
+    scorecard = build_scorecard(session, get_session_messages(session))
+    session.scorecard = scorecard
+    session.save(update_fields=['scorecard'])
+    return scorecard
+
+
+def get_key_excerpts(scorecard: Dict) -> List[Dict]:
+    """スコアカードから主要な発言の抜粋（冒頭・成功率変動の大きい発言・直近）を取り出す"""
+    candidates = [scorecard.get('opening')] + scorecard.get('highlights', []) + scorecard.get('recent', []) + [scorecard.get('pending')]
+    excerpts = {}
+    for excerpt in candidates:
+        if excerpt:
+            excerpts[excerpt['sequence']] = excerpt
+    return [excerpts[sequence] for sequence in sorted(excerpts)]
+
+
+def format_scorecard(scorecard: Dict) -> str:
+    """スコアカードをプロンプト用のテキストに変換"""
+    lines = [
+        f"- 営業担当者の発言数: {scorecard['turns']}（うち質問: {scorecard['questions']}）",
+    ]
+    if scorecard['analyzed_turns']:
+        lines.append(
+            f"- ターンごとの成功率変動: 合計 {scorecard['success_delta_total']:+d}"
+            f"（プラス {scorecard['positive_turns']} 回 / マイナス {scorecard['negative_turns']} 回 / 分析済み {scorecard['analyzed_turns']} ターン）"
+        )
+        spin_counts = scorecard['spin_counts']
+        lines.append("- SPIN段階別の発言数: " + " / ".join(f"{stage}: {spin_counts.get(stage, 0)}" for stage in SPIN_STAGES))
+        if scorecard['stage_evaluations']:
+            lines.append("- 段階評価: " + " / ".join(f"{key}: {value}" for key, value in scorecard['stage_evaluations'].items()))
+    lines.append(f"- 顧客の前向きな反応: {scorecard['customer_positive_responses']} 回")
+    lines.append(f"- 商談前進（デモ・体験・資料など）に関する顧客の発言: {scorecard['advancement_signals']} 回")
+    if scorecard['last_temperature'] is not None:
+        lines.append(f"- 顧客の温度感: 最終 {scorecard['last_temperature']:.0f} / 最高 {scorecard['max_temperature']:.0f}")
+    lines.append(f"- 営業とは関係ない話題: {scorecard['irrelevant_turns']} 回")
+    return "\n".join(lines)
+
+
+def format_key_excerpts(scorecard: Dict) -> str:
+    """主要な発言の抜粋をプロンプト用のテキストに変換"""
+    blocks = []
+    for excerpt in get_key_excerpts(scorecard):
+        header = f"[発言#{excerpt['sequence']}"
+        if excerpt.get('stage'):
+            header += f" 段階={excerpt['stage']}"
+        if excerpt.get('evaluation'):
+            header += f" 評価={excerpt['evaluation']}"
+        if excerpt.get('delta') is not None:
+            header += f" 成功率変動={excerpt['delta']:+d}"
+        header += "]"
+        block = [header, f"営業担当者: {excerpt['salesperson']}"]
+        if excerpt.get('customer'):
+            block.append(f"顧客: {excerpt['customer']}")
+        blocks.append("\n".join(block))
+    return "\n\n".join(blocks)
@@ -2,13 +2,27 @@
 スコアリング用プロンプトテンプレート
 """
 import os
+import hashlib
 import logging
 from typing import Tuple
 from spin.services.ai_provider_factory import AIProviderFactory
+from spin.services.company_brief import get_company_brief
+from spin.services.scorecard import get_scorecard, format_scorecard, format_key_excerpts
 from spin.models import AIModel
 
 logger = logging.getLogger(__name__)
 
+# スコアリングプロンプトのバージョン（プロンプト・評価基準を変更したら上げる。再スコアリングの判定に使用）
+SCORING_PROMPT_VERSION = "2"
+
+
+def compute_transcript_hash(conversation_history) -> str:
+    """会話履歴のハッシュ値を計算（再スコアリングの要否判定に使用）"""
+    digest = hashlib.sha256()
+    for msg in conversation_history:
+        digest.update(f"{msg.sequence}\x1f{msg.role}\x1f{msg.message}\x1e".encode('utf-8'))
+    return digest.hexdigest()
+
 def get_client_and_model_for_scoring() -> Tuple:
     """スコアリング用のクライアントとモデルを取得（新しいシステム）"""
     client, model = AIProviderFactory.get_client_and_model_for_purpose('scoring')
@@ -17,57 +31,30 @@ def get_client_and_model_for_scoring() -> Tuple:
     return client, model
 
 
-def score_conversation(session, conversation_history):
-    """会話履歴を分析してスコアリングを実行"""
-    logger.info(f"スコアリング開始: Session {session.id}, mode={session.mode}, メッセージ数: {len(conversation_history)}")
+def build_scoring_request(session, conversation_history):
+    """
+    スコアリング用のクライアント・モデル・メッセージを構築
     
+    Returns:
+        (client, model, messages, kwargs) のタプル
+    """
     # スコアリング用のAPIキーとモデルを取得
     client, model = get_client_and_model_for_scoring()
     model_name = model.model_id
     logger.info(f"スコアリング使用モデル: {model.provider} / {model_name}")
-    # 会話履歴をテキスト形式に変換
-    conversation_text = ""
-    irrelevant_topics = []  # 営業とは関係ない話題を記録
-    
-    # 営業とは関係ない話題のキーワード
-    irrelevant_keywords = [
-        'トイレ', 'お手洗い', '便所', '化粧室',
-        '天気', '雨', '晴れ', '気温',
-        'ランチ', '昼食', '食事', 'ご飯',
-        '趣味', 'スポーツ', '映画', '音楽',
-        'プライベート', '家族', '友人',
-        '今日の', '昨日の', '明日の',
-    ]
-    
-    for msg in conversation_history:
-        role_name = "営業担当者" if msg.role == 'salesperson' else "顧客"
-        message_text = msg.message.lower()
-        
-        # 営業担当者の発言で、営業とは関係ない話題を検出
-        if msg.role == 'salesperson':
-            for keyword in irrelevant_keywords:
-                if keyword in message_text:
-                    # 業界・価値提案・顧客の課題と関連性があるかチェック
-                    is_irrelevant = True
-                    if session.industry and session.industry.lower() in message_text:
-                        is_irrelevant = False
-                    if session.value_proposition and session.value_proposition.lower() in message_text:
-                        is_irrelevant = False
-                    if session.customer_pain and session.customer_pain.lower() in message_text:
-                        is_irrelevant = False
-                    
-                    if is_irrelevant:
-                        irrelevant_topics.append(f"「{msg.message}」")
-                        break
-        
-        conversation_text += f"{role_name}: {msg.message}\n"
+    # 会話全文の代わりに、ターンごとに集計したスコアカードと主要な発言の抜粋を使う
+    # （会話が長くなってもプロンプトのトークン数が増えないようにするため）
+    scorecard = get_scorecard(session, message_count=len(conversation_history))
+    scorecard_text = format_scorecard(scorecard)
+    excerpts_text = format_key_excerpts(scorecard)
     
     # 営業とは関係ない話題の警告文を準備
     irrelevant_warning = ""
-    if irrelevant_topics:
+    if scorecard['irrelevant_examples']:
+        irrelevant_topics = [f"「{example}」" for example in scorecard['irrelevant_examples']]
         irrelevant_warning = f"""
 【重要：営業とは関係ない話題の検出】
-以下の営業担当者の発言は、営業商談とは明らかに関係ない話題です：
+以下の営業担当者の発言は、営業商談とは明らかに関係ない話題です（計{scorecard['irrelevant_turns']}回）：
 {chr(10).join(irrelevant_topics)}
 
 これらの発言は営業スキルとして評価すべきではありません。大幅な減点を適用してください。
@@ -75,21 +62,8 @@ def score_conversation(session, conversation_history):
     
     # 企業情報を取得（詳細診断モードの場合）
     company_info_text = ""
-    if session.mode == 'detailed' and session.company:
-        company = session.company
-        company_lines = []
-        company_lines.append(f"企業名: {company.company_name}")
-        if company.industry:
-            company_lines.append(f"業界: {company.industry}")
-        if company.business_description:
-            company_lines.append(f"事業内容: {company.business_description}")
-        if company.location:
-            company_lines.append(f"所在地: {company.location}")
-        if company.employee_count:
-            company_lines.append(f"従業員数: {company.employee_count}")
-        if company.established_year:
-            company_lines.append(f"設立年: {company.established_year}")
-        company_info_text = "\n".join(company_lines)
+    if session.mode == 'detailed' and session.company_id:
+        company_info_text = get_company_brief(session)
     
     # 企業情報セクションを準備（f-stringの制限を回避するため）
     company_info_section = ""
@@ -119,8 +93,12 @@ def score_conversation(session, conversation_history):
 {company_info_section}
 注意: {company_info_note}
 
-会話履歴:
-{conversation_text}
+会話スコアカード（ターンごとの分析結果の集計）:
+{scorecard_text}
+
+主要な発言の抜粋（冒頭・成功率変動の大きい発言・直近）:
+{excerpts_text}
+注意: 会話全文ではなく、上記のスコアカードと発言の抜粋をもとに評価してください。
 
 {irrelevant_warning}
 
@@ -231,27 +209,37 @@ def score_conversation(session, conversation_history):
 }}
 """
     
+    messages = [
+        {"role": "system", "content": "あなたは営業スキル評価の専門家です。必ずJSON形式で回答してください。"},
+        {"role": "user", "content": prompt},
+    ]
+    
+    # response_formatは一部のモデルのみサポート（gpt-4-turbo, gpt-4o, gpt-3.5-turbo-1106以降など）
+    # gpt-4（旧モデル）ではサポートされていないため、条件付きで使用
+    kwargs = {}
+    # モデルIDで判定（response_formatをサポートするモデルのみ）
+    supports_json_mode = any(
+        model_id in model.model_id.lower() 
+        for model_id in ['gpt-4-turbo', 'gpt-4o', 'gpt-3.5-turbo-1106', 'gpt-3.5-turbo-0125', 'gpt-4-0125', 'gpt-4-1106']
+    )
+    
+    if supports_json_mode:
+        kwargs['response_format'] = {"type": "json_object"}
+    else:
+        # response_formatが使えない場合は、プロンプトでJSON形式を強く要求
+        messages[0]["content"] = "あなたは営業スキル評価の専門家です。必ずJSON形式で回答してください。他の形式は一切使用しないでください。"
+    
+    return client, model, messages, kwargs
+
+
+def score_conversation(session, conversation_history):
+    """会話履歴を分析してスコアリングを実行"""
+    logger.info(f"スコアリング開始: Session {session.id}, mode={session.mode}, メッセージ数: {len(conversation_history)}")
+    
+    client, model, messages, kwargs = build_scoring_request(session, conversation_history)
+    model_name = model.model_id
+    
     try:
-        messages = [
-            {"role": "system", "content": "あなたは営業スキル評価の専門家です。必ずJSON形式で回答してください。"},
-            {"role": "user", "content": prompt},
-        ]
-        
-        # response_formatは一部のモデルのみサポート（gpt-4-turbo, gpt-4o, gpt-3.5-turbo-1106以降など）
-        # gpt-4（旧モデル）ではサポートされていないため、条件付きで使用
-        kwargs = {}
-        # モデルIDで判定（response_formatをサポートするモデルのみ）
-        supports_json_mode = any(
-            model_id in model.model_id.lower() 
-            for model_id in ['gpt-4-turbo', 'gpt-4o', 'gpt-3.5-turbo-1106', 'gpt-3.5-turbo-0125', 'gpt-4-0125', 'gpt-4-1106']
-        )
-        
-        if supports_json_mode:
-            kwargs['response_format'] = {"type": "json_object"}
-        else:
-            # response_formatが使えない場合は、プロンプトでJSON形式を強く要求
-            messages[0]["content"] = "あなたは営業スキル評価の専門家です。必ずJSON形式で回答してください。他の形式は一切使用しないでください。"
-        
         response_content, usage = client.chat_completion(
             model=model,
             messages=messages,
@@ -272,3 +260,26 @@ def score_conversation(session, conversation_history):
         logger.error(f"スコアリングエラー: Session {session.id}, Error: {str(e)}", exc_info=True)
         raise
 
+
+def score_conversation_stream(session, conversation_history):
+    """
+    会話履歴を分析してスコアリングを実行（ストリーミング版）
+    
+    Yields:
+        str: スコアリング結果（JSON文字列）のチャンク
+    """
+    logger.info(f"スコアリング開始（ストリーミング）: Session {session.id}, mode={session.mode}, メッセージ数: {len(conversation_history)}")
+    
+    client, model, messages, kwargs = build_scoring_request(session, conversation_history)
+    
+    try:
+        yield from client.chat_completion_stream(
+            model=model,
+            messages=messages,
+            temperature=0.7,
+            **kwargs
+        )
+        logger.info(f"スコアリング完了（ストリーミング）: Session {session.id}, provider={model.provider}, model={model.model_id}")
+    except Exception as e:
+        logger.error(f"スコアリングエラー（ストリーミング）: Session {session.id}, Error: {str(e)}", exc_info=True)
+        raise
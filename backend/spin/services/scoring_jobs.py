@@ -0,0 +1,308 @@
+"""
+スコアリングジョブサービス
+セッション終了時のスコアリングをバックグラウンドで実行し、
+生成途中のフィードバックをジョブに書き込む（ポーリング・SSEで参照）
+"""
+import json
+import logging
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, close_old_connections, connection, transaction
+from django.utils import timezone
+
+from spin.models import Report, ScoringJob
+from spin.services.message_archive import get_session_messages
+from spin.services.ranking import get_session_rank, update_ranking_entry
+from spin.services.scoring import SCORING_PROMPT_VERSION, compute_transcript_hash, score_conversation_stream
+
+logger = logging.getLogger(__name__)
+
+# 生成途中のフィードバックをDBに書き込む間隔（秒）
+PARTIAL_FEEDBACK_FLUSH_INTERVAL = 0.5
+
+_executor = ThreadPoolExecutor(
+    max_workers=getattr(settings, 'SCORING_JOB_MAX_WORKERS', 4),
+    thread_name_prefix='scoring-job',
+)
+
+_FEEDBACK_KEY_PATTERN = re.compile(r'"feedback"\s*:\s*"')
+_JSON_ESCAPES = {'"': '"', '\\': '\\', '/': '/', 'b': '\b', 'f': '\f', 'n': '\n', 'r': '\r', 't': '\t'}
+
+
+def extract_partial_feedback(buffer: str) -> str:
+    """
+    生成途中のJSON文字列から "feedback" の値（途中まで）を取り出す
+
+    Args:
+        buffer: これまでに受信したJSON文字列
+
+    Returns:
+        デコード済みのフィードバック文（まだ出現していない場合は空文字）
+    """
+    match = _FEEDBACK_KEY_PATTERN.search(buffer)
+    if not match:
+        return ""
+
+    chars = []
+    i = match.end()
+    while i < len(buffer):
+        ch = buffer[i]
+        if ch == '"':
+            break
+        if ch != '\\':
+            chars.append(ch)
+            i += 1
+            continue
+        # エスケープシーケンス（途中で切れている場合はそこで打ち切る）
+        if i + 1 >= len(buffer):
+            break
+        escape = buffer[i + 1]
+        if escape == 'u':
+            hex_digits = buffer[i + 2:i + 6]
+            if len(hex_digits) < 4:
+                break
+            try:
+                chars.append(chr(int(hex_digits, 16)))
+            except ValueError:
+                pass
+            i += 6
+            continue
+        chars.append(_JSON_ESCAPES.get(escape, escape))
+        i += 2
+    return "".join(chars)
+
+
+def build_spin_scores(scores_data: dict) -> dict:
+    """スコアリング結果からReport.spin_scoresを構築"""
+    # 新しい5要素スコアリングに対応
+    # 後方互換性のため、SPIN要素も含める
+    return {
+        "total": scores_data.get("total", 0),
+        # 新しい5要素スコア
+        "exploration": scores_data.get("exploration", 0),
+        "implication": scores_data.get("implication", 0),
+        "value_proposition": scores_data.get("value_proposition", 0),
+        "customer_response": scores_data.get("customer_response", 0),
+        "advancement": scores_data.get("advancement", 0),
+        # 後方互換性のためSPIN要素も含める
+        "situation": scores_data.get("situation", scores_data.get("exploration", 0) // 2),
+        "problem": scores_data.get("problem", scores_data.get("exploration", 0) // 2),
+        "implication_legacy": scores_data.get("implication", 0),
+        "need": scores_data.get("need", scores_data.get("value_proposition", 0))
+    }
+
+
+def save_scoring_report(session, scores_data: dict, transcript_hash: str = '') -> Report:
+    """
+    スコアリング結果をReportとして保存し、セッションを終了状態にする
+
+    Args:
+        session: Sessionインスタンス
+        scores_data: スコアリング結果（JSONをパースした辞書）
+        transcript_hash: スコアリングした会話履歴のハッシュ値
+
+    Returns:
+        作成したReport（同時に実行された別のスコアリングが先に保存していた場合は、そのReport）
+    """
+    # トランザクション内でデータを確実に保存
+    with transaction.atomic():
+        try:
+            with transaction.atomic():
+                report = Report.objects.create(
+                    session=session,
+                    spin_scores=build_spin_scores(scores_data),
+                    feedback=scores_data.get("feedback", ""),
+                    next_actions=scores_data.get("next_actions", ""),
+                    scoring_details=scores_data.get("scoring_details", {}),
+                    transcript_hash=transcript_hash,
+                    prompt_version=SCORING_PROMPT_VERSION
+                )
+        except IntegrityError:
+            report = Report.objects.filter(session=session).first()
+            if report is None:
+                raise
+            # 既に保存済みのレポートを結果とする（セッションは先に保存した側で終了済み）
+            session.refresh_from_db(fields=['status', 'finished_at'])
+            logger.info(f"Report already exists for session: {session.id}, report_id: {report.id}")
+            return report
+
+        # セッションを終了状態に更新
+        session.status = 'finished'
+        session.finished_at = timezone.now()
+        session.save()
+
+        # ランキングエントリを更新（ランキングAPIはこのテーブルのみを参照する）
+        update_ranking_entry(session, report)
+
+    logger.info(f"Session finished and scored: {session.id}, total_score: {report.spin_scores.get('total', 0)}, report_id: {report.id}")
+    return report
+
+
+def build_finish_payload(session, report) -> dict:
+    """セッション終了レスポンス（スコアリング結果と順位）を構築"""
+    try:
+        ranking = get_session_rank(session)
+    except Exception as e:
+        # 順位はおまけの情報のため、取得できなくてもスコアリング結果は返す
+        logger.warning(f"順位の取得に失敗しました: Session {session.id}, Error: {e}", exc_info=True)
+        ranking = None
+
+    return {
+        "session_id": str(session.id),
+        "report_id": report.id,
+        "status": "finished",
+        "finished_at": session.finished_at.isoformat() if session.finished_at else None,
+        "spin_scores": report.spin_scores,
+        "feedback": report.feedback,
+        "next_actions": report.next_actions,
+        "ranking": ranking
+    }
+
+
+def serialize_job(job: ScoringJob) -> dict:
+    """ジョブの状態をレスポンス用の辞書に変換"""
+    data = {
+        "job_id": str(job.id),
+        "session_id": str(job.session_id),
+        "status": job.status,
+        "partial_feedback": job.partial_feedback,
+        "error": job.error,
+        "created_at": job.created_at.isoformat() if job.created_at else None,
+        "started_at": job.started_at.isoformat() if job.started_at else None,
+        "finished_at": job.finished_at.isoformat() if job.finished_at else None,
+    }
+    if job.status == 'completed' and job.report_id:
+        data["result"] = build_finish_payload(job.session, job.report)
+    return data
+
+
+def _is_stale(job: ScoringJob) -> bool:
+    """実行中のままワーカーが停止したジョブかどうか"""
+    stale_seconds = getattr(settings, 'SCORING_JOB_STALE_SECONDS', 300)
+    return job.status in ('pending', 'running') and job.updated_at < timezone.now() - timedelta(seconds=stale_seconds)
+
+
+def start_scoring_job(session):
+    """
+    セッションのスコアリングジョブを開始（冪等）
+
+    既に実行中・完了済みのジョブがあればそれを返し、2回目のスコアリング呼び出しは行わない。
+    失敗したジョブ、またはワーカー停止で止まったジョブのみ再実行する。
+
+    Args:
+        session: Sessionインスタンス
+
+    Returns:
+        (ScoringJob, 新たに実行を開始したかどうか) のタプル
+    """
+    try:
+        with transaction.atomic():
+            job, created = ScoringJob.objects.get_or_create(session=session)
+    except IntegrityError:
+        # 同時に終了ボタンが押された場合は、先に作成されたジョブにアタッチする
+        job, created = ScoringJob.objects.get(session=session), False
+
+    if not created:
+        if job.status == 'failed' or _is_stale(job):
+            # 状態が変わっていない場合のみ再実行（同時リクエストでの二重実行を防ぐ）
+            requeued = ScoringJob.objects.filter(pk=job.pk, status=job.status, updated_at=job.updated_at).update(
+                status='pending', error=None, partial_feedback='', updated_at=timezone.now()
+            )
+            if not requeued:
+                job.refresh_from_db()
+                return job, False
+            logger.info(f"スコアリングジョブを再実行します: job={job.id}, previous_status={job.status}")
+            job.refresh_from_db()
+        else:
+            return job, False
+
+    job_id = job.id
+    transaction.on_commit(lambda: _executor.submit(run_scoring_job, job_id))
+    logger.info(f"スコアリングジョブを登録しました: job={job.id}, session={session.id}")
+    return job, True
+
+
+def _complete_job(job_id, report):
+    ScoringJob.objects.filter(pk=job_id).update(
+        status='completed',
+        report=report,
+        partial_feedback=report.feedback,
+        finished_at=timezone.now(),
+        updated_at=timezone.now(),
+    )
+
+
+def run_scoring_job(job_id):
+    """
+    スコアリングジョブを実行（ワーカースレッドで呼び出される）
+
+    待機中のジョブを実行中に変更できた実行（started_atで識別する）だけがスコアリングを行う。
+    再実行で同じジョブが二重に登録された場合や、停止と判定されて別の実行に引き継がれた場合は途中で終了する
+    """
+    close_old_connections()
+    claimed_at = timezone.now()
+    try:
+        job = ScoringJob.objects.select_related('session').get(pk=job_id)
+        session = job.session
+
+        claimed = ScoringJob.objects.filter(pk=job_id, status='pending').update(
+            status='running', started_at=claimed_at, updated_at=claimed_at
+        )
+        if not claimed:
+            logger.info(f"スコアリングジョブは別の実行が処理中です: job={job_id}")
+            return
+
+        report = Report.objects.filter(session=session).first()
+        if report is not None:
+            # 以前の実行でレポートが保存済みの場合は、LLMを呼び出さずに完了とする
+            _complete_job(job_id, report)
+            logger.info(f"スコアリングジョブはレポート保存済みのため完了とします: job={job_id}, report_id={report.id}")
+            return
+
+        conversation_history = get_session_messages(session)
+
+        buffer = ""
+        last_feedback = ""
+        last_flush = time.monotonic()
+        for chunk in score_conversation_stream(session, conversation_history):
+            buffer += chunk
+            if time.monotonic() - last_flush < PARTIAL_FEEDBACK_FLUSH_INTERVAL:
+                continue
+            # フィードバックが変わっていなくてもupdated_atを更新し、停止したジョブと判定されないようにする
+            updates = {'updated_at': timezone.now()}
+            feedback = extract_partial_feedback(buffer)
+            if feedback != last_feedback:
+                updates['partial_feedback'] = feedback
+                last_feedback = feedback
+            if not ScoringJob.objects.filter(pk=job_id, status='running', started_at=claimed_at).update(**updates):
+                logger.info(f"スコアリングジョブが別の実行に引き継がれたため終了します: job={job_id}")
+                return
+            last_flush = time.monotonic()
+
+        if not buffer:
+            raise ValueError("AIからの応答が空です")
+
+        try:
+            scores_data = json.loads(buffer)
+        except json.JSONDecodeError as e:
+            logger.error(f"Failed to parse scoring result: {e}")
+            raise ValueError("スコアリング結果の解析に失敗しました")
+
+        report = save_scoring_report(session, scores_data, compute_transcript_hash(conversation_history))
+        _complete_job(job_id, report)
+        logger.info(f"スコアリングジョブが完了しました: job={job_id}, report_id={report.id}")
+    except Exception as e:
+        logger.error(f"スコアリングジョブが失敗しました: job={job_id}, Error: {e}", exc_info=True)
+        # 別の実行に引き継がれたジョブは失敗にしない
+        ScoringJob.objects.filter(pk=job_id, started_at=claimed_at).update(
+            status='failed',
+            error=str(e),
+            finished_at=timezone.now(),
+            updated_at=timezone.now(),
+        )
+    finally:
+        connection.close()
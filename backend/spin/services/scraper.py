@@ -10,6 +10,9 @@ from urllib.parse import urljoin, urlparse
 
 logger = logging.getLogger(__name__)
 
+# 1ページあたりに保存する本文テキストの最大文字数（検索インデックス用）
+PAGE_TEXT_MAX_CHARS = 20000
+
 
 def scrape_company_info(url: str, timeout: int = 30) -> Dict[str, any]:
     """
@@ -100,9 +103,28 @@ def extract_company_info_from_html(soup: BeautifulSoup, url: str) -> Dict[str, a
             # 業界情報を抽出（簡易版）
             company_info['industry'] = extract_industry(text)
     
+    # 検索インデックス用に本文テキストを抽出（script/styleなどは除外）
+    company_info['text_content'] = extract_text_content(soup)
+    
     return company_info
 
 
+def extract_text_content(soup: BeautifulSoup, max_chars: int = PAGE_TEXT_MAX_CHARS) -> str:
+    """
+    HTMLから表示テキストを抽出
+    
+    Args:
+        soup: BeautifulSoupオブジェクト（script/style等の要素は削除される）
+        max_chars: 最大文字数
+    
+    Returns:
+        本文テキスト
+    """
+    for tag in soup(['script', 'style', 'noscript', 'template', 'svg']):
+        tag.decompose()
+    return soup.get_text(separator=' ', strip=True)[:max_chars]
+
+
 def extract_industry(text: str) -> Optional[str]:
     """
     テキストから業界情報を抽出（簡易版）
@@ -195,7 +217,8 @@ def merge_company_info(info_list: List[Dict[str, any]]) -> Dict[str, any]:
         'location': None,
         'employee_count': None,
         'established_year': None,
-        'raw_html_list': []
+        'raw_html_list': [],
+        'page_texts': []
     }
     
     # 各フィールドを統合（最初に見つかった非None値を優先）
@@ -216,6 +239,10 @@ def merge_company_info(info_list: List[Dict[str, any]]) -> Dict[str, any]:
         # raw_htmlをリストに追加
         if info.get('raw_html'):
             merged['raw_html_list'].append(info['raw_html'])
+        
+        # ページごとの本文テキストを追加（検索インデックス用）
+        if info.get('text_content'):
+            merged['page_texts'].append({'url': info.get('url'), 'text': info['text_content']})
     
     return merged
 
@@ -3,69 +3,158 @@ GCP Speech-to-Text APIを使用した音声認識サービス
 """
 import logging
 import os
-from typing import Dict, Any, Optional
+import threading
+from pathlib import Path
+from typing import Dict, Any, Iterable, Optional, Union
+
+import grpc
+from django.conf import settings
 from google.cloud import speech
+from google.cloud.speech_v1.services.speech.transports import SpeechGrpcTransport
 from google.oauth2 import service_account
-import io
-import tempfile
 
-try:
-    from pydub import AudioSegment
-    PYDUB_AVAILABLE = True
-except ImportError:
-    PYDUB_AVAILABLE = False
-    logger = logging.getLogger(__name__)
-    logger.warning("pydub library is not installed. Audio conversion will not be available.")
+from spin.services.audio_transcode import transcode_to_wav
+
+logger = logging.getLogger(__name__)
+
+# プロセス内で共有するクライアントと、作成時の認証情報ファイルのバージョン
+_client_lock = threading.Lock()
+_client: Optional[speech.SpeechClient] = None
+_client_version = None
+
+
+def _resolve_credentials_path() -> Optional[str]:
+    """GOOGLE_APPLICATION_CREDENTIALS のパス（相対パスはプロジェクトルート基準の絶対パスに変換）"""
+    credentials_path = os.getenv('GOOGLE_APPLICATION_CREDENTIALS')
+    # 相対パスの場合は絶対パスに変換（BASE_DIRはbackend/なので、その親（プロジェクトルート）から相対パスを解決）
+    if credentials_path and not os.path.isabs(credentials_path) and hasattr(settings, 'BASE_DIR'):
+        credentials_path = str(Path(settings.BASE_DIR).parent / credentials_path)
+    return credentials_path
+
+
+def _credentials_version(credentials_path: Optional[str]) -> tuple:
+    """認証情報ファイルが変わったかどうかの判定に使う値（パス・更新時刻・サイズ）"""
+    try:
+        stat = os.stat(credentials_path) if credentials_path else None
+    except OSError:
+        stat = None
+    if stat is None:
+        return credentials_path, None, None
+    return credentials_path, stat.st_mtime_ns, stat.st_size
+
+
+def _create_speech_client(credentials_path: Optional[str]) -> speech.SpeechClient:
+    credentials = None
+    if credentials_path:
+        if os.path.isfile(credentials_path):
+            # サービスアカウントキーから認証情報を読み込む
+            credentials = service_account.Credentials.from_service_account_file(credentials_path)
+        elif os.path.isdir(credentials_path):
+            logger.error(f'GCP認証情報パスはディレクトリです: {credentials_path}')
+        else:
+            logger.warning(f'GCP認証情報ファイルが見つかりません: {credentials_path}')
+    # credentialsがNoneの場合はデフォルト認証を使用（GCP環境やgcloud認証済みの場合）
 
-if 'logger' not in locals():
-    logger = logging.getLogger(__name__)
+    # アイドル中もkeepaliveのpingを送り、NATやロードバランサーに接続を切られないようにする
+    keepalive_ms = settings.SPEECH_GRPC_KEEPALIVE_SECONDS * 1000
+    channel = SpeechGrpcTransport.create_channel(
+        f'{speech.SpeechClient.DEFAULT_ENDPOINT}:443',
+        credentials=credentials,
+        options=[
+            ('grpc.keepalive_time_ms', keepalive_ms),
+            ('grpc.keepalive_timeout_ms', 10000),
+            ('grpc.keepalive_permit_without_calls', 1),
+            ('grpc.http2.max_pings_without_data', 0),
+        ],
+    )
+    return speech.SpeechClient(transport=SpeechGrpcTransport(channel=channel))
 
 
 def get_speech_client() -> Optional[speech.SpeechClient]:
     """
     GCP Speech-to-Text APIクライアントを取得
+    プロセス内で1つのクライアント（gRPCチャネル）を使い回し、認証情報ファイルが更新された場合のみ作り直す
     
     Returns:
         SpeechClient: GCP Speech-to-Text APIクライアント
         None: 認証情報が設定されていない場合
     """
-    try:
-        # 環境変数からサービスアカウントキーのパスを取得
-        credentials_path = os.getenv('GOOGLE_APPLICATION_CREDENTIALS')
-        
-        if credentials_path:
-            # 相対パスの場合は絶対パスに変換（Django settingsのBASE_DIRを基準に）
-            if not os.path.isabs(credentials_path):
-                # Django settingsからPROJECT_ROOTを取得
-                from django.conf import settings
-                if hasattr(settings, 'BASE_DIR'):
-                    # BASE_DIRはbackend/なので、その親（プロジェクトルート）から相対パスを解決
-                    from pathlib import Path
-                    project_root = Path(settings.BASE_DIR).parent
-                    credentials_path = str(project_root / credentials_path)
-            
-            if os.path.exists(credentials_path) and os.path.isfile(credentials_path):
-                # サービスアカウントキーから認証情報を読み込む
-                credentials = service_account.Credentials.from_service_account_file(
-                    credentials_path
-                )
-                client = speech.SpeechClient(credentials=credentials)
-            else:
-                if os.path.exists(credentials_path) and os.path.isdir(credentials_path):
-                    logger.error(f'GCP認証情報パスはディレクトリです: {credentials_path}')
-                else:
-                    logger.warning(f'GCP認証情報ファイルが見つかりません: {credentials_path}')
-                # デフォルト認証を使用（GCP環境やgcloud認証済みの場合）
-                client = speech.SpeechClient()
+    global _client, _client_version
+    credentials_path = _resolve_credentials_path()
+    version = _credentials_version(credentials_path)
+    client = _client
+    if client is not None and _client_version == version:
+        return client
+
+    with _client_lock:
+        if _client is not None and _client_version == version:
+            return _client
+        try:
+            client = _create_speech_client(credentials_path)
+        except Exception as e:
+            logger.error(f'GCP Speech-to-Text APIクライアントの初期化に失敗しました: {str(e)}')
+            return None
+        if _client is not None:
+            # 使用中のリクエストがあるため、古いクライアントは閉じずに参照を外す
+            logger.info('GCP認証情報ファイルが更新されたため、Speech-to-Text APIクライアントを作り直しました')
         else:
-            # デフォルト認証を使用（GCP環境やgcloud認証済みの場合）
-            client = speech.SpeechClient()
-        
-        logger.info('GCP Speech-to-Text APIクライアントを初期化しました')
+            logger.info('GCP Speech-to-Text APIクライアントを初期化しました')
+        _client = client
+        _client_version = version
         return client
-    except Exception as e:
-        logger.error(f'GCP Speech-to-Text APIクライアントの初期化に失敗しました: {str(e)}')
-        return None
+
+
+def warm_up_speech_client(timeout: float = 10.0):
+    """
+    ワーカー起動時にクライアントを作成し、gRPCチャネルを接続しておく
+    最初の音声認識リクエストで接続を待たないようにする（起動を止めないようバックグラウンドで実行）
+    """
+    def warm_up():
+        client = get_speech_client()
+        if client is None:
+            return
+        try:
+            grpc.channel_ready_future(client.transport.grpc_channel).result(timeout=timeout)
+            logger.info('GCP Speech-to-Text APIへの接続を確立しました')
+        except grpc.FutureTimeoutError:
+            logger.warning(f'GCP Speech-to-Text APIへの接続が{timeout}秒以内に確立できませんでした')
+
+    threading.Thread(target=warm_up, name='speech-client-warmup', daemon=True).start()
+
+
+def build_recognition_config(
+    language_code: str = 'ja-JP',
+    sample_rate_hertz: Optional[int] = 16000,
+    encoding: speech.RecognitionConfig.AudioEncoding = speech.RecognitionConfig.AudioEncoding.LINEAR16
+) -> speech.RecognitionConfig:
+    """音声認識の設定（transcribe_audio と長時間音声の分割認識で共通）"""
+    # 音声認識設定
+    # GCP Speech-to-Text APIの推奨設定に基づく
+    config_params = {
+        'encoding': encoding,
+        'language_code': language_code,
+        'enable_automatic_punctuation': True,  # 自動句読点
+        'enable_word_confidence': True,  # 単語レベルの信頼度
+    }
+    
+    # サンプリングレートの設定
+    # WEBM OPUS形式の場合は、サンプリングレートを指定しない（自動検出）
+    # その他の形式の場合は、明示的にサンプリングレートを指定
+    if encoding != speech.RecognitionConfig.AudioEncoding.WEBM_OPUS and sample_rate_hertz is not None:
+        config_params['sample_rate_hertz'] = sample_rate_hertz
+    
+    # 拡張モデルの使用（日本語の場合）
+    # use_enhanced=Trueを使用する場合は、modelパラメータも指定する必要がある
+    # 日本語の会話にはphone_callモデルが適している
+    # ただし、use_enhancedとmodelの組み合わせは慎重に選択する必要がある
+    if language_code.startswith('ja'):
+        # phone_callモデルは電話音声向け、defaultモデルは汎用的
+        # まずはdefaultモデルで試し、必要に応じてphone_callに変更
+        config_params['model'] = 'default'  # 汎用モデルを使用
+        # use_enhancedは日本語では利用可能だが、まずは標準モデルで試す
+        # config_params['use_enhanced'] = True  # 必要に応じて有効化
+    
+    return speech.RecognitionConfig(**config_params)
 
 
 def transcribe_audio(
@@ -99,33 +188,7 @@ def transcribe_audio(
         raise Exception('GCP Speech-to-Text APIクライアントが初期化できませんでした')
     
     try:
-        # 音声認識設定
-        # GCP Speech-to-Text APIの推奨設定に基づく
-        config_params = {
-            'encoding': encoding,
-            'language_code': language_code,
-            'enable_automatic_punctuation': True,  # 自動句読点
-            'enable_word_confidence': True,  # 単語レベルの信頼度
-        }
-        
-        # サンプリングレートの設定
-        # WEBM OPUS形式の場合は、サンプリングレートを指定しない（自動検出）
-        # その他の形式の場合は、明示的にサンプリングレートを指定
-        if encoding != speech.RecognitionConfig.AudioEncoding.WEBM_OPUS and sample_rate_hertz is not None:
-            config_params['sample_rate_hertz'] = sample_rate_hertz
-        
-        # 拡張モデルの使用（日本語の場合）
-        # use_enhanced=Trueを使用する場合は、modelパラメータも指定する必要がある
-        # 日本語の会話にはphone_callモデルが適している
-        # ただし、use_enhancedとmodelの組み合わせは慎重に選択する必要がある
-        if language_code.startswith('ja'):
-            # phone_callモデルは電話音声向け、defaultモデルは汎用的
-            # まずはdefaultモデルで試し、必要に応じてphone_callに変更
-            config_params['model'] = 'default'  # 汎用モデルを使用
-            # use_enhancedは日本語では利用可能だが、まずは標準モデルで試す
-            # config_params['use_enhanced'] = True  # 必要に応じて有効化
-        
-        config = speech.RecognitionConfig(**config_params)
+        config = build_recognition_config(language_code, sample_rate_hertz, encoding)
         
         # 音声データを設定
         audio = speech.RecognitionAudio(content=audio_data)
@@ -181,12 +244,13 @@ def transcribe_audio(
         raise Exception(f'音声認識に失敗しました: {str(e)}')
 
 
-def convert_webm_to_wav(audio_data: bytes) -> tuple[bytes, int]:
+def convert_webm_to_wav(audio_data: Union[bytes, Iterable[bytes]]) -> tuple[bytes, int]:
     """
-    WEBM形式の音声データをWAV形式に変換
+    WEBM形式の音声データをWAV形式（16kHz、モノラル、16bit）に変換
+    ffmpegに標準入出力で受け渡し、一時ファイルは作成しない（audio_transcode.transcode_to_wav）
     
     Args:
-        audio_data: WEBM形式の音声データ（バイト列）
+        audio_data: WEBM形式の音声データ（バイト列、またはUploadedFile.chunks()などのイテレータ）
     
     Returns:
         tuple[bytes, int]: (WAV形式の音声データ（バイト列）, サンプリングレート)
@@ -194,133 +258,14 @@ def convert_webm_to_wav(audio_data: bytes) -> tuple[bytes, int]:
     Raises:
         Exception: 変換に失敗した場合
     """
-    if not PYDUB_AVAILABLE:
-        raise Exception('pydubライブラリがインストールされていません。音声変換にはpydubが必要です。')
-    
     try:
-        # 一時ファイルにWEBMデータを書き込む
-        with tempfile.NamedTemporaryFile(suffix='.webm', delete=False) as webm_file:
-            webm_file.write(audio_data)
-            webm_file_path = webm_file.name
-        
-        try:
-            # pydubでWEBMを読み込んでWAVに変換
-            # formatを明示的に指定せず、pydubに自動検出させる
-            try:
-                audio = AudioSegment.from_file(webm_file_path, format="webm")
-            except Exception as format_error:
-                # webm形式での読み込みに失敗した場合、形式を指定せずに試行
-                logger.warning(f'WEBM形式での読み込みに失敗しました: {str(format_error)}。形式を自動検出します。')
-                audio = AudioSegment.from_file(webm_file_path)
-            
-            # サンプリングレートを取得（デフォルトは16000Hz）
-            sample_rate = audio.frame_rate
-            duration_ms = len(audio)
-            duration_sec = duration_ms / 1000.0
-            logger.info(f'元の音声情報: サンプリングレート={sample_rate}Hz, チャンネル数={audio.channels}, 長さ={duration_sec:.2f}秒 ({duration_ms}ms)')
-            
-            # 音声が短すぎる場合は警告
-            if duration_sec < 0.5:
-                logger.warning(f'音声が短すぎます: {duration_sec:.2f}秒。最低0.5秒以上推奨')
-            elif duration_sec < 1.0:
-                logger.info(f'音声の長さ: {duration_sec:.2f}秒（推奨: 1秒以上）')
-            
-            # サンプリングレートを16000Hzに変換（GCP Speech-to-Text APIの推奨値）
-            if sample_rate != 16000:
-                audio = audio.set_frame_rate(16000)
-                sample_rate = 16000
-                logger.info(f'サンプリングレートを16000Hzに変換しました')
-            
-            # モノラルに変換
-            if audio.channels > 1:
-                audio = audio.set_channels(1)
-                logger.info('ステレオからモノラルに変換しました')
-            
-            # 音量を正規化（オプション）
-            # 音声が小さすぎる場合は音量を上げる
-            if audio.max_possible_amplitude > 0:
-                max_dBFS = audio.max_dBFS
-                logger.info(f'音声の最大音量: {max_dBFS:.1f}dBFS')
-                if max_dBFS < -20:  # 音量が小さい場合
-                    logger.info(f'音量が小さいため正規化します: {max_dBFS:.1f}dBFS')
-                    audio = audio.normalize()
-                    # 正規化後の音量を確認
-                    normalized_dBFS = audio.max_dBFS
-                    logger.info(f'正規化後の音量: {normalized_dBFS:.1f}dBFS')
-                
-                # 音量が非常に小さい場合（-60dBFS以下）は警告
-                if max_dBFS < -60:
-                    logger.warning(f'音声の音量が非常に小さいです: {max_dBFS:.1f}dBFS。マイクの音量設定を確認してください。')
-            
-            # WAV形式にエクスポート（16kHz、モノラル、16bit）
-            # GCP Speech-to-Text APIのLINEAR16エンコーディングは16ビットサンプルを要求するため、明示的に16ビットを指定
-            wav_file_path = webm_file_path.replace('.webm', '.wav')
-            
-            try:
-                # 16ビットPCM形式でエクスポート（GCP Speech-to-Text APIのLINEAR16要件を満たすため）
-                audio.export(
-                    wav_file_path,
-                    format="wav",
-                    parameters=["-acodec", "pcm_s16le"]  # 16ビットリトルエンディアンPCM
-                )
-                
-                # エクスポートされたファイルが存在し、サイズが0より大きいことを確認
-                if not os.path.exists(wav_file_path) or os.path.getsize(wav_file_path) == 0:
-                    raise Exception('WAVファイルのエクスポートに失敗しました（ファイルサイズが0）')
-                
-                # WAVデータを読み込む
-                with open(wav_file_path, 'rb') as wav_file:
-                    wav_data = wav_file.read()
-                
-                if len(wav_data) == 0:
-                    raise Exception('WAVファイルが空です')
-                
-                # 一時ファイルを削除
-                try:
-                    os.unlink(webm_file_path)
-                except Exception:
-                    pass  # 削除に失敗しても続行
-                
-                try:
-                    os.unlink(wav_file_path)
-                except Exception:
-                    pass  # 削除に失敗しても続行
-                
-                logger.info(f'WEBMからWAVへの変換成功: {len(audio_data)} bytes -> {len(wav_data)} bytes, サンプリングレート: {sample_rate}Hz')
-                return wav_data, sample_rate
-                
-            except Exception as export_error:
-                # エクスポートに失敗した場合、一時ファイルをクリーンアップ
-                if os.path.exists(wav_file_path):
-                    try:
-                        os.unlink(wav_file_path)
-                    except Exception:
-                        pass
-                raise Exception(f'WAV形式へのエクスポートに失敗しました: {str(export_error)}')
-        
-        except Exception as e:
-            # エラー時も一時ファイルを削除
-            try:
-                if os.path.exists(webm_file_path):
-                    os.unlink(webm_file_path)
-                # WAVファイルも存在する場合は削除
-                wav_file_path = webm_file_path.replace('.webm', '.wav')
-                if os.path.exists(wav_file_path):
-                    os.unlink(wav_file_path)
-            except Exception as cleanup_error:
-                logger.warning(f'一時ファイルの削除に失敗しました: {str(cleanup_error)}')
-            raise e
-    
+        wav_data, sample_rate = transcode_to_wav(audio_data)
+        logger.info(f'WEBMからWAVへの変換成功: {len(wav_data)} bytes, サンプリングレート: {sample_rate}Hz')
+        return wav_data, sample_rate
     except Exception as e:
         error_detail = str(e)
         logger.error(f'WEBMからWAVへの変換エラー: {error_detail}', exc_info=True)
-        # より詳細なエラーメッセージを提供
-        if 'ffmpeg' in error_detail.lower() or 'avconv' in error_detail.lower():
-            raise Exception(f'音声形式の変換に失敗しました: ffmpegが正しくインストールされていない可能性があります。詳細: {error_detail}')
-        elif 'pydub' in error_detail.lower():
-            raise Exception(f'音声形式の変換に失敗しました: pydubライブラリの問題が発生しました。詳細: {error_detail}')
-        else:
-            raise Exception(f'音声形式の変換に失敗しました: {error_detail}')
+        raise Exception(f'音声形式の変換に失敗しました: {error_detail}')
 
 
 def detect_audio_encoding(audio_data: bytes) -> speech.RecognitionConfig.AudioEncoding:
@@ -0,0 +1,164 @@
+"""
+ストリーミング音声認識（プッシュトゥトーク用）
+録音中の音声チャンクを順に認識バックエンドへ送り、途中経過と確定した文字起こしを返す
+
+- GoogleStreamingBackend: GCP Speech-to-Text の streaming_recognize（gRPCの双方向ストリーム）
+- FakeStreamingBackend: ローカル開発・負荷試験用（受け取った音声の量に応じて決まった文を返す）
+
+使用するバックエンドは SPEECH_STREAMING_BACKEND（google / fake）で切り替える
+"""
+import asyncio
+import logging
+import queue
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, Dict, Optional
+
+from django.conf import settings
+from google.cloud import speech
+
+from spin.services.speech_to_text import get_speech_client
+
+logger = logging.getLogger(__name__)
+
+ENCODINGS = {
+    'webm_opus': speech.RecognitionConfig.AudioEncoding.WEBM_OPUS,
+    'ogg_opus': speech.RecognitionConfig.AudioEncoding.OGG_OPUS,
+    'linear16': speech.RecognitionConfig.AudioEncoding.LINEAR16,
+}
+# Opusで指定できるサンプリングレート
+OPUS_SAMPLE_RATES = (8000, 12000, 16000, 24000, 48000)
+
+
+class StreamingRecognitionBackend(ABC):
+    """ストリーミング音声認識のバックエンド"""
+
+    @abstractmethod
+    def recognize(self, audio: AsyncIterator[bytes], language_code: str, encoding: str,
+                  sample_rate_hertz: int) -> AsyncIterator[Dict]:
+        """
+        音声チャンクを認識し、結果を順に返す（audioが終わると残りの結果を返して終了する）
+
+        Yields:
+            {'text': str, 'is_final': bool, 'confidence': float, 'stability': float}
+            is_finalがFalseの結果は、次の結果で置き換えられる途中経過
+        """
+
+
+class GoogleStreamingBackend(StreamingRecognitionBackend):
+    """GCP Speech-to-Text の streaming_recognize（ブロッキングAPIのため専用のスレッドで実行）"""
+
+    # ストリーム1本につき1スレッドを使う
+    _executor = ThreadPoolExecutor(
+        max_workers=getattr(settings, 'SPEECH_STREAMING_MAX_STREAMS', 32),
+        thread_name_prefix='speech-stream',
+    )
+
+    def _streaming_config(self, language_code: str, encoding: str, sample_rate_hertz: int):
+        config = speech.RecognitionConfig(
+            encoding=ENCODINGS[encoding],
+            sample_rate_hertz=sample_rate_hertz,
+            language_code=language_code,
+            enable_automatic_punctuation=True,
+            model='default',
+        )
+        return speech.StreamingRecognitionConfig(config=config, interim_results=True)
+
+    async def recognize(self, audio, language_code, encoding, sample_rate_hertz):
+        client = get_speech_client()
+        if client is None:
+            raise Exception('GCP Speech-to-Text APIクライアントが初期化できませんでした')
+
+        loop = asyncio.get_running_loop()
+        streaming_config = self._streaming_config(language_code, encoding, sample_rate_hertz)
+        requests = queue.Queue()
+        results = asyncio.Queue()
+        end = object()
+
+        def request_stream():
+            while True:
+                chunk = requests.get()
+                if chunk is None:
+                    return
+                yield speech.StreamingRecognizeRequest(audio_content=chunk)
+
+        def run():
+            try:
+                responses = client.streaming_recognize(
+                    config=streaming_config,
+                    requests=request_stream(),
+                    timeout=settings.SPEECH_STREAMING_MAX_SECONDS + 30,
+                )
+                for response in responses:
+                    for result in response.results:
+                        if not result.alternatives:
+                            continue
+                        alternative = result.alternatives[0]
+                        loop.call_soon_threadsafe(results.put_nowait, {
+                            'text': alternative.transcript,
+                            'is_final': result.is_final,
+                            'confidence': alternative.confidence,
+                            'stability': result.stability,
+                        })
+            except Exception as e:
+                loop.call_soon_threadsafe(results.put_nowait, e)
+            finally:
+                loop.call_soon_threadsafe(results.put_nowait, end)
+
+        async def feed():
+            async for chunk in audio:
+                requests.put(chunk)
+            requests.put(None)
+
+        worker = loop.run_in_executor(self._executor, run)
+        feeder = asyncio.create_task(feed())
+        try:
+            while True:
+                item = await results.get()
+                if item is end:
+                    break
+                if isinstance(item, Exception):
+                    raise Exception(f'音声認識API呼び出しに失敗しました: {item}')
+                yield item
+        finally:
+            feeder.cancel()
+            # 途中で終了した場合もリクエストのストリームを閉じ、スレッドを解放する
+            requests.put(None)
+            await asyncio.wait([worker], timeout=5)
+
+
+class FakeStreamingBackend(StreamingRecognitionBackend):
+    """ローカル開発・負荷試験用の認識バックエンド（音声の内容は見ず、受け取ったバイト数に応じて文を伸ばす）"""
+
+    WORDS = ('本日は', 'お時間を', 'いただき', 'ありがとう', 'ございます。')
+
+    def __init__(self, bytes_per_word: int = 4000):
+        self.bytes_per_word = bytes_per_word
+
+    def _text(self, words: int) -> str:
+        return ''.join(self.WORDS[index % len(self.WORDS)] for index in range(words))
+
+    async def recognize(self, audio, language_code, encoding, sample_rate_hertz):
+        received = 0
+        words = 0
+        async for chunk in audio:
+            received += len(chunk)
+            if received // self.bytes_per_word > words:
+                words = received // self.bytes_per_word
+                yield {'text': self._text(words), 'is_final': False, 'confidence': 0.0, 'stability': 0.5}
+        if received:
+            yield {'text': self._text(max(words, 1)), 'is_final': True, 'confidence': 0.9, 'stability': 1.0}
+
+
+BACKENDS = {
+    'google': GoogleStreamingBackend,
+    'fake': FakeStreamingBackend,
+}
+
+
+def get_streaming_backend(name: Optional[str] = None) -> StreamingRecognitionBackend:
+    """設定（SPEECH_STREAMING_BACKEND）に応じたバックエンドを取得"""
+    name = name or settings.SPEECH_STREAMING_BACKEND
+    if name not in BACKENDS:
+        raise ValueError(f'不明な音声認識バックエンドです: {name}（{", ".join(BACKENDS)}のいずれかを指定してください）')
+    return BACKENDS[name]()
@@ -22,6 +22,8 @@ urlpatterns = [
     path('session/chat/', views.chat_session, name='chat_session'),
     path('session/chat/stream/', views.chat_session_stream, name='chat_session_stream'),
     path('session/finish/', views.finish_session, name='finish_session'),
+    path('session/finish/job/<uuid:job_id>/', views.scoring_job_status, name='scoring_job_status'),
+    path('session/finish/job/<uuid:job_id>/stream/', views.scoring_job_stream, name='scoring_job_stream'),
 
     # レポート
     path('report/<int:id>/', views.get_report, name='get_report'),
@@ -34,12 +36,18 @@ urlpatterns = [
     # ランキング関連
     path('ranking/simple/', views.get_simple_ranking, name='get_simple_ranking'),
     path('ranking/detailed/', views.get_detailed_ranking, name='get_detailed_ranking'),
+    path('ranking/me/', views.get_my_ranking, name='get_my_ranking'),
+    path('ranking/<str:mode>/<str:period>/', views.get_windowed_ranking, name='get_windowed_ranking'),
 
     # 音声変換
     path('speech/transcribe/', views.transcribe_speech, name='transcribe_speech'),
+    path('speech/transcribe/long/', views.transcribe_long_speech, name='transcribe_long_speech'),
 
     # Text-to-Speech
     path('tts/generate/', views.generate_tts, name='generate_tts'),
     path('tts/voices/', views.get_tts_voices, name='get_tts_voices'),
+
+    # メトリクス（管理者のみ）
+    path('metrics/realtime/', views.get_realtime_metrics, name='get_realtime_metrics'),
 ]
 
@@ -1,27 +1,38 @@
 from rest_framework import viewsets, status
 from rest_framework.decorators import api_view, permission_classes, authentication_classes
-from rest_framework.permissions import IsAuthenticated, AllowAny
+from rest_framework.permissions import IsAuthenticated, AllowAny, IsAdminUser
 from rest_framework.response import Response
 from rest_framework.authentication import SessionAuthentication
 from django.shortcuts import get_object_or_404
-from django.http import StreamingHttpResponse
+from django.urls import reverse
+from django.conf import settings
+from django.http import HttpResponse, StreamingHttpResponse
 from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
 from django.contrib.auth import authenticate
 from django.contrib.auth.models import User
 from rest_framework.authtoken.models import Token
+from channels.db import database_sync_to_async
 from django.db.models import Avg, Max, Count, Q
 from django.db.models.functions import Coalesce
 from django.db import transaction
+import asyncio
 import json
+import time
 import uuid
 import logging
-from .models import Session, ChatMessage, Report, Company, CompanyAnalysis
+from datetime import datetime
+from .models import Session, ChatMessage, Report, Company, CompanyAnalysis, ScoringJob, RankingEntry
 from .serializers import (
     SessionSerializer,
+    SessionSummarySerializer,
+    SessionDetailSerializer,
     ChatMessageSerializer,
     ReportSerializer,
     SpinGenerateSerializer,
     CompanySerializer,
+    CompanySummarySerializer,
     CompanyScrapeSerializer,
     CompanySitemapSerializer,
     CompanyAnalysisSerializer,
@@ -38,17 +49,31 @@ from .services.closing_helper import (
     LOSS_REASONS
 )
 from .services.temperature_score import calculate_temperature_score
-from .services.scoring import score_conversation
+from .services.scoring import score_conversation, compute_transcript_hash
+from .services.scorecard import record_turn
+from .services.scoring_jobs import start_scoring_job, save_scoring_report, build_finish_payload, serialize_job
+from .services.pagination import paginate_by_created_at, parse_limit
+from .services.ranking import get_ranking_payload, get_user_rank, parse_cursor, parse_page_params, parse_page_size
+from .services.ranking_cache import build_etag, get_ranking_version
+from .services.ranking_windows import PERIODS as RANKING_PERIODS, RANKING_SCORE_FIELDS, clamp_window_day, get_window_payload
 from .services.scraper import scrape_company_info, scrape_multiple_urls
 from .services.sitemap_parser import parse_sitemap_from_file, parse_sitemap_from_url, parse_sitemap_index
 from .services.company_analyzer import analyze_spin_suitability
+from .services.company_retrieval import get_retrieval_index
+from .services.company_artifacts import create_company_from_scrape, get_scraped_data
+from .services.message_archive import get_message_counts, get_messages_after, get_session_messages
 from .services.conversation_analysis import analyze_sales_message
 from .services.speech_to_text import transcribe_audio, detect_audio_encoding
 from google.cloud import speech
+from .middleware import compute_etag, conditional_etag, not_modified_response, set_private_etag
 from .exceptions import OpenAIAPIError, SessionNotFoundError, SessionFinishedError, NoConversationHistoryError
 
 logger = logging.getLogger(__name__)
 
+# スコアリングジョブのSSE配信設定（秒）
+SCORING_STREAM_POLL_INTERVAL = 0.5
+SCORING_STREAM_TIMEOUT_SECONDS = 300
+
 
 @api_view(['GET'])
 @permission_classes([AllowAny])
@@ -559,7 +584,7 @@ def chat_session(request):
         stage_order = {'S': 0, 'P': 1, 'I': 2, 'N': 3}
         current_stage_value = session.current_spin_stage or 'S'
          
-        if session.mode == 'detailed' and session.company:
+        if session.mode == 'detailed' and session.company_id:
             try:
                 # 営業メッセージを分析
                 analysis_result = analyze_sales_message(session, conversation_history, message)
@@ -741,6 +766,9 @@ def chat_session(request):
                 # 分析に失敗した場合は成功率は変更しない
                 success_probability = session.success_probability
         
+        # 今回のターンをセッションのスコアカードに反映
+        record_turn(session, salesperson_msg, customer_msg)
+        
         # 失注確定のチェック
         loss_response = None
         updated_history_for_loss = list(session.messages.all().order_by('sequence'))
@@ -977,7 +1005,7 @@ def chat_session_stream(request):
                 stage_order = {'S': 0, 'P': 1, 'I': 2, 'N': 3}
                 current_stage_value = session.current_spin_stage or 'S'
                 
-                if session.mode == 'detailed' and session.company:
+                if session.mode == 'detailed' and session.company_id:
                     try:
                         # 営業メッセージを分析
                         analysis_result = analyze_sales_message(session, conversation_history, message)
@@ -1137,6 +1165,9 @@ def chat_session_stream(request):
                         logger.warning(f"成功率分析に失敗しました: {e}", exc_info=True)
                         success_probability = session.success_probability
                 
+                # 今回のターンをセッションのスコアカードに反映
+                record_turn(session, salesperson_msg, customer_msg)
+                
                 # 失注確定のチェック
                 loss_response = None
                 updated_history_for_loss = list(session.messages.all().order_by('sequence'))
@@ -1292,77 +1323,46 @@ def finish_session(request):
         raise SessionNotFoundError(f"セッションが見つかりません: {session_id}")
     
     if session.status == 'finished':
+        # 終了ボタンの連打などで再度呼ばれた場合は、完了済みジョブの結果を返す
+        job = ScoringJob.objects.select_related('session', 'report').filter(session=session, status='completed').first()
+        if job and job.report_id:
+            return Response({**build_finish_payload(session, job.report), "job_id": str(job.id)}, status=status.HTTP_200_OK)
         logger.warning(f"Session already finished: {session_id}")
         raise SessionFinishedError("セッションは既に終了しています")
     
-    # 会話履歴を取得
-    conversation_history = list(session.messages.all().order_by('sequence'))
-    
-    if not conversation_history:
+    if not get_message_counts([session.pk]).get(session.pk):
         logger.warning(f"No conversation history for session: {session_id}")
         raise NoConversationHistoryError("会話履歴がありません。まずチャットを開始してください")
     
-    # スコアリングを実行
+    # 同期モード（?sync=true）: 従来通りリクエスト内でスコアリングを実行
+    if request.query_params.get('sync', '').lower() in ('1', 'true'):
+        return _finish_session_sync(session)
+    
+    # バックグラウンドジョブとしてスコアリングを実行（実行中のジョブがあればアタッチ）
+    job, _ = start_scoring_job(session)
+    job_data = serialize_job(job)
+    if job.status == 'completed' and job.report_id:
+        return Response({**job_data["result"], "job_id": str(job.id)}, status=status.HTTP_200_OK)
+    
+    status_url = reverse('spin:scoring_job_status', kwargs={'job_id': job.id})
+    response = Response({
+        **job_data,
+        "status_url": status_url,
+        "stream_url": reverse('spin:scoring_job_stream', kwargs={'job_id': job.id}),
+    }, status=status.HTTP_202_ACCEPTED)
+    response['Location'] = status_url
+    return response
+
+
+def _finish_session_sync(session):
+    """リクエスト内でスコアリングを実行してセッションを終了する（同期モード）"""
+    conversation_history = get_session_messages(session)
+    
     try:
         scoring_result = score_conversation(session, conversation_history)
         scores_data = json.loads(scoring_result)
-        
-        # トランザクション内でデータを確実に保存
-        with transaction.atomic():
-            # 新しい5要素スコアリングに対応
-            # 後方互換性のため、SPIN要素も含める
-            spin_scores = {
-                "total": scores_data.get("total", 0),
-                # 新しい5要素スコア
-                "exploration": scores_data.get("exploration", 0),
-                "implication": scores_data.get("implication", 0),
-                "value_proposition": scores_data.get("value_proposition", 0),
-                "customer_response": scores_data.get("customer_response", 0),
-                "advancement": scores_data.get("advancement", 0),
-                # 後方互換性のためSPIN要素も含める
-                "situation": scores_data.get("situation", scores_data.get("exploration", 0) // 2),
-                "problem": scores_data.get("problem", scores_data.get("exploration", 0) // 2),
-                "implication_legacy": scores_data.get("implication", 0),
-                "need": scores_data.get("need", scores_data.get("value_proposition", 0))
-            }
-            
-            # スコアリング結果を保存
-            report = Report.objects.create(
-                session=session,
-                spin_scores=spin_scores,
-                feedback=scores_data.get("feedback", ""),
-                next_actions=scores_data.get("next_actions", ""),
-                scoring_details=scores_data.get("scoring_details", {})
-            )
-            
-            # セッションを終了状態に更新
-            session.status = 'finished'
-            session.finished_at = timezone.now()
-            session.save()
-            
-            logger.info(f"Session finished and scored: {session_id}, total_score: {report.spin_scores.get('total', 0)}, report_id: {report.id}")
-        
-        # データが確実に保存されたことを確認
-        saved_report = Report.objects.get(id=report.id)
-        saved_session = Session.objects.get(id=session.id)
-        
-        if saved_session.status != 'finished':
-            logger.error(f"Session status not saved correctly: {session_id}")
-            raise Exception("セッション状態の保存に失敗しました")
-        
-        if not saved_report:
-            logger.error(f"Report not saved correctly: {session_id}")
-            raise Exception("レポートの保存に失敗しました")
-        
-        return Response({
-            "session_id": str(session_id),
-            "report_id": report.id,
-            "status": "finished",
-            "finished_at": session.finished_at.isoformat(),
-            "spin_scores": report.spin_scores,
-            "feedback": report.feedback,
-            "next_actions": report.next_actions
-        }, status=status.HTTP_200_OK)
+        report = save_scoring_report(session, scores_data, compute_transcript_hash(conversation_history))
+        return Response(build_finish_payload(session, report), status=status.HTTP_200_OK)
     except json.JSONDecodeError as e:
         logger.error(f"Failed to parse scoring result: {e}")
         raise OpenAIAPIError("スコアリング結果の解析に失敗しました")
@@ -1371,67 +1371,289 @@ def finish_session(request):
         raise OpenAIAPIError(f"スコアリングに失敗しました: {str(e)}")
 
 
+@conditional_etag
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
-def list_sessions(request):
-    """ユーザーのセッション一覧を取得するエンドポイント"""
-    sessions = Session.objects.filter(user=request.user).order_by('-created_at')
-    
-    # ページネーション（オプション）
-    page = int(request.query_params.get('page', 1))
-    page_size = int(request.query_params.get('page_size', 20))
-    start = (page - 1) * page_size
-    end = start + page_size
-    
-    sessions_page = sessions[start:end]
+def scoring_job_status(request, job_id):
+    """スコアリングジョブの状態を取得するエンドポイント（ポーリング用）"""
+    job = get_object_or_404(
+        ScoringJob.objects.select_related('session', 'report'),
+        id=job_id,
+        session__user=request.user
+    )
+    return Response(serialize_job(job), status=status.HTTP_200_OK)
+
+
+@database_sync_to_async
+def _poll_scoring_job(job_id):
+    """SSE配信用にジョブの状態を取得（完了時のみレポートを含めてシリアライズする）"""
+    job = ScoringJob.objects.select_related('session', 'report').get(id=job_id)
+    return job, (serialize_job(job) if job.status == 'completed' else None)
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def scoring_job_stream(request, job_id):
+    """
+    スコアリングジョブの進捗をSSEで配信するエンドポイント（生成途中のフィードバック → 最終レポート）
+
+    非同期ジェネレーターで配信する（Daphne上で同期ジェネレーターを使うと、完了まで応答がバッファされ
+    ワーカースレッドも占有するため）
+    """
+    job = get_object_or_404(ScoringJob, id=job_id, session__user=request.user)
+    
+    async def generate():
+        sent_length = 0
+        started = time.monotonic()
+        last_event = started
+        while True:
+            current, job_data = await _poll_scoring_job(job.id)
+            
+            # 生成途中のフィードバックは差分のみ送信
+            feedback = current.partial_feedback or ''
+            if len(feedback) > sent_length and current.status != 'completed':
+                yield f"data: {json.dumps({'type': 'chunk', 'content': feedback[sent_length:]}, ensure_ascii=False)}\n\n"
+                sent_length = len(feedback)
+                last_event = time.monotonic()
+            elif len(feedback) < sent_length:
+                # ジョブが再実行された場合は最初から送り直す
+                sent_length = 0
+            
+            if current.status == 'completed':
+                done_data = {'type': 'done', **job_data}
+                yield f"data: {json.dumps(done_data, ensure_ascii=False)}\n\n"
+                return
+            if current.status == 'failed':
+                yield f"data: {json.dumps({'type': 'error', 'job_id': str(current.id), 'error': current.error or 'スコアリングに失敗しました'}, ensure_ascii=False)}\n\n"
+                return
+            if time.monotonic() - started > SCORING_STREAM_TIMEOUT_SECONDS:
+                yield f"data: {json.dumps({'type': 'timeout', 'job_id': str(current.id), 'status': current.status}, ensure_ascii=False)}\n\n"
+                return
+            
+            # プロキシのタイムアウトを防ぐためのキープアライブ
+            if time.monotonic() - last_event > 15:
+                yield ": keep-alive\n\n"
+                last_event = time.monotonic()
+            await asyncio.sleep(SCORING_STREAM_POLL_INTERVAL)
     
-    serializer = SessionSerializer(sessions_page, many=True)
-    return Response({
-        "count": sessions.count(),
-        "page": page,
-        "page_size": page_size,
-        "results": serializer.data
-    }, status=status.HTTP_200_OK)
+    response = StreamingHttpResponse(generate(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # nginxのバッファリングを無効化
+    return response
+
+
+# セッション一覧のETagに使う列（一覧に表示する企業名・スコアの変更も検出する）
+SESSION_LIST_VERSION_FIELDS = ('updated_at', 'company__updated_at', 'report__created_at', 'report__rescored_at')
+
+
+def _session_list_version(session):
+    """セッション一覧の1行のバージョン"""
+    company = session.company if session.company_id else None
+    report = getattr(session, 'report', None)
+    return (
+        session.id,
+        session.updated_at,
+        company.updated_at if company else None,
+        (report.id, report.created_at, report.rescored_at) if report else None,
+    )
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def list_sessions(request):
+    """
+    ユーザーのセッション一覧を取得するエンドポイント
+
+    - Query:
+      - limit: 取得件数（デフォルト20、最大100。page_sizeも可）
+      - cursor: 前のレスポンスのnext_cursor（次のページを取得する場合）
+      - stats: true の場合、セッション数・平均スコア・最高スコアを含める
+
+    一覧用の軽量な項目のみを返し、(created_at, id) のキーセットでページングする
+    （セッション数が増えてもOFFSETやcount()のコストがかからない）
+
+    返すページの各行（セッション・企業・レポート）の更新日時から生成したETagが一致する場合は、
+    シリアライズを行わず304を返す（ユーザーの全セッションは集計しない）
+    """
+    try:
+        limit = parse_limit(request.query_params)
+        sessions = (
+            Session.objects.filter(user=request.user)
+            .select_related('company', 'report')
+            .only(*SessionSummarySerializer.QUERY_FIELDS, *SESSION_LIST_VERSION_FIELDS)
+        )
+        sessions_page, next_cursor = paginate_by_created_at(sessions, request.query_params.get('cursor'), limit)
+    except ValueError as e:
+        return Response({
+            "error": "Invalid pagination parameters",
+            "message": str(e)
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    stats = None
+    if request.query_params.get('stats', '').lower() == 'true':
+        # スコアはランキングエントリ（スコアリング済みセッション）から集計する
+        score_stats = RankingEntry.objects.filter(user=request.user).aggregate(
+            scored_sessions=Count('pk'),
+            average_score=Avg('total_score'),
+            highest_score=Max('total_score'),
+        )
+        stats = {
+            "total_sessions": Session.objects.filter(user=request.user).count(),
+            **score_stats,
+        }
+
+    etag = compute_etag(
+        'sessions', request.user.id, request.query_params.urlencode(), next_cursor, stats,
+        *(_session_list_version(session) for session in sessions_page),
+    )
+    not_modified = not_modified_response(request, etag)
+    if not_modified is not None:
+        return not_modified
+
+    response_data = {
+        "results": SessionSummarySerializer(sessions_page, many=True).data,
+        "limit": limit,
+        "next_cursor": next_cursor,
+        "has_next": next_cursor is not None,
+    }
+    if stats is not None:
+        response_data["stats"] = stats
+
+    return set_private_etag(Response(response_data, status=status.HTTP_200_OK), etag)
+
+
+# セッション詳細APIで展開できる関連データ
+SESSION_EXPAND_OPTIONS = ('company', 'report', 'messages')
+# セッション詳細APIで読み込まない企業情報の列（スクレイピングの生データ等）
+SESSION_COMPANY_DEFERRED_FIELDS = ('scraped_urls', 'scraped_data', 'company_brief')
+SESSION_MESSAGES_DEFAULT_LIMIT = 100
+SESSION_MESSAGES_MAX_LIMIT = 200
+
+
+def _parse_list_param(value):
+    """カンマ区切りのクエリパラメータをリストに変換（空の場合は空リスト）"""
+    if not value:
+        return []
+    return [item.strip() for item in value.split(',') if item.strip()]
 
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def get_session(request, id):
-    """セッション詳細を取得するエンドポイント"""
+    """
+    セッション詳細を取得するエンドポイント
+
+    クエリパラメータ:
+        fields: 返すセッション項目（カンマ区切り。省略時はすべて）
+        expand: 含める関連データ（company, report, messages のカンマ区切り。省略時は messages のみ）
+        after_sequence: このsequenceより後の会話履歴を返す（デフォルト: 0）
+        limit: 会話履歴の取得件数（デフォルト: 100、最大: 200）
+
+    セッション・企業・レポートの更新日時と最新の会話sequenceから生成したETagが
+    一致する場合は、シリアライズを行わず304を返す
+    """
+    fields = _parse_list_param(request.query_params.get('fields'))
+    expand = set(_parse_list_param(request.query_params.get('expand', 'messages')))
+    invalid_fields = set(fields) - set(SessionDetailSerializer.Meta.fields)
+    invalid_expand = expand - set(SESSION_EXPAND_OPTIONS)
+    if invalid_fields or invalid_expand:
+        return Response(
+            {
+                "error": "Invalid parameter",
+                "message": f"不正な項目が指定されました: {', '.join(sorted(invalid_fields | invalid_expand))}"
+            },
+            status=status.HTTP_400_BAD_REQUEST
+        )
     try:
-        session = Session.objects.get(id=id, user=request.user)
-    except Session.DoesNotExist:
+        after_sequence = max(0, int(request.query_params.get('after_sequence', 0)))
+        limit = parse_limit(request.query_params, default=SESSION_MESSAGES_DEFAULT_LIMIT, maximum=SESSION_MESSAGES_MAX_LIMIT)
+    except ValueError:
+        return Response(
+            {"error": "Invalid parameter", "message": "after_sequence・limitは数値で指定してください"},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    versions = Session.objects.filter(id=id, user=request.user).aggregate(
+        session_updated=Max('updated_at'),
+        company_updated=Max('company__updated_at'),
+        report_created=Max('report__created_at'),
+        report_rescored=Max('report__rescored_at'),
+        last_sequence=Max('messages__sequence'),
+        message_count=Count('messages'),
+        archived_at=Max('message_archive__archived_at'),
+    )
+    if versions['session_updated'] is None:
         logger.warning(f"Session not found: {id}, user: {request.user.id}")
         raise SessionNotFoundError(f"セッションが見つかりません: {id}")
-    
-    serializer = SessionSerializer(session)
-    
-    # 会話履歴も含める
-    messages = session.messages.all().order_by('sequence')
-    messages_data = ChatMessageSerializer(messages, many=True).data
-    
-    response_data = serializer.data
-    response_data['messages'] = messages_data
-    
-    # レポートがある場合は含める
+    etag = compute_etag('session', id, *versions.values(), request.query_params.urlencode())
+    not_modified = not_modified_response(request, etag)
+    if not_modified is not None:
+        return not_modified
+
+    # 企業・レポートは1クエリで結合して取得し、展開しない大きな列は読み込まない
+    deferred = ['scorecard', 'realtime_latency'] + [f'company__{name}' for name in SESSION_COMPANY_DEFERRED_FIELDS]
+    if 'report' not in expand:
+        deferred += ['report__spin_scores', 'report__feedback', 'report__next_actions', 'report__scoring_details']
     try:
-        report = session.report
-        response_data['report'] = ReportSerializer(report).data
-    except Report.DoesNotExist:
-        response_data['report'] = None
-    
-    return Response(response_data, status=status.HTTP_200_OK)
+        session = (
+            Session.objects.select_related('company', 'report')
+            .defer(*deferred)
+            .get(id=id, user=request.user)
+        )
+    except Session.DoesNotExist:
+        logger.warning(f"Session not found: {id}, user: {request.user.id}")
+        raise SessionNotFoundError(f"セッションが見つかりません: {id}")
+
+    response_data = SessionDetailSerializer(session, fields=fields).data
+
+    if 'company' in expand:
+        response_data['company'] = CompanySummarySerializer(session.company).data if session.company_id else None
+
+    if 'report' in expand:
+        try:
+            response_data['report'] = ReportSerializer(session.report).data
+        except Report.DoesNotExist:
+            response_data['report'] = None
+
+    if 'messages' in expand:
+        # (session, sequence) のインデックスで指定位置以降の会話履歴だけを取得
+        # （アーカイブ済みのセッションはアーカイブから読み出す）
+        # 次ページの有無を判定するため1件多く取得する
+        messages = get_messages_after(
+            session, after_sequence, limit + 1, include_archive=versions['archived_at'] is not None
+        )
+        has_more = len(messages) > limit
+        messages = messages[:limit]
+        response_data['messages'] = ChatMessageSerializer(messages, many=True).data
+        response_data['messages_page'] = {
+            "after_sequence": after_sequence,
+            "limit": limit,
+            "next_after_sequence": messages[-1].sequence if has_more else None,
+            "has_more": has_more,
+        }
+
+    return set_private_etag(Response(response_data, status=status.HTTP_200_OK), etag)
 
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def get_report(request, id):
-    """レポート詳細を取得するエンドポイント"""
-    report = get_object_or_404(Report, id=id)
+    """
+    レポート詳細を取得するエンドポイント
+
+    レポートの作成・再スコアリング日時から生成したETagが一致する場合は304を返す
+    """
+    versions = get_object_or_404(Report.objects.values('session__user_id', 'created_at', 'rescored_at'), id=id)
     # 他ユーザーのレポートへのアクセスを防止
-    if report.session.user != request.user:
+    if versions['session__user_id'] != request.user.id:
         return Response({"error": "Permission denied"}, status=status.HTTP_403_FORBIDDEN)
-    return Response(ReportSerializer(report).data, status=status.HTTP_200_OK)
+    etag = compute_etag('report', id, versions['created_at'], versions['rescored_at'])
+    not_modified = not_modified_response(request, etag)
+    if not_modified is not None:
+        return not_modified
+
+    report = Report.objects.select_related('session').get(id=id)
+    return set_private_etag(Response(ReportSerializer(report).data, status=status.HTTP_200_OK), etag)
 
 
 @api_view(['POST'])
@@ -1452,7 +1674,7 @@ def scrape_company(request):
         company_info = scrape_company_info(url)
         
         # Companyモデルに保存
-        company = Company.objects.create(
+        company = create_company_from_scrape(
             user=request.user,
             source_url=url,
             scrape_source='url',
@@ -1471,7 +1693,9 @@ def scrape_company(request):
         analysis_result = None
         if value_proposition:
             try:
-                analysis_result = analyze_spin_suitability(company_info, value_proposition)
+                analysis_result = analyze_spin_suitability(
+                    company_info, value_proposition, retrieval_index=get_retrieval_index(company.pk)
+                )
                 company_analysis = CompanyAnalysis.objects.create(
                     company=company,
                     user=request.user,
@@ -1544,7 +1768,7 @@ def scrape_from_sitemap(request):
         company_info = scrape_multiple_urls(urls, max_urls=50)
         
         # Companyモデルに保存
-        company = Company.objects.create(
+        company = create_company_from_scrape(
             user=request.user,
             source_url=source_url,
             scrape_source='sitemap',
@@ -1564,7 +1788,9 @@ def scrape_from_sitemap(request):
         analysis_result = None
         if value_proposition:
             try:
-                analysis_result = analyze_spin_suitability(company_info, value_proposition)
+                analysis_result = analyze_spin_suitability(
+                    company_info, value_proposition, retrieval_index=get_retrieval_index(company.pk)
+                )
                 company_analysis = CompanyAnalysis.objects.create(
                     company=company,
                     user=request.user,
@@ -1616,7 +1842,8 @@ def analyze_company(request):
         
         logger.info(f"企業分析を開始: Company ID={company.id}, User={request.user.username}")
         
-        # 企業情報を辞書形式に変換
+        # 企業情報を辞書形式に変換（生HTML・本文テキストは圧縮テーブルから読み込む）
+        scraped_data = get_scraped_data(company) or {}
         company_info = {
             'company_name': company.company_name,
             'industry': company.industry,
@@ -1624,11 +1851,14 @@ def analyze_company(request):
             'location': company.location,
             'employee_count': company.employee_count,
             'established_year': company.established_year,
-            'raw_html_list': company.scraped_data.get('raw_html_list', []) if company.scraped_data else []
+            'raw_html_list': scraped_data.get('raw_html_list', []),
+            'page_texts': scraped_data.get('page_texts', [])
         }
         
         # SPIN適合性分析を実行
-        analysis_result = analyze_spin_suitability(company_info, value_proposition)
+        analysis_result = analyze_spin_suitability(
+            company_info, value_proposition, retrieval_index=get_retrieval_index(company.pk)
+        )
         
         # CompanyAnalysisモデルに保存（既存の場合は更新）
         company_analysis, created = CompanyAnalysis.objects.update_or_create(
@@ -1666,54 +1896,61 @@ def analyze_company(request):
 @api_view(['GET'])
 @permission_classes([AllowAny])
 def get_simple_ranking(request):
-    """簡易診断モードのランキングを取得するエンドポイント（認証不要）"""
+    """
+    簡易診断モードのランキングを取得するエンドポイント（認証不要）
+
+    - Query: page_size（最大100）, cursor（次ページは前ページの next_cursor）, industry（業界で絞り込む場合）
+    """
+    return _ranking_response(request, 'simple')
+
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def get_detailed_ranking(request):
+    """
+    詳細診断モードのランキングを取得するエンドポイント（認証不要）
+
+    - Query: page_size（最大100）, cursor（次ページは前ページの next_cursor）, industry（業界で絞り込む場合）
+    """
+    return _ranking_response(request, 'detailed')
+
+
+@conditional_etag
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def get_my_ranking(request):
+    """
+    ログインユーザーの自己ベストの順位と上位何%かを取得するエンドポイント
+
+    - URL: /api/ranking/me/
+    - Query: mode（simple/detailed、省略時は両方）
+
+    Response:
+    {
+        "username": "taro",
+        "rankings": {
+            "simple": {"mode": "simple", "best_session_id": "...", "score": 82.0, "rank": 123,
+                       "total_sessions": 1500, "top_percent": 8.2, "percentile": 91.8},
+            "detailed": null
+        }
+    }
+    """
+    mode = request.query_params.get('mode')
+    if mode and mode not in RANKING_SCORE_FIELDS:
+        return Response({
+            "error": "Invalid mode",
+            "message": f"mode は {'/'.join(RANKING_SCORE_FIELDS)} を指定してください"
+        }, status=status.HTTP_400_BAD_REQUEST)
+
     try:
-        # 簡易診断モードで完了したセッションのみを対象
-        finished_sessions = Session.objects.filter(
-            mode='simple',
-            status='finished'
-        ).select_related('user', 'report').prefetch_related('messages')
-        
-        # レポートが存在するセッションのみを対象
-        sessions_with_reports = finished_sessions.filter(report__isnull=False)
-        
-        # セッションごとのランキングデータを構築
-        ranking_data = []
-        for session in sessions_with_reports:
-            report = session.report
-            total_score = report.spin_scores.get('total', 0)
-            message_count = session.messages.count()
-            
-            ranking_data.append({
-                'session_id': str(session.id),
-                'username': session.user.username,
-                'industry': session.industry,
-                'total_score': round(total_score, 1),
-                'situation_score': round(report.spin_scores.get('situation', 0), 1),
-                'problem_score': round(report.spin_scores.get('problem', 0), 1),
-                'implication_score': round(report.spin_scores.get('implication', 0), 1),
-                'need_score': round(report.spin_scores.get('need', 0), 1),
-                'message_count': message_count,
-                'finished_at': session.finished_at.isoformat() if session.finished_at else None,
-            })
-        
-        # 総合スコアでソート（降順）
-        ranking_data.sort(key=lambda x: x['total_score'], reverse=True)
-        
-        # 順位を追加
-        for i, entry in enumerate(ranking_data, 1):
-            entry['rank'] = i
-        
-        logger.info(f"簡易診断ランキング取得: {len(ranking_data)}件")
-        
+        modes = [mode] if mode else list(RANKING_SCORE_FIELDS)
         return Response({
-            "mode": "simple",
-            "ranking": ranking_data,
-            "total_sessions": len(ranking_data)
+            "username": request.user.username,
+            "rankings": {m: get_user_rank(request.user, m) for m in modes}
         }, status=status.HTTP_200_OK)
-    
+
     except Exception as e:
-        logger.error(f"ランキング取得エラー: {e}", exc_info=True)
+        logger.error(f"順位取得エラー: {e}", exc_info=True)
         return Response({
             "error": "Failed to get ranking",
             "message": str(e)
@@ -1722,66 +1959,90 @@ def get_simple_ranking(request):
 
 @api_view(['GET'])
 @permission_classes([AllowAny])
-def get_detailed_ranking(request):
-    """詳細診断モードのランキングを取得するエンドポイント（認証不要）"""
+def get_windowed_ranking(request, mode, period):
+    """
+    期間別（日間・週間・月間）ランキングを取得するエンドポイント（認証不要）
+
+    - URL: /api/ranking/<mode>/<period>/（mode: simple/detailed、period: daily/weekly/monthly）
+    - Query: date（期間に含まれる日付 YYYY-MM-DD、省略時は今日。最初のエントリの日〜今日の範囲に丸める）, industry, page, page_size
+
+    ユーザーごとの期間内の最高スコアで順位付けする
+    """
+    if mode not in RANKING_SCORE_FIELDS or period not in RANKING_PERIODS:
+        return Response({
+            "error": "Invalid ranking window",
+            "message": f"mode は {'/'.join(RANKING_SCORE_FIELDS)}、period は {'/'.join(RANKING_PERIODS)} を指定してください"
+        }, status=status.HTTP_404_NOT_FOUND)
+
     try:
-        # 詳細診断モードで完了したセッションのみを対象
-        finished_sessions = Session.objects.filter(
-            mode='detailed',
-            status='finished'
-        ).select_related('user', 'report', 'company').prefetch_related('messages')
-        
-        # レポートが存在するセッションのみを対象
-        sessions_with_reports = finished_sessions.filter(report__isnull=False)
-        
-        # セッションごとのランキングデータを構築
-        ranking_data = []
-        for session in sessions_with_reports:
-            report = session.report
-            total_score = report.spin_scores.get('total', 0)
-            success_probability = session.success_probability
-            message_count = session.messages.count()
-            
-            # 総合評価スコア（スコア70% + 成功率30%）
-            composite_score = (total_score * 0.7) + (success_probability * 0.3)
-            
-            company_name = ''
-            if session.company:
-                company_name = session.company.company_name or ''
-            if not company_name:
-                company_name = session.industry or '未設定'
-            
-            ranking_data.append({
-                'session_id': str(session.id),
-                'username': session.user.username,
-                'company_name': company_name,
-                'industry': session.industry or '未設定',
-                'total_score': round(total_score, 1),
-                'success_probability': round(success_probability, 1),
-                'composite_score': round(composite_score, 1),
-                'situation_score': round(report.spin_scores.get('situation', 0), 1),
-                'problem_score': round(report.spin_scores.get('problem', 0), 1),
-                'implication_score': round(report.spin_scores.get('implication', 0), 1),
-                'need_score': round(report.spin_scores.get('need', 0), 1),
-                'message_count': message_count,
-                'finished_at': session.finished_at.isoformat() if session.finished_at else None,
-            })
-        
-        # 総合評価スコアでソート（降順）
-        ranking_data.sort(key=lambda x: x['composite_score'], reverse=True)
-        
-        # 順位を追加
-        for i, entry in enumerate(ranking_data, 1):
-            entry['rank'] = i
-        
-        logger.info(f"詳細診断ランキング取得: {len(ranking_data)}件")
-        
+        page, page_size = parse_page_params(request.query_params)
+        date_param = request.query_params.get('date')
+        day = datetime.strptime(date_param, '%Y-%m-%d').date() if date_param else timezone.localdate()
+        day = clamp_window_day(mode, day)
+    except ValueError:
         return Response({
-            "mode": "detailed",
-            "ranking": ranking_data,
-            "total_sessions": len(ranking_data)
-        }, status=status.HTTP_200_OK)
-    
+            "error": "Invalid parameters",
+            "message": "page と page_size には整数、date には YYYY-MM-DD 形式の日付を指定してください"
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    industry = request.query_params.get('industry', '').strip()
+    return _cached_ranking_response(
+        request,
+        mode,
+        (period, day, industry, page, page_size),
+        lambda version: get_window_payload(mode, period, day, industry, page, page_size, version),
+    )
+
+
+def _ranking_response(request, mode):
+    """ランキングの1ページ分を返す"""
+    cursor = request.query_params.get('cursor', '').strip()
+    try:
+        page_size = parse_page_size(request.query_params)
+        parse_cursor(cursor)
+    except ValueError:
+        return Response({
+            "error": "Invalid pagination parameters",
+            "message": "page_size には整数、cursor には前ページの next_cursor を指定してください"
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    industry = request.query_params.get('industry', '').strip()
+    return _cached_ranking_response(
+        request,
+        mode,
+        (industry, cursor, page_size),
+        lambda version: get_ranking_payload(mode, page_size, version, industry, cursor),
+    )
+
+
+def _cached_ranking_response(request, mode, cache_parts, build_payload):
+    """
+    キャッシュ済みのランキングレスポンスを返す
+
+    レスポンスはランキングのバージョンごとにキャッシュし、ETag/Last-Modifiedで
+    ブラウザ・nginxからの再検証（304）に応答する
+
+    Args:
+        cache_parts: ETagに含めるリクエストパラメータ
+        build_payload: バージョンを受け取り、シリアライズ済みのJSONを返す関数
+    """
+    try:
+        version, last_modified = get_ranking_version(mode)
+        if last_modified is not None:
+            # HTTP日付は秒単位のため切り捨てて比較する
+            last_modified = int(last_modified)
+        etag = build_etag(mode, version, *cache_parts)
+
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = HttpResponse(build_payload(version), content_type='application/json')
+
+        response.headers['ETag'] = etag
+        if last_modified is not None:
+            response.headers['Last-Modified'] = http_date(last_modified)
+        patch_cache_control(response, public=True, max_age=settings.RANKING_CACHE_MAX_AGE)
+        return response
+
     except Exception as e:
         logger.error(f"ランキング取得エラー: {e}", exc_info=True)
         return Response({
@@ -1840,13 +2101,10 @@ def transcribe_speech(request):
         # 言語コードを取得（デフォルト: ja-JP）
         language_code = request.data.get('language_code', 'ja-JP')
         
-        # 音声データを読み込む
-        audio_data = audio_file.read()
-        logger.info(f"音声データを読み込み: size={len(audio_data)} bytes")
-        
-        # エンコーディングを検出
+        # エンコーディングを先頭部分から検出（ファイル全体はまだ読み込まない）
         try:
-            encoding = detect_audio_encoding(audio_data)
+            encoding = detect_audio_encoding(audio_file.read(1024))
+            audio_file.seek(0)
             logger.info(f"音声エンコーディングを検出: {encoding}")
         except ValueError as ve:
             logger.error(f"音声エンコーディング検出エラー: {str(ve)}")
@@ -1861,28 +2119,29 @@ def transcribe_speech(request):
                 "detail": f"予期しないエラーが発生しました: {str(e)}"
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
         
-        # WEBM OPUS形式の場合は、WAV形式に変換してから送信
-        # GCP Speech-to-Text APIのWEBM OPUSサポートが不安定な場合があるため
+        # WEBM OPUS形式はGCP Speech-to-Text APIにそのまま送る（SPEECH_WEBM_OPUS_DIRECT=Falseの場合のみWAV形式に変換）
+        # 変換する場合はアップロードされたファイルをチャンクごとにffmpegへ流し込む
         sample_rate_hertz = 16000  # デフォルトのサンプリングレート
+        audio_data = None
         if encoding == speech.RecognitionConfig.AudioEncoding.WEBM_OPUS:
-            try:
-                from .services.speech_to_text import convert_webm_to_wav
-                logger.info('WEBM OPUS形式を検出。WAV形式に変換します。')
-                audio_data, sample_rate_hertz = convert_webm_to_wav(audio_data)
-                encoding = speech.RecognitionConfig.AudioEncoding.LINEAR16
-                logger.info(f'WAV形式への変換が完了しました。サンプリングレート: {sample_rate_hertz}Hz')
-            except ImportError as ie:
-                logger.warning(f'pydubライブラリがインストールされていません: {str(ie)}。元のWEBM形式で続行します。')
-                # pydubがインストールされていない場合は、元のWEBM形式で続行
-                # GCP Speech-to-Text APIがWEBM OPUSをサポートしている可能性があるため
-                encoding = speech.RecognitionConfig.AudioEncoding.WEBM_OPUS
-                sample_rate_hertz = None  # WEBM OPUSの場合はサンプリングレートを指定しない
-            except Exception as e:
-                logger.warning(f'WAV形式への変換に失敗しました: {str(e)}。元のWEBM形式で続行します。', exc_info=True)
-                # 変換に失敗した場合は、元のWEBM形式で続行を試みる
-                # GCP Speech-to-Text APIがWEBM OPUSをサポートしている可能性があるため
-                encoding = speech.RecognitionConfig.AudioEncoding.WEBM_OPUS
+            if settings.SPEECH_WEBM_OPUS_DIRECT:
                 sample_rate_hertz = None  # WEBM OPUSの場合はサンプリングレートを指定しない
+            else:
+                try:
+                    from .services.speech_to_text import convert_webm_to_wav
+                    logger.info('WEBM OPUS形式を検出。WAV形式に変換します。')
+                    audio_data, sample_rate_hertz = convert_webm_to_wav(audio_file.chunks())
+                    encoding = speech.RecognitionConfig.AudioEncoding.LINEAR16
+                    logger.info(f'WAV形式への変換が完了しました。サンプリングレート: {sample_rate_hertz}Hz')
+                except Exception as e:
+                    logger.warning(f'WAV形式への変換に失敗しました: {str(e)}。元のWEBM形式で続行します。', exc_info=True)
+                    # 変換に失敗した場合は、元のWEBM形式で続行を試みる
+                    audio_file.seek(0)
+                    sample_rate_hertz = None  # WEBM OPUSの場合はサンプリングレートを指定しない
+        
+        if audio_data is None:
+            audio_data = audio_file.read()
+            logger.info(f"音声データを読み込み: size={len(audio_data)} bytes")
         
         # 音声をテキストに変換
         try:
@@ -1923,6 +2182,84 @@ def transcribe_speech(request):
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def transcribe_long_speech(request):
+    """
+    長時間の音声をテキストに変換するエンドポイント（ロールプレイの通し練習など、60秒を超える録音用）
+    無音の位置で分割し、区間ごとに並列で認識してからつなぎ合わせる（services/long_audio.py）
+    
+    - URL: /api/speech/transcribe/long/
+    - Method: POST
+    - Authentication: Token認証必須
+    - Content-Type: multipart/form-data
+    - Body:
+      - audio: 音声ファイル（WEBM、WAV、MP3など。SPEECH_LONG_AUDIO_MAX_BYTES以下）
+      - language_code: 言語コード（オプション、デフォルト: ja-JP）
+    
+    Response:
+    {
+        "text": "変換されたテキスト（全体）",
+        "confidence": 0.92,
+        "duration": 612.4,
+        "segments": [{"start": 0.0, "end": 7.3, "text": "...", "confidence": 0.95}, ...]
+    }
+    """
+    from .services.long_audio import AudioTooLongError, transcribe_long_audio
+    
+    if 'audio' not in request.FILES:
+        return Response({
+            "error": "音声ファイルが送信されていません",
+            "detail": "audioフィールドに音声ファイルを添付してください"
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    audio_file = request.FILES['audio']
+    logger.info(f"長時間音声を受信: filename={audio_file.name}, size={audio_file.size} bytes, content_type={audio_file.content_type}")
+    
+    max_size = settings.SPEECH_LONG_AUDIO_MAX_BYTES
+    if audio_file.size > max_size:
+        return Response({
+            "error": "ファイルサイズが大きすぎます",
+            "detail": f"ファイルサイズは{max_size / 1024 / 1024:.0f}MB以下にしてください"
+        }, status=status.HTTP_400_BAD_REQUEST)
+    if audio_file.size < 100:
+        return Response({
+            "error": "音声ファイルが小さすぎます",
+            "detail": f"音声ファイルが正しく録音されていない可能性があります（サイズ: {audio_file.size} bytes）"
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    language_code = request.data.get('language_code', 'ja-JP')
+    
+    try:
+        result = transcribe_long_audio(audio_file.chunks(), language_code=language_code)
+    except AudioTooLongError as e:
+        return Response({
+            "error": "録音が長すぎます",
+            "detail": str(e)
+        }, status=status.HTTP_400_BAD_REQUEST)
+    except Exception as e:
+        logger.error(f"長時間音声の文字起こしエラー: {e}", exc_info=True)
+        return Response({
+            "error": "音声認識に失敗しました",
+            "detail": str(e)
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+    
+    if not result['text']:
+        return Response({
+            "error": "音声認識に失敗しました",
+            "detail": "音声が認識できませんでした。無音の可能性があります。もう一度録音してください。"
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    logger.info(f"長時間音声の変換成功: user={request.user.username}, duration={result['duration']}秒, text_length={len(result['text'])}")
+    
+    return Response({
+        "text": result['text'],
+        "confidence": result['confidence'],
+        "duration": result['duration'],
+        "segments": result['segments'],
+    }, status=status.HTTP_200_OK)
+
+
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 def generate_tts(request):
@@ -1989,6 +2326,7 @@ def generate_tts(request):
     )
 
 
+@conditional_etag
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def get_tts_voices(request):
@@ -2001,3 +2339,17 @@ def get_tts_voices(request):
     return Response({
         "voices": voices
     }, status=status.HTTP_200_OK)
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def get_realtime_metrics(request):
+    """
+    リアルタイムモードのメトリクス（全ワーカーの合算、管理者のみ）
+
+    - URL: /api/metrics/realtime/
+    - Response: {"workers": [...], "connections": 接続数, "counters": {...}, "peaks": {...}, "gauges": {...}}
+    """
+    from .services.realtime_metrics import collect
+
+    return Response(collect(), status=status.HTTP_200_OK)
@@ -213,6 +213,16 @@ async function startRealtimeConversation() {
             }
         };
         
+        realtimeClient.onTranscriptDone = (text) => {
+            // AIの応答を全文で確定
+            replaceAIMessage(text);
+        };
+        
+        // 営業メッセージの分析結果が届いたらすぐにスコアを更新
+        realtimeClient.onAnalysis = (analysis) => {
+            applyRealtimeAnalysis(analysis);
+        };
+        
         realtimeClient.onResponse = async (response) => {
             if (window.logger) {
                 window.logger.info('AI応答完了', response);
@@ -466,6 +476,19 @@ function updateOrAddAIMessage(text) {
     chatMessages.scrollTop = chatMessages.scrollHeight;
 }
 
+/**
+ * AIメッセージを全文で置き換え（表示中のメッセージがなければ追加）
+ */
+function replaceAIMessage(text) {
+    const existingMessage = currentAIMessageId ? document.getElementById(currentAIMessageId) : null;
+    const contentDiv = existingMessage ? existingMessage.querySelector('.message-content') : null;
+    if (contentDiv) {
+        contentDiv.textContent = text;
+        return;
+    }
+    updateOrAddAIMessage(text);
+}
+
 /**
  * ユーザーメッセージのプレースホルダーを作成
  */
@@ -554,8 +577,8 @@ async function updateRealtimeScore(response) {
     }
     
     try {
-        // 最新のセッション情報を取得
-        const apiResponse = await fetch(`/api/session/${currentSessionId}/`, {
+        // 最新の成功率とSPIN段階のみ取得（会話履歴などは取得しない）
+        const apiResponse = await fetch(`/api/session/${currentSessionId}/?fields=success_probability,current_spin_stage&expand=`, {
             headers: {
                 'Authorization': `Token ${authToken}`,
                 'Content-Type': 'application/json'
@@ -610,6 +633,25 @@ async function updateRealtimeScore(response) {
     }
 }
 
+/**
+ * サーバーから届いた営業メッセージの分析結果をスコアに反映
+ */
+function applyRealtimeAnalysis(analysis) {
+    const currentScore = analysis.success_probability;
+    if (typeof currentScore !== 'number') {
+        return;
+    }
+    const spinStage = analysis.current_spin_stage || 'S';
+    
+    if (typeof updateSuccessProbability === 'function') {
+        updateSuccessProbability(currentScore, analysis.success_delta || 0, null, {
+            currentStage: spinStage,
+            sessionStage: spinStage
+        });
+    }
+    lastRealtimeScore = currentScore;
+}
+
 /**
  * リアルタイムセッション開始時にスコアをリセット
  */
@@ -2071,12 +2071,16 @@ function resetCoachingHints() {
     updateCoachingHint('info', '会話を開始すると、顧客の反応に応じたアドバイスが表示されます', '📝');
 }
 
+// セッション詳細APIで1回に取得する会話履歴の件数
+const SESSION_MESSAGES_PAGE_SIZE = 200;
+
 // チャット履歴の読み込み
 async function loadChatHistory() {
     if (!currentSessionId) return;
     
     try {
-        const response = await fetch(`${API_BASE_URL}/session/${currentSessionId}/`, {
+        // 企業概要と会話履歴のみ取得（レポートやスクレイピングの生データは取得しない）
+        const response = await fetch(`${API_BASE_URL}/session/${currentSessionId}/?expand=company,messages&limit=${SESSION_MESSAGES_PAGE_SIZE}`, {
             method: 'GET',
             headers: {
                 'Authorization': `Token ${authToken}`
@@ -2086,6 +2090,19 @@ async function loadChatHistory() {
         const data = await response.json();
         
         if (response.ok) {
+            // 会話履歴が複数ページに分かれている場合は続きを取得
+            let page = data.messages_page;
+            while (page && page.has_more) {
+                const pageResponse = await fetch(
+                    `${API_BASE_URL}/session/${currentSessionId}/?fields=id&expand=messages&after_sequence=${page.next_after_sequence}&limit=${SESSION_MESSAGES_PAGE_SIZE}`,
+                    { headers: { 'Authorization': `Token ${authToken}` } }
+                );
+                if (!pageResponse.ok) break;
+                const pageData = await pageResponse.json();
+                data.messages = data.messages.concat(pageData.messages);
+                page = pageData.messages_page;
+            }
+            
             // 企業情報がある場合は表示（詳細診断モード）
             if (data.company) {
                 displayCompanySummary(data.company);
@@ -2640,7 +2657,12 @@ async function finishSession() {
         
         const data = await response.json();
         
-        if (response.ok) {
+        if (response.status === 202) {
+            // バックグラウンドでスコアリング中: 進捗をストリーミングで受信
+            const result = await streamScoringJob(data.job_id);
+            currentReportId = result.report_id;
+            displayScoringResult(result);
+        } else if (response.ok) {
             currentReportId = data.report_id;
             displayScoringResult(data);
         } else {
@@ -2653,6 +2675,67 @@ async function finishSession() {
     }
 }
 
+// スコアリングジョブの進捗をSSEで受信し、最終結果を返す
+async function streamScoringJob(jobId) {
+    const container = document.getElementById('scoringResult');
+    let partialFeedback = '';
+    let feedbackElement = null;
+    
+    const response = await fetch(`${API_BASE_URL}/session/finish/job/${jobId}/stream/`, {
+        headers: {
+            'Authorization': `Token ${authToken}`
+        }
+    });
+    
+    if (!response.ok) {
+        throw new Error('スコアリングの進捗取得に失敗しました');
+    }
+    
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    
+    while (true) {
+        const { done, value } = await reader.read();
+        
+        if (done) {
+            break;
+        }
+        
+        buffer += decoder.decode(value, { stream: true });
+        const lines = buffer.split('\n\n');
+        buffer = lines.pop() || ''; // 最後の不完全な行を保持
+        
+        for (const line of lines) {
+            if (!line.startsWith('data: ')) {
+                continue;
+            }
+            const data = JSON.parse(line.slice(6));
+            
+            if (data.type === 'chunk') {
+                // 生成途中のフィードバックを表示
+                partialFeedback += data.content;
+                if (!feedbackElement && container) {
+                    feedbackElement = document.createElement('div');
+                    feedbackElement.className = 'feedback-text';
+                    container.appendChild(feedbackElement);
+                }
+                if (feedbackElement) {
+                    feedbackElement.textContent = partialFeedback;
+                }
+            } else if (data.type === 'done') {
+                return data.result;
+            } else if (data.type === 'error') {
+                throw new Error(data.error);
+            } else if (data.type === 'timeout') {
+                throw new Error('スコアリングがタイムアウトしました。しばらくしてから履歴をご確認ください');
+            }
+        }
+    }
+    
+    throw new Error('スコアリングの進捗ストリームが切断されました');
+}
+
 // スコアリング結果の表示
 function displayScoringResult(data) {
     const container = document.getElementById('scoringResult');
@@ -2692,9 +2775,16 @@ function displayScoringResult(data) {
     // 新しい5要素スコアリングの内訳を表示
     const hasNewScoring = explorationScore > 0 || implicationScore > 0 || valuePropositionScore > 0 || customerResponseScore > 0 || advancementScore > 0;
     
+    // ランキング順位（自己ベスト）
+    const personalBest = data.ranking ? data.ranking.personal_best : null;
+    const rankText = personalBest
+        ? `自己ベスト ${personalBest.score}点：${personalBest.rank}位 / ${personalBest.total_sessions}件（上位${personalBest.top_percent}%）`
+        : '';
+    
     container.innerHTML = `
         <div class="score-card">
             <div class="score-total" style="color: ${scoreColor}">${totalScore.toFixed(1)}点</div>
+            ${rankText ? `<div class="score-rank">${escapeHtml(rankText)}</div>` : ''}
             ${hasNewScoring ? `
             <div class="score-details">
                 <h4 style="margin-top: 20px; margin-bottom: 10px; font-size: 16px; color: #333;">評価内訳（5要素）</h4>
@@ -2862,6 +2952,9 @@ function displayReportDetails(report) {
     container.innerHTML = detailsHTML;
 }
 
+// セッション一覧の次ページのカーソル
+let sessionListNextCursor = null;
+
 // セッション一覧の表示
 async function viewSessionList() {
     if (!authToken) {
@@ -2871,6 +2964,7 @@ async function viewSessionList() {
     
     showStep('sessionList');
     showLoading('sessionListContent');
+    sessionListNextCursor = null;
     
     try {
         const response = await fetch(`${API_BASE_URL}/session/list/`, {
@@ -2883,6 +2977,7 @@ async function viewSessionList() {
         const data = await response.json();
         
         if (response.ok) {
+            sessionListNextCursor = data.next_cursor;
             displaySessionList(data.results);
         } else {
             showError('sessionListContent', 'セッション一覧取得に失敗しました: ' + (data.detail || data.message || data.error || '不明なエラー'));
@@ -2892,8 +2987,33 @@ async function viewSessionList() {
     }
 }
 
+// セッション一覧の続きを読み込む
+async function loadMoreSessions() {
+    if (!sessionListNextCursor) return;
+    
+    try {
+        const response = await fetch(`${API_BASE_URL}/session/list/?cursor=${encodeURIComponent(sessionListNextCursor)}`, {
+            method: 'GET',
+            headers: {
+                'Authorization': `Token ${authToken}`
+            }
+        });
+        
+        const data = await response.json();
+        
+        if (response.ok) {
+            sessionListNextCursor = data.next_cursor;
+            displaySessionList(data.results, true);
+        } else {
+            alert('セッション一覧取得に失敗しました: ' + (data.detail || data.message || data.error || '不明なエラー'));
+        }
+    } catch (error) {
+        alert('エラー: ' + error.message);
+    }
+}
+
 // セッション一覧の表示
-function displaySessionList(sessions) {
+function displaySessionList(sessions, append = false) {
     const container = document.getElementById('sessionListContent');
     
     if (!container) {
@@ -2901,12 +3021,12 @@ function displaySessionList(sessions) {
         return;
     }
     
-    if (sessions.length === 0) {
+    if (!append && sessions.length === 0) {
         container.innerHTML = '<p>セッションがありません</p>';
         return;
     }
     
-    container.innerHTML = sessions.map(session => `
+    const itemsHTML = sessions.map(session => `
         <div class="session-item" onclick="viewSessionDetail('${session.id}')">
             <div class="session-item-header">
                 <span class="session-item-id">${session.id}</span>
@@ -2920,6 +3040,20 @@ function displaySessionList(sessions) {
             </div>
         </div>
     `).join('');
+    
+    // 「さらに読み込む」ボタンは末尾に1つだけ表示する
+    const existingButton = document.getElementById('loadMoreSessionsBtn');
+    if (existingButton) existingButton.remove();
+    
+    if (append) {
+        container.insertAdjacentHTML('beforeend', itemsHTML);
+    } else {
+        container.innerHTML = itemsHTML;
+    }
+    
+    if (sessionListNextCursor) {
+        container.insertAdjacentHTML('beforeend', '<button id="loadMoreSessionsBtn" class="btn-secondary" onclick="loadMoreSessions()">さらに読み込む</button>');
+    }
 }
 
 // セッション一覧の更新
@@ -3392,10 +3526,15 @@ function initTemperatureScorePanel() {
     }
 }
 
+// ランキングの1ページあたりの件数
+const RANKING_PAGE_SIZE = 50;
+// 各ページを取得するためのカーソル（rankingCursors[mode][page - 1]、1ページ目は空）
+const rankingCursors = { simple: [''], detailed: [''] };
+
 // ランキング表示
-async function showRanking(mode) {
+async function showRanking(mode, page = 1) {
     if (window.logger) {
-        window.logger.info('ランキングを表示', { mode });
+        window.logger.info('ランキングを表示', { mode, page });
     }
     
     showStep('ranking');
@@ -3417,13 +3556,21 @@ async function showRanking(mode) {
     
     try {
         const endpoint = mode === 'simple' ? 'ranking/simple/' : 'ranking/detailed/';
-        const response = await fetch(`${API_BASE_URL}/${endpoint}`);
+        if (page === 1) {
+            rankingCursors[mode] = [''];
+        }
+        const cursor = rankingCursors[mode][page - 1] || '';
+        const response = await fetch(`${API_BASE_URL}/${endpoint}?page_size=${RANKING_PAGE_SIZE}&cursor=${encodeURIComponent(cursor)}`);
         
         if (!response.ok) {
             throw new Error(`ランキング取得に失敗しました: ${response.status}`);
         }
         
         const data = await response.json();
+        data.page = page;
+        if (data.next_cursor) {
+            rankingCursors[mode][page] = data.next_cursor;
+        }
         
         // ローディング非表示
         if (rankingLoading) rankingLoading.style.display = 'none';
@@ -3468,8 +3615,8 @@ function displayRanking(data, mode) {
     
     html += '</tr></thead><tbody>';
     
-    ranking.forEach((entry, index) => {
-        const rankClass = index < 3 ? `rank-${index + 1}` : '';
+    ranking.forEach((entry) => {
+        const rankClass = entry.rank <= 3 ? `rank-${entry.rank}` : '';
         html += '<tr class="' + rankClass + '">';
         html += `<td class="rank-cell">${entry.rank}</td>`;
         html += `<td class="username-cell">${escapeHtml(entry.username)}</td>`;
@@ -3502,6 +3649,16 @@ function displayRanking(data, mode) {
     
     html += '</tbody></table>';
     
+    // ページ切り替え
+    const page = data.page || 1;
+    if (page > 1 || data.has_next) {
+        html += '<div class="ranking-pagination">';
+        html += `<button class="btn-secondary" onclick="showRanking('${mode}', ${page - 1})" ${page > 1 ? '' : 'disabled'}>← 前へ</button>`;
+        html += `<span class="ranking-page-info">${page}ページ目（全${data.total_sessions}件）</span>`;
+        html += `<button class="btn-secondary" onclick="showRanking('${mode}', ${page + 1})" ${data.has_next ? '' : 'disabled'}>次へ →</button>`;
+        html += '</div>';
+    }
+    
     rankingTable.innerHTML = html;
 }
 
@@ -3679,8 +3836,8 @@ async function loadDashboard() {
     document.getElementById('recentSessionsList').innerHTML = '<p class="loading-text">セッション履歴を読み込み中...</p>';
     
     try {
-        // セッション一覧を取得
-        const response = await fetch(`${API_BASE_URL}/session/list/`, {
+        // 直近のセッションと統計情報を取得（件数に関わらず一定のコストで取得できる）
+        const response = await fetch(`${API_BASE_URL}/session/list/?limit=5&stats=true`, {
             method: 'GET',
             headers: {
                 'Authorization': `Token ${authToken}`
@@ -3698,8 +3855,8 @@ async function loadDashboard() {
         const data = await response.json();
         const sessions = data.results || data || [];
         
-        // 統計情報を計算・表示
-        displayDashboardStats(sessions);
+        // 統計情報を表示
+        displayDashboardStats(data.stats);
         
         // 直近のセッション履歴を表示
         displayRecentSessions(sessions);
@@ -3725,34 +3882,14 @@ function displayDashboardError(message) {
 }
 
 // 統計情報を表示
-function displayDashboardStats(sessions) {
+function displayDashboardStats(stats) {
     // 総セッション数
-    const totalSessions = sessions.length;
-    document.getElementById('totalSessionsCount').textContent = totalSessions;
-    
-    // 完了済みセッション（スコアがあるもの）をフィルタ
-    const scoredSessions = sessions.filter(s => s.status === 'finished' && s.report);
-    
-    if (scoredSessions.length > 0) {
-        // 平均スコア計算
-        let totalScore = 0;
-        let highestScore = 0;
-        
-        scoredSessions.forEach(session => {
-            // report内のスコアを取得
-            const report = session.report;
-            if (report && report.spin_scores && report.spin_scores.total !== undefined) {
-                const score = report.spin_scores.total;
-                totalScore += score;
-                if (score > highestScore) {
-                    highestScore = score;
-                }
-            }
-        });
-        
-        const avgScore = totalScore / scoredSessions.length;
-        document.getElementById('averageScoreValue').textContent = avgScore.toFixed(1) + '点';
-        document.getElementById('highestScoreValue').textContent = highestScore.toFixed(1) + '点';
+    document.getElementById('totalSessionsCount').textContent = stats ? stats.total_sessions : '-';
+    
+    // スコアリング済みのセッションから平均・最高スコアを表示
+    if (stats && stats.scored_sessions > 0) {
+        document.getElementById('averageScoreValue').textContent = stats.average_score.toFixed(1) + '点';
+        document.getElementById('highestScoreValue').textContent = stats.highest_score.toFixed(1) + '点';
     } else {
         document.getElementById('averageScoreValue').textContent = '-';
         document.getElementById('highestScoreValue').textContent = '-';
@@ -3861,6 +3998,14 @@ let isRecording = false;
 let recordingStartTime = null;
 let recordingTimer = null;
 
+// ストリーミング音声認識（/ws/speech/）
+// 録音中にチャンクを送り、途中結果を入力欄に表示する。録音終了時には確定結果がほぼ揃っているため待ち時間が短い
+// 接続できない場合や結果が返らない場合は、従来どおり録音全体を /speech/transcribe/ に送信する
+let speechSocket = null;
+let speechStreaming = false; // startを送信済みで、録音チャンクを送信中
+let speechFinalText = '';
+let speechDoneHandler = null;
+
 // 音声録音の開始/停止
 async function toggleVoiceRecording() {
     if (!authToken) {
@@ -3903,10 +4048,18 @@ async function startRecording() {
         mediaRecorder = new MediaRecorder(stream, options);
         audioChunks = [];
         
+        // WEBM（Opus）で録音できる場合はストリーミング音声認識を使う
+        if (mediaRecorder.mimeType.includes('webm')) {
+            openSpeechStream();
+        }
+        
         // データが利用可能になったときの処理
         mediaRecorder.ondataavailable = (event) => {
             if (event.data.size > 0) {
                 audioChunks.push(event.data);
+                if (speechStreaming && speechSocket.readyState === WebSocket.OPEN) {
+                    speechSocket.send(event.data);
+                }
             }
         };
         
@@ -3917,9 +4070,15 @@ async function startRecording() {
             
             // 音声データをBlobに変換
             const audioBlob = new Blob(audioChunks, { type: mediaRecorder.mimeType });
+            const durationMs = Date.now() - recordingStartTime;
             
-            // バックエンドに送信してテキスト変換
-            await transcribeAudio(audioBlob);
+            // ストリーミング音声認識の確定結果を使う（得られない場合はバックエンドに送信してテキスト変換）
+            const result = await finishSpeechStream();
+            if (result && result.type === 'done' && result.text.trim().length > 0) {
+                applyTranscribedText(result.text, result.confidence);
+            } else {
+                await transcribeAudio(audioBlob, durationMs);
+            }
             
             // タイマーを停止
             if (recordingTimer) {
@@ -3931,8 +4090,8 @@ async function startRecording() {
             updateRecordingUI(false);
         };
         
-        // 録音開始
-        mediaRecorder.start();
+        // 録音開始（ストリーミング音声認識に送るため250msごとにデータを取り出す）
+        mediaRecorder.start(250);
         isRecording = true;
         recordingStartTime = Date.now();
         
@@ -3973,6 +4132,88 @@ function stopRecording() {
     }
 }
 
+// ストリーミング音声認識の接続を開始
+function openSpeechStream() {
+    closeSpeechStream();
+    speechFinalText = '';
+    
+    const wsProtocol = window.location.protocol === 'https:' ? 'wss:' : 'ws:';
+    const socket = new WebSocket(`${wsProtocol}//${window.location.host}/ws/speech/?token=${authToken}`);
+    speechSocket = socket;
+    
+    socket.onmessage = (event) => {
+        if (socket !== speechSocket) return;
+        const data = JSON.parse(event.data);
+        
+        if (data.type === 'ready') {
+            if (!isRecording) return; // 接続前に録音が終わった場合はアップロードで変換する
+            socket.send(JSON.stringify({
+                type: 'start',
+                language_code: 'ja-JP',
+                encoding: 'webm_opus',
+                sample_rate_hertz: 48000
+            }));
+            // 接続までに録音したデータを先に送る
+            audioChunks.forEach(chunk => socket.send(chunk));
+            speechStreaming = true;
+        } else if (data.type === 'transcript') {
+            showSpeechTranscript(data);
+        } else if (data.type === 'done' || data.type === 'error') {
+            if (data.type === 'error' && window.logger) {
+                window.logger.warning('ストリーミング音声認識エラー', { error: data.error && data.error.message });
+            }
+            if (speechDoneHandler) speechDoneHandler(data);
+        }
+    };
+    
+    socket.onclose = () => {
+        if (socket !== speechSocket) return;
+        speechStreaming = false;
+        if (speechDoneHandler) speechDoneHandler(null);
+    };
+}
+
+// 途中結果・確定結果を入力欄に表示
+function showSpeechTranscript(data) {
+    const messageInput = document.getElementById('chatMessageInput');
+    if (data.is_final) {
+        speechFinalText += data.text.trim();
+    }
+    if (messageInput) {
+        messageInput.value = speechFinalText + (data.is_final ? '' : data.text);
+    }
+}
+
+// 録音終了を通知し、確定結果を待つ（得られなかった場合はnull）
+function finishSpeechStream(timeoutMs = 10000) {
+    const socket = speechSocket;
+    if (!speechStreaming || !socket || socket.readyState !== WebSocket.OPEN) {
+        closeSpeechStream();
+        return Promise.resolve(null);
+    }
+    
+    return new Promise((resolve) => {
+        const timer = setTimeout(() => done(null), timeoutMs);
+        function done(result) {
+            clearTimeout(timer);
+            speechDoneHandler = null;
+            closeSpeechStream();
+            resolve(result);
+        }
+        speechDoneHandler = done;
+        socket.send(JSON.stringify({ type: 'stop' }));
+    });
+}
+
+function closeSpeechStream() {
+    const socket = speechSocket;
+    speechSocket = null;
+    speechStreaming = false;
+    if (socket && socket.readyState <= WebSocket.OPEN) {
+        socket.close();
+    }
+}
+
 // 録音時間のタイマー
 function startRecordingTimer() {
     const timeDisplay = document.getElementById('recordingTime');
@@ -4013,8 +4254,31 @@ function updateRecordingUI(recording) {
     }
 }
 
+// 変換されたテキストを入力欄に設定
+function applyTranscribedText(text, confidence) {
+    const messageInput = document.getElementById('chatMessageInput');
+    if (!messageInput) return;
+    
+    messageInput.value = text;
+    messageInput.placeholder = '営業担当者の質問を入力...';
+    messageInput.disabled = false;
+    
+    // 入力欄にフォーカス
+    messageInput.focus();
+    
+    if (window.logger) {
+        window.logger.info('音声変換成功', { 
+            text_length: text.length,
+            confidence: confidence 
+        });
+    }
+}
+
+// 1回の同期認識で変換できる録音の長さ（これより長い録音は分割して認識するエンドポイントに送る）
+const SHORT_TRANSCRIBE_MAX_MS = 55000;
+
 // 音声をテキストに変換
-async function transcribeAudio(audioBlob) {
+async function transcribeAudio(audioBlob, durationMs = 0) {
     const messageInput = document.getElementById('chatMessageInput');
     if (!messageInput) return;
     
@@ -4030,8 +4294,9 @@ async function transcribeAudio(audioBlob) {
         formData.append('audio', audioBlob, 'recording.webm');
         formData.append('language_code', 'ja-JP');
         
-        // バックエンドに送信
-        const response = await fetch(`${API_BASE_URL}/speech/transcribe/`, {
+        // バックエンドに送信（長い録音は分割・並列で認識する）
+        const endpoint = durationMs > SHORT_TRANSCRIBE_MAX_MS ? 'speech/transcribe/long/' : 'speech/transcribe/';
+        const response = await fetch(`${API_BASE_URL}/${endpoint}`, {
             method: 'POST',
             headers: {
                 'Authorization': `Token ${authToken}`
@@ -4043,20 +4308,7 @@ async function transcribeAudio(audioBlob) {
         
         if (response.ok) {
             if (data.text && data.text.trim().length > 0) {
-                // 変換されたテキストを入力欄に設定
-                messageInput.value = data.text;
-                messageInput.placeholder = '営業担当者の質問を入力...';
-                messageInput.disabled = false;
-                
-                // 入力欄にフォーカス
-                messageInput.focus();
-                
-                if (window.logger) {
-                    window.logger.info('音声変換成功', { 
-                        text_length: data.text.length,
-                        confidence: data.confidence 
-                    });
-                }
+                applyTranscribedText(data.text, data.confidence);
             } else {
                 // テキストが空の場合
                 throw new Error('音声が認識できませんでした。音声が短すぎるか、無音の可能性があります。もう一度録音してください。');
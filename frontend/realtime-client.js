@@ -27,6 +27,13 @@ class RealtimeClient {
         this.onError = null;
         this.onStatusChange = null;
         this.onUserSpeechStopped = null;  // ユーザー発言停止時のコールバック
+        this.onAnalysis = null;  // 営業メッセージの分析結果（成功率・SPIN段階）受信時のコールバック
+        this.onTranscriptDone = null;  // AI応答の文字起こし完了時のコールバック（全文）
+        
+        // 受信確認（サーバーの送信キューのフロー制御用）
+        this.receivedMessages = 0;
+        this.ackedMessages = 0;
+        this.ackTimer = null;
         
         // メッセージ順序管理
         this.pendingUserItemId = null;  // 文字起こし待ちのユーザーメッセージID
@@ -72,6 +79,7 @@ class RealtimeClient {
                 console.log('  - readyState:', this.ws.readyState);
                 console.log('  - protocol:', this.ws.protocol);
                 this.isConnected = true;
+                this._startAck();
                 this._emitStatus('connected');
                 if (this.onConnected) {
                     this.onConnected();
@@ -84,6 +92,7 @@ class RealtimeClient {
                 console.log('  - Reason:', event.reason || '(理由なし)');
                 console.log('  - Clean:', event.wasClean);
                 this.isConnected = false;
+                this._stopAck();
                 this.sessionConfigured = false;  // フラグリセット
                 this.sessionReady = false;  // フラグリセット
                 this._emitStatus('disconnected');
@@ -102,6 +111,7 @@ class RealtimeClient {
             
             this.ws.onmessage = (event) => {
                 this._handleMessage(event);
+                this._countReceived();
             };
             
         } catch (error) {
@@ -472,6 +482,13 @@ class RealtimeClient {
                         }
                         break;
                     
+                    case 'response.audio_transcript.done':
+                        // AIの応答の文字起こし完了（混雑時は途中経過が省略されるため全文で置き換える）
+                        if (this.onTranscriptDone && data.transcript) {
+                            this.onTranscriptDone(data.transcript);
+                        }
+                        break;
+                    
                     case 'response.audio.delta':
                         // 音声データ（Base64エンコード済みPCM16）
                         if (this.onAudio && data.delta) {
@@ -479,6 +496,13 @@ class RealtimeClient {
                         }
                         break;
                     
+                    case 'salesmind.analysis':
+                        // サーバーでの営業メッセージ分析結果（会話の転送とは別に届く）
+                        if (this.onAnalysis) {
+                            this.onAnalysis(data);
+                        }
+                        break;
+                    
                     case 'response.done':
                         // 応答完了
                         if (this.onResponse) {
@@ -497,6 +521,39 @@ class RealtimeClient {
         }
     }
     
+    /**
+     * 受信したメッセージ数を数え、一定数ごとにサーバーへ受信確認を送る
+     * （サーバーは受信確認のない送信量が上限に達すると送信を待つ）
+     */
+    _countReceived() {
+        this.receivedMessages += 1;
+        if (this.receivedMessages - this.ackedMessages >= 10) {
+            this._sendAck();
+        }
+    }
+    
+    _sendAck() {
+        if (!this.ws || this.ws.readyState !== WebSocket.OPEN || this.receivedMessages === this.ackedMessages) {
+            return;
+        }
+        this.ws.send(JSON.stringify({ type: 'salesmind.ack', received: this.receivedMessages }));
+        this.ackedMessages = this.receivedMessages;
+    }
+    
+    _startAck() {
+        this.receivedMessages = 0;
+        this.ackedMessages = 0;
+        // 受信が少ない間も定期的に確認を送る
+        this.ackTimer = setInterval(() => this._sendAck(), 500);
+    }
+    
+    _stopAck() {
+        if (this.ackTimer) {
+            clearInterval(this.ackTimer);
+            this.ackTimer = null;
+        }
+    }
+    
     /**
      * エラーイベントを発火
      */
@@ -0,0 +1,34 @@
+#!/bin/sh
+# nginxのupstream（Daphneワーカーの一覧）を生成するスクリプト
+# nginx:alpineの起動時に /docker-entrypoint.d/ から実行される（docker-compose.ymlでマウント）
+#
+# webコンテナのentrypoint.shはASGI_WORKERS個のDaphneをASGI_BASE_PORTから連番のポートで起動するため、
+# 同じ値からupstreamを生成してnginx.confのポート数と食い違わないようにする
+set -eu
+
+ASGI_WORKERS=${ASGI_WORKERS:-1}
+ASGI_BASE_PORT=${ASGI_BASE_PORT:-8000}
+ASGI_UPSTREAM_HOST=${ASGI_UPSTREAM_HOST:-web}
+OUTPUT=${ASGI_UPSTREAM_CONF:-/etc/nginx/salesmind/upstream.conf}
+
+case "$ASGI_WORKERS" in
+    ''|*[!0-9]*|0)
+        echo "ASGI_WORKERSは1以上の整数を指定してください: '$ASGI_WORKERS'" >&2
+        exit 1
+        ;;
+esac
+
+mkdir -p "$(dirname "$OUTPUT")"
+{
+    echo "# nginx-upstream.shで生成（ASGI_WORKERS=${ASGI_WORKERS}）"
+    echo "upstream salesmind_web {"
+    echo "    least_conn;"
+    i=0
+    while [ "$i" -lt "$ASGI_WORKERS" ]; do
+        echo "    server ${ASGI_UPSTREAM_HOST}:$((ASGI_BASE_PORT + i)) max_fails=3 fail_timeout=10s;"
+        i=$((i + 1))
+    done
+    echo "}"
+} > "$OUTPUT"
+
+echo "upstream salesmind_web: ${ASGI_WORKERS}ワーカー（${ASGI_UPSTREAM_HOST}:${ASGI_BASE_PORT}-$((ASGI_BASE_PORT + ASGI_WORKERS - 1))）"